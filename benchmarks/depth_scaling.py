@@ -0,0 +1,122 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Shows how the cost of walking a subtree grows with its depth, comparing
+# child handles opened relative to their parent against re-resolving every
+# child from the hive root (the pre-pool behaviour).
+#
+#     python -m benchmarks.depth_scaling [--width N] [--depths 1,2,4,...]
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Any, Callable, Iterator
+
+from windowsregistry import RegistryPath, open_subkey
+from windowsregistry.backends import MemoryBackend
+from windowsregistry.handlepool import HandlePool, set_handle_pool
+from windowsregistry.models import RegistryHKEYEnum, RegistryKeyPermissionType
+
+
+class CountingBackend(MemoryBackend):
+    def __init__(self) -> None:
+        super().__init__()
+        self.opens = 0
+        self.components = 0
+
+    def OpenKeyEx(self, key: Any, sub_key: str, reserved: int = 0, access: int = 0x20019):
+        self.opens += 1
+        self.components += len([p for p in sub_key.split("\\") if p])
+        return super().OpenKeyEx(key, sub_key, reserved, access)
+
+
+def build(backend: CountingBackend, depth: int, width: int) -> None:
+    handle = backend.CreateKeyEx(RegistryHKEYEnum.HKEY_CURRENT_USER.value, "Bench")
+    for level in range(depth):
+        for leaf in range(width):
+            backend.CreateKeyEx(handle, f"Leaf{leaf}")
+        handle = backend.CreateKeyEx(handle, f"Level{level}")
+
+
+def walk_relative(root: RegistryPath) -> Iterator[RegistryPath]:
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        yield current
+        stack.extend(current.subkeys())
+
+
+def walk_from_root(root: RegistryPath) -> Iterator[RegistryPath]:
+    backend = root._backend._ll.backend
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        yield current
+        for name in current._backend.itersubkeys():
+            stack.append(
+                open_subkey(current.regpath.fullpath, name, backend=backend)
+            )
+
+
+def measure(
+    depth: int, width: int, walker: Callable[[RegistryPath], Iterator[RegistryPath]]
+) -> tuple[int, float, float]:
+    backend = CountingBackend()
+    build(backend, depth, width)
+    set_handle_pool(HandlePool(0))
+    root = open_subkey(
+        "HKCU",
+        "Bench",
+        backend=backend,
+        permission=RegistryKeyPermissionType.KEY_READ,
+    )
+    backend.opens = backend.components = 0
+    start = time.perf_counter()
+    nodes = sum(1 for _ in walker(root))
+    elapsed = time.perf_counter() - start
+    return nodes, elapsed, backend.components / max(backend.opens, 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=16)
+    parser.add_argument("--depths", default="1,2,4,8,16,32,64,128")
+    args = parser.parse_args()
+
+    print(
+        f"{'depth':>6} {'nodes':>7} {'root us/node':>13} {'rel us/node':>12}"
+        f" {'root parts/open':>16} {'rel parts/open':>15}"
+    )
+    for depth in map(int, args.depths.split(",")):
+        nodes, root_time, root_parts = measure(depth, args.width, walk_from_root)
+        _, rel_time, rel_parts = measure(depth, args.width, walk_relative)
+        print(
+            f"{depth:>6} {nodes:>7} {root_time / nodes * 1e6:>13.1f}"
+            f" {rel_time / nodes * 1e6:>12.1f} {root_parts:>16.1f} {rel_parts:>15.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Measures what a RegistryPath costs per key produced by a tree walk: bytes
+# allocated while all yielded nodes are kept alive, and construction time.
+#
+#     python -m benchmarks.node_footprint [--keys N] [--width N]
+
+from __future__ import annotations
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+from windowsregistry import RegistryPath, open_subkey
+from windowsregistry.backends import MemoryBackend
+from windowsregistry.handlepool import HandlePool, set_handle_pool
+from windowsregistry.models import RegistryHKEYEnum
+
+
+def build(backend: MemoryBackend, keys: int, width: int) -> None:
+    root = backend.CreateKeyEx(RegistryHKEYEnum.HKEY_CURRENT_USER.value, "Bench")
+    for group in range(max(1, keys // width)):
+        handle = backend.CreateKeyEx(root, f"Group{group}")
+        for leaf in range(width):
+            backend.CreateKeyEx(handle, f"Leaf{leaf}")
+
+
+def walk(root: RegistryPath) -> list[RegistryPath]:
+    nodes = [root]
+    stack = [root]
+    while stack:
+        children = list(stack.pop().subkeys())
+        nodes.extend(children)
+        stack.extend(children)
+    return nodes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--keys", type=int, default=50_000)
+    parser.add_argument("--width", type=int, default=100)
+    args = parser.parse_args()
+
+    backend = MemoryBackend()
+    build(backend, args.keys, args.width)
+    # Large enough that every handle of the walk stays pooled.
+    set_handle_pool(HandlePool(args.keys * 2))
+    root = open_subkey("HKCU", "Bench", backend=backend)
+
+    walk(root)  # warm up caches and interned objects
+    gc.collect()
+    start = time.perf_counter()
+    nodes = walk(root)
+    elapsed = time.perf_counter() - start
+    del nodes
+    gc.collect()
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    nodes = walk(root)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    count = len(nodes)
+    print(f"nodes            {count}")
+    print(f"us per node      {elapsed / count * 1e6:.2f}")
+    print(f"bytes per node   {(after - before) / count:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Benchmark suite over a synthetic registry, with regression tracking.
+#
+# Every benchmark reports, per operation:
+#   ops_per_sec         best of --repeat runs
+#   relative_speed      ops_per_sec over that of the "reference" benchmark,
+#                       plain Python work measured in the same run
+#   syscalls_per_op     calls into the backend (OpenKeyEx, EnumValue, ...),
+#                       i.e. what would be winreg calls on Windows
+#   alloc_bytes_per_op  tracemalloc peak over one run, divided by its ops
+#
+#     python -m benchmarks.suite                      # compare with baseline
+#     python -m benchmarks.suite --save               # record a new baseline
+#     python -m benchmarks.suite --only traverse,sizeof --threshold 0.1
+#
+# The exit status is 1 when any metric regresses by more than --threshold
+# against the baseline. Counts are deterministic. Raw ops/sec depend on the
+# machine and are only reported; speed is compared through relative_speed,
+# which cancels out most of the difference between machines.
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, NamedTuple, Optional
+
+from windowsregistry import RegistryPath, open_subkey
+from windowsregistry.backends import MemoryBackend
+from windowsregistry.models import RegistryKeyPermissionType, RegistryValueType
+from windowsregistry.regpath import RegistryPathString, _parse_cached
+
+from .synthetic import DEFAULT_MIX, SyntheticSpec, SyntheticTree, generate, parse_mix
+
+DEFAULT_BASELINE = Path(__file__).parent / "baseline.json"
+
+BACKEND_METHODS = (
+    "OpenKeyEx",
+    "CreateKeyEx",
+    "CloseKey",
+    "EnumKey",
+    "EnumValue",
+    "QueryInfoKey",
+    "QueryValueEx",
+    "SetValueEx",
+    "DeleteKeyEx",
+    "DeleteValue",
+)
+
+REFERENCE = "reference"
+
+# metric -> whether a larger value is better
+METRICS = {
+    "relative_speed": True,
+    "syscalls_per_op": False,
+    "alloc_bytes_per_op": False,
+}
+
+
+class CountingBackend(MemoryBackend):
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls: Counter[str] = Counter()
+        for name in BACKEND_METHODS:
+            setattr(self, name, self._counted(name, getattr(self, name)))
+
+    def _counted(self, name: str, method: Callable[..., Any]) -> Callable[..., Any]:
+        calls = self.calls
+
+        def counted(*args: Any) -> Any:
+            calls[name] += 1
+            return method(*args)
+
+        return counted
+
+
+class Context:
+    def __init__(self, spec: SyntheticSpec) -> None:
+        self.spec = spec
+        self.backend = CountingBackend()
+        self.tree: SyntheticTree = generate(spec, backend=self.backend)
+        self.root = open_subkey(
+            self.tree.root_key.name,
+            self.tree.path,
+            backend=self.backend,
+            permission=RegistryKeyPermissionType.KEY_ALL_ACCESS,
+        )
+        self.relpaths = [key.partition("\\")[2] for key in self.tree.keys[1:]]
+        self.fullpaths = [f"{self.tree.root_key.name}\\{key}" for key in self.tree.keys]
+        self.state: Any = None
+        self._opened: Optional[list[RegistryPath]] = None
+
+    def opened(self) -> list[RegistryPath]:
+        if self._opened is None:
+            self._opened = [self.root] + [self.root.open_subkey(p) for p in self.relpaths]
+        return self._opened
+
+
+class Benchmark(NamedTuple):
+    name: str
+    run: Callable[[Context], int]
+    prepare: Optional[Callable[[Context], None]] = None
+
+
+def _reference(ctx: Context) -> int:
+    # Roughly what parsing and hashing key paths costs, without the library.
+    for _ in range(20):
+        seen: dict[tuple[str, ...], int] = {}
+        for fullpath in ctx.fullpaths:
+            parts = tuple(fullpath.upper().split("\\"))
+            seen[parts] = len(seen)
+    return 20 * len(ctx.fullpaths)
+
+
+def _parse_prepare(_ctx: Context) -> None:
+    _parse_cached.cache_clear()
+
+
+def _parse(ctx: Context) -> int:
+    for fullpath in ctx.fullpaths:
+        RegistryPathString(fullpath)
+    return len(ctx.fullpaths)
+
+
+def _join_prepare(ctx: Context) -> None:
+    ctx.state = [RegistryPathString(fullpath) for fullpath in ctx.fullpaths]
+
+
+def _join(ctx: Context) -> int:
+    for regpath in ctx.state:
+        regpath.joinpath("Child").parent.joinpath("Sibling")
+    return len(ctx.state)
+
+
+def _open_subkey(ctx: Context) -> int:
+    for relpath in ctx.relpaths:
+        with ctx.root.open_subkey(relpath):
+            pass
+    return len(ctx.relpaths)
+
+
+def _keys_prepare(ctx: Context) -> None:
+    ctx.state = ctx.opened()
+
+
+def _subkeys(ctx: Context) -> int:
+    for path in ctx.state:
+        for child in path.subkeys():
+            child.close()
+    return len(ctx.state)
+
+
+def _values(ctx: Context) -> int:
+    for path in ctx.state:
+        for _ in path.values():
+            pass
+    return len(ctx.state)
+
+
+def _typed_values(ctx: Context) -> int:
+    for path in ctx.state:
+        path.typed_values()
+    return len(ctx.state)
+
+
+def _set_value(ctx: Context) -> int:
+    for path in ctx.state:
+        path.set_value("Bench", 1, dtype=RegistryValueType.REG_DWORD, overwrite=True)
+    return len(ctx.state)
+
+
+def _traverse(ctx: Context) -> int:
+    return sum(1 for _ in ctx.root.traverse())
+
+
+def _sizeof(ctx: Context) -> int:
+    for _ in range(10):
+        ctx.root.sizeof()
+    return 10
+
+
+def _delete_prepare(ctx: Context) -> None:
+    spec = ctx.spec._replace(depth=max(1, ctx.spec.depth - 1), values_per_key=2)
+    tree = generate(
+        spec, backend=ctx.backend, root_key=ctx.tree.root_key, path="SyntheticDelete"
+    )
+    ctx.state = len(tree.keys)
+
+
+def _delete_subkey(ctx: Context) -> int:
+    with open_subkey(
+        ctx.tree.root_key.name,
+        backend=ctx.backend,
+        permission=RegistryKeyPermissionType.KEY_ALL_ACCESS,
+    ) as hive:
+        hive.delete_subkey("SyntheticDelete", recursive=True)
+    return ctx.state
+
+
+BENCHMARKS = [
+    Benchmark(REFERENCE, _reference),
+    Benchmark("regpath_parse", _parse, _parse_prepare),
+    Benchmark("regpath_join", _join, _join_prepare),
+    Benchmark("open_subkey", _open_subkey),
+    Benchmark("subkeys", _subkeys, _keys_prepare),
+    Benchmark("values", _values, _keys_prepare),
+    Benchmark("typed_values", _typed_values, _keys_prepare),
+    Benchmark("set_value", _set_value, _keys_prepare),
+    Benchmark("traverse", _traverse),
+    Benchmark("sizeof", _sizeof),
+    Benchmark("delete_subkey_recursive", _delete_subkey, _delete_prepare),
+]
+
+
+def measure(ctx: Context, benchmark: Benchmark, repeat: int) -> dict[str, Any]:
+    best = float("inf")
+    ops = 1
+    calls: Counter[str] = Counter()
+    for _ in range(repeat):
+        if benchmark.prepare is not None:
+            benchmark.prepare(ctx)
+        gc.collect()
+        ctx.backend.calls.clear()
+        start = time.perf_counter()
+        ops = benchmark.run(ctx)
+        elapsed = time.perf_counter() - start
+        calls = Counter(ctx.backend.calls)
+        best = min(best, elapsed)
+
+    if benchmark.prepare is not None:
+        benchmark.prepare(ctx)
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    benchmark.run(ctx)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    ops = max(ops, 1)
+    return {
+        "ops": ops,
+        "ops_per_sec": round(ops / best, 1) if best else 0.0,
+        "syscalls_per_op": round(sum(calls.values()) / ops, 3),
+        "alloc_bytes_per_op": round((peak - base) / ops, 1),
+        "syscalls": dict(sorted(calls.items())),
+    }
+
+
+def add_relative_speed(results: dict[str, dict[str, Any]]) -> None:
+    reference = results.get(REFERENCE, {}).get("ops_per_sec")
+    for result in results.values():
+        result["relative_speed"] = (
+            round(result["ops_per_sec"] / reference, 4) if reference else 0.0
+        )
+
+
+def compare(
+    results: dict[str, dict[str, Any]],
+    baseline: dict[str, dict[str, Any]],
+    threshold: float,
+) -> list[str]:
+    regressions: list[str] = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None or name == REFERENCE:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = before.get(metric), result[metric]
+            if not old:
+                continue
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > threshold:
+                regressions.append(f"{name}: {metric} {old} -> {new} ({change:+.1%})")
+    return regressions
+
+
+def main() -> int:
+    defaults = SyntheticSpec()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fanout", type=int, default=defaults.fanout)
+    parser.add_argument("--depth", type=int, default=defaults.depth)
+    parser.add_argument("--values", type=int, default=defaults.values_per_key)
+    parser.add_argument("--mix", type=parse_mix, default=dict(DEFAULT_MIX))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", default="")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--save", action="store_true")
+    parser.add_argument(
+        "--output", type=Path, help="also write the results to this JSON file"
+    )
+    args = parser.parse_args()
+
+    spec = SyntheticSpec(args.fanout, args.depth, args.values, args.mix)
+    selected = {name for name in args.only.split(",") if name}
+    if selected:
+        selected.add(REFERENCE)
+    ctx = Context(spec)
+    results: dict[str, dict[str, Any]] = {}
+    print(f"{'benchmark':<26} {'ops/sec':>12} {'syscalls/op':>12} {'bytes/op':>10}")
+    for benchmark in BENCHMARKS:
+        if selected and benchmark.name not in selected:
+            continue
+        result = results[benchmark.name] = measure(ctx, benchmark, args.repeat)
+        print(
+            f"{benchmark.name:<26} {result['ops_per_sec']:>12.0f}"
+            f" {result['syscalls_per_op']:>12.2f} {result['alloc_bytes_per_op']:>10.0f}"
+        )
+    add_relative_speed(results)
+
+    report = {
+        "spec": {**spec._asdict(), "type_mix": dict(spec.type_mix)},
+        "python": platform.python_version(),
+        "results": results,
+    }
+    if args.output:
+        with args.output.open("w") as fp:
+            json.dump(report, fp, indent=2)
+    if args.save:
+        # Raw ops/sec only describe this machine; the baseline keeps ratios.
+        saved = {
+            name: {k: v for k, v in result.items() if k != "ops_per_sec"}
+            for name, result in results.items()
+        }
+        with args.baseline.open("w") as fp:
+            json.dump({**report, "results": saved}, fp, indent=2)
+            fp.write("\n")
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    try:
+        with args.baseline.open() as fp:
+            baseline = json.load(fp)
+    except FileNotFoundError:
+        print(f"no baseline at {args.baseline}; run with --save to create one")
+        return 0
+    if baseline.get("spec") != report["spec"]:
+        print("baseline was recorded with a different registry shape; not comparing")
+        return 0
+    regressions = compare(results, baseline.get("results", {}), args.threshold)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if regressions:
+        return 1
+    print(f"no regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
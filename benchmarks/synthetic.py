@@ -0,0 +1,150 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Builds synthetic registries with a configurable shape in a MemoryBackend
+# (the in-process stand-in for winreg), for benchmarks that must run the
+# same way on any platform.
+#
+#     python -m benchmarks.synthetic [--fanout N] [--depth N] [--values N]
+#                                    [--mix sz=4,dword=2,...]
+
+from __future__ import annotations
+
+import argparse
+import random
+from typing import Any, Mapping, NamedTuple, Optional
+
+from windowsregistry.backends import MemoryBackend
+from windowsregistry.models import RegistryHKEYEnum, RegistryValueType
+
+DEFAULT_MIX: Mapping[str, float] = {
+    "sz": 4,
+    "expand_sz": 1,
+    "dword": 3,
+    "qword": 1,
+    "binary": 1,
+    "multi_sz": 1,
+}
+
+
+class SyntheticSpec(NamedTuple):
+    fanout: int = 4
+    depth: int = 4
+    values_per_key: int = 8
+    type_mix: Mapping[str, float] = DEFAULT_MIX
+    seed: int = 0
+
+    @property
+    def total_keys(self) -> int:
+        return sum(self.fanout**level for level in range(self.depth + 1))
+
+
+class SyntheticTree(NamedTuple):
+    backend: MemoryBackend
+    root_key: RegistryHKEYEnum
+    path: str
+    keys: list[str]
+    total_values: int
+
+
+def parse_mix(raw: str) -> dict[str, float]:
+    mix: dict[str, float] = {}
+    for item in raw.split(","):
+        name, _, weight = item.partition("=")
+        mix[name.strip().lower()] = float(weight or 1)
+    return mix
+
+
+def _dtype(name: str) -> RegistryValueType:
+    name = name.upper()
+    return RegistryValueType[name if name.startswith("REG_") else "REG_" + name]
+
+
+def _data(rng: random.Random, dtype: RegistryValueType) -> Any:
+    if dtype in (RegistryValueType.REG_SZ, RegistryValueType.REG_EXPAND_SZ):
+        return "value-%08x" % rng.getrandbits(32) * rng.randint(1, 4)
+    if dtype == RegistryValueType.REG_DWORD:
+        return rng.getrandbits(32)
+    if dtype == RegistryValueType.REG_QWORD:
+        return rng.getrandbits(64)
+    if dtype == RegistryValueType.REG_MULTI_SZ:
+        return ["item%d" % rng.getrandbits(16) for _ in range(rng.randint(1, 4))]
+    return rng.randbytes(rng.randint(4, 64))
+
+
+def generate(
+    spec: SyntheticSpec,
+    *,
+    backend: Optional[MemoryBackend] = None,
+    root_key: RegistryHKEYEnum = RegistryHKEYEnum.HKEY_CURRENT_USER,
+    path: str = "Synthetic",
+) -> SyntheticTree:
+    # Writes straight to the backend so building a tree does not depend on
+    # (or pollute the caches of) the code being measured. Keys are returned
+    # in preorder, relative to the root key.
+    backend = backend if backend is not None else MemoryBackend()
+    rng = random.Random(spec.seed)
+    kinds = [_dtype(name) for name in spec.type_mix]
+    weights = list(spec.type_mix.values())
+    keys: list[str] = []
+    total_values = 0
+    stack = [(backend.CreateKeyEx(root_key.value, path), path, 0)]
+    while stack:
+        handle, name, level = stack.pop()
+        keys.append(name)
+        chosen = rng.choices(kinds, weights, k=spec.values_per_key) if kinds else ()
+        for index, dtype in enumerate(chosen):
+            backend.SetValueEx(handle, f"Value{index}", 0, dtype.value, _data(rng, dtype))
+            total_values += 1
+        if level < spec.depth:
+            for child in reversed(range(spec.fanout)):
+                stack.append(
+                    (
+                        backend.CreateKeyEx(handle, f"Key{child}"),
+                        f"{name}\\Key{child}",
+                        level + 1,
+                    )
+                )
+        backend.CloseKey(handle)
+    return SyntheticTree(backend, root_key, path, keys, total_values)
+
+
+def main() -> None:
+    defaults = SyntheticSpec()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fanout", type=int, default=defaults.fanout)
+    parser.add_argument("--depth", type=int, default=defaults.depth)
+    parser.add_argument("--values", type=int, default=defaults.values_per_key)
+    parser.add_argument("--mix", type=parse_mix, default=dict(DEFAULT_MIX))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    spec = SyntheticSpec(args.fanout, args.depth, args.values, args.mix, args.seed)
+    tree = generate(spec)
+    print(f"keys     {len(tree.keys)}")
+    print(f"values   {tree.total_values}")
+
+
+if __name__ == "__main__":
+    main()
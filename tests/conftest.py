@@ -0,0 +1,59 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import itertools
+import os
+from typing import Callable, Iterator
+
+import pytest
+
+from windowsregistry import RegistryPath, open_subkey
+from windowsregistry.backends import MemoryBackend
+from windowsregistry.backends.base import BACKEND_ENV
+from windowsregistry.models import RegistryKeyPermissionType
+
+# Code under test that falls back to the default backend (the predefined
+# root keys, subprocess checks) runs against an in-memory registry.
+os.environ.setdefault(BACKEND_ENV, "memory")
+
+
+@pytest.fixture
+def clock() -> Callable[[], int]:
+    # Strictly increasing FILETIME-like stamps, so every write is visible.
+    return itertools.count(132_000_000_000_000_000, 10).__next__
+
+
+@pytest.fixture
+def backend(clock: Callable[[], int]) -> MemoryBackend:
+    return MemoryBackend(clock=clock)
+
+
+@pytest.fixture
+def hkcu(backend: MemoryBackend) -> Iterator[RegistryPath]:
+    with open_subkey(
+        "HKCU", backend=backend, permission=RegistryKeyPermissionType.KEY_ALL_ACCESS
+    ) as root:
+        yield root
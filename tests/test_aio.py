@@ -0,0 +1,161 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+import pytest
+
+from windowsregistry import RegistryPath, instrument
+from windowsregistry.aio import AsyncRegistryPath, AsyncRunner, aopen_subkey
+from windowsregistry.backends import MemoryBackend, use_backend
+from windowsregistry.models import (
+    RegistryHKEYEnum,
+    RegistryKeyPermissionType,
+    RegistryValueType,
+)
+
+
+class _CountingExecutor(ThreadPoolExecutor):
+    def __init__(self) -> None:
+        super().__init__(max_workers=4)
+        self.submitted = 0
+
+    def submit(  # type: ignore[override]
+        self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any
+    ):
+        self.submitted += 1
+        return super().submit(fn, *args, **kwargs)
+
+
+@pytest.fixture
+def runner():
+    runner = AsyncRunner(limit=4)
+    yield runner
+    runner.shutdown()
+
+
+def test_round_trip(backend: MemoryBackend, runner: AsyncRunner) -> None:
+    async def main() -> None:
+        async with await aopen_subkey(
+            "HKCU",
+            backend=backend,
+            permission=RegistryKeyPermissionType.KEY_ALL_ACCESS,
+            runner=runner,
+        ) as root:
+            app = await root.create_subkey("App")
+            await app.set_values(
+                [
+                    ("a", "x", RegistryValueType.REG_SZ),
+                    ("b", 7, RegistryValueType.REG_DWORD),
+                ]
+            )
+            await app.create_subkey("Child")
+            assert [v.data for v in await app.get_values("a", "b")] == ["x", 7]
+            assert await app.typed_values() == {"a": "x", "b": 7}
+            names = [key.regpath.parts[-1] async for key in app.subkeys(batch_size=1)]
+            assert names == ["Child"]
+            values = [value.value_name async for value in app.values(batch_size=1)]
+            assert values == ["a", "b"]
+            seen = [key.regpath.path async for key, _, _ in root.traverse()]
+            assert seen == ["", "App", "App\\Child"]
+            await app.delete_value("a")
+            assert not await app.value_exists("a")
+
+    asyncio.run(main())
+
+
+def test_context_is_propagated(backend: MemoryBackend, runner: AsyncRunner) -> None:
+    backend.CreateKeyEx(RegistryHKEYEnum.HKEY_CURRENT_USER.value, "Ctx")
+
+    async def main() -> None:
+        with use_backend(backend), instrument.profile() as scope:
+            path = await aopen_subkey(r"HKCU\Ctx", runner=runner)
+            assert await path.value_exists("missing") is False
+        assert isinstance(path, AsyncRegistryPath)
+        assert sum(stats.count for stats in scope.totals().values()) >= 2
+
+    asyncio.run(main())
+
+
+def test_same_key_calls_share_a_batch(hkcu: RegistryPath) -> None:
+    executor = _CountingExecutor()
+    runner = AsyncRunner(executor, limit=4)
+    hkcu.create_subkey("Shared")
+    other = hkcu.create_subkey("Other")
+
+    async def main() -> None:
+        shared = AsyncRegistryPath(hkcu.open_subkey("Shared"), runner=runner)
+        await asyncio.gather(*(shared.value_exists(str(i)) for i in range(5)))
+        assert executor.submitted == 1
+        await asyncio.gather(
+            shared.value_exists("x"),
+            AsyncRegistryPath(other, runner=runner).value_exists("x"),
+        )
+        assert executor.submitted == 3
+
+    try:
+        asyncio.run(main())
+    finally:
+        executor.shutdown()
+
+
+def test_slow_call_does_not_stall_other_keys(runner: AsyncRunner) -> None:
+    released = threading.Event()
+
+    def slow(_key: object) -> bool:
+        return released.wait(5)
+
+    def fast(_key: object) -> None:
+        released.set()
+
+    async def main() -> None:
+        results = await asyncio.gather(
+            runner.run(slow, object()), runner.run(fast, object())
+        )
+        assert results == [True, None]
+
+    asyncio.run(main())
+
+
+def test_errors_and_cancellation(runner: AsyncRunner) -> None:
+    calls: list[int] = []
+
+    def fail(_key: object) -> None:
+        raise KeyError("boom")
+
+    async def main() -> None:
+        key = object()
+        cancelled = runner.run(calls.append, 1)
+        cancelled.cancel()
+        with pytest.raises(KeyError):
+            await runner.run(fail, key)
+        await runner.run(calls.append, 2)
+
+    asyncio.run(main())
+    assert calls == [2]
@@ -0,0 +1,187 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+
+from windowsregistry import RegistryPath
+from windowsregistry.backends import MemoryBackend
+from windowsregistry.batch import BatchAction, BatchStats, RegistryBatch
+from windowsregistry.errors import OperationError
+from windowsregistry.models import RegistryValueType
+
+SZ = RegistryValueType.REG_SZ
+DWORD = RegistryValueType.REG_DWORD
+
+
+def _state(path: RegistryPath) -> dict[str, dict[str, Any]]:
+    return {
+        key.regpath.path: {v.value_name: v.data for v in values}
+        for key, _, values in path.walk()
+    }
+
+
+@pytest.fixture
+def app(hkcu: RegistryPath) -> RegistryPath:
+    app = hkcu.create_subkey("App")
+    app.set_value("keep", "old", dtype=SZ)
+    app.set_value("drop", 1, dtype=DWORD)
+    cache = app.create_subkey("Cache")
+    cache.create_subkey("Deep").set_value("x", "y", dtype=SZ)
+    return app
+
+
+def test_commit_applies_everything(backend: MemoryBackend, app: RegistryPath) -> None:
+    batch = RegistryBatch(backend=backend)
+    batch.set_value(r"HKCU\App", "keep", "new", dtype=SZ)
+    batch.delete_value(app, "DROP")
+    batch.delete_value(app, "never", missing_ok=True)
+    batch.delete_key(r"HKCU\App\Cache", recursive=True)
+    batch.create_key(r"HKCU\App\New\Nested")
+    assert len(batch) == 5
+    stats = batch.commit()
+    assert stats == BatchStats(2, 1, 1, 1, 1)
+    assert _state(app) == {
+        "App": {"keep": "new"},
+        "App\\New": {},
+        "App\\New\\Nested": {},
+    }
+    assert [entry.action for entry in batch.journal] == [
+        BatchAction.DELETE_KEY,
+        BatchAction.SET_VALUE,
+        BatchAction.DELETE_VALUE,
+        BatchAction.CREATE_KEY,
+    ]
+
+
+def test_rollback_restores_previous_state(
+    backend: MemoryBackend, app: RegistryPath
+) -> None:
+    before = _state(app)
+    with RegistryBatch(backend=backend) as batch:
+        batch.set_value(app, "keep", "new", dtype=SZ)
+        batch.set_value(app, "added", 5, dtype=DWORD)
+        batch.delete_value(app, "drop")
+        batch.delete_key(r"HKCU\App\Cache", recursive=True)
+        batch.create_key(r"HKCU\App\New\Nested")
+    assert _state(app) != before
+    batch.rollback()
+    assert _state(app) == before
+    assert batch.journal == ()
+
+
+def test_failed_commit_rolls_back(backend: MemoryBackend, app: RegistryPath) -> None:
+    before = _state(app)
+    batch = RegistryBatch(backend=backend)
+    batch.set_value(app, "keep", "new", dtype=SZ)
+    batch.delete_value(app, "missing")
+    with pytest.raises(OperationError):
+        batch.commit()
+    assert _state(app) == before
+
+    batch.delete_key(r"HKCU\App\Cache")
+    with pytest.raises(OperationError, match="not empty"):
+        batch.commit()
+    assert _state(app) == before
+
+
+def test_without_journal(backend: MemoryBackend, app: RegistryPath) -> None:
+    batch = RegistryBatch(backend=backend, journal=False)
+    batch.set_value(app, "keep", "new", dtype=SZ)
+    batch.delete_value(app, "missing")
+    with pytest.raises(OperationError):
+        batch.commit()
+    assert batch.journal == ()
+    assert app.get_value("keep").data == "new"
+
+
+def test_delete_supersedes_pending_children(
+    backend: MemoryBackend, app: RegistryPath
+) -> None:
+    batch = RegistryBatch(backend=backend)
+    batch.set_value(r"HKCU\App\Cache\Deep", "x", "z", dtype=SZ)
+    batch.create_key(r"HKCU\App\Cache\Other")
+    batch.delete_key(r"HKCU\App\Cache", recursive=True)
+    assert len(batch) == 1
+    batch.commit()
+    assert not app.subkey_exists("Cache")
+    with pytest.raises(OperationError):
+        batch.delete_key("HKCU")
+
+
+def test_exit_with_error_discards(backend: MemoryBackend, app: RegistryPath) -> None:
+    batch = RegistryBatch(backend=backend)
+    with pytest.raises(RuntimeError), batch:
+        batch.set_value(app, "keep", "new", dtype=SZ)
+        raise RuntimeError
+    assert len(batch) == 0
+    assert app.get_value("keep").data == "old"
+
+
+def test_deleted_keys_are_not_served_from_the_pool(
+    backend: MemoryBackend, app: RegistryPath
+) -> None:
+    app.open_subkey("Cache").close()
+    cache = app.regpath.joinpath("Cache")
+    RegistryBatch(backend=backend).delete_key(cache, recursive=True).commit()
+    RegistryBatch(backend=backend).set_value(cache, "v", "fresh", dtype=SZ).commit()
+    with app.open_subkey("Cache") as cache:
+        assert [value.data for value in cache.values()] == ["fresh"]
+
+
+def test_value_names_fold_like_the_registry(
+    backend: MemoryBackend, app: RegistryPath
+) -> None:
+    # The Kelvin sign lowercases to "k" but is its own name in the registry.
+    batch = RegistryBatch(backend=backend)
+    batch.set_value(app, "k", "ascii", dtype=SZ)
+    batch.set_value(app, "K", "kelvin", dtype=SZ)
+    assert len(batch) == 2
+    batch.commit()
+    assert app.get_value("k").data == "ascii"
+    assert app.get_value("K").data == "kelvin"
+
+
+def test_rollback_replays_data_the_codec_rejects(
+    backend: MemoryBackend, app: RegistryPath
+) -> None:
+    # Written behind the codec's back; rollback must put it back verbatim.
+    root = app._backend.winreg_handler
+    for path in ("", r"Cache\Deep"):
+        handle = backend.CreateKeyEx(root, path, 0, 0xF003F)
+        backend.SetValueEx(handle, "raw", 0, SZ.value, "a\0b")
+        backend.CloseKey(handle)
+    batch = RegistryBatch(backend=backend)
+    batch.set_value(app, "raw", "clean", dtype=SZ)
+    batch.delete_key(r"HKCU\App\Cache", recursive=True)
+    batch.delete_value(app, "missing")
+    with pytest.raises(OperationError):
+        batch.commit()
+    for path in ("", r"Cache\Deep"):
+        handle = backend.OpenKeyEx(root, path)
+        assert backend.QueryValueEx(handle, "raw") == ("a\0b", SZ.value)
+        backend.CloseKey(handle)
@@ -0,0 +1,71 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from benchmarks.suite import (
+    BENCHMARKS,
+    DEFAULT_BASELINE,
+    REFERENCE,
+    add_relative_speed,
+    compare,
+)
+
+
+def _result(ops_per_sec: float, syscalls: float = 1.0) -> dict[str, Any]:
+    return {
+        "ops_per_sec": ops_per_sec,
+        "syscalls_per_op": syscalls,
+        "alloc_bytes_per_op": 8,
+    }
+
+
+def test_speed_is_compared_relative_to_the_reference() -> None:
+    baseline = {REFERENCE: _result(1000.0), "open": _result(100.0)}
+    add_relative_speed(baseline)
+    assert baseline["open"]["relative_speed"] == 0.1
+    # A machine twice as slow across the board is not a regression.
+    slower = {REFERENCE: _result(500.0), "open": _result(50.0)}
+    add_relative_speed(slower)
+    assert compare(slower, baseline, 0.25) == []
+    # Only the library getting slower against the same reference is.
+    regressed = {REFERENCE: _result(1000.0), "open": _result(50.0, syscalls=2.0)}
+    add_relative_speed(regressed)
+    assert compare(regressed, baseline, 0.25) == [
+        "open: relative_speed 0.1 -> 0.05 (-50.0%)",
+        "open: syscalls_per_op 1.0 -> 2.0 (+100.0%)",
+    ]
+
+
+def test_committed_baseline_holds_no_raw_speeds() -> None:
+    with DEFAULT_BASELINE.open() as fp:
+        results = json.load(fp)["results"]
+    assert set(results) == {benchmark.name for benchmark in BENCHMARKS}
+    for result in results.values():
+        assert "ops_per_sec" not in result
+        assert result["relative_speed"] > 0
+    assert results[REFERENCE]["relative_speed"] == 1.0
@@ -0,0 +1,95 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+from typing import Any, Iterator
+
+import pytest
+
+from windowsregistry import RegistryPath
+from windowsregistry.backends import MemoryBackend
+from windowsregistry.batch import RegistryBatch
+from windowsregistry.codec import ValueCodec, get_codec, register_codec
+from windowsregistry.errors import (
+    OperationDataErrorKind,
+    OperationError,
+    OperationErrorKind,
+    ValueCodecError,
+)
+from windowsregistry.models import RegistryValueType
+
+SZ = RegistryValueType.REG_SZ
+DWORD = RegistryValueType.REG_DWORD
+
+
+@pytest.fixture
+def encoded() -> Iterator[list[Any]]:
+    # Every REG_SZ encode, by data.
+    original = get_codec(SZ)
+    calls: list[Any] = []
+
+    def encode(data: Any) -> Any:
+        calls.append(data)
+        return original.encode(data)
+
+    register_codec(SZ, ValueCodec(original.decode, encode))
+    try:
+        yield calls
+    finally:
+        register_codec(SZ, original)
+
+
+def test_set_value_wraps_codec_errors(hkcu: RegistryPath) -> None:
+    app = hkcu.create_subkey("App")
+    with pytest.raises(OperationError) as info:
+        app.set_value("n", 1 << 32, dtype=DWORD)
+    assert info.value.operation is OperationErrorKind.ON_UPDATE
+    assert info.value.kind is OperationDataErrorKind.VALUE
+    assert isinstance(info.value.exc, ValueCodecError)
+    assert not app.value_exists("n")
+    with pytest.raises(OperationError, match="embedded|NUL"):
+        app.set_value("s", "a\0b", dtype=SZ)
+    assert app.set_value("n", b"\x01\0\0\0", dtype=DWORD).data == 1
+
+
+def test_batch_validates_once(
+    backend: MemoryBackend, hkcu: RegistryPath, encoded: list[Any]
+) -> None:
+    app = hkcu.create_subkey("App")
+    batch = RegistryBatch(backend=backend)
+    with pytest.raises(ValueCodecError):
+        batch.set_value(app, "bad", 1 << 32, dtype=DWORD)
+    batch.set_value(app, "s", "text", dtype=SZ)
+    assert encoded == ["text"]
+    batch.commit()
+    assert encoded == ["text"]
+    assert app.get_value("s").data == "text"
+
+
+def test_create_tree_validates_once(hkcu: RegistryPath, encoded: list[Any]) -> None:
+    app = hkcu.create_subkey("App")
+    app.create_tree({"s": ("text", "REG_SZ"), "Sub": {"t": ("more", SZ)}})
+    assert sorted(encoded) == ["more", "text"]
+    assert app.open_subkey("Sub").get_value("t").data == "more"
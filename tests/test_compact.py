@@ -0,0 +1,112 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import io
+from pathlib import Path
+
+import pytest
+
+from windowsregistry.errors import HiveFormatError, OperationError
+from windowsregistry.hive import CompactBackend, HiveNode, open_compact, write_compact
+from windowsregistry.hive.compact import HEADER, KEY, SUBKEY
+from windowsregistry.models import RegistryValueType
+
+REG_SZ = RegistryValueType.REG_SZ.value
+REG_DWORD = RegistryValueType.REG_DWORD.value
+
+NODE = HiveNode(
+    "ROOT",
+    0,
+    [("n", 1, REG_DWORD)],
+    [
+        HiveNode("Alpha", 0, [("s", "a", REG_SZ)], []),
+        HiveNode("beta", 0, [("s", "b", REG_SZ)], [HiveNode("Deep", 0, [], [])]),
+        HiveNode("Gamma", 0, [("s", "a", REG_SZ)], []),
+    ],
+)
+
+
+def test_round_trip(tmp_path: Path) -> None:
+    file = tmp_path / "snap"
+    stats = write_compact(NODE, file, timestamp=7)
+    assert (stats.total_keys, stats.total_values, stats.shared_blobs) == (5, 4, 1)
+    assert stats.file_size == file.stat().st_size
+    root = open_compact(file)
+    assert [key.regpath.name for key in root.subkeys()] == ["Alpha", "beta", "Gamma"]
+    assert root.get_value("N").data == 1
+    assert [key.regpath.name for key in root.open_subkey("BETA").subkeys()] == ["Deep"]
+    assert root.open_subkey("gamma").get_value("s").data == "a"
+    mapped = root._backend._ll.backend
+    assert isinstance(mapped, CompactBackend)
+    root.close()
+    assert mapped._mm.closed
+    file.unlink()
+
+
+def test_snapshot_inside_a_larger_file(tmp_path: Path) -> None:
+    stream = io.BytesIO()
+    stream.write(b"prefix")
+    stats = write_compact(NODE, stream, timestamp=7)
+    stream.write(b"suffix")
+    assert stats.file_size == len(stream.getvalue()) - len(b"prefixsuffix")
+    file = tmp_path / "embedded"
+    file.write_bytes(stream.getvalue())
+    root = open_compact(file, offset=len(b"prefix"))
+    assert root.open_subkey("beta").get_value("s").data == "b"
+    assert [key.regpath.name for key in root.open_subkey("beta").subkeys()] == ["Deep"]
+    with pytest.raises(HiveFormatError):
+        CompactBackend(file)
+
+
+def test_corrupt_records_are_skipped(tmp_path: Path) -> None:
+    file = tmp_path / "snap"
+    write_compact(NODE, file, timestamp=7)
+    raw = bytearray(file.read_bytes())
+    root = HEADER.unpack_from(raw, 0)[3]
+    # Point the second subkey of the root ("beta") past the end of the file.
+    entry = root + KEY.size + SUBKEY.size
+    name = SUBKEY.unpack_from(raw, entry)[0]
+    SUBKEY.pack_into(raw, entry, name, len(raw) + 64)
+    file.write_bytes(bytes(raw))
+    snapshot = open_compact(file)
+    assert [key.regpath.name for key in snapshot.subkeys()] == ["Alpha", "Gamma"]
+    with pytest.raises(OperationError) as info:
+        snapshot.open_subkey("beta")
+    assert isinstance(info.value.exc, HiveFormatError)
+    errors: list[Exception] = []
+    walked = [path.regpath.name for path, _, _ in snapshot.walk(onerror=errors.append)]
+    assert walked == ["HKEY_LOCAL_MACHINE", "Alpha", "Gamma"]
+    assert len(errors) == 1
+
+
+def test_format_errors_are_os_errors(tmp_path: Path) -> None:
+    file = tmp_path / "junk"
+    file.write_bytes(b"x" * HEADER.size)
+    with pytest.raises(OSError) as info:
+        CompactBackend(file)
+    assert isinstance(info.value, HiveFormatError)
+    assert info.value.winerror == 1009  # type: ignore[attr-defined]
+    assert "signature" in str(info.value)
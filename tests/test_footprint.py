@@ -0,0 +1,95 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import weakref
+
+from windowsregistry import RegistryPath, open_subkey
+from windowsregistry._backend import WindowsRegistryHandler
+from windowsregistry._lowlevel import get_lowlevel
+from windowsregistry.backends import MemoryBackend
+from windowsregistry.models import RegistryKeyPermissionType, RegistryValueType
+from windowsregistry.regpath import RegistryPathString
+from windowsregistry.utils import get_permission_config
+
+
+def test_per_key_objects_have_no_dict(hkcu: RegistryPath) -> None:
+    app = hkcu.create_subkey("App")
+    for obj in (app, app._backend, app._backend._ll, app.regpath):
+        assert not hasattr(obj, "__dict__")
+    weakref.ref(app)
+    weakref.ref(app._backend)
+
+
+def test_lowlevel_and_permissions_are_shared(backend: MemoryBackend) -> None:
+    read = (RegistryKeyPermissionType.KEY_READ,)
+    assert get_permission_config(read, False) is get_permission_config(read, False)
+    config = get_permission_config(read, False)
+    assert get_lowlevel(config, backend) is get_lowlevel(config, backend)
+    assert get_lowlevel(config, backend) is not get_lowlevel(config, MemoryBackend())
+    with open_subkey("HKCU", backend=backend) as a, open_subkey(
+        "HKCU", backend=backend
+    ) as b:
+        assert a._backend._ll is b._backend._ll
+
+
+class _CountingBackend(MemoryBackend):
+    def __init__(self) -> None:
+        super().__init__()
+        self.queries = 0
+
+    def QueryInfoKey(self, key):  # type: ignore[no-untyped-def]
+        self.queries += 1
+        return super().QueryInfoKey(key)
+
+
+def test_key_info_is_queried_lazily() -> None:
+    backend = _CountingBackend()
+    with open_subkey(
+        "HKCU", backend=backend, permission=RegistryKeyPermissionType.KEY_ALL_ACCESS
+    ) as root:
+        app = root.create_subkey("App")
+        backend.queries = 0
+        handler = WindowsRegistryHandler(
+            "App", root_key=root.regpath.root_key, backend=backend
+        )
+        assert backend.queries == 0
+        assert handler.winreg_query.total_values == 0
+        # Counts are never stale, even after writes through another object.
+        app.set_value("v", 1, dtype=RegistryValueType.REG_DWORD)
+        app.create_subkey("Sub")
+        info = handler.winreg_query
+        assert (info.total_subkeys, info.total_values) == (1, 1)
+        values = RegistryPath._from_handler(handler).values()
+        assert [value.value_name for value in values] == ["v"]
+        handler.close()
+        assert handler.closed
+
+
+def test_regpath_round_trips() -> None:
+    regpath = RegistryPathString(r"HKLM\Software\Vendor")
+    assert regpath.fullpath == "HKEY_LOCAL_MACHINE\\Software\\Vendor"
+    assert regpath.path == "Software\\Vendor"
+    assert regpath.name == "Vendor"
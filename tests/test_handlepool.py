@@ -0,0 +1,158 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import io
+from typing import Iterator
+
+import pytest
+
+from windowsregistry import RegistryPath
+from windowsregistry.backends import MemoryBackend
+from windowsregistry.handlepool import (
+    HandlePool,
+    HandlePoolKey,
+    get_handle_pool,
+    make_key,
+    set_handle_pool,
+)
+from windowsregistry.models import RegistryHKEYEnum, RegistryValueType
+from windowsregistry.regfile import import_reg
+from windowsregistry.regpath import RegistryPathString
+
+HKCU = RegistryHKEYEnum.HKEY_CURRENT_USER.value
+
+
+@pytest.fixture
+def pool() -> Iterator[HandlePool]:
+    previous = get_handle_pool()
+    pool = HandlePool(4, track_leaks=True)
+    set_handle_pool(pool)
+    try:
+        yield pool
+    finally:
+        set_handle_pool(previous)
+
+
+def _key(backend: MemoryBackend, path: str) -> HandlePoolKey:
+    return make_key(backend, RegistryPathString(f"HKCU\\{path}"), 1)
+
+
+def test_acquire_reuses_and_evicts_lru(backend: MemoryBackend, pool: HandlePool) -> None:
+    for name in "abcde":
+        backend.CreateKeyEx(HKCU, name)
+    opened: list[str] = []
+
+    def opener(name: str):
+        def open_():
+            opened.append(name)
+            return backend.OpenKeyEx(HKCU, name)
+
+        return open_
+
+    entries = {name: pool.acquire(_key(backend, name), opener(name)) for name in "abcd"}
+    again = pool.acquire(_key(backend, "A"), opener("A"))
+    assert again is entries["a"] and again.refcount == 2
+    for entry in [*entries.values(), again]:
+        pool.release(entry)
+    assert pool.stats() == (4, 0, 1, 4, 0)
+
+    pool.acquire(_key(backend, "a"), opener("a"))
+    pool.acquire(_key(backend, "e"), opener("e"))
+    # "b" was the least recently used idle handle.
+    assert entries["b"].closed and not entries["b"].handle
+    assert not entries["a"].closed
+    assert opened == ["a", "b", "c", "d", "e"]
+    assert pool.stats().evictions == 1
+
+
+def test_in_use_handles_survive_invalidate(backend: MemoryBackend, pool: HandlePool) -> None:
+    backend.CreateKeyEx(HKCU, r"a\b")
+    outer = pool.acquire(_key(backend, "a"), lambda: backend.OpenKeyEx(HKCU, "a"))
+    inner = pool.acquire(_key(backend, r"a\b"), lambda: backend.OpenKeyEx(HKCU, r"a\b"))
+    pool.release(inner)
+    pool.invalidate(backend, RegistryPathString(r"HKCU\A"))
+    assert len(pool) == 0
+    assert inner.closed and not inner.handle
+    # Still checked out: detached from the pool, closed on the last release.
+    assert outer.closed and outer.handle
+    pool.release(outer)
+    assert not outer.handle
+
+
+def test_leak_report(backend: MemoryBackend, pool: HandlePool) -> None:
+    backend.CreateKeyEx(HKCU, "a")
+    entry = pool.acquire(_key(backend, "a"), lambda: backend.OpenKeyEx(HKCU, "a"))
+    (leak,) = pool.leak_report()
+    assert leak.fullpath == "HKEY_CURRENT_USER\\a"
+    assert leak.refcount == 1
+    assert leak.acquired_at is not None
+    pool.release(entry)
+    assert pool.leak_report() == []
+
+
+def test_registry_paths_share_handles(pool: HandlePool, hkcu: RegistryPath) -> None:
+    hkcu.create_subkey("Shared")
+    with hkcu.open_subkey("Shared"), hkcu.open_subkey("shared"):
+        assert pool.stats().in_use >= 1
+    hits = pool.stats().hits
+    hkcu.open_subkey("SHARED").close()
+    assert pool.stats().hits == hits + 1
+
+
+@pytest.mark.usefixtures("pool")
+def test_import_delete_invalidates_pool(
+    backend: MemoryBackend, hkcu: RegistryPath
+) -> None:
+    hkcu.create_subkey("Soft").close()
+    hkcu.open_subkey("Soft").close()
+    text = (
+        "Windows Registry Editor Version 5.00\n\n"
+        "[-HKEY_CURRENT_USER\\Soft]\n\n"
+        "[HKEY_CURRENT_USER\\Soft]\n"
+        '"v"="fresh"\n'
+    )
+    import_reg(io.BytesIO(text.encode("utf-8")), backend=backend)
+    with hkcu.open_subkey("Soft") as soft:
+        assert [value.data for value in soft.values()] == ["fresh"]
+
+
+def test_recreated_key_reopens_stale_handle(
+    backend: MemoryBackend, pool: HandlePool, hkcu: RegistryPath
+) -> None:
+    with hkcu.create_subkey("App") as app:
+        app.set_value("v", "old", dtype=RegistryValueType.REG_SZ)
+        app.create_subkey("Sub").close()
+    hkcu.open_subkey("App").close()
+    # Another process removes and recreates the key behind the pool's back.
+    backend.DeleteKeyEx(HKCU, r"App\Sub")
+    backend.DeleteKeyEx(HKCU, "App")
+    handle = backend.CreateKeyEx(HKCU, "App")
+    backend.SetValueEx(handle, "v", 0, 1, "new")
+    backend.CloseKey(handle)
+    with hkcu.open_subkey("App") as app:
+        assert [value.data for value in app.values()] == ["new"]
+        assert list(app.subkeys()) == []
+    assert [leak.fullpath for leak in pool.leak_report()] == ["HKEY_CURRENT_USER"]
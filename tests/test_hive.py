@@ -0,0 +1,127 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from windowsregistry import RegistryPath
+from windowsregistry.backends import MemoryBackend
+from windowsregistry.errors import HiveFormatError, OperationError
+from windowsregistry.handlepool import get_handle_pool
+from windowsregistry.hive import HiveBackend, open_hive, write_hive
+from windowsregistry.models import RegistryHKEYEnum, RegistryValueType
+
+
+@pytest.fixture
+def hive(tmp_path: Path, backend: MemoryBackend, hkcu: RegistryPath) -> Path:
+    app = hkcu.create_subkey(r"Software\App")
+    app.set_value("", "default", dtype=RegistryValueType.REG_SZ)
+    app.set_value("Count", 7, dtype=RegistryValueType.REG_DWORD)
+    app.set_value("Big", 2**40, dtype=RegistryValueType.REG_QWORD)
+    app.set_value("List", ["a", "b"], dtype=RegistryValueType.REG_MULTI_SZ)
+    app.set_value("Blob", bytes(range(256)) * 100, dtype=RegistryValueType.REG_BINARY)
+    app.set_value("Tiny", b"\x01", dtype=RegistryValueType.REG_BINARY)
+    for name in ("Zeta", "alpha", "Ünïcode"):
+        app.create_subkey(name)
+    file = tmp_path / "NTUSER.DAT"
+    write_hive(backend.root(RegistryHKEYEnum.HKEY_CURRENT_USER), file)
+    return file
+
+
+def test_reads_keys_and_values(hive: Path) -> None:
+    app = open_hive(hive, r"software\APP")
+    # Subkeys enumerate in the hive's upcased order.
+    assert [key.regpath.name for key in app.subkeys()] == ["alpha", "Zeta", "Ünïcode"]
+    values = {value.value_name: value.data for value in app.values()}
+    assert values == {
+        "": "default",
+        "Count": 7,
+        "Big": 2**40,
+        "List": ["a", "b"],
+        "Blob": bytes(range(256)) * 100,
+        "Tiny": b"\x01",
+    }
+    assert app.get_value("count").data == 7
+    assert app.subkey_exists("ÜNÏCODE")
+    assert app.query_info.total_subkeys == 3
+
+
+def test_hive_is_read_only(hive: Path) -> None:
+    app = open_hive(hive, r"Software\App")
+    with pytest.raises(OperationError):
+        app.set_value("x", 1, dtype=RegistryValueType.REG_DWORD, overwrite=True)
+    with pytest.raises(OperationError):
+        app.create_subkey("New")
+
+
+def test_missing_key(hive: Path) -> None:
+    with pytest.raises(OperationError):
+        open_hive(hive, r"Software\Missing")
+
+
+def test_closing_the_root_releases_the_file(
+    hive: Path, backend: MemoryBackend, hkcu: RegistryPath
+) -> None:
+    with open_hive(hive, "Software") as software:
+        app = software.open_subkey("App")
+        assert app.get_value("Count").data == 7
+        app.close()
+        mapped = software._backend._ll.backend
+    assert isinstance(mapped, HiveBackend)
+    assert mapped._mm.closed
+    assert not any(key[0] is mapped for key in get_handle_pool()._entries)
+    # The file can be replaced and opened again.
+    hive.unlink()
+    hkcu.open_subkey(r"Software\App").set_value(
+        "Count", 8, dtype=RegistryValueType.REG_DWORD, overwrite=True
+    )
+    write_hive(backend.root(RegistryHKEYEnum.HKEY_CURRENT_USER), hive)
+    with open_hive(hive, r"Software\App") as app:
+        assert app.get_value("Count").data == 8
+
+
+def test_handles(hive: Path) -> None:
+    with HiveBackend(hive) as backend:
+        handle = backend.OpenKeyEx(None, "Software")
+        assert backend.EnumKey(handle, 0) == "App"
+        backend.CloseKey(handle)
+        with pytest.raises(OSError):
+            backend.EnumKey(handle, 0)
+        assert backend.version[0] == 1
+        assert not backend.dirty
+
+
+@pytest.mark.parametrize(
+    "content",
+    [b"", b"regf", b"xxxx" + bytes(8192)],
+    ids=["empty", "truncated", "signature"],
+)
+def test_rejects_non_hives(tmp_path: Path, content: bytes) -> None:
+    file = tmp_path / "bad"
+    file.write_bytes(content)
+    with pytest.raises(HiveFormatError):
+        HiveBackend(file)
@@ -0,0 +1,101 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import io
+from pathlib import Path
+
+from windowsregistry import RegistryPath
+from windowsregistry.backends import MemoryBackend
+from windowsregistry.hive import HiveNode, open_hive, write_hive
+from windowsregistry.hive.format import (
+    BASE_BLOCK_CHECKSUM_OFFSET,
+    U32,
+    base_block_checksum,
+)
+from windowsregistry.models import RegistryHKEYEnum, RegistryValueType
+
+REG_BINARY = RegistryValueType.REG_BINARY.value
+REG_SZ = RegistryValueType.REG_SZ.value
+
+
+def test_stats_and_checksum(tmp_path: Path) -> None:
+    blob = b"x" * 64
+    node = HiveNode(
+        "ROOT",
+        0,
+        [("a", blob, REG_BINARY), ("b", blob, REG_BINARY), ("s", "text", REG_SZ)],
+        [HiveNode("Child", 0, [("c", blob, REG_BINARY)], [])],
+    )
+    file = tmp_path / "hive"
+    stats = write_hive(node, file)
+    data = file.read_bytes()
+    assert (stats.total_keys, stats.total_values) == (2, 4)
+    # Identical payloads are stored once and shared by the other values.
+    assert stats.shared_data_cells == 2
+    assert stats.hive_size == len(data)
+    checksum = U32.unpack_from(data, BASE_BLOCK_CHECKSUM_OFFSET)[0]
+    assert checksum == base_block_checksum(data[:4096])
+    assert open_hive(file, "Child").get_value("c").data == blob
+
+
+def test_wide_keys_use_an_index_root(tmp_path: Path) -> None:
+    names = [f"key{i:04}" for i in range(1200)]
+    node = HiveNode("ROOT", 0, [], [HiveNode(name, 0, [], []) for name in names])
+    file = tmp_path / "wide"
+    write_hive(node, file)
+    root = open_hive(file)
+    assert root.query_info.total_subkeys == len(names)
+    assert [key.regpath.name for key in root.subkeys()] == names
+    assert root.subkey_exists("KEY1199")
+    assert not root.subkey_exists("key1200")
+
+
+def test_writes_from_registry_path_into_a_stream(
+    tmp_path: Path, hkcu: RegistryPath
+) -> None:
+    app = hkcu.create_subkey(r"Software\App")
+    app.set_value("n", 1, dtype=RegistryValueType.REG_DWORD)
+    app.create_subkey("Sub").set_value("s", "v", dtype=RegistryValueType.REG_SZ)
+    stream = io.BytesIO(b"prefix")
+    stream.seek(0, io.SEEK_END)
+    stats = write_hive(app, stream)
+    file = tmp_path / "from-path"
+    file.write_bytes(stream.getvalue()[len(b"prefix") :])
+    assert stats.hive_size == file.stat().st_size
+    copy = open_hive(file)
+    assert copy.get_value("n").data == 1
+    assert copy.open_subkey("sub").get_value("S").data == "v"
+
+
+def test_compacts_memory_trees(
+    tmp_path: Path, backend: MemoryBackend, hkcu: RegistryPath
+) -> None:
+    hkcu.create_subkey("Keep")
+    hkcu.create_subkey("Gone")
+    hkcu.delete_subkey("Gone")
+    file = tmp_path / "compact"
+    write_hive(backend.root(RegistryHKEYEnum.HKEY_CURRENT_USER), file)
+    assert [key.regpath.name for key in open_hive(file).subkeys()] == ["Keep"]
@@ -0,0 +1,106 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import subprocess
+import sys
+
+import pytest
+
+import windowsregistry
+from windowsregistry.core import RegistryPath, open_subkey
+from windowsregistry.errors import WindowsRegistryError
+
+# Optional features that must stay unloaded until they are used.
+HEAVY_MODULES = (
+    "aio",
+    "batch",
+    "hive",
+    "index",
+    "parallel",
+    "regfile",
+    "search",
+    "sizeof",
+    "snapshot",
+    "trace",
+    "tree",
+    "watch",
+)
+
+
+def _run(code: str, *options: str) -> subprocess.CompletedProcess[str]:
+    return subprocess.run(
+        [sys.executable, *options, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def test_import_loads_no_submodules() -> None:
+    result = _run(
+        "import sys, windowsregistry;"
+        "print(*sorted(m for m in sys.modules if m.startswith('windowsregistry.')))"
+    )
+    assert result.stdout.strip() == ""
+
+
+def test_public_api_loads_no_heavy_modules() -> None:
+    result = _run(
+        "import sys, windowsregistry as w;"
+        "w.RegistryPath, w.open_subkey, w.WindowsRegistryError, w.HKCU;"
+        "print(*sorted(sys.modules))"
+    )
+    loaded = set(result.stdout.split())
+    assert "windowsregistry.core" in loaded
+    heavy = {f"windowsregistry.{name}" for name in HEAVY_MODULES}
+    assert not loaded & heavy
+    assert not {"asyncio", "mmap", "sqlite3"} & loaded
+
+
+def test_root_keys_created_on_first_access() -> None:
+    result = _run(
+        "import windowsregistry as w;"
+        "assert 'HKLM' not in vars(w);"
+        "hklm = w.HKLM;"
+        "assert w.HKEY_LOCAL_MACHINE is hklm and vars(w)['HKLM'] is hklm;"
+        "assert w.HKCU is w.HKEY_CURRENT_USER and w.HKCR is w.HKEY_CLASSES_ROOT;"
+        "print(type(hklm).__name__)"
+    )
+    assert result.stdout.strip() == "RegistryPath"
+
+
+def test_lazy_attributes() -> None:
+    assert windowsregistry.RegistryPath is RegistryPath
+    assert windowsregistry.open_subkey is open_subkey
+    assert windowsregistry.WindowsRegistryError is WindowsRegistryError
+    assert windowsregistry.backends.__name__ == "windowsregistry.backends"
+    assert windowsregistry.models.__name__ == "windowsregistry.models"
+    assert set(windowsregistry.__all__) <= set(dir(windowsregistry))
+    namespace: dict[str, object] = {}
+    exec("from windowsregistry import *", namespace)
+    assert all(name in namespace for name in windowsregistry.__all__)
+    with pytest.raises(AttributeError):
+        windowsregistry.missing  # noqa: B018
@@ -0,0 +1,168 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+
+from windowsregistry import RegistryPath, open_subkey
+from windowsregistry.backends import MemoryBackend, MemoryKeyHandle
+from windowsregistry.errors import OperationError, WindowsRegistryError
+from windowsregistry.index import IndexStats, RegistryIndex
+from windowsregistry.models import (
+    RegistryHKEYEnum,
+    RegistryKeyPermissionType,
+    RegistryValue,
+    RegistryValueType,
+)
+from windowsregistry.regpath import RegistryPathString
+from windowsregistry.search import FindMatch
+
+HKCU = RegistryHKEYEnum.HKEY_CURRENT_USER.value
+
+
+class _CountingBackend(MemoryBackend):
+    # Tracks how many handles are open at once. Keys named "locked" refuse
+    # to open; keys listed in `missing` look deleted when opened.
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.missing: set[str] = set()
+        self.open = self.peak = 0
+
+    def OpenKeyEx(
+        self,
+        key: Any,
+        sub_key: str,
+        reserved: int = 0,
+        access: int = RegistryKeyPermissionType.KEY_READ.value,
+    ) -> MemoryKeyHandle:
+        name = sub_key.rpartition("\\")[2]
+        if name == "locked":
+            raise PermissionError(13, "denied")
+        if name in self.missing:
+            raise FileNotFoundError(2, "gone")
+        handle = super().OpenKeyEx(key, sub_key, reserved, access)
+        self.open += 1
+        self.peak = max(self.peak, self.open)
+        return handle
+
+    def CreateKeyEx(
+        self,
+        key: Any,
+        sub_key: str,
+        reserved: int = 0,
+        access: int = RegistryKeyPermissionType.KEY_WRITE.value,
+    ) -> MemoryKeyHandle:
+        handle = super().CreateKeyEx(key, sub_key, reserved, access)
+        self.open += 1
+        return handle
+
+    def CloseKey(self, hkey: Any) -> None:
+        if not hkey._closed:
+            self.open -= 1
+        super().CloseKey(hkey)
+
+
+def _tree(backend: MemoryBackend) -> RegistryPath:
+    return open_subkey(
+        r"HKCU\Tree",
+        backend=backend,
+        permission=RegistryKeyPermissionType.KEY_ALL_ACCESS,
+    )
+
+
+def _rel(regpath: RegistryPathString) -> str:
+    return "\\".join(regpath.parts[1:])
+
+
+def _value(match: FindMatch) -> RegistryValue:
+    assert match.value is not None
+    return match.value
+
+
+def test_refresh_and_queries(hkcu: RegistryPath) -> None:
+    tree = hkcu.create_subkey("Tree")
+    app = tree.create_subkey("App")
+    app.set_value("DisplayName", "Thing 1.0", dtype=RegistryValueType.REG_SZ)
+    app.create_subkey("Sub").set_value("n", 5, dtype=RegistryValueType.REG_DWORD)
+    tree.create_subkey("Other")
+    with RegistryIndex() as index:
+        assert index.refresh(tree) == IndexStats(4, 4, 4, 0)
+        assert [_rel(p) for p in index.keys(prefix=r"HKCU\Tree\App")] == [
+            "App",
+            r"App\Sub",
+        ]
+        assert [_rel(p) for p in index.keys(name="sub")] == [r"App\Sub"]
+        found = list(index.values(data_prefix="Thing"))
+        assert [(_rel(m.regpath), _value(m).data) for m in found] == [
+            ("App", "Thing 1.0")
+        ]
+        assert [_value(m).data for m in index.values(data="5")] == [5]
+
+
+def test_refresh_rereads_only_changes(hkcu: RegistryPath) -> None:
+    tree = hkcu.create_subkey("Tree")
+    tree.create_subkey("a").create_subkey("a1")
+    tree.create_subkey("b")
+    with RegistryIndex() as index:
+        index.refresh(tree)
+        assert index.refresh(tree) == IndexStats(4, 0, 0, 0)
+        tree.delete_subkey("a", recursive=True)
+        tree.open_subkey("b").set_value("v", "x", dtype=RegistryValueType.REG_SZ)
+        assert index.refresh(tree) == IndexStats(2, 2, 0, 2)
+        assert [_rel(p) for p in index.keys()] == ["", "b"]  # noqa: SIM118
+
+
+def test_wide_key_opens_children_one_at_a_time() -> None:
+    backend = _CountingBackend()
+    for i in range(50):
+        backend.CloseKey(backend.CreateKeyEx(HKCU, rf"Tree\k{i}\leaf"))
+    with _tree(backend) as tree, RegistryIndex() as index:
+        base = backend.peak = backend.open
+        assert index.refresh(tree).total_keys == 101
+        assert backend.peak <= base + 2
+        assert backend.open == base
+
+
+def test_unreadable_and_vanished_subkeys() -> None:
+    backend = _CountingBackend()
+    for path in (r"Tree\a\locked", r"Tree\b\x", r"Tree\c"):
+        backend.CloseKey(backend.CreateKeyEx(HKCU, path))
+    with _tree(backend) as tree, RegistryIndex() as index:
+        base = backend.open
+        errors: list[WindowsRegistryError] = []
+        assert index.refresh(tree, onerror=errors.append).total_keys == 5
+        assert len(errors) == 1 and "locked" in str(errors[0])
+        with pytest.raises(OperationError, match="locked"):
+            index.refresh(tree)
+        assert backend.open == base
+        # Deleted between the parent's enumeration and the open: dropped from
+        # the index along with everything below it.
+        backend.missing.add("b")
+        stats = index.refresh(tree, onerror=errors.append)
+        assert stats.removed_keys == 2
+        assert [_rel(p) for p in index.keys()] == ["", "a", "c"]  # noqa: SIM118
@@ -0,0 +1,86 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+from typing import Iterator
+
+import pytest
+
+from windowsregistry import RegistryPath, instrument, open_subkey
+from windowsregistry.backends import MemoryBackend
+from windowsregistry.handlepool import HandlePool, get_handle_pool, set_handle_pool
+
+
+@pytest.fixture
+def pool() -> Iterator[HandlePool]:
+    previous = get_handle_pool()
+    pool = HandlePool(3)
+    set_handle_pool(pool)
+    try:
+        yield pool
+    finally:
+        pool.clear()
+        set_handle_pool(previous)
+
+
+def _paths(events: list[instrument.CallEvent], operation: str) -> list[str]:
+    return [event.path for event in events if event.operation == operation]
+
+
+def test_calls_are_attributed_to_key_paths(
+    pool: HandlePool, backend: MemoryBackend, hkcu: RegistryPath
+) -> None:
+    hkcu.create_subkey("App").create_subkey("Sub")
+    pool.clear()
+    events: list[instrument.CallEvent] = []
+    with instrument.profile(sinks=[events.append], prefix_depth=1) as scope, open_subkey(
+        r"HKCU\App", backend=backend
+    ) as app, app.open_subkey("Sub") as sub:
+        list(sub.values())
+    assert _paths(events, "OpenKeyEx") == ["App", r"App\Sub"]
+    assert _paths(events, "QueryInfoKey") == [r"App\Sub"]
+    assert {event.root for event in events} == {"HKEY_CURRENT_USER"}
+    assert {key.prefix for key in scope.stats()} == {"app"}
+
+
+def test_pool_closes_forget_handles(pool: HandlePool, hkcu: RegistryPath) -> None:
+    for name in "abcd":
+        hkcu.create_subkey(name).close()
+    pool.clear()
+    with instrument.profile():
+        for name in "abcd":
+            hkcu.open_subkey(name).close()
+        # Two stay idle in the pool; the evicted ones are forgotten.
+        assert len(instrument._handles) == 2
+        hkcu.delete_subkey("d")
+        assert len(instrument._handles) == 1
+        held = hkcu.open_subkey("c")
+        pool.invalidate(held._backend._ll.backend, held.regpath)
+        assert len(instrument._handles) == 1
+        held.close()
+        assert len(instrument._handles) == 0
+        hkcu.open_subkey("a").close()
+        pool.clear()
+        assert instrument._handles == {}
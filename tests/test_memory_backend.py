@@ -0,0 +1,153 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import sys
+
+import pytest
+
+from windowsregistry import RegistryPath, open_subkey
+from windowsregistry.backends import (
+    MemoryBackend,
+    base,
+    get_default_backend,
+    use_backend,
+)
+from windowsregistry.errors import BackendUnavailableError
+from windowsregistry.models import (
+    RegistryHKEYEnum,
+    RegistryKeyPermissionType,
+    RegistryValueType,
+)
+
+HKCU = RegistryHKEYEnum.HKEY_CURRENT_USER.value
+HKLM = RegistryHKEYEnum.HKEY_LOCAL_MACHINE.value
+KEY_READ = RegistryKeyPermissionType.KEY_READ.value
+KEY_ALL_ACCESS = RegistryKeyPermissionType.KEY_ALL_ACCESS.value
+KEY_WOW64_32KEY = 0x0200
+
+
+def test_create_open_and_enumerate(backend: MemoryBackend) -> None:
+    handle = backend.CreateKeyEx(HKCU, r"Software\App", 0, KEY_ALL_ACCESS)
+    backend.CreateKeyEx(handle, "b", 0, KEY_ALL_ACCESS)
+    backend.CreateKeyEx(handle, "A", 0, KEY_ALL_ACCESS)
+    backend.SetValueEx(handle, "Name", 0, RegistryValueType.REG_SZ.value, "x")
+    backend.SetValueEx(handle, "List", 0, RegistryValueType.REG_MULTI_SZ.value, ["a"])
+
+    opened = backend.OpenKeyEx(HKCU, r"SOFTWARE\app", 0, KEY_READ)
+    assert backend.QueryInfoKey(opened)[:2] == (2, 2)
+    assert [backend.EnumKey(opened, i) for i in range(2)] == ["A", "b"]
+    assert backend.EnumValue(opened, 1) == ("List", ["a"], 7)
+    assert backend.QueryValueEx(opened, "NAME") == ("x", 1)
+    with pytest.raises(OSError) as info:
+        backend.EnumKey(opened, 2)
+    assert info.value.winerror == 259  # type: ignore[attr-defined]
+    with pytest.raises(FileNotFoundError):
+        backend.OpenKeyEx(HKCU, "Missing")
+
+
+def test_access_mask_is_enforced(backend: MemoryBackend) -> None:
+    backend.CreateKeyEx(HKCU, "App", 0, KEY_ALL_ACCESS)
+    readonly = backend.OpenKeyEx(HKCU, "App", 0, KEY_READ)
+    with pytest.raises(PermissionError):
+        backend.SetValueEx(readonly, "x", 0, RegistryValueType.REG_DWORD.value, 1)
+    with pytest.raises(PermissionError):
+        backend.CreateKeyEx(readonly, "Child", 0, KEY_READ)
+
+
+def test_delete_rules_and_deleted_handles(backend: MemoryBackend) -> None:
+    parent = backend.CreateKeyEx(HKCU, r"App\Child", 0, KEY_ALL_ACCESS)
+    with pytest.raises(PermissionError):
+        backend.DeleteKeyEx(HKCU, "App")
+    backend.DeleteKeyEx(HKCU, r"App\Child")
+    with pytest.raises(OSError) as info:
+        backend.QueryInfoKey(parent)
+    assert info.value.winerror == 1018  # type: ignore[attr-defined]
+    backend.CloseKey(parent)
+    with pytest.raises(OSError) as info:
+        backend.QueryInfoKey(parent)
+    assert info.value.winerror == 6  # type: ignore[attr-defined]
+
+
+def test_values_are_coerced_like_winreg(backend: MemoryBackend) -> None:
+    handle = backend.CreateKeyEx(HKCU, "App", 0, KEY_ALL_ACCESS)
+    backend.SetValueEx(handle, "empty", 0, RegistryValueType.REG_BINARY.value, None)
+    assert backend.QueryValueEx(handle, "empty") == (None, 3)
+    with pytest.raises(ValueError):
+        backend.SetValueEx(handle, "big", 0, RegistryValueType.REG_DWORD.value, 1 << 32)
+    with pytest.raises(FileNotFoundError):
+        backend.DeleteValue(handle, "missing")
+
+
+def test_wow64_redirection(backend: MemoryBackend) -> None:
+    backend.CreateKeyEx(HKLM, r"SOFTWARE\App", 0, KEY_ALL_ACCESS | KEY_WOW64_32KEY)
+    view32 = backend.OpenKeyEx(HKLM, r"SOFTWARE\WOW6432Node", 0, KEY_READ)
+    assert backend.EnumKey(view32, 0) == "App"
+    with pytest.raises(FileNotFoundError):
+        backend.OpenKeyEx(HKLM, r"SOFTWARE\App", 0, KEY_READ)
+
+
+def test_writes_touch_last_modified(backend: MemoryBackend) -> None:
+    handle = backend.CreateKeyEx(HKCU, "App", 0, KEY_ALL_ACCESS)
+    before = backend.QueryInfoKey(handle)[2]
+    backend.SetValueEx(handle, "x", 0, RegistryValueType.REG_DWORD.value, 1)
+    assert backend.QueryInfoKey(handle)[2] > before
+
+
+def test_registry_path_over_memory_backend(hkcu: RegistryPath) -> None:
+    app = hkcu.create_subkey(r"Software\App")
+    app.set_value("n", 5, dtype=RegistryValueType.REG_DWORD)
+    assert hkcu.subkey_exists(r"software\APP")
+    assert app.get_value("N").data == 5
+    assert [value.value_name for value in app.values()] == ["n"]
+    hkcu.delete_subkey("Software", recursive=True)
+    assert not hkcu.subkey_exists("Software")
+
+
+def test_use_backend_scopes_the_default() -> None:
+    backend = MemoryBackend()
+    with use_backend(backend):
+        assert get_default_backend() is backend
+        path = open_subkey("HKCU", permission=RegistryKeyPermissionType.KEY_ALL_ACCESS)
+        path.create_subkey("Scoped")
+    assert get_default_backend() is not backend
+    assert open_subkey("HKCU", backend=backend).subkey_exists("Scoped")
+
+
+def test_memory_backend_is_never_picked_implicitly(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(base, "_default_backend", None)
+    monkeypatch.setitem(sys.modules, "winreg", None)
+    monkeypatch.delenv(base.BACKEND_ENV, raising=False)
+    with pytest.raises(BackendUnavailableError, match="MemoryBackend"):
+        get_default_backend()
+    monkeypatch.setenv(base.BACKEND_ENV, "registry")
+    with pytest.raises(BackendUnavailableError, match="unknown backend"):
+        get_default_backend()
+    monkeypatch.setenv(base.BACKEND_ENV, "memory")
+    default = get_default_backend()
+    assert isinstance(default, MemoryBackend)
+    assert get_default_backend() is default
@@ -0,0 +1,173 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import gc
+import threading
+import time
+import weakref
+from typing import Any, Iterable
+
+import pytest
+
+from windowsregistry import RegistryPath, open_subkey
+from windowsregistry.backends import MemoryBackend
+from windowsregistry.errors import WindowsRegistryError
+from windowsregistry.models import (
+    RegistryHKEYEnum,
+    RegistryKeyPermissionType,
+    RegistryValueType,
+)
+from windowsregistry.parallel import WalkResult, _Engine, _Task, parallel_walk
+
+HKCU = RegistryHKEYEnum.HKEY_CURRENT_USER.value
+
+
+class _BrokenBackend(MemoryBackend):
+    def OpenKeyEx(self, key: Any, sub_key: str, *args: Any, **kwargs: Any) -> Any:
+        if sub_key.endswith("broken"):
+            raise FileNotFoundError(2, "not found")
+        return super().OpenKeyEx(key, sub_key, *args, **kwargs)
+
+
+class _LockedBackend(MemoryBackend):
+    # Keys named "locked" open fine but refuse enumeration.
+    def QueryInfoKey(self, key: Any) -> tuple[int, int, int]:
+        if key._key.name == "locked":
+            raise PermissionError(13, "Access is denied")
+        return super().QueryInfoKey(key)
+
+
+def _populate(root: RegistryPath, fanout: int = 4, depth: int = 3) -> RegistryPath:
+    tree = root.create_subkey("Tree")
+
+    def fill(node: RegistryPath, level: int) -> None:
+        node.set_value("v", node.regpath.path, dtype=RegistryValueType.REG_SZ)
+        if level < depth:
+            for index in range(fanout):
+                fill(node.create_subkey(f"k{index}"), level + 1)
+
+    fill(tree, 0)
+    return tree
+
+
+def _paths(results: Iterable[WalkResult]) -> list[str]:
+    return [result.key.regpath.path for result in results]
+
+
+def _walk_threads() -> list[threading.Thread]:
+    return [t for t in threading.enumerate() if t.name.startswith("windowsregistry-walk")]
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_ordered_matches_walk(hkcu: RegistryPath, workers: int) -> None:
+    tree = _populate(hkcu)
+    expected = [path.regpath.path for path, _, _ in tree.walk()]
+    results = list(parallel_walk(tree, workers=workers, ordered=True, max_pending=3))
+    assert _paths(results) == expected
+    assert len(expected) == 1 + 4 + 16 + 64
+    assert all(result.values[0].data == result.key.regpath.path for result in results)
+    assert [result.depth for result in results[:3]] == [0, 1, 2]
+
+
+def test_unordered_visits_every_key(hkcu: RegistryPath) -> None:
+    tree = _populate(hkcu)
+    expected = sorted(path.regpath.path for path, _, _ in tree.walk())
+    results = list(parallel_walk(tree, workers=4, max_depth=2, keys_only=True))
+    assert sorted(_paths(results)) == [p for p in expected if p.count("\\") <= 2]
+    assert all(result.values == () for result in results)
+
+
+def test_unopenable_children_are_reported() -> None:
+    backend = _BrokenBackend()
+    with open_subkey(
+        "HKCU", backend=backend, permission=RegistryKeyPermissionType.KEY_ALL_ACCESS
+    ) as hkcu:
+        tree = _populate(hkcu, fanout=2, depth=1)
+        backend.CreateKeyEx(HKCU, r"Tree\broken\below")
+        errors: list[WindowsRegistryError] = []
+        seen = _paths(parallel_walk(tree, workers=2, ordered=True, onerror=errors.append))
+    assert seen == ["Tree", "Tree\\k0", "Tree\\k1"]
+    assert len(errors) == 1
+
+@pytest.mark.parametrize("ordered", [False, True])
+def test_unreadable_keys_are_reported(ordered: bool) -> None:
+    backend = _LockedBackend()
+    with open_subkey(
+        "HKCU", backend=backend, permission=RegistryKeyPermissionType.KEY_ALL_ACCESS
+    ) as hkcu:
+        tree = _populate(hkcu, fanout=2, depth=1)
+        backend.CreateKeyEx(HKCU, r"Tree\locked\below")
+        errors: list[WindowsRegistryError] = []
+        seen = _paths(
+            parallel_walk(tree, workers=2, ordered=ordered, onerror=errors.append)
+        )
+    assert sorted(seen) == ["Tree", "Tree\\k0", "Tree\\k1"]
+    assert len(errors) == 1
+
+
+@pytest.mark.parametrize("ordered", [False, True])
+def test_early_exit_stops_all_threads(hkcu: RegistryPath, ordered: bool) -> None:
+    tree = _populate(hkcu)
+    walk = parallel_walk(tree, workers=4, ordered=ordered, max_pending=2)
+    next(walk)
+    next(walk)
+    walk.close()
+    deadline = time.monotonic() + 5
+    while _walk_threads() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert _walk_threads() == []
+
+
+def test_worker_failures_propagate() -> None:
+    backend = _BrokenBackend()
+
+    def boom(_error: WindowsRegistryError) -> None:
+        raise RuntimeError("from onerror")
+
+    with open_subkey(
+        "HKCU", backend=backend, permission=RegistryKeyPermissionType.KEY_ALL_ACCESS
+    ) as hkcu:
+        tree = _populate(hkcu, fanout=2, depth=1)
+        backend.CreateKeyEx(HKCU, r"Tree\broken")
+        for ordered in (False, True):
+            with pytest.raises(RuntimeError):
+                list(parallel_walk(tree, workers=2, ordered=ordered, onerror=boom))
+
+
+def test_tasks_do_not_hold_handles(hkcu: RegistryPath) -> None:
+    assert _Task._fields == ("tree_key", "subkey", "depth")
+    with pytest.raises(TypeError):
+        _Engine(  # type: ignore[abstract]
+            hkcu, workers=1, max_pending=1, keys_only=False, max_depth=None, onerror=None
+        )
+    tree = _populate(hkcu, fanout=2, depth=2)
+    keys: list[weakref.ref[RegistryPath]] = []
+    for result in parallel_walk(tree, workers=2, ordered=True, max_pending=1):
+        if result.depth:
+            keys.append(weakref.ref(result.key))
+        del result
+    gc.collect()
+    assert all(ref() is None for ref in keys)
@@ -0,0 +1,146 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import io
+from pathlib import Path
+
+import pytest
+
+from windowsregistry import RegistryPath
+from windowsregistry.backends import MemoryBackend
+from windowsregistry.models import RegistryValueType
+from windowsregistry.regfile import RegFileError, export_reg, import_reg, iter_export
+
+
+class _Pipe(io.RawIOBase):
+    # A readable stream that cannot seek, like a pipe.
+
+    def __init__(self, data: bytes) -> None:
+        self._data = io.BytesIO(data)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: bytearray) -> int:  # type: ignore[override]
+        chunk = self._data.read(min(len(buffer), 7))
+        buffer[: len(chunk)] = chunk
+        return len(chunk)
+
+
+def _import(text: str, backend: MemoryBackend, encoding: str = "utf-16") -> None:
+    import_reg(io.BytesIO(text.encode(encoding)), backend=backend)
+
+
+def test_export_import_round_trip(
+    tmp_path: Path, hkcu: RegistryPath
+) -> None:
+    app = hkcu.create_subkey(r"Software\App")
+    app.set_value("", 'quoted "\\ text', dtype=RegistryValueType.REG_SZ)
+    app.set_value("n", 0x1234, dtype=RegistryValueType.REG_DWORD)
+    app.set_value("q", 2**40, dtype=RegistryValueType.REG_QWORD)
+    app.set_value("m", ["a", "b"], dtype=RegistryValueType.REG_MULTI_SZ)
+    app.set_value("x", "%PATH%", dtype=RegistryValueType.REG_EXPAND_SZ)
+    app.set_value("b", bytes(range(100)), dtype=RegistryValueType.REG_BINARY)
+    app.create_subkey("Sub").set_value("s", "v", dtype=RegistryValueType.REG_SZ)
+    file = tmp_path / "app.reg"
+    export_reg(app, file)
+    assert file.read_bytes().startswith(b"\xff\xfe")
+
+    target = MemoryBackend()
+    stats = import_reg(file, backend=target)
+    assert (stats.total_keys, stats.total_values) == (2, 7)
+    with RegistryPath(r"HKCU\Software\App", backend=target) as copy:
+        assert {v.value_name: v.data for v in copy.values()} == {
+            v.value_name: v.data for v in app.values()
+        }
+        assert copy.open_subkey("Sub").get_value("s").data == "v"
+
+
+def test_delete_entries(backend: MemoryBackend, hkcu: RegistryPath) -> None:
+    app = hkcu.create_subkey(r"Soft\App")
+    app.set_value("gone", 1, dtype=RegistryValueType.REG_DWORD)
+    app.create_subkey(r"Deep\Er")
+    _import(
+        "Windows Registry Editor Version 5.00\n\n"
+        "[HKEY_CURRENT_USER\\Soft\\App]\n"
+        '"gone"=-\n'
+        '"absent"=-\n\n'
+        "[-HKEY_CURRENT_USER\\Soft\\App\\Deep]\n"
+        "[-HKEY_CURRENT_USER\\Nope\\Child]\n",
+        backend,
+    )
+    assert not app.value_exists("gone")
+    assert not app.subkey_exists("Deep")
+
+
+def test_regedit4_strings_are_ansi(backend: MemoryBackend, hkcu: RegistryPath) -> None:
+    text = (
+        "REGEDIT4\r\n\r\n"
+        "[HKEY_CURRENT_USER\\Legacy]\r\n"
+        '"Name"="café"\r\n'
+        '"Path"=hex(2):25,57,49,4e,44,49,52,25,5c,e9,00\r\n'
+        '"List"=hex(7):61,00,e9,00,00\r\n'
+    )
+    import_reg(io.BytesIO(text.encode("cp1252")), backend=backend)
+    legacy = hkcu.open_subkey("Legacy")
+    assert legacy.get_value("Name").data == "café"
+    assert legacy.get_value("Path").data == "%WINDIR%\\é"
+    assert legacy.get_value("List").data == ["a", "é"]
+
+
+def test_non_seekable_streams(backend: MemoryBackend, hkcu: RegistryPath) -> None:
+    text = "Windows Registry Editor Version 5.00\n\n[HKEY_CURRENT_USER\\Piped]\n@=dword:00000002\n"
+    pipe = _Pipe(text.encode("utf-8"))
+    stats = import_reg(pipe, backend=backend)  # type: ignore[arg-type]
+    assert stats.total_values == 1
+    assert not pipe.closed
+    assert hkcu.open_subkey("Piped").get_value().data == 2
+
+
+@pytest.mark.parametrize(
+    ("body", "lineno"),
+    [
+        ("[HKEY_CURRENT_USER\\A\n", 3),
+        ('[HKEY_CURRENT_USER\\A]\n"x"=dword:zz\n', 4),
+        ('"orphan"="x"\n', 3),
+    ],
+)
+def test_errors_carry_line_numbers(backend: MemoryBackend, body: str, lineno: int) -> None:
+    with pytest.raises(RegFileError) as info:
+        _import("Windows Registry Editor Version 5.00\n\n" + body, backend)
+    assert info.value.lineno == lineno
+
+
+def test_missing_header(backend: MemoryBackend) -> None:
+    with pytest.raises(RegFileError):
+        _import("[HKEY_CURRENT_USER\\A]\n", backend)
+
+
+def test_export_streams_keys(hkcu: RegistryPath) -> None:
+    app = hkcu.create_subkey("App")
+    app.create_subkey("B")
+    chunks = list(iter_export(app, header=False))
+    assert chunks == ["[HKEY_CURRENT_USER\\App]\n\n", "[HKEY_CURRENT_USER\\App\\B]\n\n"]
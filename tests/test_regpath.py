@@ -0,0 +1,103 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import copy
+import pickle
+from pathlib import Path
+
+import pytest
+
+from windowsregistry import RegistryPath, open_subkey
+from windowsregistry.backends import MemoryBackend
+from windowsregistry.errors import RegistryPathError
+from windowsregistry.hive import HiveBackend, write_hive
+from windowsregistry.models import RegistryHKEYEnum, RegistryKeyPermissionType
+from windowsregistry.regpath import RegistryPathString, fold_case
+
+
+class _TaggedPath(RegistryPathString):
+    __slots__ = ()
+
+
+def test_parsing_and_root_aliases() -> None:
+    for spelling in ("HKLM", "hklm", "HKEY_LOCAL_MACHINE"):
+        regpath = RegistryPathString(spelling + r"\Software")
+        assert regpath.root_key is RegistryHKEYEnum.HKEY_LOCAL_MACHINE
+    users = RegistryPathString("Software", root_key=RegistryHKEYEnum.HKEY_USERS)
+    assert users.fullpath == "HKEY_USERS\\Software"
+    with pytest.raises(RegistryPathError):
+        RegistryPathString(r"HKXX\Software")
+
+
+def test_roots_and_prefixes_are_shared() -> None:
+    a = RegistryPathString(r"HKCU\Software\A")
+    b = a.parent.joinpath("B")
+    assert a.parent is b.parent
+    assert RegistryPathString("HKCU") is RegistryPathString("HKEY_CURRENT_USER")
+    assert copy.deepcopy(a) is a
+
+
+def test_case_folding_matches_the_registry() -> None:
+    assert fold_case("straße") == "STRAßE"
+    assert fold_case("Ünïcode") == "ÜNÏCODE"
+    a = RegistryPathString(r"HKCU\Ünïcode\straße")
+    b = RegistryPathString(r"hkcu\üNÏcode\STRAßE")
+    assert a == b and hash(a) == hash(b)
+    assert a != RegistryPathString(r"HKCU\Ünïcode\STRASSE")
+    assert a.is_relative_to(RegistryPathString(r"HKCU\ÜNÏCODE"))
+
+
+def test_backends_fold_like_paths(tmp_path: Path) -> None:
+    backend = MemoryBackend()
+    with open_subkey(
+        "HKCU", backend=backend, permission=RegistryKeyPermissionType.KEY_ALL_ACCESS
+    ) as root:
+        root.create_subkey("Ünïcode").create_subkey("straße")
+        assert root.subkey_exists(r"üNÏCODE\STRAßE")
+        assert not root.subkey_exists(r"Ünïcode\STRASSE")
+        hive_file = tmp_path / "hive"
+        write_hive(backend.root(RegistryHKEYEnum.HKEY_CURRENT_USER), hive_file)
+    with HiveBackend(hive_file) as hive:
+        handle = hive.OpenKeyEx(None, r"üNÏCODE\STRAßE")
+        hive.CloseKey(handle)
+        with pytest.raises(FileNotFoundError):
+            hive.OpenKeyEx(None, r"Ünïcode\STRASSE")
+
+
+def test_pickle_keeps_the_class() -> None:
+    regpath = RegistryPathString(r"HKCU\Software\App")
+    assert pickle.loads(pickle.dumps(regpath)) == regpath
+    tagged = _TaggedPath(r"HKCU\Software\App")
+    restored = pickle.loads(pickle.dumps(tagged))
+    assert type(restored) is _TaggedPath
+    assert restored.parts == ("Software", "App")
+    assert type(restored.parent) is _TaggedPath
+
+
+def test_registry_path_uses_parsed_paths(hkcu: RegistryPath) -> None:
+    hkcu.create_subkey("App")
+    with open_subkey(r"HKCU\app", backend=hkcu._backend._ll.backend) as app:
+        assert app.regpath == RegistryPathString(r"HKEY_CURRENT_USER\APP")
@@ -0,0 +1,95 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+from typing import Any
+
+from windowsregistry import RegistryPath, open_subkey
+from windowsregistry.backends import MemoryBackend
+from windowsregistry.backends.memory import MemoryKeyHandle
+from windowsregistry.models import (
+    RegistryHKEYEnum,
+    RegistryKeyPermissionType,
+    RegistryValueType,
+)
+from windowsregistry.regpath import RegistryPathString
+
+
+class _CountingBackend(MemoryBackend):
+    def __init__(self) -> None:
+        super().__init__()
+        self.opens: list[tuple[Any, str]] = []
+
+    def OpenKeyEx(self, key: Any, sub_key: str, *args: Any, **kwargs: Any) -> Any:
+        self.opens.append((key, sub_key))
+        return super().OpenKeyEx(key, sub_key, *args, **kwargs)
+
+
+def test_children_open_from_the_parent_handle() -> None:
+    backend = _CountingBackend()
+    backend.CreateKeyEx(RegistryHKEYEnum.HKEY_CURRENT_USER.value, r"a\b\c\d")
+    with open_subkey(r"HKCU\a\b", backend=backend) as parent:
+        backend.opens.clear()
+        with parent.open_subkey(r"c\d") as child:
+            assert child.regpath.fullpath == "HKEY_CURRENT_USER\\a\\b\\c\\d"
+            ((key, sub_key),) = backend.opens
+            assert isinstance(key, MemoryKeyHandle)
+            assert sub_key == "c\\d"
+        backend.opens.clear()
+        (sub,) = parent.subkeys()
+        assert sub.regpath.parts[-1] == "c"
+        assert backend.opens[0][1] == "c"
+
+
+def test_other_view_opens_from_the_root() -> None:
+    backend = _CountingBackend()
+    hklm = RegistryHKEYEnum.HKEY_LOCAL_MACHINE.value
+    backend.CreateKeyEx(hklm, r"SOFTWARE\Native")
+    with open_subkey("HKLM", backend=backend) as root:
+        software = root.open_subkey("SOFTWARE")
+        backend.opens.clear()
+        with software.open_subkey(wow64_32key_access=True) as wow:
+            assert backend.opens == [(hklm, "SOFTWARE")]
+            assert not wow.subkey_exists("Native")
+        assert software.subkey_exists("Native")
+
+
+def test_child_permission_differs_from_parent(hkcu: RegistryPath) -> None:
+    hkcu.create_subkey("Perm")
+    with open_subkey("HKCU", backend=hkcu._backend._ll.backend) as readonly:
+        writable = readonly.open_subkey(
+            "Perm", permission=RegistryKeyPermissionType.KEY_ALL_ACCESS
+        )
+        writable.set_value("v", "x", dtype=RegistryValueType.REG_SZ)
+        assert readonly.open_subkey("Perm").get_value("v").data == "x"
+
+
+def test_joinpath_and_parent_keep_root() -> None:
+    base = RegistryPathString(r"HKLM\Software")
+    child = base.joinpath("Vendor", r"App\Sub")
+    assert child.parts == ("Software", "Vendor", "App", "Sub")
+    assert child.root_key is RegistryHKEYEnum.HKEY_LOCAL_MACHINE
+    assert child.parent.parent == base.joinpath("vendor")
+    assert RegistryPathString("HKLM").parent == RegistryPathString("HKLM")
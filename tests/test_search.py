@@ -0,0 +1,217 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import re
+from typing import Any
+
+import pytest
+
+from windowsregistry import RegistryPath, open_subkey
+from windowsregistry.backends import MemoryBackend, MemoryKeyHandle
+from windowsregistry.errors import OperationError, WindowsRegistryError
+from windowsregistry.models import (
+    RegistryHKEYEnum,
+    RegistryKeyPermissionType,
+    RegistryValue,
+    RegistryValueType,
+)
+from windowsregistry.search import FindMatch
+
+HKCU = RegistryHKEYEnum.HKEY_CURRENT_USER.value
+
+
+class _CountingBackend(MemoryBackend):
+    # Records which keys get opened and how many handles are open at once;
+    # keys named "locked" refuse to open and keys named "vanished" behave as
+    # if deleted right after being opened.
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.opened: list[str] = []
+        self.open = self.peak = 0
+
+    def OpenKeyEx(
+        self,
+        key: Any,
+        sub_key: str,
+        reserved: int = 0,
+        access: int = RegistryKeyPermissionType.KEY_READ.value,
+    ) -> MemoryKeyHandle:
+        if sub_key.rpartition("\\")[2] == "locked":
+            raise PermissionError(13, "denied")
+        handle = super().OpenKeyEx(key, sub_key, reserved, access)
+        self.opened.append(sub_key)
+        self.open += 1
+        self.peak = max(self.peak, self.open)
+        return handle
+
+    def CreateKeyEx(
+        self,
+        key: Any,
+        sub_key: str,
+        reserved: int = 0,
+        access: int = RegistryKeyPermissionType.KEY_WRITE.value,
+    ) -> MemoryKeyHandle:
+        handle = super().CreateKeyEx(key, sub_key, reserved, access)
+        self.open += 1
+        return handle
+
+    def QueryInfoKey(self, key: Any) -> tuple[int, int, int]:
+        if key._key.name == "vanished":
+            exc = OSError(2, "marked for deletion")
+            exc.winerror = 1018  # type: ignore[attr-defined]
+            raise exc
+        return super().QueryInfoKey(key)
+
+    def CloseKey(self, hkey: Any) -> None:
+        if not hkey._closed:
+            self.open -= 1
+        super().CloseKey(hkey)
+
+
+def _build(backend: MemoryBackend, spec: dict[str, Any]) -> None:
+    for path, values in spec.items():
+        handle = backend.CreateKeyEx(HKCU, path)
+        for name, (data, dtype) in values.items():
+            backend.SetValueEx(handle, name, 0, dtype.value, data)
+        backend.CloseKey(handle)
+
+
+@pytest.fixture
+def counting() -> _CountingBackend:
+    backend = _CountingBackend()
+    _build(
+        backend,
+        {
+            r"Tree\CLSID\{A}\InprocServer32": {
+                "": ("c:\\evil.dll", RegistryValueType.REG_SZ)
+            },
+            r"Tree\CLSID\{B}\InprocServer32": {
+                "": ("c:\\good.dll", RegistryValueType.REG_SZ),
+                "ThreadingModel": ("Both", RegistryValueType.REG_SZ),
+            },
+            r"Tree\CLSID\{C}\LocalServer32": {},
+            r"Tree\Other\InprocServer32": {
+                "n": (7, RegistryValueType.REG_DWORD)
+            },
+        },
+    )
+    return backend
+
+
+def _tree(backend: MemoryBackend) -> RegistryPath:
+    return open_subkey(
+        r"HKCU\Tree",
+        backend=backend,
+        permission=RegistryKeyPermissionType.KEY_ALL_ACCESS,
+    )
+
+
+def _rel(match: FindMatch) -> str:
+    return "\\".join(match.regpath.parts[1:])
+
+
+def _value(match: FindMatch) -> RegistryValue:
+    assert match.value is not None
+    return match.value
+
+
+def test_key_names_in_registry_order(counting: _CountingBackend) -> None:
+    with _tree(counting) as tree:
+        found = [_rel(m) for m in tree.find(key="inproc*")]
+    assert found == [
+        r"CLSID\{A}\InprocServer32",
+        r"CLSID\{B}\InprocServer32",
+        r"Other\InprocServer32",
+    ]
+    with _tree(counting) as tree:
+        found = [_rel(m) for m in tree.find(key=re.compile(r"^\{[AC]\}$"))]
+    assert found == [r"CLSID\{A}", r"CLSID\{C}"]
+
+
+def test_keypath_glob_prunes_branches(counting: _CountingBackend) -> None:
+    with _tree(counting) as tree:
+        counting.opened.clear()
+        found = [_rel(m) for m in tree.find(keypath=r"CLSID\*\InprocServer32")]
+    assert found == [r"CLSID\{A}\InprocServer32", r"CLSID\{B}\InprocServer32"]
+    assert "Other" not in counting.opened
+    assert "LocalServer32" not in counting.opened
+
+
+def test_value_filters_and_limit(counting: _CountingBackend) -> None:
+    with _tree(counting) as tree:
+        base = counting.open
+        evil = list(tree.find(data="*\\evil.dll"))
+        assert [(_rel(m), _value(m).value_name) for m in evil] == [
+            (r"CLSID\{A}\InprocServer32", "")
+        ]
+        dwords = list(tree.find(dtype=RegistryValueType.REG_DWORD))
+        assert [_value(m).data for m in dwords] == [7]
+        named = list(tree.find(value="threading*", max_depth=2))
+        assert named == []
+        first = list(tree.find(key="*Server32", limit=1))
+        assert len(first) == 1
+        assert counting.open == base
+
+
+def test_wide_key_opens_children_one_at_a_time() -> None:
+    backend = _CountingBackend()
+    _build(backend, {rf"Tree\k{i}\leaf": {} for i in range(50)})
+    with _tree(backend) as tree:
+        base = backend.peak = backend.open
+        found = list(tree.find(key="leaf"))
+        assert len(found) == 50
+        assert backend.peak <= base + 2
+        matches = tree.find(key="leaf")
+        next(matches)
+        matches.close()
+        assert backend.open == base
+
+
+def test_unreadable_subkey(counting: _CountingBackend) -> None:
+    _build(counting, {r"Tree\CLSID\locked\InprocServer32": {}})
+    with _tree(counting) as tree:
+        base = counting.open
+        errors: list[WindowsRegistryError] = []
+        found = list(tree.find(key="InprocServer32", onerror=errors.append))
+        assert len(found) == 3
+        assert len(errors) == 1 and "locked" in str(errors[0])
+        with pytest.raises(OperationError, match="locked"):
+            list(tree.find(key="InprocServer32"))
+        assert counting.open == base
+
+
+def test_key_vanishing_mid_scan(counting: _CountingBackend) -> None:
+    _build(counting, {r"Tree\CLSID\vanished\InprocServer32": {}})
+    with _tree(counting) as tree:
+        base = counting.open
+        errors: list[WindowsRegistryError] = []
+        found = list(tree.find(value="*", onerror=errors.append))
+        assert len(found) == 4
+        assert len(errors) == 1 and "vanished" in str(errors[0])
+        with pytest.raises(OperationError, match="vanished"):
+            list(tree.find(key="InprocServer32"))
+        assert counting.open == base
@@ -0,0 +1,141 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+
+from windowsregistry import RegistryPath, open_subkey
+from windowsregistry.backends import MemoryBackend, MemoryKeyHandle
+from windowsregistry.errors import OperationError, WindowsRegistryError
+from windowsregistry.models import (
+    RegistryHKEYEnum,
+    RegistryKeyPermissionType,
+    RegistryValueType,
+)
+from windowsregistry.sizeof import SizeCache
+
+HKCU = RegistryHKEYEnum.HKEY_CURRENT_USER.value
+
+
+class _CountingBackend(MemoryBackend):
+    # Tracks how many handles are open at once; keys named "locked" refuse
+    # to open.
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.open = self.peak = 0
+
+    def OpenKeyEx(
+        self,
+        key: Any,
+        sub_key: str,
+        reserved: int = 0,
+        access: int = RegistryKeyPermissionType.KEY_READ.value,
+    ) -> MemoryKeyHandle:
+        if sub_key.rpartition("\\")[2] == "locked":
+            raise PermissionError(13, "denied")
+        handle = super().OpenKeyEx(key, sub_key, reserved, access)
+        self.open += 1
+        self.peak = max(self.peak, self.open)
+        return handle
+
+    def CloseKey(self, hkey: Any) -> None:
+        if not hkey._closed:
+            self.open -= 1
+        super().CloseKey(hkey)
+
+
+def _wide(backend: _CountingBackend, width: int = 50) -> None:
+    tree = backend.CreateKeyEx(HKCU, "Tree")
+    for i in range(width):
+        child = backend.CreateKeyEx(tree, f"k{i}")
+        backend.SetValueEx(child, "v", 0, 1, "x" * i)
+        backend.CloseKey(backend.CreateKeyEx(child, "leaf"))
+        backend.CloseKey(child)
+    backend.CloseKey(tree)
+
+
+def _open(backend: MemoryBackend, path: str) -> RegistryPath:
+    return open_subkey(
+        path, backend=backend, permission=RegistryKeyPermissionType.KEY_ALL_ACCESS
+    )
+
+
+def test_totals_and_depth(hkcu: RegistryPath) -> None:
+    tree = hkcu.create_subkey("Tree")
+    a = tree.create_subkey("a")
+    a.create_subkey("a1").set_value("x", "abc", dtype=RegistryValueType.REG_SZ)
+    tree.create_subkey("b")
+    tree.set_value("n", 1, dtype=RegistryValueType.REG_DWORD)
+    size = tree.sizeof(data_bytes=True)
+    assert (size.total_subkeys, size.total_values, size.max_depth) == (3, 2, 2)
+    assert size.data_bytes == 4 + len("abc\0".encode("utf-16-le"))
+    shallow = tree.sizeof(max_depth=0)
+    assert (shallow.total_subkeys, shallow.max_depth) == (2, 0)
+
+
+@pytest.mark.parametrize("workers", [None, 4])
+def test_wide_key_opens_children_one_at_a_time(workers: Any) -> None:
+    backend = _CountingBackend()
+    _wide(backend)
+    with _open(backend, r"HKCU\Tree") as tree:
+        backend.open = backend.peak = 0
+        size = tree.sizeof(workers=workers, data_bytes=True)
+    assert (size.total_subkeys, size.total_values) == (100, 50)
+    assert size.data_bytes == sum(2 * (i + 1) for i in range(50))
+    assert size.max_depth == 2
+    assert backend.open == 0
+    # At most one branch per level, plus one per worker.
+    assert backend.peak <= 2 * (workers or 1)
+
+
+@pytest.mark.parametrize("workers", [None, 4])
+def test_unreadable_subkey(workers: Any) -> None:
+    backend = _CountingBackend()
+    _wide(backend, 3)
+    backend.CloseKey(backend.CreateKeyEx(HKCU, r"Tree\k1\locked"))
+    with _open(backend, r"HKCU\Tree") as tree:
+        backend.open = 0
+        errors: list[WindowsRegistryError] = []
+        size = tree.sizeof(workers=workers, onerror=errors.append)
+        assert size.total_subkeys == 7
+        assert [str(e).count("locked") for e in errors] == [1]
+        with pytest.raises(OperationError, match="locked"):
+            tree.sizeof(workers=workers)
+    assert backend.open == 0
+
+
+def test_cache_reuses_unchanged_keys(hkcu: RegistryPath) -> None:
+    tree = hkcu.create_subkey("Tree")
+    tree.create_subkey("a").create_subkey("a1")
+    cache = SizeCache()
+    first = tree.sizeof(cache=cache, data_bytes=True)
+    assert cache.stats().misses == 3
+    assert tree.sizeof(cache=cache, data_bytes=True) == first
+    assert cache.stats().hits == 3
+    tree.create_subkey("b")
+    assert tree.sizeof(cache=cache).total_subkeys == 3
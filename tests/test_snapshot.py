@@ -0,0 +1,114 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+from windowsregistry import RegistryPath
+from windowsregistry.backends import MemoryBackend
+from windowsregistry.models import RegistryValueType
+from windowsregistry.snapshot import DiffKind, RegistrySnapshot, diff, diff_live
+
+SZ = RegistryValueType.REG_SZ
+
+
+def _app(hkcu: RegistryPath) -> RegistryPath:
+    app = hkcu.create_subkey("App")
+    app.set_value("b", "2", dtype=SZ)
+    app.set_value("A", "1", dtype=SZ)
+    settings = app.create_subkey("Settings")
+    settings.set_value("theme", "dark", dtype=SZ)
+    app.create_subkey("Cache").create_subkey("Old")
+    return app
+
+
+def test_capture_is_sorted_and_limited(hkcu: RegistryPath) -> None:
+    app = _app(hkcu)
+    snap = app.snapshot()
+    assert [item[0] for item in snap.root.values] == ["A", "b"]
+    assert [child.name for child in snap.root.subkeys] == ["Cache", "Settings"]
+    assert [regpath.path for regpath, _ in snap.iterkeys()] == [
+        "App",
+        "App\\Cache",
+        "App\\Cache\\Old",
+        "App\\Settings",
+    ]
+    shallow = app.snapshot(max_depth=1)
+    cache, settings = shallow.root.subkeys
+    # Past max_depth only subkey names are kept.
+    assert cache.subkeys == (("Old", 0, (), ()),)
+    assert settings.values == snap.root.subkeys[1].values
+    assert not diff(snap, RegistrySnapshot.capture(app))
+
+
+def test_diff_reports_every_kind(hkcu: RegistryPath) -> None:
+    app = _app(hkcu)
+    before = app.snapshot()
+    app.set_value("A", "changed", dtype=SZ, overwrite=True)
+    app.delete_value("b")
+    app.set_value("c", "3", dtype=SZ)
+    app.delete_subkey("Cache", recursive=True)
+    app.create_subkey("New").set_value("x", "y", dtype=SZ)
+    drift = diff_live(before, app)
+    kinds = [(entry.kind, entry.regpath.path, entry.name) for entry in drift.entries]
+    assert sorted(kinds, key=str) == sorted(
+        [
+            (DiffKind.VALUE_CHANGED, "App", "A"),
+            (DiffKind.VALUE_REMOVED, "App", "b"),
+            (DiffKind.VALUE_ADDED, "App", "c"),
+            (DiffKind.KEY_REMOVED, "App\\Cache", None),
+            (DiffKind.KEY_ADDED, "App\\New", None),
+            (DiffKind.VALUE_ADDED, "App\\New", "x"),
+        ],
+        key=str,
+    )
+    (changed,) = drift.of_kind(DiffKind.VALUE_CHANGED)
+    assert changed.old is not None and changed.new is not None
+    assert (changed.old.data, changed.new.data) == ("1", "changed")
+
+
+def test_refresh_shares_unchanged_subtrees(hkcu: RegistryPath) -> None:
+    app = _app(hkcu)
+    before = app.snapshot()
+    app.open_subkey("Settings").set_value("theme", "light", dtype=SZ, overwrite=True)
+    after = before.refresh(app)
+    old_cache, old_settings = before.root.subkeys
+    new_cache, new_settings = after.root.subkeys
+    assert new_cache is old_cache
+    assert new_settings is not old_settings
+    assert after.root.values is before.root.values
+    assert len(diff(before, after).entries) == 1
+
+
+def test_patch_replays_elsewhere(backend: MemoryBackend, hkcu: RegistryPath) -> None:
+    app = _app(hkcu)
+    mirror = _app(hkcu.create_subkey("Mirror"))
+    before = app.snapshot()
+    app.set_value("A", "changed", dtype=SZ, overwrite=True)
+    app.delete_subkey("Cache", recursive=True)
+    app.create_subkey("New").create_subkey("Deeper")
+    drift = diff_live(before, app)
+    drift.to_batch(target=mirror.regpath, backend=backend).commit()
+    assert not diff(
+        drift.new._replace(regpath=mirror.regpath), mirror.snapshot()
+    ).entries
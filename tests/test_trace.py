@@ -0,0 +1,157 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import io
+from typing import Any
+
+import pytest
+
+from windowsregistry import open_subkey
+from windowsregistry.backends import MemoryBackend
+from windowsregistry.errors import TraceError
+from windowsregistry.models import (
+    RegistryHKEYEnum,
+    RegistryKeyPermissionType,
+    RegistryValueType,
+)
+from windowsregistry.trace import (
+    RecordingBackend,
+    ReplayBackend,
+    TraceRecord,
+    analyze_trace,
+    read_trace,
+)
+
+HKCU = RegistryHKEYEnum.HKEY_CURRENT_USER.value
+KEY_READ = RegistryKeyPermissionType.KEY_READ.value
+KEY_ALL_ACCESS = RegistryKeyPermissionType.KEY_ALL_ACCESS.value
+
+
+class _BuggyBackend(MemoryBackend):
+    def QueryValueEx(self, key: Any, name: Any) -> Any:
+        if name == "bug":
+            raise TypeError("not a registry error")
+        return super().QueryValueEx(key, name)
+
+
+def test_record_and_replay() -> None:
+    backend = MemoryBackend()
+    stream = io.BytesIO()
+    with RecordingBackend(stream, backend) as recorder, open_subkey(
+        "HKCU",
+        backend=recorder,
+        permission=RegistryKeyPermissionType.KEY_ALL_ACCESS,
+    ) as root:
+        app = root.create_subkey("App")
+        app.set_value("n", 5, dtype=RegistryValueType.REG_DWORD)
+        assert app.get_value("n").data == 5
+        assert not app.value_exists("missing")
+        app.close()
+    stream.seek(0)
+    records = list(read_trace(stream))
+    assert {"CreateKeyEx", "SetValueEx", "QueryValueEx"} <= {
+        record.operation for record in records
+    }
+    assert any(record.error is not None for record in records)
+    # The library asks for an explicit registry view, so replay with its access.
+    access = next(r.args[2] for r in records if r.operation == "CreateKeyEx")
+    replay = ReplayBackend(records)
+    handle = replay.CreateKeyEx(HKCU, "APP", 0, access)
+    # Answers to the same call come back in the order they were recorded.
+    with pytest.raises(FileNotFoundError):
+        replay.QueryValueEx(handle, "N")
+    assert replay.QueryValueEx(handle, "N") == (5, RegistryValueType.REG_DWORD.value)
+    with pytest.raises(FileNotFoundError):
+        replay.QueryValueEx(handle, "missing")
+    with pytest.raises(TraceError, match="not in trace"):
+        replay.QueryValueEx(handle, "other")
+
+
+def test_only_results_and_os_errors_are_recorded() -> None:
+    backend = _BuggyBackend()
+    handle = backend.CreateKeyEx(HKCU, "App", 0, KEY_ALL_ACCESS)
+    backend.SetValueEx(handle, "v", 0, RegistryValueType.REG_SZ.value, "x")
+    stream = io.BytesIO()
+    with RecordingBackend(stream, backend) as recorder:
+        with pytest.raises(TypeError, match="not a registry error"):
+            recorder.QueryValueEx(handle, "bug")
+        with pytest.raises(FileNotFoundError):
+            recorder.QueryValueEx(handle, "gone")
+        assert recorder.QueryValueEx(handle, "v") == ("x", 1)
+        assert recorder.records == 2
+    stream.seek(0)
+    records = list(read_trace(stream))
+    assert [record.args for record in records] == [("gone",), ("v",)]
+    assert records[0].error is not None and records[0].error[0] == "FileNotFoundError"
+    assert records[1].result == ["x", 1]
+
+
+def _rec(operation: str, handle: int, *args: Any, result: Any = None) -> TraceRecord:
+    return TraceRecord(operation, handle, args, result, None, 0.001)
+
+
+def test_analysis_forgets_answers_after_writes() -> None:
+    trace = [
+        _rec("OpenKeyEx", HKCU, "App", 0, KEY_READ, result=1),
+        _rec("QueryInfoKey", 1),
+        _rec("QueryInfoKey", 1),
+        _rec("QueryValueEx", 1, "v"),
+        _rec("SetValueEx", 1, "v", 0, 1, "x"),
+        _rec("QueryValueEx", 1, "V"),
+        _rec("QueryInfoKey", 1),
+        _rec("OpenKeyEx", HKCU, "Probe", 0, KEY_READ, result=2),
+        _rec("CloseKey", 2),
+        _rec("OpenKeyEx", HKCU, "probe", 0, KEY_READ, result=3),
+        _rec("OpenKeyEx", HKCU, "app", 0, KEY_READ, result=4),
+        _rec("DeleteKeyEx", HKCU, "App", KEY_ALL_ACCESS, 0),
+        _rec("CreateKeyEx", HKCU, "App", 0, KEY_ALL_ACCESS, result=5),
+        _rec("OpenKeyEx", HKCU, "App", 0, KEY_READ, result=6),
+    ]
+    report = analyze_trace(trace)
+    assert report.total_calls == len(trace)
+    assert [(r.path, r.calls) for r in report.repeated_queries] == [
+        (r"HKEY_CURRENT_USER\App", 1)
+    ]
+    assert [(r.path, r.calls) for r in report.exists_then_open] == [
+        (r"HKEY_CURRENT_USER\Probe", 1)
+    ]
+    assert [(r.path, r.calls) for r in report.repeated_opens] == [
+        (r"HKEY_CURRENT_USER\App", 1)
+    ]
+    assert report.redundant_calls == 3
+
+
+def test_analysis_of_a_long_trace() -> None:
+    # Writes to many distinct keys used to rescan every remembered answer.
+    trace: list[TraceRecord] = []
+    for i in range(5000):
+        trace.append(_rec("OpenKeyEx", HKCU, f"k{i}", 0, KEY_READ, result=i + 1))
+        trace.append(_rec("QueryInfoKey", i + 1))
+        trace.append(_rec("SetValueEx", i + 1, "v", 0, 1, "x"))
+        trace.append(_rec("QueryInfoKey", i + 1))
+    report = analyze_trace(trace)
+    assert report.total_calls == 20000
+    assert report.redundant_calls == 0
@@ -0,0 +1,114 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+
+from windowsregistry import RegistryPath
+from windowsregistry.errors import TreeSpecError
+from windowsregistry.models import RegistryValue, RegistryValueType
+from windowsregistry.tree import TreeSpec, TreeStamps, TreeStats
+
+SPEC: TreeSpec = {
+    "Theme": ("dark", "REG_SZ"),
+    "Size": [3, "dword"],
+    "Blob": (b"\x00\x01", RegistryValueType.REG_BINARY),
+    "Plugins": {
+        "Enabled": (1, 4),
+        "List": RegistryValue("List", ["a", "b"], RegistryValueType.REG_MULTI_SZ),
+        "Empty": {},
+    },
+}
+
+
+def _state(path: RegistryPath) -> dict[str, dict[str, Any]]:
+    return {
+        key.regpath.path: {v.value_name: v.data for v in values}
+        for key, _, values in path.walk()
+    }
+
+
+def test_create_and_reapply(hkcu: RegistryPath) -> None:
+    app = hkcu.create_subkey("App")
+    stats = app.create_tree(SPEC)
+    assert stats == TreeStats(3, 0, 2, 0, 5, 0)
+    assert _state(app) == {
+        "App": {"Theme": "dark", "Size": 3, "Blob": b"\x00\x01"},
+        "App\\Plugins": {"Enabled": 1, "List": ["a", "b"]},
+        "App\\Plugins\\Empty": {},
+    }
+    assert app.create_tree(SPEC) == TreeStats(3, 3, 0, 0, 0, 0)
+    changed = dict(SPEC, Theme=("light", "REG_SZ"))
+    assert app.create_tree(changed).set_values == 1
+
+
+def test_prune(hkcu: RegistryPath) -> None:
+    app = hkcu.create_subkey("App")
+    app.create_tree(SPEC)
+    app.set_value("Extra", "x", dtype=RegistryValueType.REG_SZ)
+    app.create_subkey("Stray").create_subkey("Below")
+    # A pooled handle to the pruned key must not survive the prune.
+    app.open_subkey("Stray").close()
+    stats = app.create_tree(SPEC, prune=True)
+    assert (stats.deleted_keys, stats.deleted_values) == (2, 1)
+    assert not app.value_exists("Extra")
+    assert not app.subkey_exists("Stray")
+    app.create_subkey("Stray").set_value("v", "new", dtype=RegistryValueType.REG_SZ)
+    assert [v.data for v in app.open_subkey("Stray").values()] == ["new"]
+
+
+def test_stamps_skip_unchanged_keys(hkcu: RegistryPath) -> None:
+    app = hkcu.create_subkey("App")
+    stamps: TreeStamps = {}
+    app.create_tree(SPEC, stamps=stamps)
+    assert len(stamps) == 3
+    snapshot = dict(stamps)
+    assert app.create_tree(SPEC, stamps=stamps).unchanged_keys == 3
+    assert stamps == snapshot
+    app.set_value("Theme", "changed", dtype=RegistryValueType.REG_SZ, overwrite=True)
+    assert app.create_tree(SPEC, stamps=stamps).set_values == 1
+    assert app.get_value("Theme").data == "dark"
+
+
+@pytest.mark.parametrize(
+    "bad",
+    [
+        {"Plugins": {"Name": (5, "REG_SZ")}},
+        {"Plugins": {"Count": ("5", "REG_DWORD")}},
+        {"Plugins": {"Count": (2**32, "REG_DWORD")}},
+        {"Name": ("x", "REG_NOPE")},
+        {"Name": "not a pair"},
+        {"bad\\name": {}},
+        {"Dup": {}, "dup": {}},
+    ],
+)
+def test_bad_specs_fail_before_writing(hkcu: RegistryPath, bad: TreeSpec) -> None:
+    app = hkcu.create_subkey("App")
+    spec: TreeSpec = {"First": ("written?", "REG_SZ"), "Sub": {}, **bad}
+    with pytest.raises(TreeSpecError):
+        app.create_tree(spec)
+    assert _state(app) == {"App": {}}
@@ -0,0 +1,155 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+from windowsregistry import RegistryPath, open_subkey
+from windowsregistry.backends import MemoryBackend
+from windowsregistry.models import RegistryKeyPermissionType, RegistryValueType
+from windowsregistry.regpath import RegistryPathString
+from windowsregistry.valuecache import (
+    MISSING,
+    UNCACHED,
+    ValueCache,
+    invalidate_caches,
+    make_cache_key,
+)
+
+SZ = RegistryValueType.REG_SZ
+
+
+def _key(backend: MemoryBackend, path: str, view: bool = False):
+    return make_cache_key(backend, RegistryPathString(path), view)
+
+
+def test_get_put_ttl_and_lru() -> None:
+    now = [0.0]
+    cache = ValueCache(2, ttl=5, clock=lambda: now[0])
+    backend = MemoryBackend()
+    a, b, c = (_key(backend, f"HKCU\\{n}") for n in "abc")
+    cache.put(a, "v", "x", 1)
+    cache.put(b, "v", "x", 2)
+    assert cache.get(a, "v", "x") == 1
+    cache.put(c, "v", "x", 3)
+    assert cache.get(b, "v", "x") is UNCACHED
+    assert len(cache) == 2
+    now[0] = 5.0
+    assert cache.get(a, "v", "x") is UNCACHED
+    stats = cache.stats()
+    assert (stats.hits, stats.evictions, stats.stale, stats.size) == (1, 1, 1, 1)
+
+
+def test_revalidation_and_negatives() -> None:
+    backend = MemoryBackend()
+    key = _key(backend, r"HKCU\a")
+    cache = ValueCache(revalidate=True)
+    cache.put(key, "v", "x", MISSING, 10)
+    assert cache.get(key, "v", "x", 10) is MISSING
+    assert cache.get(key, "v", "x", 11) is UNCACHED
+    no_negatives = ValueCache(negative=False)
+    no_negatives.put(key, "v", "x", MISSING)
+    assert len(no_negatives) == 0
+
+
+def test_invalidate_is_scoped() -> None:
+    backend, other = MemoryBackend(), MemoryBackend()
+    cache = ValueCache()
+    paths = [r"HKCU\a", r"HKCU\a\b", r"HKCU\a\b\c", r"HKCU\ab", r"HKCU\x"]
+    for path in paths:
+        for view in (False, True):
+            cache.put(_key(backend, path, view), "v", "n", path)
+            cache.put(_key(backend, path, view), "e", "", True)
+        cache.put(_key(other, path), "v", "n", path)
+
+    def cached(b: MemoryBackend = backend) -> list[str]:
+        return sorted(
+            path
+            for path in paths
+            if cache.get(_key(b, path), "v", "n") is not UNCACHED
+        )
+
+    cache.invalidate(backend, RegistryPathString(r"hkcu\A\B"))
+    assert cached() == [r"HKCU\a", r"HKCU\a\b\c", r"HKCU\ab", r"HKCU\x"]
+    assert cache.get(_key(backend, r"HKCU\a\b", True), "v", "n") is UNCACHED
+    cache.invalidate(backend, RegistryPathString(r"HKCU\a"), tree=True)
+    assert cached() == [r"HKCU\ab", r"HKCU\x"]
+    assert cached(other) == paths
+
+    cache.put(_key(backend, "HKCU"), "e", "", True)
+    cache.put(_key(backend, r"HKCU\new"), "e", "", MISSING)
+    cache.put(_key(backend, r"HKCU\new\deeper"), "e", "", MISSING)
+    cache.invalidate(backend, RegistryPathString(r"HKCU\new\deeper"), created=True)
+    assert cache.get(_key(backend, r"HKCU\new"), "e", "") is UNCACHED
+    assert cache.get(_key(backend, "HKCU"), "e", "") is UNCACHED
+    assert cache.get(_key(backend, r"HKCU\x"), "e", "") is True
+    cache.clear()
+    assert len(cache) == 0 and not cache._subtrees
+
+
+def test_index_is_released_with_items() -> None:
+    backend = MemoryBackend()
+    cache = ValueCache(1)
+    cache.put(_key(backend, r"HKCU\a\b"), "v", "n", 1)
+    cache.put(_key(backend, r"HKCU\c"), "v", "n", 1)
+    assert {path for _, path in cache._subtrees} == {
+        RegistryPathString(r"HKCU\c"),
+        RegistryPathString("HKCU"),
+    }
+
+
+def test_library_writes_invalidate(backend: MemoryBackend) -> None:
+    cache = ValueCache(revalidate=False)
+    with open_subkey(
+        "HKCU",
+        backend=backend,
+        permission=RegistryKeyPermissionType.KEY_ALL_ACCESS,
+        cache=cache,
+    ) as root:
+        app = root.create_subkey("App")
+        assert not app.value_exists("v")
+        assert not root.subkey_exists(r"App\Sub")
+        app.set_value("v", "1", dtype=SZ)
+        app.create_subkey("Sub")
+        assert app.get_value("v").data == "1"
+        assert root.subkey_exists(r"App\Sub")
+        hits = cache.stats().hits
+        assert app.get_value("v").data == "1"
+        assert cache.stats().hits == hits + 1
+        # Another writer is not seen without revalidation...
+        handle = backend.OpenKeyEx(root._backend.winreg_handler, "App", 0, 0xF003F)
+        backend.SetValueEx(handle, "v", 0, SZ.value, "2")
+        assert app.get_value("v").data == "1"
+        # ...until the library is told.
+        invalidate_caches(backend, app.regpath)
+        assert app.get_value("v").data == "2"
+
+
+def test_cached_path_children_share_the_cache(hkcu: RegistryPath) -> None:
+    cache = ValueCache()
+    hkcu.create_subkey("App").set_value("v", "x", dtype=SZ)
+    backend = hkcu._backend._ll.backend
+    with open_subkey("HKCU", backend=backend, cache=cache) as root:
+        app = root.open_subkey("App")
+        list(app.values())
+        assert len(cache) == 1
@@ -0,0 +1,158 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+
+from windowsregistry import RegistryPath, open_subkey
+from windowsregistry.backends import MemoryBackend
+from windowsregistry.errors import OperationError, WindowsRegistryError
+from windowsregistry.models import (
+    RegistryHKEYEnum,
+    RegistryKeyPermissionType,
+    RegistryValueType,
+)
+
+
+class _FailingBackend(MemoryBackend):
+    # Enumerating subkeys of "badkeys" or values of "badvalues" fails.
+
+    def EnumKey(self, key: Any, index: int) -> str:
+        if key._key.name == "badkeys":
+            raise PermissionError(13, "denied")
+        return super().EnumKey(key, index)
+
+    def EnumValue(self, key: Any, index: int) -> tuple[str, Any, int]:
+        if key._key.name == "badvalues" and index:
+            raise PermissionError(13, "denied")
+        return super().EnumValue(key, index)
+
+
+def _populate(root: RegistryPath) -> RegistryPath:
+    tree = root.create_subkey("Tree")
+    for path in (r"a\a1\a11", r"a\a2", r"b\b1", "c"):
+        node = tree
+        for part in path.split("\\"):
+            node = node.create_subkey(part, exist_ok=True)
+        node.set_value("leaf", path, dtype=RegistryValueType.REG_SZ)
+    return tree
+
+
+def _rel(tree: RegistryPath, path: RegistryPath) -> str:
+    return "\\".join(path.regpath.parts[len(tree.regpath.parts) :])
+
+
+def test_topdown_is_depth_first(hkcu: RegistryPath) -> None:
+    tree = _populate(hkcu)
+    seen = [(_rel(tree, path), names) for path, names, _ in tree.walk()]
+    assert seen == [
+        ("", ["a", "b", "c"]),
+        ("a", ["a1", "a2"]),
+        ("a\\a1", ["a11"]),
+        ("a\\a1\\a11", []),
+        ("a\\a2", []),
+        ("b", ["b1"]),
+        ("b\\b1", []),
+        ("c", []),
+    ]
+
+
+def test_pruning_and_depth_limit(hkcu: RegistryPath) -> None:
+    tree = _populate(hkcu)
+    seen: list[str] = []
+    for path, names, _ in tree.walk():
+        seen.append(_rel(tree, path))
+        if "a" in names:
+            names.remove("a")
+    assert seen == ["", "b", "b\\b1", "c"]
+    limited = [_rel(tree, path) for path, _, _ in tree.walk(max_depth=1)]
+    assert limited == ["", "a", "b", "c"]
+
+
+def test_bottom_up_and_values(hkcu: RegistryPath) -> None:
+    tree = _populate(hkcu)
+    seen = [
+        (_rel(tree, path), [v.data for v in values])
+        for path, _, values in tree.walk(topdown=False)
+    ]
+    assert seen[0] == ("a\\a1\\a11", ["a\\a1\\a11"])
+    assert seen[-1] == ("", [])
+    assert [rel for rel, _ in seen].index("a") > [rel for rel, _ in seen].index("a\\a2")
+    keys_only = [list(values) for _, _, values in tree.walk(keys_only=True)]
+    assert all(values == [] for values in keys_only)
+
+
+def test_failures_go_to_onerror() -> None:
+    backend = _FailingBackend()
+    with open_subkey(
+        "HKCU", backend=backend, permission=RegistryKeyPermissionType.KEY_ALL_ACCESS
+    ) as root:
+        tree = root.create_subkey("Tree")
+        tree.create_subkey("badkeys").create_subkey("hidden")
+        bad = tree.create_subkey("badvalues")
+        for name in "xyz":
+            bad.set_value(name, name, dtype=RegistryValueType.REG_SZ)
+        tree.create_subkey("ok")
+        errors: list[WindowsRegistryError] = []
+        seen = {
+            _rel(tree, path): [v.value_name for v in values]
+            for path, _, values in tree.walk(onerror=errors.append)
+        }
+        assert seen == {"": [], "badvalues": ["x"], "ok": []}
+        assert len(errors) == 2
+        assert all(isinstance(exc, OperationError) for exc in errors)
+        assert "badkeys" in str(errors[0])
+        # Without onerror the failing parts are skipped silently.
+        assert len(list(tree.walk())) == 3
+
+
+def test_unopenable_children_are_reported() -> None:
+    backend = MemoryBackend()
+    hkcu = RegistryHKEYEnum.HKEY_CURRENT_USER.value
+    backend.CreateKeyEx(hkcu, r"Tree\gone")
+    errors: list[WindowsRegistryError] = []
+    with open_subkey(r"HKCU\Tree", backend=backend) as tree:
+        walk = tree.walk(onerror=errors.append)
+        _, names, _ = next(walk)
+        backend.DeleteKeyEx(hkcu, r"Tree\gone")
+        assert names == ["gone"]
+        assert list(walk) == []
+    assert len(errors) == 1
+
+
+def test_walk_root_failure() -> None:
+    backend = _FailingBackend()
+    backend.CreateKeyEx(RegistryHKEYEnum.HKEY_CURRENT_USER.value, r"badkeys\child")
+    with open_subkey(r"HKCU\badkeys", backend=backend) as path, pytest.raises(
+        OperationError
+    ):
+        for _ in path.walk(onerror=_raise):
+            pass
+
+
+def _raise(exc: WindowsRegistryError) -> None:
+    raise exc
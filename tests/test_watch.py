@@ -0,0 +1,166 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Any, Iterator
+
+import pytest
+
+from windowsregistry import RegistryPath, open_subkey
+from windowsregistry.backends import MemoryBackend
+from windowsregistry.models import RegistryKeyPermissionType, RegistryValueType
+from windowsregistry.snapshot import DiffKind
+from windowsregistry.watch import ChangeEvent, RegistryWatcher
+
+SZ = RegistryValueType.REG_SZ
+
+
+@pytest.fixture
+def watcher() -> Iterator[RegistryWatcher]:
+    # Long intervals: the scheduler thread stays out of the way unless a
+    # test wants it.
+    with RegistryWatcher(min_interval=60, max_interval=60) as watcher:
+        yield watcher
+
+
+def _kinds(event: ChangeEvent) -> list[tuple[DiffKind, str, object]]:
+    return [(entry.kind, entry.regpath.path, entry.name) for entry in event.entries]
+
+
+def test_poll_delivers_coalesced_events(
+    hkcu: RegistryPath, watcher: RegistryWatcher
+) -> None:
+    app = hkcu.create_subkey("App")
+    events: list[ChangeEvent] = []
+    watch = watcher.watch(app, events.append, recursive=True)
+    assert watcher.poll() == 1
+    assert events == []
+    app.set_value("a", "1", dtype=SZ)
+    app.create_subkey("Sub").set_value("b", "2", dtype=SZ)
+    watcher.poll()
+    (event,) = events
+    assert event.regpath == app.regpath
+    assert sorted(_kinds(event), key=str) == sorted(
+        [
+            (DiffKind.VALUE_ADDED, "App", "a"),
+            (DiffKind.KEY_ADDED, "App\\Sub", None),
+            (DiffKind.VALUE_ADDED, "App\\Sub", "b"),
+        ],
+        key=str,
+    )
+    watch.cancel()
+    app.set_value("c", "3", dtype=SZ)
+    assert watcher.poll() == 0
+    assert len(events) == 1
+
+
+def test_non_recursive_watch_ignores_subkey_values(
+    hkcu: RegistryPath, watcher: RegistryWatcher
+) -> None:
+    app = hkcu.create_subkey("App")
+    sub = app.create_subkey("Sub")
+    events: list[ChangeEvent] = []
+    watcher.watch(app, events.append)
+    sub.set_value("b", "2", dtype=SZ)
+    watcher.poll()
+    assert events == []
+    app.create_subkey("Other")
+    watcher.poll()
+    assert _kinds(events[0]) == [(DiffKind.KEY_ADDED, "App\\Other", None)]
+
+
+def test_removed_and_recreated_key(hkcu: RegistryPath, watcher: RegistryWatcher) -> None:
+    app = hkcu.create_subkey("App")
+    events: list[ChangeEvent] = []
+    watcher.watch(app, events.append)
+    hkcu.delete_subkey("App")
+    watcher.poll()
+    hkcu.create_subkey("App").set_value("v", "x", dtype=SZ)
+    watcher.poll()
+    assert [_kinds(event) for event in events] == [
+        [(DiffKind.KEY_REMOVED, "App", None)],
+        [(DiffKind.KEY_ADDED, "App", None), (DiffKind.VALUE_ADDED, "App", "v")],
+    ]
+
+
+class _SlowBackend(MemoryBackend):
+    # Yields the GIL mid-poll so concurrent polls interleave.
+
+    def QueryInfoKey(self, key: Any) -> tuple[int, int, int]:
+        time.sleep(0.001)
+        return super().QueryInfoKey(key)
+
+
+def test_concurrent_polls_report_a_change_once(watcher: RegistryWatcher) -> None:
+    root = open_subkey(
+        "HKCU",
+        backend=_SlowBackend(),
+        permission=RegistryKeyPermissionType.KEY_ALL_ACCESS,
+    )
+    app = root.create_subkey("App")
+    events: list[ChangeEvent] = []
+    watcher.watch(app, events.append)
+    for round in range(10):
+        app.set_value(f"v{round}", "x", dtype=SZ)
+        barrier = threading.Barrier(8)
+
+        def poll(barrier: threading.Barrier) -> None:
+            barrier.wait()
+            watcher.poll()
+
+        threads = [threading.Thread(target=poll, args=(barrier,)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(events) == round + 1
+
+
+def test_scheduler_thread_and_async_events(hkcu: RegistryPath) -> None:
+    app = hkcu.create_subkey("App")
+
+    async def main() -> ChangeEvent:
+        with RegistryWatcher(min_interval=0.01, max_interval=0.05) as watcher:
+            watch = watcher.watch(app)
+            events = watch.events()
+            waiter = asyncio.ensure_future(events.__anext__())
+            await asyncio.sleep(0.02)
+            app.set_value("a", "1", dtype=SZ)
+            event = await asyncio.wait_for(waiter, 5)
+            await events.aclose()
+            return event
+
+    event = asyncio.run(main())
+    assert _kinds(event) == [(DiffKind.VALUE_ADDED, "App", "a")]
+
+
+def test_closed_watcher_rejects_watches(hkcu: RegistryPath) -> None:
+    watcher = RegistryWatcher()
+    watcher.close()
+    with pytest.raises(RuntimeError):
+        watcher.watch(hkcu)
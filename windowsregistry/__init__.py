@@ -22,17 +22,30 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from typing import Final
+from __future__ import annotations
 
-from . import models
-from .core import RegistryPath, open_subkey
-from .errors import WindowsRegistryError
+# Importing the package loads nothing else: submodules, the public classes
+# and the predefined root keys are resolved on first attribute access by
+# `__getattr__` below and then cached in the module namespace.
 
-HKCR = HKEY_CLASSES_ROOT = open_subkey("HKCR")
-HKCU = HKEY_CURRENT_USER = open_subkey("HKCU")
-HKLM = HKEY_LOCAL_MACHINE = open_subkey("HKLM")
+TYPE_CHECKING = False
+
+if TYPE_CHECKING:
+    from typing import Any, Final
+
+    from . import backends, models
+    from .core import RegistryPath, open_subkey
+    from .errors import WindowsRegistryError
+
+    HKCR: RegistryPath
+    HKCU: RegistryPath
+    HKLM: RegistryPath
+    HKEY_CLASSES_ROOT: RegistryPath
+    HKEY_CURRENT_USER: RegistryPath
+    HKEY_LOCAL_MACHINE: RegistryPath
 
 __all__ = [
+    "backends",
     "models",
     "RegistryPath",
     "open_subkey",
@@ -46,3 +59,39 @@ __all__ = [
 ]
 
 __version__: Final[str] = "0.1.3"
+
+_attributes = {
+    "RegistryPath": ".core",
+    "open_subkey": ".core",
+    "WindowsRegistryError": ".errors",
+}
+_roots = {
+    "HKCR": ("HKCR", "HKEY_CLASSES_ROOT"),
+    "HKCU": ("HKCU", "HKEY_CURRENT_USER"),
+    "HKLM": ("HKLM", "HKEY_LOCAL_MACHINE"),
+}
+_roots.update({names[1]: names for names in _roots.values()})
+
+
+def __getattr__(name: str) -> Any:
+    from importlib import import_module  # noqa: PLC0415
+
+    names = _roots.get(name)
+    if names is not None:
+        root = import_module(".core", __name__).open_subkey(names[0])
+        # Another thread may have got there first; keep whichever was stored.
+        root = globals().setdefault(names[0], root)
+        globals().setdefault(names[1], root)
+        return root
+    module = _attributes.get(name)
+    if module is not None:
+        value = getattr(import_module(module, __name__), name)
+    elif name in __all__:
+        value = import_module(f".{name}", __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return globals().setdefault(name, value)
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *__all__})
@@ -25,50 +25,120 @@
 from __future__ import annotations
 
 from functools import partial
-from typing import TYPE_CHECKING, Any, Iterable, Optional, Sequence, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Iterable,
+    Optional,
+    Sequence,
+    TypeVar,
+    Union,
+)
 
-from ._lowlevel import lowlevel
+from ._lowlevel import get_lowlevel
 from ._typings import RegistryKeyPermissionTypeArgs
-from .errors import OperationDataErrorKind, OperationError, OperationErrorKind
+from .backends import RegistryBackend
+from .errors import (
+    OperationDataErrorKind,
+    OperationError,
+    OperationErrorKind,
+    ValueCodecError,
+)
+from .handlepool import (
+    HandlePoolKey,
+    PooledHandle,
+    get_handle_pool,
+    is_stale,
+    make_key,
+)
 from .models import (
     RegistryHKEYEnum,
     RegistryInfoKey,
     RegistryKeyPermissionType,
-    RegistryPermissionConfig,
 )
-from .regpath import RegistryPathString
+from .regpath import REGISTRY_SEP, RegistryPathString, fold_case
+from .utils import get_permission_config
+from .valuecache import (
+    MISSING,
+    UNCACHED,
+    CacheKey,
+    ValueCache,
+    invalidate_caches,
+    make_cache_key,
+)
 
 if TYPE_CHECKING:
     from winreg import HKEYType
 
+_T = TypeVar("_T")
+
 
 class WindowsRegistryHandler:
-    def __init__(
+    __slots__ = (
+        "_entry",
+        "_cache",
+        "_regpath",
+        "_ll",
+        "_pool",
+        "_on_close",
+        "__weakref__",
+    )
+
+    def __init__(  # noqa: PLR0913
         self,
         subkey: Union[str, Sequence[str], None] = None,
         *,
         root_key: Optional[RegistryHKEYEnum] = None,
         permission: Optional[RegistryKeyPermissionTypeArgs] = None,
         wow64_32key_access: bool = False,
+        backend: Optional[RegistryBackend] = None,
+        parent: Optional[WindowsRegistryHandler] = None,
+        cache: Optional[ValueCache] = None,
     ) -> None:
+        self._entry: Optional[PooledHandle] = None
+        self._on_close: Optional[Callable[[], None]] = None
+        if cache is None and parent is not None:
+            cache = parent._cache
+        self._cache: Optional[ValueCache] = cache
         if subkey is None:
             subkey = []
         elif isinstance(subkey, str):
             subkey = [subkey]
         if permission is None:
-            permission = RegistryKeyPermissionType.KEY_READ
-        if isinstance(permission, RegistryKeyPermissionType):
-            permission = [permission]
-        self._regpath = RegistryPathString(*subkey, root_key=root_key)
-        self._ll = lowlevel(
-            permconf=RegistryPermissionConfig(
-                permissions=tuple(permission), wow64_32key_access=wow64_32key_access
+            permission = (RegistryKeyPermissionType.KEY_READ,)
+        elif isinstance(permission, RegistryKeyPermissionType):
+            permission = (permission,)
+        elif not isinstance(permission, tuple):
+            permission = tuple(permission)
+        permconf = get_permission_config(permission, wow64_32key_access)
+        if parent is None:
+            self._regpath = RegistryPathString(*subkey, root_key=root_key)
+            self._ll = get_lowlevel(permconf, backend)
+            opener = partial(
+                self._ll.open_subkey, self._regpath.root_key.value, self._regpath.path
             )
-        )
+        else:
+            # `subkey` is relative to `parent`: open it from the parent's
+            # handle so the backend only resolves the new components.
+            self._regpath = parent._regpath.joinpath(*subkey)
+            if permconf is parent._ll._permconf:
+                self._ll = parent._ll
+            else:
+                self._ll = get_lowlevel(permconf, parent._ll.backend)
+            if wow64_32key_access == parent._ll._permconf.wow64_32key_access:
+                opener = partial(
+                    parent._call, self._ll.open_subkey, REGISTRY_SEP.join(subkey)
+                )
+            else:
+                opener = partial(
+                    self._ll.open_subkey,
+                    self._regpath.root_key.value,
+                    self._regpath.path,
+                )
+        self._pool = get_handle_pool()
         try:
-            self._winreg_handler = self._ll.open_subkey(
-                self._regpath.root_key.value, self._regpath.path
-            )
+            self._entry = self._pool.acquire(self._pool_key(self._regpath), opener)
         except OSError as exc:
             raise OperationError(
                 OperationErrorKind.ON_READ,
@@ -77,29 +147,111 @@ class WindowsRegistryHandler:
                 exc,
             ) from exc
 
-        self._winreg_query = RegistryInfoKey(
-            *self._ll.query_subkey(self._winreg_handler)
+    def _cache_key(self, regpath: Optional[RegistryPathString] = None) -> CacheKey:
+        regpath = regpath if regpath is not None else self._regpath
+        return make_cache_key(
+            self._ll.backend, regpath, self._ll._permconf.wow64_32key_access
         )
 
+    def _cache_stamp(self, cache: ValueCache) -> Optional[int]:
+        if not cache.revalidate:
+            return None
+        return self._call(self._ll.query_subkey)[2]
+
+    def _invalidate(
+        self,
+        regpath: Optional[RegistryPathString] = None,
+        *,
+        tree: bool = False,
+        created: bool = False,
+    ) -> None:
+        regpath = regpath if regpath is not None else self._regpath
+        invalidate_caches(self._ll.backend, regpath, tree=tree, created=created)
+
+    def _pool_key(self, regpath: RegistryPathString) -> HandlePoolKey:
+        return make_key(self._ll.backend, regpath, self._ll._access)
+
     @property
     def winreg_handler(self) -> "HKEYType":
-        return self._winreg_handler
+        if self._entry is None:
+            raise OperationError(
+                OperationErrorKind.ON_READ,
+                OperationDataErrorKind.SUBKEY,
+                f"{self._regpath.fullpath!r} is closed",
+            )
+        return self._entry.handle
+
+    def _reopen(self) -> bool:
+        entry = self._entry
+        if entry is None:
+            return False
+        opener = partial(
+            self._ll.open_subkey, self._regpath.root_key.value, self._regpath.path
+        )
+        try:
+            self._entry = self._pool.reopen(entry, opener)
+        except OSError:
+            return False
+        self._invalidate(tree=True)
+        return True
+
+    def _call(self, func: Callable[..., _T], *args: Any) -> _T:
+        # A pooled handle may outlive its key; reopen by path once and retry.
+        try:
+            return func(self.winreg_handler, *args)
+        except OSError as exc:
+            if not is_stale(exc) or not self._reopen():
+                raise
+        return func(self.winreg_handler, *args)
 
     @property
     def winreg_query(self) -> RegistryInfoKey:
-        return self._winreg_query
+        # Queried on every access, so counts never go stale after writes.
+        return RegistryInfoKey(*self._call(self._ll.query_subkey))
+
+    @property
+    def closed(self) -> bool:
+        return self._entry is None
+
+    def _release(self) -> None:
+        entry, self._entry = self._entry, None
+        if entry is not None:
+            self._pool.release(entry)
+
+    def close(self) -> None:
+        self._release()
+        on_close, self._on_close = self._on_close, None
+        if on_close is not None:
+            on_close()
+
+    def __del__(self) -> None:
+        # Only gives the handle back: whatever `_on_close` tears down may
+        # still be in use by keys opened from this one. A plain try keeps
+        # this safe during interpreter shutdown.
+        try:  # noqa: SIM105
+            self._release()
+        except Exception:
+            pass
 
     def itersubkeys(self) -> Iterable[str]:
-        yield from map(
-            partial(self._ll.subkey_from_index, self.winreg_handler),
-            range(self.winreg_query.total_subkeys),
-        )
+        for index in range(self._call(self._ll.query_subkey)[0]):
+            yield self._call(self._ll.subkey_from_index, index)
 
     def itervalues(self) -> Iterable[tuple[str, Any, int]]:
-        yield from map(
-            partial(self._ll.value_from_index, self.winreg_handler),
-            range(self.winreg_query.total_values),
-        )
+        cache = self._cache
+        if cache is None:
+            for index in range(self._call(self._ll.query_subkey)[1]):
+                yield self._call(self._ll.value_from_index, index)
+            return
+        key, stamp = self._cache_key(), self._cache_stamp(cache)
+        values = cache.get(key, "a", "", stamp)
+        if values is UNCACHED:
+            values = tuple(
+                self._call(self._ll.value_from_index, i)
+                for i in range(self._call(self._ll.query_subkey)[1])
+            )
+            cache.put(key, "a", "", values, stamp)
+        yield from values
 
     def new_handler_from_path(
         self, subkey_parts: Sequence[str]
@@ -109,18 +261,37 @@ class WindowsRegistryHandler:
             root_key=self._regpath.root_key,
             permission=self._ll._permconf.permissions,
             wow64_32key_access=self._ll._permconf.wow64_32key_access,
+            backend=self._ll.backend,
+            cache=self._cache,
         )
 
     def subkey_exists(self, subkey: str):
+        regpath = self._regpath.joinpath(subkey)
+        cache = self._cache
+        key: Optional[CacheKey] = None
+        stamp: Optional[int] = None
+        if cache is not None:
+            key, stamp = self._cache_key(regpath), self._cache_stamp(cache)
+            cached = cache.get(key, "e", "", stamp)
+            if cached is not UNCACHED:
+                return cached is not MISSING
         try:
-            self._ll.open_subkey(self.winreg_handler, subkey)
-            return True
+            entry = self._pool.acquire(
+                self._pool_key(regpath),
+                partial(self._call, self._ll.open_subkey, subkey),
+            )
         except OSError:
+            if cache is not None and key is not None:
+                cache.put(key, "e", "", MISSING, stamp)
             return False
+        self._pool.release(entry)
+        if cache is not None and key is not None:
+            cache.put(key, "e", "", True, stamp)
+        return True
 
     def new_subkey(self, subkey: str):
         try:
-            self._ll.create_subkey(self.winreg_handler, subkey)
+            handle = self._call(self._ll.create_subkey, subkey)
         except OSError as exc:
             raise OperationError(
                 OperationErrorKind.ON_CREATE,
@@ -128,21 +299,27 @@ class WindowsRegistryHandler:
                 f"fail to create subkey {subkey!r}",
                 exc,
             ) from exc
+        regpath = self._regpath.joinpath(subkey)
+        self._pool.adopt(self._pool_key(regpath), handle)
+        self._invalidate(regpath, created=True)
 
     def delete_subkey_tree(self, subkey: str, recursive: bool):
         af = self._regpath.joinpath(subkey)
         af_handler = self.new_handler_from_path(af.parts)
-        if af_handler.winreg_query.total_subkeys != 0:
-            if not recursive:
-                raise OperationError(
-                    OperationErrorKind.ON_DELETE,
-                    OperationDataErrorKind.SUBKEY,
-                    "subkey is not empty",
-                )
-            for subaf in af_handler.itersubkeys():
-                af_handler.delete_subkey_tree(subaf, recursive=True)
         try:
-            self._ll.delete_subkey(self.winreg_handler, subkey)
+            if af_handler.winreg_query.total_subkeys != 0:
+                if not recursive:
+                    raise OperationError(
+                        OperationErrorKind.ON_DELETE,
+                        OperationDataErrorKind.SUBKEY,
+                        "subkey is not empty",
+                    )
+                for subaf in tuple(af_handler.itersubkeys()):
+                    af_handler.delete_subkey_tree(subaf, recursive=True)
+        finally:
+            af_handler.close()
+        try:
+            self._call(self._ll.delete_subkey, subkey)
         except OSError as exc:
             raise OperationError(
                 OperationErrorKind.ON_DELETE,
@@ -150,20 +327,48 @@ class WindowsRegistryHandler:
                 f"fail to delete subkey {subkey!r}",
                 exc,
             ) from exc
+        self._pool.invalidate(self._ll.backend, af)
+        self._invalidate(af, tree=True)
+
+    def _cached_value(self, name: str) -> Any:
+        cache = self._cache
+        if cache is None:
+            try:
+                return self._call(self._ll.query_value, name)
+            except FileNotFoundError:
+                return MISSING
+        key, stamp = self._cache_key(), self._cache_stamp(cache)
+        result = cache.get(key, "v", fold_case(name), stamp)
+        if result is UNCACHED:
+            try:
+                result = self._call(self._ll.query_value, name)
+            except FileNotFoundError:
+                result = MISSING
+            cache.put(key, "v", fold_case(name), result, stamp)
+        return result
 
     def value_exists(self, name: str):
         try:
-            self._ll.query_value(self.winreg_handler, name)
-            return True
+            return self._cached_value(name) is not MISSING
         except OSError:
             return False
 
     def query_value(self, name: str) -> tuple[str, Any, int]:
-        return (name, *self._ll.query_value(self.winreg_handler, name))
+        result = self._cached_value(name)
+        if result is MISSING:
+            raise FileNotFoundError(2, "The system cannot find the file specified")
+        return (name, *result)
 
     def set_value(self, name: str, dtype: int, data: Any) -> None:
         try:
-            self._ll.set_value(self.winreg_handler, name, dtype, data)
+            self._call(self._ll.set_value, name, dtype, data)
+        except ValueCodecError as exc:
+            raise OperationError(
+                OperationErrorKind.ON_UPDATE,
+                OperationDataErrorKind.VALUE,
+                f"invalid data for value {name!r}",
+                exc,
+            ) from exc
         except OSError as exc:
             if self.value_exists(name):
                 kind = OperationErrorKind.ON_UPDATE
@@ -175,10 +380,11 @@ class WindowsRegistryHandler:
                 f"fail to create/update value {name!r}",
                 exc,
             ) from exc
+        self._invalidate()
 
     def delete_value(self, name: str) -> None:
         try:
-            self._ll.delete_value(self._winreg_handler, name)
+            self._call(self._ll.delete_value, name)
         except OSError as exc:
             raise OperationError(
                 OperationErrorKind.ON_DELETE,
@@ -186,3 +392,4 @@ class WindowsRegistryHandler:
                 f"fail to delete value {name!r}",
                 exc,
             ) from exc
+        self._invalidate()
@@ -24,52 +24,183 @@
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any
+import weakref
+from typing import TYPE_CHECKING, Any, Optional
 
+from . import codec, instrument
+from .backends import RegistryBackend, get_default_backend
 from .models import RegistryPermissionConfig
 from .utils import get_permission_int
 
 if TYPE_CHECKING:
     from winreg import _KeyType as _RegistryHandlerType
 
-try:
-    import winreg
-except ImportError as exc:
-    raise RuntimeError("not running on windows") from exc
-
 
 class lowlevel:
-    def __init__(self, *, permconf: RegistryPermissionConfig) -> None:
+    __slots__ = ("_permconf", "_access", "_backend")
+
+    def __init__(
+        self,
+        *,
+        permconf: RegistryPermissionConfig,
+        backend: Optional[RegistryBackend] = None,
+    ) -> None:
         self._permconf = permconf
         self._access = get_permission_int(self._permconf)
+        self._backend = backend if backend is not None else get_default_backend()
+
+    @property
+    def backend(self) -> RegistryBackend:
+        return self._backend
+
+    # Every backend call checks `instrument.enabled` first; see instrument.py.
 
     def open_subkey(self, handler: _RegistryHandlerType, path: str):
-        return winreg.OpenKeyEx(handler, path, access=self._access)
+        if instrument.enabled:
+            return instrument.observe(
+                "OpenKeyEx",
+                handler,
+                path,
+                self._backend.OpenKeyEx,
+                handler,
+                path,
+                0,
+                self._access,
+            )
+        return self._backend.OpenKeyEx(handler, path, 0, self._access)
+
+    def close_subkey(self, handler: _RegistryHandlerType) -> None:
+        if instrument.enabled:
+            instrument.forget(handler)
+        self._backend.CloseKey(handler)
 
     def query_subkey(self, handler: _RegistryHandlerType) -> tuple[int, int, int]:
-        return winreg.QueryInfoKey(handler)
+        if instrument.enabled:
+            return instrument.observe(
+                "QueryInfoKey", handler, None, self._backend.QueryInfoKey, handler
+            )
+        return self._backend.QueryInfoKey(handler)
 
     def subkey_from_index(self, handler: _RegistryHandlerType, index: int) -> str:
-        return winreg.EnumKey(handler, index)
+        if instrument.enabled:
+            return instrument.observe(
+                "EnumKey", handler, None, self._backend.EnumKey, handler, index
+            )
+        return self._backend.EnumKey(handler, index)
 
     def create_subkey(self, handler: _RegistryHandlerType, subkey: str):
-        winreg.CreateKeyEx(handler, subkey, access=self._access)
+        if instrument.enabled:
+            return instrument.observe(
+                "CreateKeyEx",
+                handler,
+                subkey,
+                self._backend.CreateKeyEx,
+                handler,
+                subkey,
+                0,
+                self._access,
+            )
+        return self._backend.CreateKeyEx(handler, subkey, 0, self._access)
 
     def delete_subkey(self, handler: _RegistryHandlerType, subkey: str):
-        winreg.DeleteKeyEx(handler, subkey, access=self._access)
+        if instrument.enabled:
+            instrument.observe(
+                "DeleteKeyEx",
+                handler,
+                subkey,
+                self._backend.DeleteKeyEx,
+                handler,
+                subkey,
+                self._access,
+                0,
+            )
+            return
+        self._backend.DeleteKeyEx(handler, subkey, self._access, 0)
+
+    def delete_tree(self, handler: _RegistryHandlerType, subkey: str) -> int:
+        child = self.open_subkey(handler, subkey)
+        deleted = 0
+        try:
+            total = self.query_subkey(child)[0]
+            names = [self.subkey_from_index(child, i) for i in range(total)]
+            for name in names:
+                deleted += self.delete_tree(child, name)
+        finally:
+            self.close_subkey(child)
+        self.delete_subkey(handler, subkey)
+        return deleted + 1
 
     def query_value(self, handler: _RegistryHandlerType, name: str):
-        return winreg.QueryValueEx(handler, name)
+        if instrument.enabled:
+            return instrument.observe(
+                "QueryValueEx", handler, None, self._backend.QueryValueEx, handler, name
+            )
+        return self._backend.QueryValueEx(handler, name)
 
     def set_value(
-        self, handler: _RegistryHandlerType, name: str, dtype: int, data: Any
+        self,
+        handler: _RegistryHandlerType,
+        name: str,
+        dtype: int,
+        data: Any,
+        *,
+        encoded: bool = False,
     ):
-        winreg.SetValueEx(handler, name, 0, dtype, data)
+        # Checked and converted here so that nothing reaches SetValueEx that
+        # the type cannot hold; raises ValueCodecError. Callers that already
+        # ran the data through codec.encode pass encoded=True.
+        if not encoded:
+            data = codec.encode(dtype, data)
+        if instrument.enabled:
+            instrument.observe(
+                "SetValueEx",
+                handler,
+                None,
+                self._backend.SetValueEx,
+                handler,
+                name,
+                0,
+                dtype,
+                data,
+            )
+            return
+        self._backend.SetValueEx(handler, name, 0, dtype, data)
 
     def delete_value(self, handler: _RegistryHandlerType, name: str):
-        winreg.DeleteValue(handler, name)
+        if instrument.enabled:
+            instrument.observe(
+                "DeleteValue", handler, None, self._backend.DeleteValue, handler, name
+            )
+            return
+        self._backend.DeleteValue(handler, name)
 
     def value_from_index(
         self, handler: _RegistryHandlerType, index: int
     ) -> tuple[str, Any, int]:
-        return winreg.EnumValue(handler, index)
+        if instrument.enabled:
+            return instrument.observe(
+                "EnumValue", handler, None, self._backend.EnumValue, handler, index
+            )
+        return self._backend.EnumValue(handler, index)
+
+
+_shared: "weakref.WeakKeyDictionary[Any, dict[RegistryPermissionConfig, lowlevel]]"
+_shared = weakref.WeakKeyDictionary()
+
+
+def get_lowlevel(
+    permconf: RegistryPermissionConfig, backend: Optional[RegistryBackend] = None
+) -> lowlevel:
+    # lowlevel is immutable, so one instance per (backend, permconf) is shared
+    # by every handler instead of being rebuilt per key.
+    backend = backend if backend is not None else get_default_backend()
+    try:
+        per_backend = _shared.get(backend)
+        if per_backend is None:
+            per_backend = _shared.setdefault(backend, {})
+    except TypeError:
+        return lowlevel(permconf=permconf, backend=backend)
+    ll = per_backend.get(permconf)
+    if ll is None:
+        ll = per_backend.setdefault(permconf, lowlevel(permconf=permconf, backend=backend))
+    return ll
@@ -0,0 +1,158 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+from typing import Any, Callable, Iterator, Optional
+
+from ._lowlevel import lowlevel
+from .errors import (
+    OperationDataErrorKind,
+    OperationError,
+    OperationErrorKind,
+    WindowsRegistryError,
+)
+from .regpath import RegistryPathString
+
+ErrorHandler = Callable[[WindowsRegistryError], None]
+Opener = Callable[["KeyFrame", str, Any], "tuple[Any, Any]"]
+
+
+class KeyFrame:
+    __slots__ = (
+        "handle",
+        "regpath",
+        "depth",
+        "parent",
+        "data",
+        "leaving",
+        "_children",
+        "_pending",
+        "_owned",
+    )
+
+    def __init__(  # noqa: PLR0913, PLR0917
+        self,
+        handle: Any,
+        regpath: RegistryPathString,
+        depth: int,
+        parent: Optional[KeyFrame],
+        data: Any,
+        owned: bool,
+    ) -> None:
+        self.handle = handle
+        self.regpath = regpath
+        self.depth = depth
+        self.parent = parent
+        self.data = data
+        self.leaving = False
+        self._children: list[tuple[str, Any]] = []
+        self._pending: Iterator[tuple[str, Any]] = iter(())
+        self._owned = owned
+
+    def descend(self, name: str, data: Any = None) -> None:
+        self._children.append((name, data))
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}: {self.regpath.fullpath!r}>"
+
+
+def report_open_error(
+    regpath: RegistryPathString,
+    exc: OSError,
+    onerror: Optional[ErrorHandler],
+    *,
+    action: str = "open",
+) -> None:
+    error = OperationError(
+        OperationErrorKind.ON_READ,
+        OperationDataErrorKind.SUBKEY,
+        f"fail to {action} {regpath.fullpath!r}",
+        exc,
+    )
+    if onerror is None:
+        raise error from exc
+    onerror(error)
+
+
+def walk_keys(  # noqa: PLR0913
+    ll: lowlevel,
+    handle: Any,
+    regpath: RegistryPathString,
+    *,
+    depth: int = 0,
+    data: Any = None,
+    owned: bool = False,
+    leave: bool = False,
+    opener: Optional[Opener] = None,
+    onerror: Optional[ErrorHandler] = None,
+) -> Iterator[KeyFrame]:
+    # Depth-first walk that opens a subkey only when it is reached, so no
+    # more than one handle per level is open at any time. Each frame is
+    # yielded on entry; the caller picks the children to visit, in order, with
+    # frame.descend(). With `leave`, a frame is yielded again (frame.leaving)
+    # once everything below it is done. A child that fails to open goes to
+    # `onerror` and is skipped, or raises when there is no handler. A custom
+    # `opener` returns (handle, data) for the child and deals with its own
+    # failures; a None handle skips the child.
+    root = KeyFrame(handle, regpath, depth, None, data, owned)
+    stack = [root]
+    try:
+        yield root
+        root._pending = iter(root._children)
+        while stack:
+            parent = stack[-1]
+            item = next(parent._pending, None)
+            if item is None:
+                stack.pop()
+                try:
+                    if leave:
+                        parent.leaving = True
+                        yield parent
+                finally:
+                    if parent._owned:
+                        ll.close_subkey(parent.handle)
+                continue
+            name, child_data = item
+            child_path = parent.regpath._child(name)
+            if opener is not None:
+                child, child_data = opener(parent, name, child_data)
+                if child is None:
+                    continue
+            else:
+                try:
+                    child = ll.open_subkey(parent.handle, name)
+                except OSError as exc:
+                    report_open_error(child_path, exc, onerror)
+                    continue
+            frame = KeyFrame(
+                child, child_path, parent.depth + 1, parent, child_data, True
+            )
+            stack.append(frame)
+            yield frame
+            frame._pending = iter(frame._children)
+    finally:
+        for frame in stack:
+            if frame._owned:
+                ll.close_subkey(frame.handle)
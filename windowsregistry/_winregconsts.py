@@ -0,0 +1,80 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Mirror of the constants exported by the standard library `winreg` module,
+# used on platforms where `winreg` is unavailable.
+
+HKEY_CLASSES_ROOT = 0x80000000
+HKEY_CURRENT_USER = 0x80000001
+HKEY_LOCAL_MACHINE = 0x80000002
+HKEY_USERS = 0x80000003
+HKEY_PERFORMANCE_DATA = 0x80000004
+HKEY_CURRENT_CONFIG = 0x80000005
+HKEY_DYN_DATA = 0x80000006
+
+KEY_QUERY_VALUE = 0x0001
+KEY_SET_VALUE = 0x0002
+KEY_CREATE_SUB_KEY = 0x0004
+KEY_ENUMERATE_SUB_KEYS = 0x0008
+KEY_NOTIFY = 0x0010
+KEY_CREATE_LINK = 0x0020
+KEY_WOW64_64KEY = 0x0100
+KEY_WOW64_32KEY = 0x0200
+KEY_READ = 0x20019
+KEY_WRITE = 0x20006
+KEY_EXECUTE = 0x20019
+KEY_ALL_ACCESS = 0xF003F
+
+REG_NONE = 0
+REG_SZ = 1
+REG_EXPAND_SZ = 2
+REG_BINARY = 3
+REG_DWORD = 4
+REG_DWORD_LITTLE_ENDIAN = 4
+REG_DWORD_BIG_ENDIAN = 5
+REG_LINK = 6
+REG_MULTI_SZ = 7
+REG_RESOURCE_LIST = 8
+REG_FULL_RESOURCE_DESCRIPTOR = 9
+REG_RESOURCE_REQUIREMENTS_LIST = 10
+REG_QWORD = 11
+REG_QWORD_LITTLE_ENDIAN = 11
+
+REG_CREATED_NEW_KEY = 1
+REG_LEGAL_CHANGE_FILTER = 0x1000000F
+REG_LEGAL_OPTION = 31
+REG_NOTIFY_CHANGE_ATTRIBUTES = 2
+REG_NOTIFY_CHANGE_LAST_SET = 4
+REG_NOTIFY_CHANGE_NAME = 1
+REG_NOTIFY_CHANGE_SECURITY = 8
+REG_NO_LAZY_FLUSH = 4
+REG_OPENED_EXISTING_KEY = 2
+REG_OPTION_BACKUP_RESTORE = 4
+REG_OPTION_CREATE_LINK = 2
+REG_OPTION_NON_VOLATILE = 0
+REG_OPTION_OPEN_LINK = 8
+REG_OPTION_RESERVED = 0
+REG_OPTION_VOLATILE = 1
+REG_REFRESH_HIVE = 2
+REG_WHOLE_HIVE_VOLATILE = 1
@@ -0,0 +1,427 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import itertools
+import types
+import weakref
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Callable,
+    Iterable,
+    Iterator,
+    Optional,
+    Sequence,
+    TypeVar,
+)
+
+from ._typings import RegistryKeyPermissionTypeArgs
+from .backends import RegistryBackend
+from .core import RegistryPath
+from .errors import WindowsRegistryError
+from .models import (
+    RegistryHKEYEnum,
+    RegistryInfoKey,
+    RegistryKeyPermissionType,
+    RegistrySize,
+    RegistryValue,
+    RegistryValueType,
+)
+from .parallel import default_workers
+from .regpath import RegistryPathString
+
+if TYPE_CHECKING:
+    from .sizeof import SizeCache
+
+T = TypeVar("T")
+
+_Call = tuple[
+    contextvars.Context, Callable[..., Any], tuple[Any, ...], "asyncio.Future[Any]"
+]
+
+
+def _run_batch(
+    calls: list[tuple[contextvars.Context, Callable[..., Any], tuple[Any, ...]]]
+):
+    # Each call runs in the context it was made from, so `use_backend()`,
+    # `instrument.profile()` and friends apply as they would synchronously.
+    results: list[tuple[bool, Any]] = []
+    for ctx, fn, args in calls:
+        try:
+            results.append((True, ctx.run(fn, *args)))
+        except Exception as exc:  # noqa: BLE001
+            results.append((False, exc))
+    return results
+
+
+def _target(fn: Callable[..., Any], args: tuple[Any, ...]) -> int:
+    # The object a call works on: the instance of a bound method, otherwise
+    # the first argument (the key, for the module-level helpers below).
+    target = getattr(fn, "__self__", None)
+    if target is None or isinstance(target, types.ModuleType):
+        target = args[0] if args else fn
+    return id(target)
+
+
+def _take(iterator: Iterator[T], count: int) -> list[T]:
+    return list(itertools.islice(iterator, count))
+
+
+class _LoopState:
+    def __init__(self, limit: int) -> None:
+        self.pending: list[_Call] = []
+        self.scheduled = False
+        self.semaphore = asyncio.Semaphore(limit)
+        self.tasks: set[asyncio.Task[None]] = set()
+
+
+class AsyncRunner:
+    # Calls made while the event loop is busy are queued and flushed on the
+    # next loop iteration. Calls on the same object (see `_target`) share one
+    # executor hop; calls on different objects go out as separate batches and
+    # run concurrently, so a slow key never delays unrelated ones. `limit` caps
+    # the number of batches in the executor at once for each event loop.
+
+    def __init__(
+        self,
+        executor: Optional[Executor] = None,
+        *,
+        limit: Optional[int] = None,
+        max_batch: int = 64,
+    ) -> None:
+        self._limit = max(1, limit if limit is not None else default_workers())
+        self._max_batch = max(1, max_batch)
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._states: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, _LoopState
+        ] = weakref.WeakKeyDictionary()
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._limit, thread_name_prefix="windowsregistry-aio"
+            )
+        return self._executor
+
+    def _state(self, loop: asyncio.AbstractEventLoop) -> _LoopState:
+        state = self._states.get(loop)
+        if state is None:
+            state = self._states[loop] = _LoopState(self._limit)
+        return state
+
+    def run(self, fn: Callable[..., T], *args: Any) -> "asyncio.Future[T]":
+        loop = asyncio.get_running_loop()
+        state = self._state(loop)
+        future: asyncio.Future[T] = loop.create_future()
+        state.pending.append((contextvars.copy_context(), fn, args, future))
+        if not state.scheduled:
+            state.scheduled = True
+            loop.call_soon(self._schedule, loop, state)
+        return future
+
+    def _schedule(self, loop: asyncio.AbstractEventLoop, state: _LoopState) -> None:
+        state.scheduled = False
+        groups: dict[int, list[_Call]] = {}
+        for call in state.pending:
+            if not call[3].done():
+                groups.setdefault(_target(call[1], call[2]), []).append(call)
+        state.pending.clear()
+        for group in groups.values():
+            for start in range(0, len(group), self._max_batch):
+                task = loop.create_task(
+                    self._submit(loop, state, group[start : start + self._max_batch])
+                )
+                state.tasks.add(task)
+                task.add_done_callback(state.tasks.discard)
+
+    async def _submit(
+        self, loop: asyncio.AbstractEventLoop, state: _LoopState, batch: list[_Call]
+    ) -> None:
+        try:
+            async with state.semaphore:
+                batch = [call for call in batch if not call[3].done()]
+                if not batch:
+                    return
+                results = await loop.run_in_executor(
+                    self.executor,
+                    _run_batch,
+                    [(ctx, fn, args) for ctx, fn, args, _ in batch],
+                )
+        except BaseException as exc:
+            for _, _, _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            if not isinstance(exc, Exception):
+                raise
+            return
+        for (_, _, _, future), (ok, value) in zip(batch, results, strict=True):
+            if future.done():
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    async def iterate(
+        self, iterator: Iterator[T], batch_size: int
+    ) -> AsyncIterator[T]:
+        batch_size = max(1, batch_size)
+        while True:
+            chunk = await self.run(_take, iterator, batch_size)
+            for item in chunk:
+                yield item
+            if len(chunk) < batch_size:
+                return
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+_default_runner: Optional[AsyncRunner] = None
+
+
+def get_default_runner() -> AsyncRunner:
+    global _default_runner
+    if _default_runner is None:
+        _default_runner = AsyncRunner()
+    return _default_runner
+
+
+def set_default_runner(runner: Optional[AsyncRunner]) -> None:
+    global _default_runner
+    _default_runner = runner
+
+
+def _scan(path: RegistryPath) -> tuple[tuple[RegistryPath, ...], tuple[RegistryValue, ...]]:
+    return tuple(path.subkeys()), tuple(path.values())
+
+
+def _get_values(path: RegistryPath, names: Sequence[str]) -> tuple[RegistryValue, ...]:
+    return tuple(path.get_value(name) for name in names)
+
+
+def _set_values(
+    path: RegistryPath,
+    items: Iterable[tuple[str, Any, RegistryValueType]],
+    overwrite: bool,
+) -> tuple[RegistryValue, ...]:
+    return tuple(
+        path.set_value(name, data, dtype=dtype, overwrite=overwrite)
+        for name, data, dtype in items
+    )
+
+
+class AsyncRegistryPath:
+    def __init__(
+        self, path: RegistryPath, *, runner: Optional[AsyncRunner] = None
+    ) -> None:
+        self._path = path
+        self._runner = runner if runner is not None else get_default_runner()
+
+    def _wrap(self, path: RegistryPath) -> "AsyncRegistryPath":
+        return self.__class__(path, runner=self._runner)
+
+    @property
+    def sync(self) -> RegistryPath:
+        return self._path
+
+    @property
+    def runner(self) -> AsyncRunner:
+        return self._runner
+
+    @property
+    def regpath(self) -> RegistryPathString:
+        return self._path.regpath
+
+    async def query_info(self) -> RegistryInfoKey:
+        return await self._runner.run(getattr, self._path, "query_info")
+
+    async def parent(self) -> "AsyncRegistryPath":
+        return self._wrap(await self._runner.run(getattr, self._path, "parent"))
+
+    async def open_subkey(
+        self,
+        *paths: str,
+        permission: Optional[RegistryKeyPermissionTypeArgs] = None,
+        wow64_32key_access: Optional[bool] = None,
+    ) -> "AsyncRegistryPath":
+        def opener() -> RegistryPath:
+            return self._path.open_subkey(
+                *paths, permission=permission, wow64_32key_access=wow64_32key_access
+            )
+
+        return self._wrap(await self._runner.run(opener))
+
+    async def subkeys(self, *, batch_size: int = 64) -> AsyncIterator["AsyncRegistryPath"]:
+        async for path in self._runner.iterate(self._path.subkeys(), batch_size):
+            yield self._wrap(path)
+
+    async def subkey_exists(self, subkey: str) -> bool:
+        return await self._runner.run(self._path.subkey_exists, subkey)
+
+    async def create_subkey(
+        self, subkey: str, *, exist_ok: bool = False
+    ) -> "AsyncRegistryPath":
+        def creator() -> RegistryPath:
+            return self._path.create_subkey(subkey, exist_ok=exist_ok)
+
+        return self._wrap(await self._runner.run(creator))
+
+    async def delete_subkey(self, subkey: str, *, recursive: bool = False) -> None:
+        def deleter() -> None:
+            self._path.delete_subkey(subkey, recursive=recursive)
+
+        await self._runner.run(deleter)
+
+    async def value_exists(self, name: str) -> bool:
+        return await self._runner.run(self._path.value_exists, name)
+
+    async def values(self, *, batch_size: int = 256) -> AsyncIterator[RegistryValue]:
+        async for value in self._runner.iterate(self._path.values(), batch_size):
+            yield value
+
+    async def typed_values(self) -> dict[str, Any]:
+        return await self._runner.run(self._path.typed_values)
+
+    async def get_value(self, key: str = "") -> RegistryValue:
+        return await self._runner.run(self._path.get_value, key)
+
+    async def get_values(self, *names: str) -> tuple[RegistryValue, ...]:
+        return await self._runner.run(_get_values, self._path, names)
+
+    async def set_value(
+        self, name: str, data: Any, *, dtype: RegistryValueType, overwrite: bool = False
+    ) -> RegistryValue:
+        (value,) = await self._runner.run(
+            _set_values, self._path, ((name, data, dtype),), overwrite
+        )
+        return value
+
+    async def set_values(
+        self,
+        items: Iterable[tuple[str, Any, RegistryValueType]],
+        *,
+        overwrite: bool = False,
+    ) -> tuple[RegistryValue, ...]:
+        return await self._runner.run(_set_values, self._path, tuple(items), overwrite)
+
+    async def delete_value(self, name: str) -> None:
+        await self._runner.run(self._path.delete_value, name)
+
+    async def traverse(
+        self,
+    ) -> AsyncIterator[
+        tuple[
+            "AsyncRegistryPath",
+            tuple["AsyncRegistryPath", ...],
+            tuple[RegistryValue, ...],
+        ]
+    ]:
+        # One executor hop per key: its subkeys are opened and its values read
+        # together, in the same breadth-first order as RegistryPath.traverse.
+        current = [self._path]
+        while current:
+            scans = await asyncio.gather(
+                *(self._runner.run(_scan, path) for path in current)
+            )
+            following: list[RegistryPath] = []
+            for path, (subkeys, values) in zip(current, scans, strict=True):
+                yield self._wrap(path), tuple(map(self._wrap, subkeys)), values
+                following.extend(subkeys)
+            current = following
+
+    async def sizeof(
+        self,
+        *,
+        max_depth: Optional[int] = None,
+        workers: Optional[int] = None,
+        data_bytes: bool = False,
+        cache: Optional["SizeCache"] = None,
+        onerror: Optional[Callable[[WindowsRegistryError], None]] = None,
+    ) -> RegistrySize:
+        return await self._runner.run(
+            partial(
+                self._path.sizeof,
+                max_depth=max_depth,
+                workers=workers,
+                data_bytes=data_bytes,
+                cache=cache,
+                onerror=onerror,
+            )
+        )
+
+    @property
+    def closed(self) -> bool:
+        return self._path.closed
+
+    def close(self) -> None:
+        self._path.close()
+
+    async def __aenter__(self) -> "AsyncRegistryPath":
+        return self
+
+    async def __aexit__(self, *args: object) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return (
+            f"<{self.__class__.__name__}: {self.regpath.fullpath} at {hex(id(self))}>"
+        )
+
+
+async def aopen_subkey(
+    *path: str,
+    root_key: Optional[RegistryHKEYEnum] = None,
+    permission: Optional[RegistryKeyPermissionType] = None,
+    wow64_32key_access: bool = False,
+    backend: Optional[RegistryBackend] = None,
+    runner: Optional[AsyncRunner] = None,
+) -> AsyncRegistryPath:
+    runner = runner if runner is not None else get_default_runner()
+
+    def opener() -> RegistryPath:
+        return RegistryPath(
+            root_key=root_key,
+            subkey=path,
+            permission=permission,
+            wow64_32key_access=wow64_32key_access,
+            backend=backend,
+        )
+
+    return AsyncRegistryPath(await runner.run(opener), runner=runner)
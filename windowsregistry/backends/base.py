@@ -0,0 +1,126 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Generator, Optional, Protocol
+
+from ..errors import BackendUnavailableError
+
+# Handles are opaque to the library: a predefined HKEY integer or whatever
+# object the backend returned from `OpenKeyEx`/`CreateKeyEx`.
+RegistryHandle = Any
+
+
+class RegistryBackend(Protocol):
+    def OpenKeyEx(
+        self, key: RegistryHandle, sub_key: str, reserved: int = 0, access: int = ...
+    ) -> RegistryHandle: ...
+
+    def CreateKeyEx(
+        self, key: RegistryHandle, sub_key: str, reserved: int = 0, access: int = ...
+    ) -> RegistryHandle: ...
+
+    def CloseKey(self, hkey: RegistryHandle) -> None: ...
+
+    def EnumKey(self, key: RegistryHandle, index: int) -> str: ...
+
+    def EnumValue(self, key: RegistryHandle, index: int) -> tuple[str, Any, int]: ...
+
+    def QueryInfoKey(self, key: RegistryHandle) -> tuple[int, int, int]: ...
+
+    def QueryValueEx(self, key: RegistryHandle, name: Optional[str]) -> tuple[Any, int]: ...
+
+    def SetValueEx(
+        self,
+        key: RegistryHandle,
+        value_name: Optional[str],
+        reserved: int,
+        type: int,
+        value: Any,
+    ) -> None: ...
+
+    def DeleteKeyEx(
+        self, key: RegistryHandle, sub_key: str, access: int = ..., reserved: int = 0
+    ) -> None: ...
+
+    def DeleteValue(self, key: RegistryHandle, value: Optional[str]) -> None: ...
+
+
+# "winreg" or "memory"; the in-memory backend is never picked implicitly,
+# since writes to it would silently vanish with the process.
+BACKEND_ENV = "WINDOWSREGISTRY_BACKEND"
+
+_default_backend: Optional[RegistryBackend] = None
+_current_backend: ContextVar[Optional[RegistryBackend]] = ContextVar(
+    "windowsregistry_backend", default=None
+)
+
+
+def _make_platform_backend() -> RegistryBackend:
+    choice = os.environ.get(BACKEND_ENV, "winreg").strip().lower() or "winreg"
+    if choice == "memory":
+        from .memory import MemoryBackend  # noqa: PLC0415
+
+        return MemoryBackend()
+    if choice != "winreg":
+        raise BackendUnavailableError(
+            f"unknown backend {choice!r} in {BACKEND_ENV} (expected winreg or memory)"
+        )
+    from .native import WinregBackend  # noqa: PLC0415
+
+    try:
+        return WinregBackend()
+    except RuntimeError as exc:
+        raise BackendUnavailableError(
+            "winreg is not available on this platform; pass a MemoryBackend "
+            f"explicitly or set {BACKEND_ENV}=memory"
+        ) from exc
+
+
+def get_default_backend() -> RegistryBackend:
+    global _default_backend
+    current = _current_backend.get()
+    if current is not None:
+        return current
+    if _default_backend is None:
+        _default_backend = _make_platform_backend()
+    return _default_backend
+
+
+def set_default_backend(backend: Optional[RegistryBackend]) -> None:
+    global _default_backend
+    _default_backend = backend
+
+
+@contextmanager
+def use_backend(backend: RegistryBackend) -> Generator[RegistryBackend, None, None]:
+    token = _current_backend.set(backend)
+    try:
+        yield backend
+    finally:
+        _current_backend.reset(token)
@@ -0,0 +1,383 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import errno
+import threading
+import time
+from typing import Any, Callable, Iterable, Optional, Sequence, Union, cast
+
+from ..models import (
+    RegistryAlternateViewType,
+    RegistryHKEYEnum,
+    RegistryKeyPermissionType,
+    RegistryValueType,
+)
+from ..regpath import fold_case
+
+WOW64_NODE = "WOW6432Node"
+FILETIME_UNIX_EPOCH = 116444736000000000
+
+_KEY_QUERY_VALUE = RegistryKeyPermissionType.KEY_QUERY_VALUE.value
+_KEY_SET_VALUE = RegistryKeyPermissionType.KEY_SET_VALUE.value
+_KEY_CREATE_SUB_KEY = RegistryKeyPermissionType.KEY_CREATE_SUB_KEY.value
+_KEY_ENUMERATE_SUB_KEYS = RegistryKeyPermissionType.KEY_ENUMERATE_SUB_KEYS.value
+_KEY_WOW64_32KEY = RegistryAlternateViewType.KEY_WOW64_32KEY.value
+
+_REG_SZ = RegistryValueType.REG_SZ.value
+_REG_EXPAND_SZ = RegistryValueType.REG_EXPAND_SZ.value
+_REG_MULTI_SZ = RegistryValueType.REG_MULTI_SZ.value
+_REG_DWORD = RegistryValueType.REG_DWORD.value
+_REG_QWORD = RegistryValueType.REG_QWORD.value
+
+
+def filetime_now() -> int:
+    return time.time_ns() // 100 + FILETIME_UNIX_EPOCH
+
+
+def _oserror(cls: type[OSError], err: int, winerror: int, message: str) -> OSError:
+    exc = cls(err, message)
+    exc.winerror = winerror  # type: ignore[attr-defined]
+    return exc
+
+
+def _not_found() -> OSError:
+    return _oserror(
+        FileNotFoundError, errno.ENOENT, 2, "The system cannot find the file specified"
+    )
+
+
+def _access_denied() -> OSError:
+    return _oserror(PermissionError, errno.EACCES, 5, "Access is denied")
+
+
+def _invalid_handle() -> OSError:
+    return _oserror(OSError, errno.EBADF, 6, "The handle is invalid")
+
+
+def _no_more_data() -> OSError:
+    return _oserror(OSError, errno.ENODATA, 259, "No more data is available")
+
+
+def _key_deleted() -> OSError:
+    return _oserror(
+        OSError,
+        errno.ENOENT,
+        1018,
+        "Illegal operation attempted on a registry key that has been marked for deletion",
+    )
+
+
+def _split(sub_key: Optional[str]) -> list[str]:
+    if not sub_key:
+        return []
+    return [part for part in sub_key.split("\\") if part]
+
+
+def _coerce(dtype: int, value: Any) -> Any:  # noqa: PLR0911
+    bad = ValueError("Could not convert the data to the specified type.")
+    if dtype in (_REG_DWORD, _REG_QWORD):
+        if value is None:
+            return 0
+        limit = 0xFFFFFFFF if dtype == _REG_DWORD else 0xFFFFFFFFFFFFFFFF
+        if not isinstance(value, int) or not 0 <= value <= limit:
+            raise bad
+        return int(value)
+    if dtype in (_REG_SZ, _REG_EXPAND_SZ):
+        if value is None:
+            return ""
+        if not isinstance(value, str):
+            raise bad
+        return value
+    if dtype == _REG_MULTI_SZ:
+        if value is None:
+            return ()
+        if not isinstance(value, (list, tuple)):
+            raise bad
+        items = cast("Sequence[object]", value)
+        if not all(isinstance(item, str) for item in items):
+            raise bad
+        return tuple(items)
+    if value is None:
+        return b""
+    try:
+        return bytes(memoryview(value))
+    except TypeError:
+        raise bad from None
+
+
+def _export(dtype: int, data: Any) -> Any:
+    if dtype == _REG_MULTI_SZ:
+        return list(data)
+    if isinstance(data, bytes) and not data:
+        return None
+    return data
+
+
+class MemoryKey:
+    __slots__ = (
+        "name",
+        "subkeys",
+        "values",
+        "last_modified",
+        "redirected",
+        "deleted",
+        "_subkey_order",
+        "_value_order",
+    )
+
+    def __init__(self, name: str, last_modified: int) -> None:
+        self.name = name
+        self.subkeys: dict[str, MemoryKey] = {}
+        self.values: dict[str, tuple[str, Any, int]] = {}
+        self.last_modified = last_modified
+        self.redirected = False
+        self.deleted = False
+        self._subkey_order: Optional[list[MemoryKey]] = None
+        self._value_order: Optional[list[tuple[str, Any, int]]] = None
+
+    def subkey_order(self) -> list[MemoryKey]:
+        if self._subkey_order is None:
+            self._subkey_order = [self.subkeys[k] for k in sorted(self.subkeys)]
+        return self._subkey_order
+
+    def value_order(self) -> list[tuple[str, Any, int]]:
+        if self._value_order is None:
+            self._value_order = list(self.values.values())
+        return self._value_order
+
+    def __repr__(self) -> str:
+        return (
+            f"<{self.__class__.__name__}: {self.name!r} "
+            f"({len(self.subkeys)} subkeys, {len(self.values)} values)>"
+        )
+
+
+class MemoryKeyHandle:
+    __slots__ = ("_key", "_access", "_closed")
+
+    def __init__(self, key: MemoryKey, access: int) -> None:
+        self._key = key
+        self._access = access
+        self._closed = False
+
+    @property
+    def handle(self) -> int:
+        return 0 if self._closed else id(self)
+
+    def Close(self) -> None:
+        self._closed = True
+
+    def Detach(self) -> int:
+        handle = self.handle
+        self._closed = True
+        return handle
+
+    def __bool__(self) -> bool:
+        return not self._closed
+
+    def __enter__(self) -> "MemoryKeyHandle":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.Close()
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}: {self._key.name!r} at {hex(id(self))}>"
+
+
+class MemoryBackend:
+    def __init__(
+        self,
+        *,
+        clock: Callable[[], int] = filetime_now,
+        wow64_redirected: Iterable[tuple[RegistryHKEYEnum, str]] = (
+            (RegistryHKEYEnum.HKEY_LOCAL_MACHINE, "SOFTWARE"),
+        ),
+    ) -> None:
+        self._lock = threading.RLock()
+        self._clock = clock
+        now = clock()
+        self._roots = {hk.value: MemoryKey(hk.name, now) for hk in RegistryHKEYEnum}
+        for hkey, path in wow64_redirected:
+            node = self._walk(self._roots[hkey.value], _split(path), False, True)
+            node.redirected = True
+            self._child(node, WOW64_NODE, True)
+
+    def root(self, hkey: Union[RegistryHKEYEnum, int]) -> MemoryKey:
+        if isinstance(hkey, RegistryHKEYEnum):
+            hkey = hkey.value
+        return self._roots[hkey]
+
+    def _node(self, key: Any, required: int = 0) -> MemoryKey:
+        if isinstance(key, MemoryKeyHandle):
+            if key._closed:
+                raise _invalid_handle()
+            if key._key.deleted:
+                raise _key_deleted()
+            if required and not key._access & required:
+                raise _access_denied()
+            return key._key
+        try:
+            return self._roots[key]
+        except (KeyError, TypeError):
+            raise _invalid_handle() from None
+
+    def _touch(self, node: MemoryKey) -> None:
+        node.last_modified = self._clock()
+
+    def _child(self, node: MemoryKey, name: str, create: bool) -> MemoryKey:
+        child = node.subkeys.get(fold_case(name))
+        if child is None:
+            if not create:
+                raise _not_found()
+            child = MemoryKey(name, self._clock())
+            node.subkeys[fold_case(name)] = child
+            node._subkey_order = None
+            self._touch(node)
+        return child
+
+    def _walk(
+        self, node: MemoryKey, parts: Sequence[str], wow32: bool, create: bool
+    ) -> MemoryKey:
+        for part in parts:
+            if wow32 and node.redirected:
+                node = self._child(node, WOW64_NODE, create)
+            node = self._child(node, part, create)
+        if wow32 and node.redirected:
+            node = self._child(node, WOW64_NODE, create)
+        return node
+
+    def OpenKeyEx(
+        self,
+        key: Any,
+        sub_key: str,
+        reserved: int = 0,  # noqa: ARG002
+        access: int = RegistryKeyPermissionType.KEY_READ.value,
+    ) -> MemoryKeyHandle:
+        with self._lock:
+            node = self._walk(
+                self._node(key), _split(sub_key), bool(access & _KEY_WOW64_32KEY), False
+            )
+            return MemoryKeyHandle(node, access)
+
+    def CreateKeyEx(
+        self,
+        key: Any,
+        sub_key: str,
+        reserved: int = 0,  # noqa: ARG002
+        access: int = RegistryKeyPermissionType.KEY_WRITE.value,
+    ) -> MemoryKeyHandle:
+        with self._lock:
+            node = self._walk(
+                self._node(key, _KEY_CREATE_SUB_KEY),
+                _split(sub_key),
+                bool(access & _KEY_WOW64_32KEY),
+                True,
+            )
+            return MemoryKeyHandle(node, access)
+
+    def CloseKey(self, hkey: Any) -> None:
+        if isinstance(hkey, MemoryKeyHandle):
+            hkey.Close()
+
+    def EnumKey(self, key: Any, index: int) -> str:
+        with self._lock:
+            order = self._node(key, _KEY_ENUMERATE_SUB_KEYS).subkey_order()
+            if not 0 <= index < len(order):
+                raise _no_more_data()
+            return order[index].name
+
+    def EnumValue(self, key: Any, index: int) -> tuple[str, Any, int]:
+        with self._lock:
+            order = self._node(key, _KEY_QUERY_VALUE).value_order()
+            if not 0 <= index < len(order):
+                raise _no_more_data()
+            name, data, dtype = order[index]
+            return name, _export(dtype, data), dtype
+
+    def QueryInfoKey(self, key: Any) -> tuple[int, int, int]:
+        with self._lock:
+            node = self._node(key, _KEY_QUERY_VALUE)
+            return len(node.subkeys), len(node.values), node.last_modified
+
+    def QueryValueEx(self, key: Any, name: Optional[str]) -> tuple[Any, int]:
+        with self._lock:
+            node = self._node(key, _KEY_QUERY_VALUE)
+            try:
+                _, data, dtype = node.values[fold_case(name or "")]
+            except KeyError:
+                raise _not_found() from None
+            return _export(dtype, data), dtype
+
+    def SetValueEx(
+        self,
+        key: Any,
+        value_name: Optional[str],
+        reserved: int,  # noqa: ARG002
+        type: int,
+        value: Any,
+    ) -> None:
+        data = _coerce(type, value)
+        with self._lock:
+            node = self._node(key, _KEY_SET_VALUE)
+            name = value_name or ""
+            node.values[fold_case(name)] = (name, data, type)
+            node._value_order = None
+            self._touch(node)
+
+    def DeleteKeyEx(
+        self,
+        key: Any,
+        sub_key: str,
+        access: int = RegistryAlternateViewType.KEY_WOW64_64KEY.value,
+        reserved: int = 0,  # noqa: ARG002
+    ) -> None:
+        parts = _split(sub_key)
+        if not parts:
+            raise _access_denied()
+        with self._lock:
+            wow32 = bool(access & _KEY_WOW64_32KEY)
+            parent = self._walk(self._node(key), parts[:-1], wow32, False)
+            child = self._child(parent, parts[-1], False)
+            if child.subkeys:
+                raise _access_denied()
+            del parent.subkeys[fold_case(parts[-1])]
+            parent._subkey_order = None
+            child.deleted = True
+            self._touch(parent)
+
+    def DeleteValue(self, key: Any, value: Optional[str]) -> None:
+        with self._lock:
+            node = self._node(key, _KEY_SET_VALUE)
+            try:
+                del node.values[fold_case(value or "")]
+            except KeyError:
+                raise _not_found() from None
+            node._value_order = None
+            self._touch(node)
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} at {hex(id(self))}>"
@@ -0,0 +1,96 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Optional
+
+from .base import RegistryHandle
+
+_FUNCTIONS = (
+    "OpenKeyEx",
+    "CreateKeyEx",
+    "CloseKey",
+    "EnumKey",
+    "EnumValue",
+    "QueryInfoKey",
+    "QueryValueEx",
+    "SetValueEx",
+    "DeleteKeyEx",
+    "DeleteValue",
+)
+
+
+class WinregBackend:
+    # The winreg functions are bound straight onto the instance, so a call
+    # costs no wrapper frame. Their typeshed signatures are positional-only
+    # and narrower than RegistryBackend, hence the declarations below.
+    if TYPE_CHECKING:
+
+        def OpenKeyEx(
+            self, key: RegistryHandle, sub_key: str, reserved: int = 0, access: int = ...
+        ) -> RegistryHandle: ...
+
+        def CreateKeyEx(
+            self, key: RegistryHandle, sub_key: str, reserved: int = 0, access: int = ...
+        ) -> RegistryHandle: ...
+
+        def CloseKey(self, hkey: RegistryHandle) -> None: ...
+
+        def EnumKey(self, key: RegistryHandle, index: int) -> str: ...
+
+        def EnumValue(self, key: RegistryHandle, index: int) -> tuple[str, Any, int]: ...
+
+        def QueryInfoKey(self, key: RegistryHandle) -> tuple[int, int, int]: ...
+
+        def QueryValueEx(
+            self, key: RegistryHandle, name: Optional[str]
+        ) -> tuple[Any, int]: ...
+
+        def SetValueEx(
+            self,
+            key: RegistryHandle,
+            value_name: Optional[str],
+            reserved: int,
+            type: int,
+            value: Any,
+        ) -> None: ...
+
+        def DeleteKeyEx(
+            self, key: RegistryHandle, sub_key: str, access: int = ..., reserved: int = 0
+        ) -> None: ...
+
+        def DeleteValue(self, key: RegistryHandle, value: Optional[str]) -> None: ...
+
+    def __init__(self) -> None:
+        try:
+            import winreg  # noqa: PLC0415
+        except ImportError as exc:
+            raise RuntimeError("not running on windows") from exc
+
+        for name in _FUNCTIONS:
+            setattr(self, name, getattr(winreg, name))
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}>"
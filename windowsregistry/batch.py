@@ -0,0 +1,485 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import contextlib
+from enum import Enum, auto
+from typing import Any, NamedTuple, Optional, Union
+
+from ._lowlevel import lowlevel
+from .backends import RegistryBackend
+from .codec import encode
+from .core import RegistryPath
+from .errors import (
+    BatchRollbackError,
+    OperationDataErrorKind,
+    OperationError,
+    OperationErrorKind,
+)
+from .handlepool import get_handle_pool
+from .models import (
+    RegistryKeyPermissionType,
+    RegistryPermissionConfig,
+    RegistryValueType,
+)
+from .regpath import REGISTRY_SEP, RegistryPathString, fold_case
+from .valuecache import invalidate_caches
+
+BatchKey = Union[str, RegistryPathString, RegistryPath]
+
+
+class BatchAction(Enum):
+    CREATE_KEY = auto()
+    DELETE_KEY = auto()
+    SET_VALUE = auto()
+    DELETE_VALUE = auto()
+
+
+class KeyImage(NamedTuple):
+    name: str
+    values: tuple[tuple[str, Any, int], ...]
+    subkeys: tuple["KeyImage", ...]
+
+
+class JournalEntry(NamedTuple):
+    action: BatchAction
+    regpath: RegistryPathString
+    name: Optional[str]
+    # SET_VALUE/DELETE_VALUE: the previous (data, dtype), or None if absent.
+    # CREATE_KEY: the topmost key that did not exist before.
+    # DELETE_KEY: a KeyImage of the deleted subtree.
+    before: Any
+
+
+class BatchStats(NamedTuple):
+    total_keys: int
+    created_keys: int
+    deleted_keys: int
+    set_values: int
+    deleted_values: int
+
+
+class _ValueOp(NamedTuple):
+    name: str
+    data: Any
+    dtype: int
+    delete: bool
+    missing_ok: bool
+
+
+class _KeyOps:
+    __slots__ = ("regpath", "delete", "create", "values")
+
+    def __init__(self, regpath: RegistryPathString) -> None:
+        self.regpath = regpath
+        # (recursive, missing_ok) when the key is deleted before anything else
+        self.delete: Optional[tuple[bool, bool]] = None
+        self.create = False
+        self.values: dict[str, _ValueOp] = {}
+
+
+def _resolve(key: BatchKey) -> RegistryPathString:
+    if isinstance(key, RegistryPath):
+        return key.regpath
+    if isinstance(key, RegistryPathString):
+        return key
+    return RegistryPathString(key)
+
+
+def _group_key(regpath: RegistryPathString) -> tuple[int, str]:
+    return regpath.root_key.value, fold_case(regpath.path)
+
+
+class RegistryBatch:
+    def __init__(
+        self,
+        *,
+        backend: Optional[RegistryBackend] = None,
+        wow64_32key_access: bool = False,
+        journal: bool = True,
+    ) -> None:
+        self._ll = lowlevel(
+            permconf=RegistryPermissionConfig(
+                permissions=(RegistryKeyPermissionType.KEY_ALL_ACCESS,),
+                wow64_32key_access=wow64_32key_access,
+            ),
+            backend=backend,
+        )
+        self._use_journal = journal
+        self._groups: dict[tuple[int, str], _KeyOps] = {}
+        self._journal: list[JournalEntry] = []
+
+    def _group(self, key: BatchKey) -> _KeyOps:
+        regpath = _resolve(key)
+        gk = _group_key(regpath)
+        group = self._groups.get(gk)
+        if group is None:
+            group = self._groups[gk] = _KeyOps(regpath)
+        return group
+
+    @property
+    def journal(self) -> tuple[JournalEntry, ...]:
+        return tuple(self._journal)
+
+    def create_key(self, key: BatchKey) -> "RegistryBatch":
+        self._group(key).create = True
+        return self
+
+    def set_value(
+        self, key: BatchKey, name: str, data: Any, *, dtype: RegistryValueType
+    ) -> "RegistryBatch":
+        # Fail while queueing rather than halfway through commit().
+        data = encode(dtype, data)
+        group = self._group(key)
+        group.values[fold_case(name)] = _ValueOp(name, data, dtype.value, False, False)
+        return self
+
+    def delete_value(
+        self, key: BatchKey, name: str, *, missing_ok: bool = False
+    ) -> "RegistryBatch":
+        group = self._group(key)
+        group.values[fold_case(name)] = _ValueOp(name, None, 0, True, missing_ok)
+        return self
+
+    def delete_key(
+        self, key: BatchKey, *, recursive: bool = False, missing_ok: bool = False
+    ) -> "RegistryBatch":
+        regpath = _resolve(key)
+        root, prefix = _group_key(regpath)
+        if not prefix:
+            raise OperationError(
+                OperationErrorKind.ON_DELETE,
+                OperationDataErrorKind.SUBKEY,
+                "cannot delete a root key",
+            )
+        # Pending work below a deleted key is superseded by the delete.
+        for gk in list(self._groups):
+            if gk[0] == root and gk[1].startswith(prefix + REGISTRY_SEP):
+                del self._groups[gk]
+        group = self._group(regpath)
+        group.delete = (recursive, missing_ok)
+        group.create = False
+        group.values.clear()
+        return self
+
+    def __len__(self) -> int:
+        return sum(
+            (group.delete is not None) + group.create + len(group.values)
+            for group in self._groups.values()
+        )
+
+    # applying
+
+    def _record(
+        self,
+        action: BatchAction,
+        regpath: RegistryPathString,
+        name: Optional[str],
+        before: Any,
+    ) -> None:
+        if self._use_journal:
+            self._journal.append(JournalEntry(action, regpath, name, before))
+
+    def _open(self, regpath: RegistryPathString) -> Any:
+        return self._ll.open_subkey(regpath.root_key.value, regpath.path)
+
+    def _image(self, handle: Any, name: str) -> KeyImage:
+        total_subkeys, total_values, _ = self._ll.query_subkey(handle)
+        values = tuple(
+            self._ll.value_from_index(handle, i) for i in range(total_values)
+        )
+        names = [self._ll.subkey_from_index(handle, i) for i in range(total_subkeys)]
+        subkeys: list[KeyImage] = []
+        for subkey in names:
+            child = self._ll.open_subkey(handle, subkey)
+            try:
+                subkeys.append(self._image(child, subkey))
+            finally:
+                self._ll.close_subkey(child)
+        return KeyImage(name, values, tuple(subkeys))
+
+    def _apply_delete(self, group: _KeyOps, recursive: bool, missing_ok: bool) -> bool:
+        regpath = group.regpath
+        try:
+            parent = self._open(regpath.parent)
+            try:
+                handle = self._ll.open_subkey(parent, regpath.name)
+            except BaseException:
+                self._ll.close_subkey(parent)
+                raise
+        except FileNotFoundError as exc:
+            if missing_ok:
+                return False
+            raise OperationError(
+                OperationErrorKind.ON_DELETE,
+                OperationDataErrorKind.SUBKEY,
+                f"subkey {regpath.fullpath!r} does not exists",
+                exc,
+            ) from exc
+        try:
+            try:
+                if self._use_journal:
+                    image = self._image(handle, regpath.name)
+                    has_subkeys = bool(image.subkeys)
+                else:
+                    image = None
+                    has_subkeys = bool(self._ll.query_subkey(handle)[0])
+            finally:
+                self._ll.close_subkey(handle)
+            if has_subkeys and not recursive:
+                raise OperationError(
+                    OperationErrorKind.ON_DELETE,
+                    OperationDataErrorKind.SUBKEY,
+                    f"subkey {regpath.fullpath!r} is not empty",
+                )
+            self._record(BatchAction.DELETE_KEY, regpath, None, image)
+            self._ll.delete_tree(parent, regpath.name)
+        except OSError as exc:
+            raise OperationError(
+                OperationErrorKind.ON_DELETE,
+                OperationDataErrorKind.SUBKEY,
+                f"fail to delete subkey {regpath.fullpath!r}",
+                exc,
+            ) from exc
+        finally:
+            self._ll.close_subkey(parent)
+        self._forget(regpath, tree=True)
+        return True
+
+    def _forget(
+        self, regpath: RegistryPathString, *, tree: bool = False, created: bool = False
+    ) -> None:
+        backend = self._ll.backend
+        if tree:
+            get_handle_pool().invalidate(backend, regpath)
+        invalidate_caches(backend, regpath, tree=tree, created=created)
+
+    def _first_missing(self, regpath: RegistryPathString) -> RegistryPathString:
+        missing = regpath
+        while len(missing.parts) > 1:
+            try:
+                self._ll.close_subkey(self._open(missing.parent))
+            except FileNotFoundError:
+                missing = missing.parent
+                continue
+            break
+        return missing
+
+    def _acquire(self, group: _KeyOps) -> tuple[Any, bool]:
+        regpath = group.regpath
+        needs_key = group.create or any(not op.delete for op in group.values.values())
+        if needs_key and not self._use_journal:
+            return self._ll.create_subkey(regpath.root_key.value, regpath.path), False
+        try:
+            return self._open(regpath), False
+        except FileNotFoundError:
+            if not needs_key:
+                raise
+        self._record(BatchAction.CREATE_KEY, regpath, None, self._first_missing(regpath))
+        return self._ll.create_subkey(regpath.root_key.value, regpath.path), True
+
+    def _before_values(
+        self, handle: Any, group: _KeyOps
+    ) -> dict[str, tuple[Any, int]]:
+        total_values = self._ll.query_subkey(handle)[1]
+        if len(group.values) * 2 >= total_values:
+            # Cheaper to enumerate the whole key than to query each name.
+            before: dict[str, tuple[Any, int]] = {}
+            for i in range(total_values):
+                name, data, dtype = self._ll.value_from_index(handle, i)
+                before[fold_case(name)] = (data, dtype)
+            return before
+        before = {}
+        for folded, op in group.values.items():
+            with contextlib.suppress(FileNotFoundError):
+                before[folded] = self._ll.query_value(handle, op.name)
+        return before
+
+    def _apply_values(self, group: _KeyOps, stats: list[int]) -> None:
+        regpath = group.regpath
+        try:
+            handle, created = self._acquire(group)
+        except FileNotFoundError as exc:
+            if all(op.missing_ok for op in group.values.values()):
+                return
+            raise OperationError(
+                OperationErrorKind.ON_DELETE,
+                OperationDataErrorKind.VALUE,
+                f"subkey {regpath.fullpath!r} does not exists",
+                exc,
+            ) from exc
+        except OSError as exc:
+            raise OperationError(
+                OperationErrorKind.ON_CREATE,
+                OperationDataErrorKind.SUBKEY,
+                f"fail to create subkey {regpath.fullpath!r}",
+                exc,
+            ) from exc
+        stats[0] += 1
+        stats[1] += created
+        try:
+            before: dict[str, tuple[Any, int]] = {}
+            if self._use_journal and not created and group.values:
+                before = self._before_values(handle, group)
+            for folded, op in group.values.items():
+                previous = before.get(folded)
+                if op.delete:
+                    if self._use_journal and previous is None:
+                        if op.missing_ok:
+                            continue
+                        raise OperationError(
+                            OperationErrorKind.ON_DELETE,
+                            OperationDataErrorKind.VALUE,
+                            f"value name {op.name!r} does not exists",
+                        )
+                    self._record(BatchAction.DELETE_VALUE, regpath, op.name, previous)
+                    try:
+                        self._ll.delete_value(handle, op.name)
+                    except FileNotFoundError as exc:
+                        if op.missing_ok:
+                            continue
+                        raise OperationError(
+                            OperationErrorKind.ON_DELETE,
+                            OperationDataErrorKind.VALUE,
+                            f"value name {op.name!r} does not exists",
+                            exc,
+                        ) from exc
+                    stats[4] += 1
+                    continue
+                self._record(BatchAction.SET_VALUE, regpath, op.name, previous)
+                try:
+                    self._ll.set_value(
+                        handle, op.name, op.dtype, op.data, encoded=True
+                    )
+                except (OSError, ValueError, TypeError) as exc:
+                    raise OperationError(
+                        OperationErrorKind.ON_UPDATE,
+                        OperationDataErrorKind.VALUE,
+                        f"fail to set value {op.name!r} in {regpath.fullpath!r}",
+                        exc,
+                    ) from exc
+                stats[3] += 1
+        finally:
+            self._ll.close_subkey(handle)
+            self._forget(regpath, created=created)
+
+    def commit(self, *, rollback_on_error: bool = True) -> BatchStats:
+        groups = list(self._groups.values())
+        self._groups.clear()
+        self._journal = []
+        # [keys touched, keys created, keys deleted, values set, values deleted]
+        stats = [0, 0, 0, 0, 0]
+        try:
+            deletes = [group for group in groups if group.delete is not None]
+            deletes.sort(key=lambda group: len(group.regpath.parts), reverse=True)
+            for group in deletes:
+                stats[2] += self._apply_delete(group, *group.delete)  # type: ignore[misc]
+            for group in groups:
+                if group.create or group.values:
+                    self._apply_values(group, stats)
+        except BaseException:
+            if rollback_on_error and self._use_journal:
+                self.rollback()
+            raise
+        return BatchStats(*stats)
+
+    # rollback
+
+    def _restore_image(self, parent: Any, image: KeyImage) -> None:
+        handle = self._ll.create_subkey(parent, image.name)
+        try:
+            for name, data, dtype in image.values:
+                self._ll.set_value(handle, name, dtype, data, encoded=True)
+            for subkey in image.subkeys:
+                self._restore_image(handle, subkey)
+        finally:
+            self._ll.close_subkey(handle)
+
+    def _undo(self, entry: JournalEntry) -> None:
+        regpath = entry.regpath
+        root = regpath.root_key.value
+        if entry.action is BatchAction.CREATE_KEY:
+            top: RegistryPathString = entry.before
+            try:
+                parent = self._open(top.parent)
+            except FileNotFoundError:
+                return
+            try:
+                self._ll.delete_tree(parent, top.name)
+            except FileNotFoundError:
+                pass
+            finally:
+                self._ll.close_subkey(parent)
+            self._forget(top, tree=True)
+            return
+        if entry.action is BatchAction.DELETE_KEY:
+            parent = self._ll.create_subkey(root, regpath.parent.path)
+            try:
+                self._restore_image(parent, entry.before)
+            finally:
+                self._ll.close_subkey(parent)
+                self._forget(regpath, tree=True, created=True)
+            return
+        try:
+            handle = self._open(regpath)
+        except FileNotFoundError:
+            if entry.before is None:
+                return
+            handle = self._ll.create_subkey(root, regpath.path)
+        try:
+            if entry.before is None:
+                with contextlib.suppress(FileNotFoundError):
+                    self._ll.delete_value(handle, entry.name or "")
+            else:
+                data, dtype = entry.before
+                self._ll.set_value(
+                    handle, entry.name or "", dtype, data, encoded=True
+                )
+        finally:
+            self._ll.close_subkey(handle)
+            self._forget(regpath, created=True)
+
+    def rollback(self) -> None:
+        errors: list[BaseException] = []
+        journal, self._journal = self._journal, []
+        for entry in reversed(journal):
+            try:
+                self._undo(entry)
+            except (OSError, ValueError, TypeError) as exc:
+                errors.append(exc)
+        if errors:
+            raise BatchRollbackError(
+                f"{len(journal)} journal entries replayed", errors
+            )
+
+    def __enter__(self) -> "RegistryBatch":
+        return self
+
+    def __exit__(self, exc_type: Optional[type], *args: object) -> None:
+        if exc_type is None:
+            self.commit()
+        else:
+            self._groups.clear()
+
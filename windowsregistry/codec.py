@@ -0,0 +1,269 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import os
+import re
+import struct
+from typing import Any, Callable, Iterable, Mapping, NamedTuple, Optional, Union
+
+from .errors import ValueCodecError
+from .models import RegistryValue, RegistryValueType
+
+_U32 = struct.Struct("<I")
+_U32_BE = struct.Struct(">I")
+_U64 = struct.Struct("<Q")
+_VARIABLE = re.compile(r"%([^%]+)%")
+
+DTypeLike = Union[RegistryValueType, int]
+
+
+class ExpandableString(str):
+    # A REG_EXPAND_SZ value; `str` compares and formats it unexpanded, the
+    # way it is stored.
+
+    __slots__ = ()
+
+    def expand(self, environ: Optional[Mapping[str, str]] = None) -> str:
+        # Windows looks names up case-insensitively and leaves unknown
+        # %VARIABLES% untouched.
+        source = os.environ if environ is None else environ
+        names = {name.upper(): value for name, value in source.items()}
+
+        def lookup(match: re.Match[str]) -> str:
+            return names.get(match.group(1).upper(), match.group(0))
+
+        return _VARIABLE.sub(lookup, self)
+
+
+class ValueCodec(NamedTuple):
+    # decode: what a backend returned for the type -> typed Python object.
+    # encode: any accepted Python object -> what `SetValueEx` takes for the
+    # type; raises ValueCodecError on data the type cannot hold.
+    decode: Callable[[Any], Any]
+    encode: Callable[[Any], Any]
+
+
+def _error(dtype: int, message: str) -> ValueCodecError:
+    try:
+        name = RegistryValueType(dtype).name
+    except ValueError:
+        name = f"type {dtype}"
+    return ValueCodecError(message, name)
+
+
+def _is_buffer(data: Any) -> bool:
+    return isinstance(data, (bytes, bytearray, memoryview))
+
+
+def _int_codec(dtype: int, codec: struct.Struct, limit: int) -> ValueCodec:
+    # Backends return DWORD/QWORD data as an int; offline sources and
+    # REG_DWORD_BIG_ENDIAN hand over the raw little/big-endian bytes.
+    big_endian = dtype == RegistryValueType.REG_DWORD_BIG_ENDIAN.value
+
+    def decode(data: Any) -> int:
+        if data is None:
+            return 0
+        if isinstance(data, int):
+            return data
+        if len(data) < codec.size:
+            raise _error(dtype, f"expected {codec.size} bytes, got {len(data)}")
+        return codec.unpack_from(data)[0]
+
+    def encode(data: Any) -> Any:
+        if data is None:
+            data = 0
+        elif _is_buffer(data):
+            if len(data) != codec.size:
+                raise _error(dtype, f"expected {codec.size} bytes, got {len(data)}")
+            data = codec.unpack_from(data)[0]
+        elif not isinstance(data, int):
+            raise _error(dtype, f"expected an int, got {type(data).__name__}")
+        elif not 0 <= data <= limit:
+            raise _error(dtype, f"{data} is out of range 0..{limit:#x}")
+        return codec.pack(data) if big_endian else int(data)
+
+    return ValueCodec(decode, encode)
+
+
+def _check_text(dtype: int, data: Any) -> str:
+    if not isinstance(data, str):
+        raise _error(dtype, f"expected a str, got {type(data).__name__}")
+    if "\0" in data:
+        # The registry stores strings NUL-terminated; anything after an
+        # embedded NUL would be silently lost.
+        raise _error(dtype, "string contains a NUL character")
+    return data
+
+
+def _sz_codec(dtype: int) -> ValueCodec:
+    def decode(data: Any) -> str:
+        return "" if data is None else data
+
+    def encode(data: Any) -> str:
+        return "" if data is None else _check_text(dtype, data)
+
+    return ValueCodec(decode, encode)
+
+
+def _expand_sz_codec(dtype: int) -> ValueCodec:
+    def decode(data: Any) -> ExpandableString:
+        return ExpandableString("" if data is None else data)
+
+    def encode(data: Any) -> str:
+        return "" if data is None else _check_text(dtype, data)
+
+    return ValueCodec(decode, encode)
+
+
+def _multi_sz_codec(dtype: int) -> ValueCodec:
+    def decode(data: Any) -> list[str]:
+        return [] if data is None else list(data)
+
+    def encode(data: Any) -> list[str]:
+        if data is None:
+            return []
+        if isinstance(data, str) or not isinstance(data, Iterable):
+            raise _error(dtype, f"expected a list of str, got {type(data).__name__}")
+        items: list[str] = []
+        for item in data:  # pyright: ignore[reportUnknownVariableType]
+            text = _check_text(dtype, item)
+            if not text:
+                # An empty string terminates the list when it is read back.
+                raise _error(dtype, "list contains an empty string")
+            items.append(text)
+        return items
+
+    return ValueCodec(decode, encode)
+
+
+def _binary_codec(dtype: int) -> ValueCodec:
+    # Binary data is handed out as a memoryview over the buffer the backend
+    # returned, so slicing a large blob never copies it.
+    empty = memoryview(b"")
+
+    def decode(data: Any) -> memoryview:
+        return empty if data is None else memoryview(data)
+
+    def encode(data: Any) -> Optional[bytes]:
+        if data is None or isinstance(data, bytes):
+            return data
+        if not _is_buffer(data):
+            raise _error(dtype, f"expected a bytes-like object, got {type(data).__name__}")
+        return bytes(data)
+
+    return ValueCodec(decode, encode)
+
+
+def _link_codec(dtype: int) -> ValueCodec:
+    binary = _binary_codec(dtype)
+
+    def decode(data: Any) -> str:
+        if isinstance(data, str) or data is None:
+            return data or ""
+        return bytes(data).decode("utf-16-le", errors="surrogatepass").rstrip("\0")
+
+    def encode(data: Any) -> Optional[bytes]:
+        if isinstance(data, str):
+            return _check_text(dtype, data).encode("utf-16-le", errors="surrogatepass")
+        return binary.encode(data)
+
+    return ValueCodec(decode, encode)
+
+
+_codecs: dict[int, ValueCodec] = {}
+
+
+def _code(dtype: DTypeLike) -> int:
+    return dtype if type(dtype) is int else dtype._value_  # type: ignore[union-attr]
+
+
+def register_codec(dtype: DTypeLike, codec: ValueCodec) -> None:
+    _codecs[_code(dtype)] = codec
+
+
+def get_codec(dtype: DTypeLike) -> ValueCodec:
+    code = _code(dtype)
+    codec = _codecs.get(code)
+    if codec is None:
+        # Types without a codec of their own travel as binary.
+        codec = _codecs[code] = _binary_codec(code)
+    return codec
+
+
+for _dtype, _codec in (
+    (RegistryValueType.REG_SZ, _sz_codec),
+    (RegistryValueType.REG_EXPAND_SZ, _expand_sz_codec),
+    (RegistryValueType.REG_MULTI_SZ, _multi_sz_codec),
+    (RegistryValueType.REG_LINK, _link_codec),
+    (RegistryValueType.REG_BINARY, _binary_codec),
+    (RegistryValueType.REG_NONE, _binary_codec),
+    (RegistryValueType.REG_RESOURCE_LIST, _binary_codec),
+    (RegistryValueType.REG_FULL_RESOURCE_DESCRIPTOR, _binary_codec),
+    (RegistryValueType.REG_RESOURCE_REQUIREMENTS_LIST, _binary_codec),
+):
+    register_codec(_dtype, _codec(_dtype.value))
+register_codec(
+    RegistryValueType.REG_DWORD,
+    _int_codec(RegistryValueType.REG_DWORD.value, _U32, 0xFFFFFFFF),
+)
+register_codec(
+    RegistryValueType.REG_DWORD_BIG_ENDIAN,
+    _int_codec(RegistryValueType.REG_DWORD_BIG_ENDIAN.value, _U32_BE, 0xFFFFFFFF),
+)
+register_codec(
+    RegistryValueType.REG_QWORD,
+    _int_codec(RegistryValueType.REG_QWORD.value, _U64, 0xFFFFFFFFFFFFFFFF),
+)
+del _dtype, _codec
+
+
+def decode(dtype: DTypeLike, data: Any) -> Any:
+    return get_codec(dtype).decode(data)
+
+
+def encode(dtype: DTypeLike, data: Any) -> Any:
+    return get_codec(dtype).encode(data)
+
+
+def decode_value(value: RegistryValue) -> Any:
+    return get_codec(value.dtype).decode(value.data)
+
+
+def decode_values(
+    values: Iterable[tuple[str, Any, Union[RegistryValueType, int]]],
+) -> dict[str, Any]:
+    # Takes RegistryValue items or raw backend triples. Decoders are looked
+    # up once per type rather than once per value, keyed by the raw type
+    # number: hashing an Enum member runs Python code.
+    decoders: dict[int, Callable[[Any], Any]] = {}
+    result: dict[str, Any] = {}
+    for name, data, dtype in values:
+        code = dtype if isinstance(dtype, int) else dtype._value_
+        fn = decoders.get(code)
+        if fn is None:
+            fn = decoders[code] = get_codec(code).decode
+        result[name] = fn(data)
+    return result
@@ -23,10 +23,20 @@
 # SOFTWARE.
 
 from collections import deque
-from typing import Any, Iterator, Optional, Sequence, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Generator,
+    Iterator,
+    Optional,
+    Sequence,
+    Union,
+)
 
 from ._backend import WindowsRegistryHandler
 from ._typings import RegistryKeyPermissionTypeArgs
+from .backends import RegistryBackend
 from .errors import (
     OperationDataErrorKind,
     OperationError,
@@ -42,24 +52,43 @@ from .models import (
     RegistryValueType,
 )
 from .regpath import RegistryPathString
+from .valuecache import ValueCache
+
+if TYPE_CHECKING:
+    from .search import DtypeFilter, FindMatch, Patterns
+    from .sizeof import SizeCache
+    from .snapshot import RegistrySnapshot
+    from .tree import TreeSpec, TreeStamps, TreeStats
 
 
 class RegistryPath:
-    def __init__(
+    __slots__ = ("_backend", "__weakref__")
+
+    def __init__(  # noqa: PLR0913
         self,
         subkey: Union[None, str, Sequence[str]] = None,
         *,
         root_key: Optional[RegistryHKEYEnum] = None,
         permission: Optional[RegistryKeyPermissionTypeArgs] = None,
         wow64_32key_access: bool = False,
+        backend: Optional[RegistryBackend] = None,
+        cache: Optional[ValueCache] = None,
     ) -> None:
         self._backend = WindowsRegistryHandler(
             subkey=subkey,
             root_key=root_key,
             permission=permission,
             wow64_32key_access=wow64_32key_access,
+            backend=backend,
+            cache=cache,
         )
 
+    @classmethod
+    def _from_handler(cls, handler: WindowsRegistryHandler) -> "RegistryPath":
+        self = cls.__new__(cls)
+        self._backend = handler
+        return self
+
     def _sanargs(
         self, perm: Optional[RegistryKeyPermissionTypeArgs], w64: Optional[bool]
     ):
@@ -78,13 +107,22 @@ class RegistryPath:
     ):
         perm, w64 = self._sanargs(perm, w64)
         return self.__class__(
-            subkey=r.path, root_key=r.root_key, permission=perm, wow64_32key_access=w64
+            subkey=r.path,
+            root_key=r.root_key,
+            permission=perm,
+            wow64_32key_access=w64,
+            backend=self._backend._ll.backend,
+            cache=self._backend._cache,
         )
 
     @property
     def regpath(self) -> RegistryPathString:
         return self._backend._regpath
 
+    @property
+    def cache(self) -> Optional[ValueCache]:
+        return self._backend._cache
+
     @property
     def query_info(self) -> RegistryInfoKey:
         return self._backend.winreg_query
@@ -99,8 +137,11 @@ class RegistryPath:
         permission: Optional[RegistryKeyPermissionTypeArgs] = None,
         wow64_32key_access: Optional[bool] = None,
     ) -> "RegistryPath":
-        return self._internal_open_subkey(
-            self.regpath.joinpath(*paths), permission, wow64_32key_access
+        perm, w64 = self._sanargs(permission, wow64_32key_access)
+        return self._from_handler(
+            WindowsRegistryHandler(
+                paths, permission=perm, wow64_32key_access=w64, parent=self._backend
+            )
         )
 
     def subkeys(self) -> Iterator["RegistryPath"]:
@@ -126,6 +167,17 @@ class RegistryPath:
         self._backend.new_subkey(subkey)
         return self.open_subkey(subkey)
 
+    def create_tree(
+        self,
+        spec: "TreeSpec",
+        *,
+        prune: bool = False,
+        stamps: Optional["TreeStamps"] = None,
+    ) -> "TreeStats":
+        from .tree import create_tree  # noqa: PLC0415
+
+        return create_tree(self, spec, prune=prune, stamps=stamps)
+
     def delete_subkey(self, subkey: str, *, recursive: bool = False) -> None:
         if not self.subkey_exists(subkey):
             raise OperationError(
@@ -142,6 +194,11 @@ class RegistryPath:
         for name, data, dtype in self._backend.itervalues():
             yield RegistryValue(name, data, RegistryValueType(dtype))
 
+    def typed_values(self) -> dict[str, Any]:
+        from .codec import decode_values  # noqa: PLC0415
+
+        return decode_values(self.values())
+
     def get_value(self, key: str = "") -> RegistryValue:
         result = self._backend.query_value(key)
         name, data, dtype = result
@@ -182,17 +239,167 @@ class RegistryPath:
             yield curr, subkeys_in_curr, values_in_curr
             stacks.extend(subkeys_in_curr)
 
-    def sizeof(self) -> RegistrySize:
-        cached = getattr(self, "__cached_sizeof", None)
-        if cached is not None:
-            return cached
-        sub, val = 0, 0
-        for r, _, _ in self.traverse():
-            sub += r.query_info.total_subkeys
-            val += r.query_info.total_values
-        final = RegistrySize(self.regpath, sub, val)
-        setattr(self, "__cached_sizeof", final)
-        return final
+    def walk(
+        self,
+        *,
+        topdown: bool = True,
+        max_depth: Optional[int] = None,
+        keys_only: bool = False,
+        onerror: Optional[Callable[[WindowsRegistryError], None]] = None,
+    ) -> Iterator[tuple["RegistryPath", list[str], Iterator[RegistryValue]]]:
+        # Depth-first, like os.walk: with topdown=True the caller may prune
+        # the yielded subkey name list in place to skip those subtrees.
+        # Failures are passed to `onerror` (or ignored) and the key skipped.
+        def report(path: RegistryPath, exc: Exception, what: str) -> None:
+            if onerror is None:
+                return
+            if not isinstance(exc, WindowsRegistryError):
+                exc = OperationError(
+                    OperationErrorKind.ON_READ,
+                    OperationDataErrorKind.SUBKEY
+                    if what == "subkeys"
+                    else OperationDataErrorKind.VALUE,
+                    f"fail to enumerate {what} of {path.regpath.fullpath!r}",
+                    exc,
+                )
+            onerror(exc)
+
+        def read_values(path: RegistryPath) -> Iterator[RegistryValue]:
+            try:
+                yield from path.values()
+            except (OSError, WindowsRegistryError) as exc:
+                report(path, exc, "values")
+
+        def scan(path: RegistryPath, depth: int):
+            try:
+                names = list(path._backend.itersubkeys())
+            except (OSError, WindowsRegistryError) as exc:
+                report(path, exc, "subkeys")
+                return None
+            values: Iterator[RegistryValue] = (
+                iter(()) if keys_only else read_values(path)
+            )
+            return names, values, max_depth is None or depth < max_depth
+
+        def open_child(parent: RegistryPath, name: str) -> Optional[RegistryPath]:
+            try:
+                return parent.open_subkey(name)
+            except WindowsRegistryError as exc:
+                if onerror is not None:
+                    onerror(exc)
+                return None
+
+        scanned = scan(self, 0)
+        if scanned is None:
+            return
+        names, values, descend = scanned
+        if topdown:
+            yield self, names, values
+            stack: list[tuple[RegistryPath, Iterator[str], int]] = (
+                [(self, iter(names), 0)] if descend else []
+            )
+            while stack:
+                parent, pending, depth = stack[-1]
+                name = next(pending, None)
+                if name is None:
+                    stack.pop()
+                    continue
+                child = open_child(parent, name)
+                if child is None:
+                    continue
+                scanned = scan(child, depth + 1)
+                if scanned is None:
+                    continue
+                names, values, descend = scanned
+                yield child, names, values
+                if descend:
+                    stack.append((child, iter(names), depth + 1))
+            return
+
+        frames: list[
+            tuple[RegistryPath, list[str], Iterator[RegistryValue], Iterator[str], int]
+        ] = [(self, names, values, iter(names if descend else ()), 0)]
+        while frames:
+            path, names, values, pending, depth = frames[-1]
+            name = next(pending, None)
+            if name is None:
+                frames.pop()
+                yield path, names, values
+                continue
+            child = open_child(path, name)
+            if child is None:
+                continue
+            scanned = scan(child, depth + 1)
+            if scanned is None:
+                continue
+            names, values, descend = scanned
+            frames.append(
+                (child, names, values, iter(names if descend else ()), depth + 1)
+            )
+
+    def find(  # noqa: PLR0913
+        self,
+        *,
+        key: Optional["Patterns"] = None,
+        keypath: Optional["Patterns"] = None,
+        value: Optional["Patterns"] = None,
+        data: Optional["Patterns"] = None,
+        dtype: Optional["DtypeFilter"] = None,
+        max_depth: Optional[int] = None,
+        limit: Optional[int] = None,
+        onerror: Optional[Callable[[WindowsRegistryError], None]] = None,
+    ) -> Generator["FindMatch", None, None]:
+        from .search import find  # noqa: PLC0415
+
+        return find(
+            self,
+            key=key,
+            keypath=keypath,
+            value=value,
+            data=data,
+            dtype=dtype,
+            max_depth=max_depth,
+            limit=limit,
+            onerror=onerror,
+        )
+
+    def snapshot(self, *, max_depth: Optional[int] = None) -> "RegistrySnapshot":
+        from .snapshot import RegistrySnapshot  # noqa: PLC0415
+
+        return RegistrySnapshot.capture(self, max_depth=max_depth)
+
+    def sizeof(
+        self,
+        *,
+        max_depth: Optional[int] = None,
+        workers: Optional[int] = None,
+        data_bytes: bool = False,
+        cache: Optional["SizeCache"] = None,
+        onerror: Optional[Callable[[WindowsRegistryError], None]] = None,
+    ) -> RegistrySize:
+        from .sizeof import sizeof  # noqa: PLC0415
+
+        return sizeof(
+            self,
+            max_depth=max_depth,
+            workers=workers,
+            data_bytes=data_bytes,
+            cache=cache,
+            onerror=onerror,
+        )
+
+    @property
+    def closed(self) -> bool:
+        return self._backend.closed
+
+    def close(self) -> None:
+        self._backend.close()
+
+    def __enter__(self) -> "RegistryPath":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
 
     def __repr__(self) -> str:
         return (
@@ -205,10 +412,14 @@ def open_subkey(
     root_key: Optional[RegistryHKEYEnum] = None,
     permission: Optional[RegistryKeyPermissionType] = None,
     wow64_32key_access: bool = False,
+    backend: Optional[RegistryBackend] = None,
+    cache: Optional[ValueCache] = None,
 ) -> RegistryPath:
     return RegistryPath(
         root_key=root_key,
         subkey=path,
         permission=permission,
         wow64_32key_access=wow64_32key_access,
+        backend=backend,
+        cache=cache,
     )
@@ -23,7 +23,7 @@
 # SOFTWARE.
 
 from enum import Enum, auto
-from typing import Optional
+from typing import Optional, Sequence
 
 
 class OperationErrorKind(Enum):
@@ -78,3 +78,52 @@ class RegistryPathError(WindowsRegistryError):
     
     def __str__(self) -> str:
         return f"error on parsing path: {self.message}"
+
+# Also an OSError, like the ERROR_BADDB a corrupt hive gives through winreg, so
+# code that skips keys it cannot read skips corrupt ones too.
+class HiveFormatError(WindowsRegistryError, OSError):
+    def __init__(self, message: str) -> None:
+        super().__init__(message)
+        self.message = message
+        self.winerror = 1009
+
+    def __str__(self) -> str:
+        return f"error on reading hive: {self.message}"
+
+class BatchRollbackError(WindowsRegistryError):
+    def __init__(self, message: str, errors: Sequence[BaseException]) -> None:
+        self.message = message
+        self.errors = tuple(errors)
+
+    def __str__(self) -> str:
+        return f"error on rolling back batch: {self.message} ({len(self.errors)} failed)"
+
+class TreeSpecError(WindowsRegistryError):
+    def __init__(self, message: str, path: str) -> None:
+        self.message = message
+        self.path = path
+
+    def __str__(self) -> str:
+        return f"error on parsing tree spec at {self.path!r}: {self.message}"
+
+class TraceError(WindowsRegistryError):
+    def __init__(self, message: str) -> None:
+        self.message = message
+
+    def __str__(self) -> str:
+        return f"error in trace: {self.message}"
+
+class BackendUnavailableError(WindowsRegistryError):
+    def __init__(self, message: str) -> None:
+        self.message = message
+
+    def __str__(self) -> str:
+        return f"error on selecting backend: {self.message}"
+
+class ValueCodecError(WindowsRegistryError):
+    def __init__(self, message: str, dtype: str) -> None:
+        self.message = message
+        self.dtype = dtype
+
+    def __str__(self) -> str:
+        return f"error on converting {self.dtype} data: {self.message}"
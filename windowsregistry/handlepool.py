@@ -0,0 +1,257 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import contextlib
+import threading
+import traceback
+from collections import OrderedDict
+from typing import Any, Callable, NamedTuple, Optional
+
+from . import instrument
+from .backends import RegistryBackend
+from .regpath import RegistryPathString
+
+HandlePoolKey = tuple[RegistryBackend, RegistryPathString, int]
+
+# ERROR_INVALID_HANDLE and ERROR_KEY_DELETED: the key behind a pooled handle
+# was deleted (and possibly recreated) by someone else.
+_STALE_WINERRORS = frozenset((6, 1018))
+
+
+class HandleLeak(NamedTuple):
+    fullpath: str
+    access: int
+    refcount: int
+    acquired_at: Optional[traceback.StackSummary]
+
+
+class HandlePoolStats(NamedTuple):
+    size: int
+    in_use: int
+    hits: int
+    misses: int
+    evictions: int
+
+
+class PooledHandle:
+    __slots__ = ("key", "handle", "refcount", "closed", "acquired_at")
+
+    def __init__(self, key: HandlePoolKey, handle: Any) -> None:
+        self.key = key
+        self.handle = handle
+        self.refcount = 0
+        self.closed = False
+        self.acquired_at: Optional[traceback.StackSummary] = None
+
+    @property
+    def fullpath(self) -> str:
+        return self.key[1].fullpath
+
+    def __repr__(self) -> str:
+        return (
+            f"<{self.__class__.__name__}: {self.fullpath} "
+            f"(refcount={self.refcount}{', closed' if self.closed else ''})>"
+        )
+
+
+def _close_handle(key: HandlePoolKey, handle: Any) -> None:
+    # Pooled handles are closed here rather than through lowlevel, so drop
+    # them from the instrumentation map the same way close_subkey does.
+    if instrument.enabled:
+        instrument.forget(handle)
+    key[0].CloseKey(handle)
+
+
+def is_stale(exc: OSError) -> bool:
+    return getattr(exc, "winerror", None) in _STALE_WINERRORS
+
+
+def make_key(
+    backend: RegistryBackend, regpath: RegistryPathString, access: int
+) -> HandlePoolKey:
+    # Registry paths hash and compare case-insensitively, so the node itself
+    # is the key; no lowercased copy of the path is kept per handle.
+    return (backend, regpath, access)
+
+
+class HandlePool:
+    def __init__(self, max_size: int = 256, *, track_leaks: bool = False) -> None:
+        self._lock = threading.RLock()
+        self._entries: dict[HandlePoolKey, PooledHandle] = {}
+        self._idle: OrderedDict[HandlePoolKey, PooledHandle] = OrderedDict()
+        self._max_size = max_size
+        self._track_leaks = track_leaks
+        self._hits = self._misses = self._evictions = 0
+
+    @property
+    def max_size(self) -> int:
+        return self._max_size
+
+    def resize(self, max_size: int) -> None:
+        with self._lock:
+            self._max_size = max_size
+            self._evict()
+
+    def _close(self, entry: PooledHandle) -> None:
+        entry.closed = True
+        self._entries.pop(entry.key, None)
+        self._idle.pop(entry.key, None)
+        with contextlib.suppress(OSError):
+            _close_handle(entry.key, entry.handle)
+
+    def _evict(self) -> None:
+        while len(self._entries) > self._max_size and self._idle:
+            _, entry = self._idle.popitem(last=False)
+            self._close(entry)
+            self._evictions += 1
+
+    def _checkout(self, entry: PooledHandle) -> PooledHandle:
+        if entry.refcount == 0:
+            self._idle.pop(entry.key, None)
+        entry.refcount += 1
+        if self._track_leaks:
+            entry.acquired_at = traceback.StackSummary.from_list(
+                traceback.extract_stack(limit=16)[:-2]
+            )
+        return entry
+
+    def acquire(
+        self, key: HandlePoolKey, opener: Callable[[], Any]
+    ) -> PooledHandle:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._hits += 1
+                return self._checkout(entry)
+            self._misses += 1
+        handle = opener()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                # Another thread opened the same key meanwhile; keep theirs.
+                _close_handle(key, handle)
+                return self._checkout(entry)
+            entry = PooledHandle(key, handle)
+            self._entries[key] = entry
+            self._checkout(entry)
+            self._evict()
+            return entry
+
+    def adopt(self, key: HandlePoolKey, handle: Any) -> None:
+        with self._lock:
+            if key in self._entries:
+                _close_handle(key, handle)
+                return
+            entry = PooledHandle(key, handle)
+            self._entries[key] = entry
+            self._idle[key] = entry
+            self._evict()
+
+    def release(self, entry: PooledHandle) -> None:
+        with self._lock:
+            if entry.refcount <= 0:
+                return
+            entry.refcount -= 1
+            if entry.refcount:
+                return
+            entry.acquired_at = None
+            if entry.closed:
+                _close_handle(entry.key, entry.handle)
+                return
+            self._idle[entry.key] = entry
+            self._evict()
+
+    def invalidate(
+        self, backend: RegistryBackend, regpath: Optional[RegistryPathString] = None
+    ) -> None:
+        # Drops every pooled handle at or below `regpath` (all of the
+        # backend's without one); handles still in use are detached from the
+        # pool and closed on their last release.
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                entry_backend, entry_path, _ = key
+                if entry_backend is not backend:
+                    continue
+                if regpath is not None and not entry_path.is_relative_to(regpath):
+                    continue
+                if entry.refcount:
+                    entry.closed = True
+                    del self._entries[key]
+                else:
+                    self._close(entry)
+
+    def reopen(
+        self, entry: PooledHandle, opener: Callable[[], Any]
+    ) -> PooledHandle:
+        # Swaps a checked-out entry whose handle went stale for a fresh one.
+        backend, regpath, _ = entry.key
+        self.invalidate(backend, regpath)
+        fresh = self.acquire(entry.key, opener)
+        self.release(entry)
+        return fresh
+
+    def clear(self) -> None:
+        with self._lock:
+            for entry in list(self._idle.values()):
+                self._close(entry)
+
+    def stats(self) -> HandlePoolStats:
+        with self._lock:
+            return HandlePoolStats(
+                len(self._entries),
+                len(self._entries) - len(self._idle),
+                self._hits,
+                self._misses,
+                self._evictions,
+            )
+
+    def leak_report(self) -> list[HandleLeak]:
+        with self._lock:
+            return [
+                HandleLeak(
+                    entry.fullpath, entry.key[2], entry.refcount, entry.acquired_at
+                )
+                for entry in self._entries.values()
+                if entry.refcount
+            ]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}: {len(self._entries)}/{self._max_size} handles>"
+
+
+_default_pool = HandlePool()
+
+
+def get_handle_pool() -> HandlePool:
+    return _default_pool
+
+
+def set_handle_pool(pool: HandlePool) -> None:
+    global _default_pool
+    _default_pool = pool
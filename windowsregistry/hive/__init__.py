@@ -0,0 +1,88 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import os
+from typing import Optional, Union
+
+from ..core import RegistryPath
+from ..handlepool import get_handle_pool
+from ..models import RegistryHKEYEnum
+from .compact import CompactBackend, CompactWriteStats, write_compact
+from .reader import HiveBackend, HiveKeyHandle
+from .writer import HiveNode, HiveWriteStats, write_hive
+
+
+def _owned(
+    backend: Union[HiveBackend, CompactBackend],
+    path: tuple[str, ...],
+    root_key: Optional[RegistryHKEYEnum],
+) -> RegistryPath:
+    # Closing the returned path (or leaving its `with` block) unmaps the
+    # file; pooled handles into the mapping are dropped along with it.
+    def close() -> None:
+        get_handle_pool().invalidate(backend)
+        backend.close()
+
+    if root_key is None:
+        root_key = RegistryHKEYEnum.HKEY_LOCAL_MACHINE
+    try:
+        root = RegistryPath(subkey=path, root_key=root_key, backend=backend)
+    except BaseException:
+        close()
+        raise
+    root._backend._on_close = close
+    return root
+
+
+def open_hive(
+    file: Union[str, "os.PathLike[str]"],
+    *path: str,
+    root_key: Optional[RegistryHKEYEnum] = None,
+) -> RegistryPath:
+    return _owned(HiveBackend(file), path, root_key)
+
+
+def open_compact(
+    file: Union[str, "os.PathLike[str]"],
+    *path: str,
+    root_key: Optional[RegistryHKEYEnum] = None,
+    offset: int = 0,
+) -> RegistryPath:
+    return _owned(CompactBackend(file, offset=offset), path, root_key)
+
+
+__all__ = [
+    "CompactBackend",
+    "CompactWriteStats",
+    "HiveBackend",
+    "HiveKeyHandle",
+    "HiveNode",
+    "HiveWriteStats",
+    "open_compact",
+    "open_hive",
+    "write_compact",
+    "write_hive",
+]
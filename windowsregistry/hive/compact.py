@@ -0,0 +1,372 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import IO, Any, Final, NamedTuple, Optional, Union
+
+from ..backends.memory import filetime_now
+from ..errors import HiveFormatError
+from ..regpath import fold_case
+from .format import decode_data, encode_data, sort_key
+from .reader import HiveKeyHandle, _no_more_data, _not_found, _read_only
+from .writer import HiveNode, HiveSource, _as_node
+
+# A compact, read-only snapshot of a subtree, meant to be memory-mapped by
+# many processes at once. Layout:
+#
+#   header
+#   value data blobs and key records, interleaved, in the order written
+#   string table: count, (count + 1) offsets, UTF-8 names
+#
+# Key records are written after their subkeys (post-order), so a record can
+# point at its already written children. Subkeys are sorted the way Windows
+# sorts them, which allows a binary search by name; every key name and value
+# name is stored once in the string table and identical value data once.
+# Every offset is relative to the start of the header, so a snapshot can be
+# written at any position of a file and read back from there.
+COMPACT_SIGNATURE: Final[bytes] = b"RSNP"
+COMPACT_VERSION: Final[int] = 1
+
+# signature, version, reserved, root key, string table, keys, values, timestamp
+HEADER = struct.Struct("<4sHHQQQQQ")
+# name, last written, subkeys, values
+KEY = struct.Struct("<IQII")
+# name, key record
+SUBKEY = struct.Struct("<IQ")
+# name, data type, data offset, data size
+VALUE = struct.Struct("<IIQI")
+U32 = struct.Struct("<I")
+
+
+class CompactWriteStats(NamedTuple):
+    total_keys: int
+    total_values: int
+    shared_blobs: int
+    file_size: int
+
+
+class _CompactWriter:
+    def __init__(self, fp: IO[bytes]) -> None:
+        self._fp = fp
+        self._start = fp.tell()
+        self._pos = HEADER.size
+        self._names: dict[str, int] = {}
+        self._blobs: dict[bytes, tuple[int, int]] = {}
+        self.total_keys = self.total_values = self.shared_blobs = 0
+
+    def _write(self, raw: bytes) -> int:
+        pos = self._pos
+        self._fp.write(raw)
+        self._pos += len(raw)
+        return pos
+
+    def _name(self, name: str) -> int:
+        index = self._names.get(name)
+        if index is None:
+            index = self._names[name] = len(self._names)
+        return index
+
+    def _blob(self, raw: bytes) -> tuple[int, int]:
+        if not raw:
+            return 0, 0
+        digest = hashlib.blake2b(raw, digest_size=16).digest()
+        found = self._blobs.get(digest)
+        if found is not None:
+            self.shared_blobs += 1
+            return found
+        found = self._blobs[digest] = (self._write(raw), len(raw))
+        return found
+
+    def key(self, node: HiveNode) -> int:
+        subkeys = sorted(
+            ((sort_key(child.name), child.name, self.key(child)) for child in node.subkeys),
+        )
+        values: list[bytes] = []
+        for name, data, dtype in node.values:
+            offset, size = self._blob(encode_data(dtype, data))
+            values.append(VALUE.pack(self._name(name), dtype, offset, size))
+        record = bytearray(
+            KEY.pack(self._name(node.name), node.last_modified, len(subkeys), len(values))
+        )
+        for _, name, offset in subkeys:
+            record += SUBKEY.pack(self._name(name), offset)
+        for value in values:
+            record += value
+        self.total_keys += 1
+        self.total_values += len(values)
+        return self._write(bytes(record))
+
+    def write(self, node: HiveNode, timestamp: int) -> int:
+        self._fp.write(bytes(HEADER.size))
+        root = self.key(node)
+        encoded = [name.encode("utf-8", errors="surrogatepass") for name in self._names]
+        offsets = [0]
+        for raw in encoded:
+            offsets.append(offsets[-1] + len(raw))
+        table = self._write(
+            U32.pack(len(encoded))
+            + struct.pack(f"<{len(offsets)}I", *offsets)
+            + b"".join(encoded)
+        )
+        end = self._fp.tell()
+        self._fp.seek(self._start)
+        self._fp.write(
+            HEADER.pack(
+                COMPACT_SIGNATURE,
+                COMPACT_VERSION,
+                0,
+                root,
+                table,
+                self.total_keys,
+                self.total_values,
+                timestamp,
+            )
+        )
+        self._fp.seek(end)
+        return self._pos
+
+
+def write_compact(
+    source: Union[HiveSource, HiveNode],
+    file: Union[str, "os.PathLike[str]", IO[bytes]],
+    *,
+    timestamp: Optional[int] = None,
+) -> CompactWriteStats:
+    if timestamp is None:
+        timestamp = filetime_now()
+    node = _as_node(source)
+    if isinstance(file, (str, os.PathLike)):
+        with Path(file).open("wb") as fp:
+            writer = _CompactWriter(fp)
+            size = writer.write(node, timestamp)
+    else:
+        writer = _CompactWriter(file)
+        size = writer.write(node, timestamp)
+    return CompactWriteStats(
+        writer.total_keys, writer.total_values, writer.shared_blobs, size
+    )
+
+
+class CompactBackend:
+    def __init__(
+        self, file: Union[str, "os.PathLike[str]"], *, offset: int = 0
+    ) -> None:
+        with Path(file).open("rb") as fp:
+            try:
+                self._mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as exc:
+                raise HiveFormatError("file is empty") from exc
+        if not 0 <= offset <= len(self._mm) - HEADER.size:
+            self._mm.close()
+            raise HiveFormatError("file is smaller than the snapshot header")
+        (
+            signature,
+            version,
+            _,
+            root,
+            table,
+            total_keys,
+            total_values,
+            timestamp,
+        ) = HEADER.unpack_from(self._mm, offset)
+        if signature != COMPACT_SIGNATURE:
+            self._mm.close()
+            raise HiveFormatError("missing compact snapshot signature")
+        if version != COMPACT_VERSION:
+            self._mm.close()
+            raise HiveFormatError(f"unsupported compact snapshot version {version}")
+        self._filename = os.fspath(file)
+        self._base = offset
+        self._root: int = offset + root
+        self._total_keys: int = total_keys
+        self._total_values: int = total_values
+        self._timestamp: int = timestamp
+        table += offset
+        if table + U32.size > len(self._mm):
+            self._mm.close()
+            raise HiveFormatError("string table out of bounds")
+        self._names: int = U32.unpack_from(self._mm, table)[0]
+        self._offsets = table + U32.size
+        self._strings = self._offsets + U32.size * (self._names + 1)
+        if self._strings > len(self._mm):
+            self._mm.close()
+            raise HiveFormatError("string table out of bounds")
+
+    @property
+    def total_keys(self) -> int:
+        return self._total_keys
+
+    @property
+    def total_values(self) -> int:
+        return self._total_values
+
+    @property
+    def timestamp(self) -> int:
+        return self._timestamp
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def __enter__(self) -> "CompactBackend":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def _name(self, index: int) -> str:
+        if not 0 <= index < self._names:
+            raise HiveFormatError(f"string {index} out of bounds")
+        start, end = struct.unpack_from("<II", self._mm, self._offsets + U32.size * index)
+        start += self._strings
+        end += self._strings
+        if not start <= end <= len(self._mm):
+            raise HiveFormatError(f"string {index} out of bounds")
+        try:
+            return self._mm[start:end].decode("utf-8", errors="surrogatepass")
+        except UnicodeDecodeError as exc:
+            raise HiveFormatError(f"string {index} is not valid UTF-8") from exc
+
+    def _key(self, offset: int) -> tuple[int, int, int, int]:
+        if not self._base <= offset <= len(self._mm) - KEY.size:
+            raise HiveFormatError(f"key record {offset:#x} out of bounds")
+        record = KEY.unpack_from(self._mm, offset)
+        end = offset + KEY.size + SUBKEY.size * record[2] + VALUE.size * record[3]
+        if end > len(self._mm):
+            raise HiveFormatError(f"key record {offset:#x} out of bounds")
+        return record
+
+    def _subkey(self, offset: int, index: int) -> tuple[int, int]:
+        name, child = SUBKEY.unpack_from(
+            self._mm, offset + KEY.size + SUBKEY.size * index
+        )
+        return name, self._base + child
+
+    def _value(self, offset: int, subkeys: int, index: int) -> tuple[str, Any, int]:
+        name, dtype, data, size = VALUE.unpack_from(
+            self._mm, offset + KEY.size + SUBKEY.size * subkeys + VALUE.size * index
+        )
+        data += self._base
+        if data + size > len(self._mm):
+            raise HiveFormatError(f"value data {data:#x} out of bounds")
+        return self._name(name), decode_data(dtype, self._mm[data : data + size]), dtype
+
+    def _find_subkey(self, offset: int, count: int, name: str) -> Optional[int]:
+        wanted = sort_key(name)
+        upper = fold_case(name)
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            name_index, child = self._subkey(offset, middle)
+            candidate = self._name(name_index)
+            if fold_case(candidate) == upper:
+                return child
+            if sort_key(candidate) < wanted:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def _offset(self, key: Any) -> int:
+        if isinstance(key, HiveKeyHandle):
+            if key._closed:
+                exc = OSError(9, "The handle is invalid")
+                exc.winerror = 6  # type: ignore[attr-defined]
+                raise exc
+            return key.offset
+        return self._root
+
+    def OpenKeyEx(
+        self, key: Any, sub_key: str, reserved: int = 0, access: int = 0  # noqa: ARG002
+    ) -> HiveKeyHandle:
+        offset = self._offset(key)
+        for part in sub_key.split("\\") if sub_key else ():
+            if not part:
+                continue
+            found = self._find_subkey(offset, self._key(offset)[2], part)
+            if found is None:
+                raise _not_found()
+            offset = found
+        # Checked here so a corrupt record fails the open, not later reads.
+        self._key(offset)
+        return HiveKeyHandle(offset)
+
+    def CreateKeyEx(
+        self, key: Any, sub_key: str, reserved: int = 0, access: int = 0  # noqa: ARG002
+    ) -> HiveKeyHandle:
+        raise _read_only()
+
+    def CloseKey(self, hkey: Any) -> None:
+        if isinstance(hkey, HiveKeyHandle):
+            hkey.Close()
+
+    def EnumKey(self, key: Any, index: int) -> str:
+        offset = self._offset(key)
+        if not 0 <= index < self._key(offset)[2]:
+            raise _no_more_data()
+        return self._name(self._subkey(offset, index)[0])
+
+    def EnumValue(self, key: Any, index: int) -> tuple[str, Any, int]:
+        offset = self._offset(key)
+        _, _, subkeys, values = self._key(offset)
+        if not 0 <= index < values:
+            raise _no_more_data()
+        return self._value(offset, subkeys, index)
+
+    def QueryInfoKey(self, key: Any) -> tuple[int, int, int]:
+        _, last_modified, subkeys, values = self._key(self._offset(key))
+        return subkeys, values, last_modified
+
+    def QueryValueEx(self, key: Any, name: Optional[str]) -> tuple[Any, int]:
+        offset = self._offset(key)
+        _, _, subkeys, values = self._key(offset)
+        folded = fold_case(name or "")
+        base = offset + KEY.size + SUBKEY.size * subkeys
+        for index in range(values):
+            name_index = U32.unpack_from(self._mm, base + VALUE.size * index)[0]
+            if fold_case(self._name(name_index)) == folded:
+                _, data, dtype = self._value(offset, subkeys, index)
+                return data, dtype
+        raise _not_found()
+
+    def SetValueEx(
+        self, key: Any, value_name: Optional[str], reserved: int, type: int, value: Any  # noqa: ARG002
+    ) -> None:
+        raise _read_only()
+
+    def DeleteKeyEx(
+        self, key: Any, sub_key: str, access: int = 0, reserved: int = 0  # noqa: ARG002
+    ) -> None:
+        raise _read_only()
+
+    def DeleteValue(self, key: Any, value: Optional[str]) -> None:  # noqa: ARG002
+        raise _read_only()
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}: {self._filename!r}>"
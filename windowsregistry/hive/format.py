@@ -0,0 +1,153 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import struct
+from typing import Final
+
+from ..regpath import fold_case
+
+REGF_SIGNATURE: Final[bytes] = b"regf"
+HBIN_SIGNATURE: Final[bytes] = b"hbin"
+BASE_BLOCK_SIZE: Final[int] = 0x1000
+HBIN_ALIGNMENT: Final[int] = 0x1000
+HBIN_HEADER_SIZE: Final[int] = 0x20
+CELL_ALIGNMENT: Final[int] = 8
+# Data larger than this is split into "db" segments (hive format 1.4+).
+BIG_DATA_SEGMENT_SIZE: Final[int] = 16344
+# The top bit of a vk data size marks data stored inline in the offset field.
+VK_DATA_INLINE: Final[int] = 0x80000000
+NO_CELL: Final[int] = 0xFFFFFFFF
+
+KEY_HIVE_EXIT: Final[int] = 0x0002
+KEY_HIVE_ENTRY: Final[int] = 0x0004
+KEY_NO_DELETE: Final[int] = 0x0008
+KEY_COMP_NAME: Final[int] = 0x0020
+VALUE_COMP_NAME: Final[int] = 0x0001
+
+# signature, primary seq, secondary seq, last written, major, minor, file type,
+# file format, root cell, hive bins size, clustering factor
+BASE_BLOCK = struct.Struct("<4sIIQIIIIIII")
+BASE_BLOCK_FILENAME_OFFSET: Final[int] = 0x30
+BASE_BLOCK_CHECKSUM_OFFSET: Final[int] = 0x1FC
+# signature, offset, size, reserved, timestamp, spare
+HBIN = struct.Struct("<4sIIQQI")
+CELL_SIZE = struct.Struct("<i")
+# signature, flags, last written, access bits, parent, subkeys, volatile subkeys,
+# subkeys list, volatile subkeys list, values, values list, security, class,
+# largest subkey name, largest subkey class, largest value name,
+# largest value data, workvar, name length, class length
+NK = struct.Struct("<2sHQIIIIIIIIIIIIIIIHH")
+# signature, name length, data size, data offset, data type, flags, spare
+VK = struct.Struct("<2sHIIIHH")
+# signature, count
+LIST_HEADER = struct.Struct("<2sH")
+# signature, segments, segments list
+DB = struct.Struct("<2sHI")
+# signature, reserved, flink, blink, reference count, descriptor size
+SK = struct.Struct("<2sHIIII")
+U32 = struct.Struct("<I")
+LH_ELEMENT = struct.Struct("<II")
+
+
+def lh_hash(name: str) -> int:
+    h = 0
+    raw = fold_case(name).encode("utf-16-le", errors="surrogatepass")
+    for (unit,) in struct.iter_unpack("<H", raw):
+        h = (h * 37 + unit) & 0xFFFFFFFF
+    return h
+
+
+def sort_key(name: str) -> bytes:
+    return fold_case(name).encode("utf-16-be", errors="surrogatepass")
+
+
+def base_block_checksum(block: bytes) -> int:
+    checksum = 0
+    for (dword,) in struct.iter_unpack("<I", block[:BASE_BLOCK_CHECKSUM_OFFSET]):
+        checksum ^= dword
+    if checksum == 0xFFFFFFFF:
+        return 0xFFFFFFFE
+    if checksum == 0:
+        return 1
+    return checksum
+
+
+def decode_name(raw: bytes, compressed: bool) -> str:
+    if compressed:
+        return raw.decode("latin-1")
+    return raw.decode("utf-16-le", errors="surrogatepass")
+
+
+def encode_name(name: str) -> tuple[bytes, bool]:
+    try:
+        return name.encode("latin-1"), True
+    except UnicodeEncodeError:
+        return name.encode("utf-16-le", errors="surrogatepass"), False
+
+
+REG_SZ: Final[int] = 1
+REG_EXPAND_SZ: Final[int] = 2
+REG_DWORD: Final[int] = 4
+REG_DWORD_BIG_ENDIAN: Final[int] = 5
+REG_MULTI_SZ: Final[int] = 7
+REG_QWORD: Final[int] = 11
+
+
+def _utf16(raw: bytes) -> str:
+    return raw[: len(raw) & ~1].decode("utf-16-le", errors="surrogatepass")
+
+
+def decode_data(dtype: int, raw: bytes) -> object:
+    if dtype in (REG_SZ, REG_EXPAND_SZ):
+        return _utf16(raw).split("\0", 1)[0]
+    if dtype == REG_MULTI_SZ:
+        result: list[str] = []
+        for item in _utf16(raw).split("\0"):
+            if not item:
+                break
+            result.append(item)
+        return result
+    if dtype == REG_DWORD:
+        return int.from_bytes(raw[:4], "little")
+    if dtype == REG_QWORD:
+        return int.from_bytes(raw[:8], "little")
+    return bytes(raw) or None
+
+
+def encode_data(dtype: int, data: object) -> bytes:
+    if data is None:
+        return b""
+    if dtype in (REG_SZ, REG_EXPAND_SZ):
+        return (str(data) + "\0").encode("utf-16-le", errors="surrogatepass")
+    if dtype == REG_MULTI_SZ:
+        items: list[str] = list(data)  # type: ignore[call-overload]
+        text = "".join(item + "\0" for item in items) + "\0"
+        return text.encode("utf-16-le", errors="surrogatepass")
+    if isinstance(data, int):
+        if dtype == REG_QWORD:
+            return data.to_bytes(8, "little")
+        return data.to_bytes(4, "big" if dtype == REG_DWORD_BIG_ENDIAN else "little")
+    return bytes(memoryview(data))  # type: ignore[arg-type]
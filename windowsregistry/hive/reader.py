@@ -0,0 +1,356 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import mmap
+import os
+from pathlib import Path
+from typing import Any, Optional, Union
+
+from ..errors import HiveFormatError
+from ..regpath import fold_case
+from .format import (
+    BASE_BLOCK,
+    BASE_BLOCK_SIZE,
+    BIG_DATA_SEGMENT_SIZE,
+    CELL_SIZE,
+    DB,
+    KEY_COMP_NAME,
+    LH_ELEMENT,
+    LIST_HEADER,
+    NK,
+    NO_CELL,
+    REGF_SIGNATURE,
+    U32,
+    VALUE_COMP_NAME,
+    VK,
+    VK_DATA_INLINE,
+    decode_data,
+    decode_name,
+    lh_hash,
+)
+
+
+def _read_only() -> OSError:
+    exc = PermissionError(13, "Access is denied")
+    exc.winerror = 5  # type: ignore[attr-defined]
+    return exc
+
+
+def _not_found() -> OSError:
+    exc = FileNotFoundError(2, "The system cannot find the file specified")
+    exc.winerror = 2  # type: ignore[attr-defined]
+    return exc
+
+
+def _no_more_data() -> OSError:
+    exc = OSError(61, "No more data is available")
+    exc.winerror = 259  # type: ignore[attr-defined]
+    return exc
+
+
+class HiveKeyHandle:
+    __slots__ = ("offset", "_closed")
+
+    def __init__(self, offset: int) -> None:
+        self.offset = offset
+        self._closed = False
+
+    @property
+    def handle(self) -> int:
+        return 0 if self._closed else self.offset
+
+    def Close(self) -> None:
+        self._closed = True
+
+    def Detach(self) -> int:
+        handle = self.handle
+        self._closed = True
+        return handle
+
+    def __bool__(self) -> bool:
+        return not self._closed
+
+    def __enter__(self) -> "HiveKeyHandle":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.Close()
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}: cell {self.offset:#x}>"
+
+
+class HiveBackend:
+    def __init__(self, file: Union[str, "os.PathLike[str]"]) -> None:
+        with Path(file).open("rb") as fp:
+            try:
+                self._mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as exc:
+                raise HiveFormatError("file is empty") from exc
+        if len(self._mm) < BASE_BLOCK_SIZE:
+            self._mm.close()
+            raise HiveFormatError("file is smaller than the base block")
+        (
+            signature,
+            primary_seq,
+            secondary_seq,
+            last_written,
+            major,
+            minor,
+            _,
+            _,
+            root,
+            bins_size,
+            _,
+        ) = BASE_BLOCK.unpack_from(self._mm, 0)
+        if signature != REGF_SIGNATURE:
+            self._mm.close()
+            raise HiveFormatError("missing regf signature")
+        self._filename = os.fspath(file)
+        self._dirty = primary_seq != secondary_seq
+        self._last_written: int = last_written
+        self._version: tuple[int, int] = (major, minor)
+        self._root: int = root
+        self._end = min(len(self._mm), BASE_BLOCK_SIZE + bins_size)
+        if self._nk(root)[0] != b"nk":
+            self._mm.close()
+            raise HiveFormatError("root cell is not a key node")
+
+    @property
+    def version(self) -> tuple[int, int]:
+        return self._version
+
+    @property
+    def last_written(self) -> int:
+        return self._last_written
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def __enter__(self) -> "HiveBackend":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def _cell(self, offset: int) -> tuple[int, int]:
+        pos = BASE_BLOCK_SIZE + offset
+        if offset == NO_CELL or pos + 4 > self._end:
+            raise HiveFormatError(f"cell offset {offset:#x} out of bounds")
+        size = -CELL_SIZE.unpack_from(self._mm, pos)[0]
+        if size < 4 or pos + size > self._end:
+            raise HiveFormatError(f"cell at {offset:#x} is not allocated")
+        return pos + 4, size - 4
+
+    def _nk(self, offset: int) -> tuple[Any, ...]:
+        pos, _ = self._cell(offset)
+        fields = NK.unpack_from(self._mm, pos)
+        if fields[0] != b"nk":
+            raise HiveFormatError(f"cell at {offset:#x} is not a key node")
+        return fields
+
+    def _key_name(self, offset: int) -> str:
+        pos, _ = self._cell(offset)
+        fields = NK.unpack_from(self._mm, pos)
+        start = pos + NK.size
+        return decode_name(
+            self._mm[start : start + fields[18]], bool(fields[1] & KEY_COMP_NAME)
+        )
+
+    def _list(self, offset: int) -> tuple[bytes, int, int]:
+        pos, _ = self._cell(offset)
+        signature, count = LIST_HEADER.unpack_from(self._mm, pos)
+        return signature, count, pos + LIST_HEADER.size
+
+    def _find_subkey(self, offset: int, upper: str, name_hash: int) -> Optional[int]:
+        signature, count, pos = self._list(offset)
+        mm = self._mm
+        if signature == b"ri":
+            for (sub,) in U32.iter_unpack(mm[pos : pos + 4 * count]):
+                found = self._find_subkey(sub, upper, name_hash)
+                if found is not None:
+                    return found
+        elif signature == b"lh":
+            for child, child_hash in LH_ELEMENT.iter_unpack(mm[pos : pos + 8 * count]):
+                if (
+                    child_hash == name_hash
+                    and fold_case(self._key_name(child)) == upper
+                ):
+                    return child
+        elif signature == b"lf":
+            hint = upper[:4]
+            for index in range(count):
+                element = pos + 8 * index
+                child_hint = mm[element + 4 : element + 8].rstrip(b"\0")
+                if fold_case(child_hint.decode("latin-1")) != hint[: len(child_hint)]:
+                    continue
+                child = U32.unpack_from(mm, element)[0]
+                if fold_case(self._key_name(child)) == upper:
+                    return child
+        elif signature == b"li":
+            for (child,) in U32.iter_unpack(mm[pos : pos + 4 * count]):
+                if fold_case(self._key_name(child)) == upper:
+                    return child
+        else:
+            raise HiveFormatError(f"unknown subkey list {signature!r}")
+        return None
+
+    def _subkey_at(self, offset: int, index: int) -> int:
+        signature, count, pos = self._list(offset)
+        if signature == b"ri":
+            for (sub,) in U32.iter_unpack(self._mm[pos : pos + 4 * count]):
+                sub_count = self._list(sub)[1]
+                if index < sub_count:
+                    return self._subkey_at(sub, index)
+                index -= sub_count
+        elif index < count:
+            if signature in (b"lh", b"lf"):
+                return U32.unpack_from(self._mm, pos + 8 * index)[0]
+            if signature == b"li":
+                return U32.unpack_from(self._mm, pos + 4 * index)[0]
+            raise HiveFormatError(f"unknown subkey list {signature!r}")
+        raise _no_more_data()
+
+    def _value_at(self, nk: tuple[Any, ...], index: int) -> int:
+        if not 0 <= index < nk[9]:
+            raise _no_more_data()
+        pos, _ = self._cell(nk[10])
+        return U32.unpack_from(self._mm, pos + 4 * index)[0]
+
+    def _value_name(self, offset: int) -> tuple[int, str]:
+        pos, _ = self._cell(offset)
+        signature, name_length, _, _, _, flags, _ = VK.unpack_from(self._mm, pos)
+        if signature != b"vk":
+            raise HiveFormatError(f"cell at {offset:#x} is not a value")
+        start = pos + VK.size
+        raw = self._mm[start : start + name_length]
+        return pos, decode_name(raw, bool(flags & VALUE_COMP_NAME))
+
+    def _value_data(self, pos: int) -> tuple[Any, int]:
+        _, _, size, data_offset, dtype, _, _ = VK.unpack_from(self._mm, pos)
+        if size & VK_DATA_INLINE:
+            length = min(size & ~VK_DATA_INLINE, 4)
+            return decode_data(dtype, self._mm[pos + 8 : pos + 8 + length]), dtype
+        if size == 0:
+            return decode_data(dtype, b""), dtype
+        data_pos, cell_size = self._cell(data_offset)
+        if (
+            size > BIG_DATA_SEGMENT_SIZE
+            and self._version >= (1, 4)
+            and self._mm[data_pos : data_pos + 2] == b"db"
+        ):
+            _, segments, segments_list = DB.unpack_from(self._mm, data_pos)
+            list_pos, _ = self._cell(segments_list)
+            chunks: list[bytes] = []
+            remaining = size
+            for (segment,) in U32.iter_unpack(
+                self._mm[list_pos : list_pos + 4 * segments]
+            ):
+                segment_pos, _ = self._cell(segment)
+                take = min(remaining, BIG_DATA_SEGMENT_SIZE)
+                chunks.append(self._mm[segment_pos : segment_pos + take])
+                remaining -= take
+            return decode_data(dtype, b"".join(chunks)), dtype
+        return decode_data(dtype, self._mm[data_pos : data_pos + min(size, cell_size)]), dtype
+
+    def _offset(self, key: Any) -> int:
+        if isinstance(key, HiveKeyHandle):
+            if key._closed:
+                exc = OSError(9, "The handle is invalid")
+                exc.winerror = 6  # type: ignore[attr-defined]
+                raise exc
+            return key.offset
+        return self._root
+
+    def OpenKeyEx(
+        self, key: Any, sub_key: str, reserved: int = 0, access: int = 0  # noqa: ARG002
+    ) -> HiveKeyHandle:
+        offset = self._offset(key)
+        for part in sub_key.split("\\") if sub_key else ():
+            if not part:
+                continue
+            nk = self._nk(offset)
+            if nk[5] == 0:
+                raise _not_found()
+            found = self._find_subkey(nk[7], fold_case(part), lh_hash(part))
+            if found is None:
+                raise _not_found()
+            offset = found
+        return HiveKeyHandle(offset)
+
+    def CreateKeyEx(
+        self, key: Any, sub_key: str, reserved: int = 0, access: int = 0  # noqa: ARG002
+    ) -> HiveKeyHandle:
+        raise _read_only()
+
+    def CloseKey(self, hkey: Any) -> None:
+        if isinstance(hkey, HiveKeyHandle):
+            hkey.Close()
+
+    def EnumKey(self, key: Any, index: int) -> str:
+        nk = self._nk(self._offset(key))
+        if not 0 <= index < nk[5]:
+            raise _no_more_data()
+        return self._key_name(self._subkey_at(nk[7], index))
+
+    def EnumValue(self, key: Any, index: int) -> tuple[str, Any, int]:
+        nk = self._nk(self._offset(key))
+        pos, name = self._value_name(self._value_at(nk, index))
+        data, dtype = self._value_data(pos)
+        return name, data, dtype
+
+    def QueryInfoKey(self, key: Any) -> tuple[int, int, int]:
+        nk = self._nk(self._offset(key))
+        return nk[5], nk[9], nk[2]
+
+    def QueryValueEx(self, key: Any, name: Optional[str]) -> tuple[Any, int]:
+        nk = self._nk(self._offset(key))
+        folded = fold_case(name or "")
+        for index in range(nk[9]):
+            pos, value_name = self._value_name(self._value_at(nk, index))
+            if fold_case(value_name) == folded:
+                return self._value_data(pos)
+        raise _not_found()
+
+    def SetValueEx(
+        self, key: Any, value_name: Optional[str], reserved: int, type: int, value: Any  # noqa: ARG002
+    ) -> None:
+        raise _read_only()
+
+    def DeleteKeyEx(
+        self, key: Any, sub_key: str, access: int = 0, reserved: int = 0  # noqa: ARG002
+    ) -> None:
+        raise _read_only()
+
+    def DeleteValue(self, key: Any, value: Optional[str]) -> None:  # noqa: ARG002
+        raise _read_only()
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}: {self._filename!r}>"
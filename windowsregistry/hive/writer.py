@@ -0,0 +1,364 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import hashlib
+import os
+import struct
+from pathlib import Path
+from typing import IO, Any, Iterable, NamedTuple, Optional, Union
+
+from ..backends.memory import MemoryKey, filetime_now
+from ..core import RegistryPath
+from .format import (
+    BASE_BLOCK,
+    BASE_BLOCK_CHECKSUM_OFFSET,
+    BASE_BLOCK_FILENAME_OFFSET,
+    BASE_BLOCK_SIZE,
+    BIG_DATA_SEGMENT_SIZE,
+    CELL_ALIGNMENT,
+    CELL_SIZE,
+    DB,
+    HBIN,
+    HBIN_ALIGNMENT,
+    HBIN_HEADER_SIZE,
+    KEY_COMP_NAME,
+    KEY_HIVE_ENTRY,
+    KEY_NO_DELETE,
+    LH_ELEMENT,
+    LIST_HEADER,
+    NK,
+    NO_CELL,
+    REGF_SIGNATURE,
+    SK,
+    U32,
+    VALUE_COMP_NAME,
+    VK,
+    VK_DATA_INLINE,
+    base_block_checksum,
+    encode_data,
+    encode_name,
+    lh_hash,
+    sort_key,
+)
+
+HiveSource = Union[RegistryPath, MemoryKey]
+
+# Windows starts splitting a subkey index into an "ri" of leaves past this size.
+MAX_LEAF_ELEMENTS = 511
+
+
+class HiveNode(NamedTuple):
+    name: str
+    last_modified: int
+    values: Iterable[tuple[str, Any, int]]
+    subkeys: Iterable["HiveNode"]
+
+
+class HiveWriteStats(NamedTuple):
+    total_keys: int
+    total_values: int
+    shared_data_cells: int
+    hive_size: int
+
+
+def _sid(authority: int, *subauthorities: int) -> bytes:
+    return (
+        bytes([1, len(subauthorities)])
+        + authority.to_bytes(6, "big")
+        + b"".join(sub.to_bytes(4, "little") for sub in subauthorities)
+    )
+
+
+def _default_security_descriptor() -> bytes:
+    # O:BA G:SY D:(A;CI;KA;;;BA)(A;CI;KA;;;SY)(A;CI;KR;;;BU)
+    administrators = _sid(5, 32, 544)
+    system = _sid(5, 18)
+    users = _sid(5, 32, 545)
+    aces = b""
+    for mask, sid in ((0xF003F, administrators), (0xF003F, system), (0x20019, users)):
+        aces += struct.pack("<BBHI", 0, 0x02, 8 + len(sid), mask) + sid
+    dacl = struct.pack("<BBHHH", 2, 0, 8 + len(aces), 3, 0) + aces
+    header_size = 20
+    owner = header_size + len(dacl)
+    group = owner + len(administrators)
+    header = struct.pack("<BBHIIII", 1, 0, 0x8004, owner, group, 0, header_size)
+    return header + dacl + administrators + system
+
+
+def _node_from_regpath(path: RegistryPath) -> HiveNode:
+    return HiveNode(
+        path.regpath.name,
+        path.query_info.last_modified,
+        ((v.value_name, v.data, v.dtype.value) for v in path.values()),
+        (_node_from_regpath(sub) for sub in path.subkeys()),
+    )
+
+
+def _node_from_memory(key: MemoryKey) -> HiveNode:
+    return HiveNode(
+        key.name,
+        key.last_modified,
+        key.value_order(),
+        (_node_from_memory(sub) for sub in key.subkey_order()),
+    )
+
+
+def _as_node(source: Union[HiveSource, HiveNode]) -> HiveNode:
+    if isinstance(source, HiveNode):
+        return source
+    if isinstance(source, RegistryPath):
+        return _node_from_regpath(source)
+    return _node_from_memory(source)
+
+
+def _round_up(size: int, alignment: int) -> int:
+    return (size + alignment - 1) & ~(alignment - 1)
+
+
+class _HiveWriter:
+    def __init__(self, fp: IO[bytes], timestamp: int) -> None:
+        self._fp = fp
+        self._start = fp.tell()
+        self._timestamp = timestamp
+        self._bin = bytearray()
+        self._bin_offset = 0
+        self._bin_size = 0
+        self._shared: dict[bytes, int] = {}
+        self.total_keys = 0
+        self.total_values = 0
+        self.shared_data_cells = 0
+        fp.write(bytes(BASE_BLOCK_SIZE))
+
+    @property
+    def bins_size(self) -> int:
+        return self._bin_offset + self._bin_size
+
+    def _flush_bin(self) -> None:
+        if not self._bin_size:
+            return
+        free = self._bin_size - len(self._bin)
+        if free:
+            self._bin += CELL_SIZE.pack(free) + bytes(free - CELL_SIZE.size)
+        self._fp.write(self._bin)
+        self._bin_offset += self._bin_size
+        self._bin = bytearray()
+        self._bin_size = 0
+
+    def _new_bin(self, cell_size: int) -> None:
+        self._flush_bin()
+        self._bin_size = _round_up(HBIN_HEADER_SIZE + cell_size, HBIN_ALIGNMENT)
+        self._bin = bytearray(
+            HBIN.pack(b"hbin", self._bin_offset, self._bin_size, 0, self._timestamp, 0)
+        )
+
+    def alloc(self, payload: bytes) -> int:
+        size = _round_up(CELL_SIZE.size + len(payload), CELL_ALIGNMENT)
+        if len(self._bin) + size > self._bin_size:
+            self._new_bin(size)
+        offset = self._bin_offset + len(self._bin)
+        self._bin += CELL_SIZE.pack(-size) + payload
+        self._bin += bytes(size - CELL_SIZE.size - len(payload))
+        return offset
+
+    def patch(self, offset: int, payload: bytes) -> None:
+        pos = offset + CELL_SIZE.size - self._bin_offset
+        if pos >= 0:
+            self._bin[pos : pos + len(payload)] = payload
+            return
+        self._fp.seek(self._start + BASE_BLOCK_SIZE + offset + CELL_SIZE.size)
+        self._fp.write(payload)
+        self._fp.seek(0, os.SEEK_END)
+
+    def _data_cell(self, raw: bytes) -> int:
+        digest = hashlib.blake2b(raw, digest_size=16).digest()
+        offset = self._shared.get(digest)
+        if offset is not None:
+            self.shared_data_cells += 1
+            return offset
+        if len(raw) > BIG_DATA_SEGMENT_SIZE:
+            segments = [
+                self.alloc(raw[i : i + BIG_DATA_SEGMENT_SIZE])
+                for i in range(0, len(raw), BIG_DATA_SEGMENT_SIZE)
+            ]
+            segments_list = self.alloc(b"".join(map(U32.pack, segments)))
+            offset = self.alloc(DB.pack(b"db", len(segments), segments_list))
+        else:
+            offset = self.alloc(raw)
+        self._shared[digest] = offset
+        return offset
+
+    def _value(self, name: str, dtype: int, raw: bytes) -> int:
+        raw_name, compressed = encode_name(name)
+        flags = VALUE_COMP_NAME if compressed else 0
+        if len(raw) <= 4:
+            size = len(raw) | VK_DATA_INLINE
+            data = U32.unpack(raw.ljust(4, b"\0"))[0]
+        else:
+            size = len(raw)
+            data = self._data_cell(raw)
+        self.total_values += 1
+        return self.alloc(VK.pack(b"vk", len(raw_name), size, data, dtype, flags, 0) + raw_name)
+
+    def _leaf(self, entries: list[tuple[bytes, int, int]]) -> int:
+        return self.alloc(
+            LIST_HEADER.pack(b"lh", len(entries))
+            + b"".join(LH_ELEMENT.pack(offset, h) for _, offset, h in entries)
+        )
+
+    def _subkey_index(self, entries: list[tuple[bytes, int, int]]) -> int:
+        if not entries:
+            return NO_CELL
+        entries.sort()
+        if len(entries) <= MAX_LEAF_ELEMENTS:
+            return self._leaf(entries)
+        leaves = [
+            self._leaf(entries[i : i + MAX_LEAF_ELEMENTS])
+            for i in range(0, len(entries), MAX_LEAF_ELEMENTS)
+        ]
+        return self.alloc(
+            LIST_HEADER.pack(b"ri", len(leaves)) + b"".join(map(U32.pack, leaves))
+        )
+
+    def _reserve_key(self, node: HiveNode) -> int:
+        raw_name, _ = encode_name(node.name)
+        return self.alloc(bytes(NK.size + len(raw_name)))
+
+    def key(
+        self, node: HiveNode, parent: int, security: int, offset: Optional[int] = None
+    ) -> int:
+        raw_name, compressed = encode_name(node.name)
+        root = offset is not None
+        if offset is None:
+            offset = self._reserve_key(node)
+        self.total_keys += 1
+
+        values: list[int] = []
+        max_value_name = max_value_data = 0
+        for name, data, dtype in node.values:
+            raw = encode_data(dtype, data)
+            values.append(self._value(name, dtype, raw))
+            max_value_name = max(max_value_name, len(name) * 2)
+            max_value_data = max(max_value_data, len(raw))
+        values_list = self.alloc(b"".join(map(U32.pack, values))) if values else NO_CELL
+
+        entries: list[tuple[bytes, int, int]] = []
+        max_subkey_name = 0
+        for sub in node.subkeys:
+            sub_offset = self.key(sub, offset, security)
+            entries.append((sort_key(sub.name), sub_offset, lh_hash(sub.name)))
+            max_subkey_name = max(max_subkey_name, len(sub.name) * 2)
+        subkeys_list = self._subkey_index(entries)
+
+        flags = KEY_COMP_NAME if compressed else 0
+        if root:
+            flags |= KEY_HIVE_ENTRY | KEY_NO_DELETE
+        self.patch(
+            offset,
+            NK.pack(
+                b"nk",
+                flags,
+                node.last_modified,
+                0,
+                parent,
+                len(entries),
+                0,
+                subkeys_list,
+                NO_CELL,
+                len(values),
+                values_list,
+                security,
+                NO_CELL,
+                max_subkey_name,
+                0,
+                max_value_name,
+                max_value_data,
+                0,
+                len(raw_name),
+                0,
+            )
+            + raw_name,
+        )
+        return offset
+
+    def write(self, node: HiveNode, hive_name: str) -> int:
+        # Tools commonly expect the root key to be the first cell of the first bin.
+        root = self._reserve_key(node)
+        descriptor = _default_security_descriptor()
+        security = self.alloc(SK.pack(b"sk", 0, 0, 0, 0, len(descriptor)) + descriptor)
+        self.key(node, NO_CELL, security, root)
+        self.patch(
+            security,
+            SK.pack(b"sk", 0, security, security, self.total_keys, len(descriptor)),
+        )
+        self._flush_bin()
+
+        base = bytearray(BASE_BLOCK_SIZE)
+        BASE_BLOCK.pack_into(
+            base,
+            0,
+            REGF_SIGNATURE,
+            1,
+            1,
+            self._timestamp,
+            1,
+            5,
+            0,
+            1,
+            root,
+            self.bins_size,
+            1,
+        )
+        filename = hive_name[-31:].encode("utf-16-le")
+        base[BASE_BLOCK_FILENAME_OFFSET : BASE_BLOCK_FILENAME_OFFSET + len(filename)] = filename
+        U32.pack_into(base, BASE_BLOCK_CHECKSUM_OFFSET, base_block_checksum(bytes(base)))
+        end = self._fp.tell()
+        self._fp.seek(self._start)
+        self._fp.write(base)
+        self._fp.seek(end)
+        return BASE_BLOCK_SIZE + self.bins_size
+
+
+def write_hive(
+    source: Union[HiveSource, HiveNode],
+    file: Union[str, "os.PathLike[str]", IO[bytes]],
+    *,
+    timestamp: Optional[int] = None,
+) -> HiveWriteStats:
+    if timestamp is None:
+        timestamp = filetime_now()
+    node = _as_node(source)
+    if isinstance(file, (str, os.PathLike)):
+        hive_name = Path(file).name
+        with Path(file).open("wb") as fp:
+            writer = _HiveWriter(fp, timestamp)
+            size = writer.write(node, hive_name)
+    else:
+        name = getattr(file, "name", "")
+        writer = _HiveWriter(file, timestamp)
+        size = writer.write(node, Path(name).name if isinstance(name, str) else "")
+    return HiveWriteStats(
+        writer.total_keys, writer.total_values, writer.shared_data_cells, size
+    )
@@ -0,0 +1,405 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import os
+import sqlite3
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Union,
+    cast,
+)
+
+from ._walk import KeyFrame, report_open_error, walk_keys
+from .errors import RegistryPathError, WindowsRegistryError
+from .hive.format import decode_data, encode_data
+from .models import RegistryValue, RegistryValueType
+from .regpath import REGISTRY_SEP, RegistryPathString, fold_case
+from .search import FindMatch
+
+if TYPE_CHECKING:
+    from .core import RegistryPath
+
+SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS keys (
+    id INTEGER PRIMARY KEY,
+    parent INTEGER,
+    name TEXT NOT NULL,
+    name_folded TEXT NOT NULL,
+    fullpath TEXT NOT NULL,
+    fullpath_folded TEXT NOT NULL,
+    last_modified INTEGER NOT NULL,
+    total_subkeys INTEGER NOT NULL,
+    total_values INTEGER NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS keys_by_parent ON keys (parent, name_folded);
+CREATE INDEX IF NOT EXISTS keys_by_name ON keys (name_folded);
+CREATE UNIQUE INDEX IF NOT EXISTS keys_by_fullpath ON keys (fullpath_folded);
+CREATE TABLE IF NOT EXISTS "values" (
+    key_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    name_folded TEXT NOT NULL,
+    dtype INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    text TEXT
+);
+CREATE INDEX IF NOT EXISTS values_by_key ON "values" (key_id);
+CREATE INDEX IF NOT EXISTS values_by_name ON "values" (name_folded);
+CREATE INDEX IF NOT EXISTS values_by_text ON "values" (text);
+"""
+
+# Upper bound for prefix range scans over case-folded text columns.
+_PREFIX_END = "\U0010ffff"
+
+
+class IndexStats(NamedTuple):
+    total_keys: int
+    read_keys: int
+    added_keys: int
+    removed_keys: int
+
+
+class _Row(NamedTuple):
+    id: int
+    name: str
+    last_modified: int
+    total_subkeys: int
+    total_values: int
+
+
+def _text(data: Any) -> Optional[str]:
+    # Searchable form of the data: strings as they are, integers in decimal
+    # and REG_MULTI_SZ items joined by newlines; binary data has none.
+    if isinstance(data, str):
+        return data
+    if isinstance(data, int):
+        return str(data)
+    if isinstance(data, list):
+        items = cast("list[Any]", data)
+        return "\n".join(item for item in items if isinstance(item, str))
+    return None
+
+
+class RegistryIndex:
+    def __init__(self, database: Union[str, "os.PathLike[str]"] = ":memory:") -> None:
+        self._db = sqlite3.connect(os.fspath(database))
+        self._db.executescript(_SCHEMA)
+        version = self._meta("version")
+        if version is None:
+            with self._db:
+                self._set_meta("version", str(SCHEMA_VERSION))
+        elif int(version) != SCHEMA_VERSION:
+            self._db.close()
+            raise ValueError(
+                f"index schema {version} is not supported (expected {SCHEMA_VERSION})"
+            )
+
+    def _meta(self, name: str) -> Optional[str]:
+        row = self._db.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row is not None else None
+
+    def _set_meta(self, name: str, value: str) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, value)
+        )
+
+    @property
+    def root(self) -> Optional[RegistryPathString]:
+        fullpath = self._meta("root")
+        return RegistryPathString(fullpath) if fullpath is not None else None
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM keys").fetchone()[0]
+
+    # refreshing
+
+    def refresh(
+        self,
+        path: "RegistryPath",
+        *,
+        onerror: Optional[Callable[[WindowsRegistryError], None]] = None,
+    ) -> IndexStats:
+        # Every key is queried, but subkeys and values are only re-read for
+        # keys whose last-write time or counts differ from the index; the
+        # subkey names of unchanged keys come from the index itself.
+        with self._db:
+            root = path.regpath
+            if self._meta("root") != root.fullpath:
+                self._db.execute("DELETE FROM keys")
+                self._db.execute('DELETE FROM "values"')
+                self._set_meta("root", root.fullpath)
+            return _Refresh(self._db, path, onerror).run()
+
+    # queries
+
+    def _paths(self, sql: str, params: tuple[Any, ...]) -> Iterator[RegistryPathString]:
+        for (fullpath,) in self._db.execute(sql, params):
+            yield RegistryPathString(fullpath)
+
+    def keys(
+        self, *, name: Optional[str] = None, prefix: Optional[str] = None
+    ) -> Iterator[RegistryPathString]:
+        # `name` matches key names exactly and `prefix` full key paths (root
+        # abbreviations allowed), both case-insensitively.
+        sql = "SELECT fullpath FROM keys"
+        where, params = self._key_filter(name, prefix)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        return self._paths(sql + " ORDER BY fullpath_folded", tuple(params))
+
+    def _key_filter(
+        self, name: Optional[str], prefix: Optional[str], column: str = ""
+    ) -> tuple[list[str], list[Any]]:
+        where: list[str] = []
+        params: list[Any] = []
+        if name is not None:
+            where.append(f"{column}name_folded = ?")
+            params.append(fold_case(name))
+        if prefix is not None:
+            try:
+                folded = fold_case(RegistryPathString(prefix).fullpath)
+            except RegistryPathError:
+                folded = fold_case(prefix)
+            where.append(f"{column}fullpath_folded >= ? AND {column}fullpath_folded < ?")
+            params.extend((folded, folded + _PREFIX_END))
+        return where, params
+
+    def values(  # noqa: PLR0913
+        self,
+        *,
+        name: Optional[str] = None,
+        data: Optional[str] = None,
+        data_prefix: Optional[str] = None,
+        dtype: Optional[RegistryValueType] = None,
+        key: Optional[str] = None,
+        prefix: Optional[str] = None,
+    ) -> Iterator[FindMatch]:
+        # `data` and `data_prefix` match the text form of the data (case
+        # sensitive, REG_MULTI_SZ items joined by newlines); `key` and
+        # `prefix` restrict the keys like keys() does.
+        where, params = self._key_filter(key, prefix, "k.")
+        if name is not None:
+            where.append("v.name_folded = ?")
+            params.append(fold_case(name))
+        if data is not None:
+            where.append("v.text = ?")
+            params.append(data)
+        if data_prefix is not None:
+            where.append("v.text >= ? AND v.text < ?")
+            params.extend((data_prefix, data_prefix + _PREFIX_END))
+        if dtype is not None:
+            where.append("v.dtype = ?")
+            params.append(dtype.value)
+        sql = (
+            'SELECT k.fullpath, v.name, v.dtype, v.data FROM "values" v '
+            "JOIN keys k ON k.id = v.key_id"
+        )
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY k.fullpath_folded, v.name_folded"
+        for fullpath, value_name, value_dtype, raw in self._db.execute(sql, params):
+            yield FindMatch(
+                RegistryPathString(fullpath),
+                RegistryValue(
+                    value_name,
+                    decode_data(value_dtype, raw),
+                    RegistryValueType(value_dtype),
+                ),
+            )
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self) -> "RegistryIndex":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        root = self._meta("root")
+        return f"<{self.__class__.__name__}: {root or 'empty'}>"
+
+
+class _Refresh:
+    def __init__(
+        self,
+        db: sqlite3.Connection,
+        path: "RegistryPath",
+        onerror: Optional[Callable[[WindowsRegistryError], None]],
+    ) -> None:
+        self._db = db
+        self._path = path
+        self._ll = path._backend._ll
+        self._onerror = onerror
+        self.total = self.read = self.added = self.removed = 0
+
+    def _rows(self, parent: Optional[int]) -> dict[str, _Row]:
+        cursor = self._db.execute(
+            "SELECT id, name, last_modified, total_subkeys, total_values FROM keys "
+            + ("WHERE parent IS NULL" if parent is None else "WHERE parent = ?"),
+            () if parent is None else (parent,),
+        )
+        return {fold_case(row[1]): _Row(*row) for row in cursor}
+
+    def _remove(self, row: _Row, regpath: RegistryPathString) -> None:
+        folded = fold_case(regpath.fullpath)
+        ids = [
+            key_id
+            for (key_id,) in self._db.execute(
+                "SELECT id FROM keys WHERE id = ? OR "
+                "(fullpath_folded >= ? AND fullpath_folded < ?)",
+                (row.id, folded + REGISTRY_SEP, folded + REGISTRY_SEP + _PREFIX_END),
+            )
+        ]
+        self._db.executemany('DELETE FROM "values" WHERE key_id = ?', ((i,) for i in ids))
+        self._db.executemany("DELETE FROM keys WHERE id = ?", ((i,) for i in ids))
+        self.removed += len(ids)
+
+    def _store(
+        self,
+        handle: Any,
+        regpath: RegistryPathString,
+        parent: Optional[int],
+        row: Optional[_Row],
+        info: tuple[int, int, int],
+    ) -> int:
+        total_subkeys, total_values, last_modified = info
+        if row is None:
+            cursor = self._db.execute(
+                "INSERT INTO keys (parent, name, name_folded, fullpath, fullpath_folded, "
+                "last_modified, total_subkeys, total_values) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    parent,
+                    regpath.name,
+                    fold_case(regpath.name),
+                    regpath.fullpath,
+                    fold_case(regpath.fullpath),
+                    last_modified,
+                    total_subkeys,
+                    total_values,
+                ),
+            )
+            key_id = cursor.lastrowid
+            assert key_id is not None
+            self.added += 1
+        else:
+            key_id = row.id
+            self._db.execute(
+                "UPDATE keys SET last_modified = ?, total_subkeys = ?, total_values = ? "
+                "WHERE id = ?",
+                (last_modified, total_subkeys, total_values, key_id),
+            )
+            self._db.execute('DELETE FROM "values" WHERE key_id = ?', (key_id,))
+        values: list[tuple[int, str, str, int, bytes, Optional[str]]] = []
+        for index in range(total_values):
+            name, data, dtype = self._ll.value_from_index(handle, index)
+            values.append(
+                (
+                    key_id,
+                    name,
+                    fold_case(name),
+                    dtype,
+                    encode_data(dtype, data),
+                    _text(data),
+                )
+            )
+        self._db.executemany(
+            'INSERT INTO "values" (key_id, name, name_folded, dtype, data, text) '
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            values,
+        )
+        self.read += 1
+        return key_id
+
+    def _visit(
+        self,
+        handle: Any,
+        regpath: RegistryPathString,
+        parent: Optional[int],
+        row: Optional[_Row],
+    ) -> tuple[int, list[tuple[str, Optional[_Row]]]]:
+        info = self._ll.query_subkey(handle)
+        self.total += 1
+        known = self._rows(row.id) if row is not None else {}
+        if (
+            row is not None
+            and (row.last_modified, row.total_subkeys, row.total_values)
+            == (info[2], info[0], info[1])
+            and len(known) == info[0]
+        ):
+            return row.id, [(child.name, child) for child in known.values()]
+        key_id = self._store(handle, regpath, parent, row, info)
+        children: list[tuple[str, Optional[_Row]]] = []
+        for index in range(info[0]):
+            name = self._ll.subkey_from_index(handle, index)
+            children.append((name, known.pop(fold_case(name), None)))
+        for gone in known.values():
+            self._remove(gone, regpath._child(gone.name))
+        return key_id, children
+
+    def _open(
+        self, parent: KeyFrame, name: str, data: tuple[int, Optional[_Row]]
+    ) -> tuple[Any, tuple[int, Optional[_Row]]]:
+        try:
+            return self._ll.open_subkey(parent.handle, name), data
+        except OSError as exc:
+            child_path = parent.regpath._child(name)
+            child_row = data[1]
+            if child_row is not None and isinstance(exc, FileNotFoundError):
+                self._remove(child_row, child_path)
+            else:
+                report_open_error(child_path, exc, self._onerror)
+            return None, data
+
+    def run(self) -> IndexStats:
+        handler = self._path._backend
+        root_rows = self._rows(None)
+        root_row = next(iter(root_rows.values()), None)
+        # Frames carry (parent id, stored row).
+        for frame in walk_keys(
+            self._ll,
+            handler.winreg_handler,
+            handler._regpath,
+            data=(None, root_row),
+            opener=self._open,
+        ):
+            parent, row = frame.data
+            key_id, children = self._visit(frame.handle, frame.regpath, parent, row)
+            for name, child_row in children:
+                frame.descend(name, (key_id, child_row))
+        return IndexStats(self.total, self.read, self.added, self.removed)
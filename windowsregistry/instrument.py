@@ -0,0 +1,357 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Generator,
+    NamedTuple,
+    Optional,
+    Sequence,
+)
+
+from .models import RegistryHKEYEnum
+
+if TYPE_CHECKING:
+    import logging
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket
+# is unbounded.
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    1e-6,
+    5e-6,
+    1e-5,
+    5e-5,
+    1e-4,
+    5e-4,
+    1e-3,
+    5e-3,
+    1e-2,
+    5e-2,
+    1e-1,
+    5e-1,
+    1.0,
+)
+
+# Checked by lowlevel before every backend call; nothing else is paid while
+# no instrumentation is enabled and no profile() block is running.
+enabled = False
+
+_lock = threading.Lock()
+_global: Optional["Instrumentation"] = None
+_profiles = 0
+_scopes: ContextVar[tuple["Instrumentation", ...]] = ContextVar(
+    "windowsregistry_profiles", default=()
+)
+# id(handle) -> (root key name, path below it) for handles opened while
+# instrumentation was on; predefined root keys are resolved directly.
+_handles: dict[int, tuple[str, str]] = {}
+_roots = {hkey.value: hkey.name for hkey in RegistryHKEYEnum}
+
+
+class CallEvent(NamedTuple):
+    operation: str
+    root: str
+    path: str
+    elapsed: float
+    error: Optional[BaseException]
+
+
+class StatsKey(NamedTuple):
+    operation: str
+    root: str
+    prefix: str
+
+
+class OperationStats:
+    __slots__ = ("count", "errors", "total_time", "max_time", "buckets")
+
+    def __init__(self, buckets: int) -> None:
+        self.count = self.errors = 0
+        self.total_time = self.max_time = 0.0
+        self.buckets = [0] * (buckets + 1)
+
+    @property
+    def mean_time(self) -> float:
+        return self.total_time / self.count if self.count else 0.0
+
+    def copy(self) -> "OperationStats":
+        other = OperationStats(len(self.buckets) - 1)
+        other.count, other.errors = self.count, self.errors
+        other.total_time, other.max_time = self.total_time, self.max_time
+        other.buckets = list(self.buckets)
+        return other
+
+    def __repr__(self) -> str:
+        return (
+            f"<{self.__class__.__name__}: {self.count} calls, "
+            f"{self.errors} errors, mean {self.mean_time * 1e6:.1f}us>"
+        )
+
+
+class Instrumentation:
+    def __init__(
+        self,
+        *,
+        prefix_depth: int = 0,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        sinks: Sequence[Callable[[CallEvent], None]] = (),
+    ) -> None:
+        self._lock = threading.Lock()
+        self._prefix_depth = prefix_depth
+        self._bounds = tuple(sorted(buckets))
+        self._stats: dict[StatsKey, OperationStats] = {}
+        self._sinks = list(sinks)
+
+    @property
+    def buckets(self) -> tuple[float, ...]:
+        return self._bounds
+
+    def add_sink(self, sink: Callable[[CallEvent], None]) -> None:
+        self._sinks.append(sink)
+
+    def remove_sink(self, sink: Callable[[CallEvent], None]) -> None:
+        self._sinks.remove(sink)
+
+    def _prefix(self, path: str) -> str:
+        if not self._prefix_depth or not path:
+            return ""
+        return "\\".join(path.split("\\", self._prefix_depth)[: self._prefix_depth]).lower()
+
+    def record(self, event: CallEvent) -> None:
+        key = StatsKey(event.operation, event.root, self._prefix(event.path))
+        index = bisect.bisect_left(self._bounds, event.elapsed)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = OperationStats(len(self._bounds))
+            stats.count += 1
+            if event.error is not None:
+                stats.errors += 1
+            stats.total_time += event.elapsed
+            stats.max_time = max(stats.max_time, event.elapsed)
+            stats.buckets[index] += 1
+        for sink in self._sinks:
+            sink(event)
+
+    def stats(self) -> dict[StatsKey, OperationStats]:
+        with self._lock:
+            return {key: stats.copy() for key, stats in self._stats.items()}
+
+    def totals(self) -> dict[str, OperationStats]:
+        # Per operation, across every root key and prefix.
+        result: dict[str, OperationStats] = {}
+        for key, stats in self.stats().items():
+            total = result.get(key.operation)
+            if total is None:
+                result[key.operation] = stats
+                continue
+            total.count += stats.count
+            total.errors += stats.errors
+            total.total_time += stats.total_time
+            total.max_time = max(total.max_time, stats.max_time)
+            total.buckets = [a + b for a, b in zip(total.buckets, stats.buckets, strict=True)]
+        return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def to_prometheus(self, namespace: str = "windowsregistry") -> str:
+        # Prometheus text exposition format: a call/error counter pair and a
+        # latency histogram, labelled by operation, root key and prefix.
+        name = f"{namespace}_call_duration_seconds"
+        lines = [
+            f"# HELP {namespace}_calls_total Registry backend calls.",
+            f"# TYPE {namespace}_calls_total counter",
+        ]
+        stats = sorted(self.stats().items())
+        for key, item in stats:
+            lines.append(f"{namespace}_calls_total{{{_labels(key)}}} {item.count}")
+        lines += [
+            f"# HELP {namespace}_errors_total Registry backend calls that raised.",
+            f"# TYPE {namespace}_errors_total counter",
+        ]
+        for key, item in stats:
+            lines.append(f"{namespace}_errors_total{{{_labels(key)}}} {item.errors}")
+        lines += [
+            f"# HELP {name} Registry backend call latency.",
+            f"# TYPE {name} histogram",
+        ]
+        for key, item in stats:
+            labels = _labels(key)
+            cumulative = 0
+            for bound, count in zip((*self._bounds, float("inf")), item.buckets, strict=True):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"{name}_sum{{{labels}}} {item.total_time!r}")
+            lines.append(f"{name}_count{{{labels}}} {item.count}")
+        return "\n".join(lines) + "\n"
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}: {len(self._stats)} series>"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(key: StatsKey) -> str:
+    labels = f'operation="{key.operation}",root="{key.root}"'
+    if key.prefix:
+        labels += f',prefix="{_escape(key.prefix)}"'
+    return labels
+
+
+class LoggingSink:
+    def __init__(
+        self, logger: Optional[logging.Logger] = None, level: Optional[int] = None
+    ) -> None:
+        # logging is only imported once a sink is made; it costs more to
+        # import than the rest of the package.
+        import logging  # noqa: PLC0415
+
+        self._logger = logger if logger is not None else logging.getLogger(__name__)
+        self._level = level if level is not None else logging.DEBUG
+
+    def __call__(self, event: CallEvent) -> None:
+        if not self._logger.isEnabledFor(self._level):
+            return
+        self._logger.log(
+            self._level,
+            "%s %s\\%s %.1fus%s",
+            event.operation,
+            event.root,
+            event.path,
+            event.elapsed * 1e6,
+            f" failed: {event.error!r}" if event.error is not None else "",
+        )
+
+
+def _update() -> None:
+    global enabled
+    enabled = _global is not None or _profiles > 0
+    if not enabled:
+        _handles.clear()
+
+
+def enable(instrumentation: Optional[Instrumentation] = None) -> Instrumentation:
+    global _global
+    with _lock:
+        if instrumentation is None:
+            instrumentation = _global if _global is not None else Instrumentation()
+        _global = instrumentation
+        _update()
+    return instrumentation
+
+
+def disable() -> None:
+    global _global
+    with _lock:
+        _global = None
+        _update()
+
+
+def get_instrumentation() -> Optional[Instrumentation]:
+    return _global
+
+
+@contextmanager
+def profile(
+    *,
+    prefix_depth: int = 0,
+    sinks: Sequence[Callable[[CallEvent], None]] = (),
+) -> Generator[Instrumentation, None, None]:
+    # Collects the calls made inside the block (in this thread or task, and
+    # in tasks it starts) into a fresh Instrumentation, on top of whatever
+    # enable() collects globally.
+    global _profiles
+    scope = Instrumentation(prefix_depth=prefix_depth, sinks=sinks)
+    token = _scopes.set((*_scopes.get(), scope))
+    with _lock:
+        _profiles += 1
+        _update()
+    try:
+        yield scope
+    finally:
+        _scopes.reset(token)
+        with _lock:
+            _profiles -= 1
+            _update()
+
+
+def _locate(handle: Any) -> tuple[str, str]:
+    if isinstance(handle, int):
+        root = _roots.get(handle)
+        if root is not None:
+            return root, ""
+    return _handles.get(id(handle), ("?", ""))
+
+
+def _join(path: str, sub_key: Optional[str]) -> str:
+    if not sub_key:
+        return path
+    sub_key = sub_key.strip("\\")
+    return f"{path}\\{sub_key}" if path else sub_key
+
+
+def observe(
+    operation: str,
+    handle: Any,
+    sub_key: Optional[str],
+    fn: Callable[..., Any],
+    *args: Any,
+) -> Any:
+    root, path = _locate(handle)
+    path = _join(path, sub_key)
+    error: Optional[BaseException] = None
+    start = time.perf_counter()
+    try:
+        result = fn(*args)
+    except BaseException as exc:
+        error = exc
+        raise
+    finally:
+        event = CallEvent(operation, root, path, time.perf_counter() - start, error)
+        if _global is not None:
+            _global.record(event)
+        if _profiles:
+            for scope in _scopes.get():
+                scope.record(event)
+    if operation in ("OpenKeyEx", "CreateKeyEx"):
+        _handles[id(result)] = (root, path)
+    return result
+
+
+def forget(handle: Any) -> None:
+    _handles.pop(id(handle), None)
@@ -52,3 +52,5 @@ class RegistrySize(NamedTuple):
     regpath: RegistryPathString
     total_subkeys: int
     total_values: int
+    data_bytes: int = 0
+    max_depth: int = 0
@@ -23,7 +23,11 @@
 # SOFTWARE.
 
 import enum
-import winreg
+
+try:
+    import winreg
+except ImportError:
+    from .. import _winregconsts as winreg
 
 
 class RegistryHKEYEnum(enum.Enum):
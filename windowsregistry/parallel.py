@@ -0,0 +1,417 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import heapq
+import os
+import queue
+import random
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Callable, Generator, Iterator, NamedTuple, Optional, Union
+
+from .core import RegistryPath
+from .errors import (
+    OperationDataErrorKind,
+    OperationError,
+    OperationErrorKind,
+    WindowsRegistryError,
+)
+from .models import RegistryValue
+from .regpath import REGISTRY_SEP
+
+# Preorder position of a key below the walk root: the root is (), its
+# second child (1,), that child's first child (1, 0) and so on.
+TreeKey = tuple[int, ...]
+
+
+class WalkResult(NamedTuple):
+    key: RegistryPath
+    subkeys: tuple[str, ...]
+    values: tuple[RegistryValue, ...]
+    depth: int
+
+
+class _Task(NamedTuple):
+    tree_key: TreeKey
+    # Path below the walk root; the key is only opened once the task is
+    # popped, so queued tasks hold no handles.
+    subkey: str
+    depth: int
+
+
+class _Scanned(NamedTuple):
+    tree_key: TreeKey
+    result: WalkResult
+
+
+class _Skipped(NamedTuple):
+    tree_key: TreeKey
+
+
+class _Failed(NamedTuple):
+    exc: BaseException
+
+
+_Done = object()
+_Output = Union[_Scanned, _Skipped, _Failed]
+
+
+def default_workers() -> int:
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+class _Engine(ABC):
+    def __init__(  # noqa: PLR0913
+        self,
+        root: RegistryPath,
+        *,
+        workers: int,
+        max_pending: int,
+        keys_only: bool,
+        max_depth: Optional[int],
+        onerror: Optional[Callable[[WindowsRegistryError], None]],
+    ) -> None:
+        self._root = root
+        self._workers = max(1, workers)
+        self._max_pending = max(1, max_pending)
+        self._keys_only = keys_only
+        self._max_depth = max_depth
+        self._onerror = onerror
+        self._cv = threading.Condition()
+        self._outstanding = 0
+        self._stopped = False
+        self._threads: list[threading.Thread] = []
+
+    # scheduling hooks, implemented by the unordered/ordered engines
+
+    @abstractmethod
+    def _push(self, worker: int, tasks: list[_Task]) -> None: ...
+
+    @abstractmethod
+    def _pop(self, worker: int) -> Optional[_Task]: ...
+
+    @abstractmethod
+    def _emit(self, item: _Output) -> None: ...
+
+    @abstractmethod
+    def results(self) -> Iterator[WalkResult]: ...
+
+    @abstractmethod
+    def drain(self) -> None: ...
+
+    def _scan(self, task: _Task) -> _Output:
+        if not task.subkey:
+            path = self._root
+        else:
+            try:
+                path = self._root.open_subkey(task.subkey)
+            except WindowsRegistryError as exc:
+                if self._onerror is not None:
+                    self._onerror(exc)
+                return _Skipped(task.tree_key)
+        try:
+            names = tuple(path._backend.itersubkeys())
+        except (OSError, WindowsRegistryError) as exc:
+            return self._skip(task, path, exc, OperationDataErrorKind.SUBKEY)
+        values: tuple[RegistryValue, ...] = ()
+        if not self._keys_only:
+            try:
+                values = tuple(path.values())
+            except (OSError, WindowsRegistryError) as exc:
+                return self._skip(task, path, exc, OperationDataErrorKind.VALUE)
+        return _Scanned(task.tree_key, WalkResult(path, names, values, task.depth))
+
+    def _skip(
+        self,
+        task: _Task,
+        path: RegistryPath,
+        exc: Exception,
+        kind: OperationDataErrorKind,
+    ) -> _Skipped:
+        # Same contract as RegistryPath.walk: report the key and move on.
+        if path is not self._root:
+            path.close()
+        if self._onerror is not None:
+            if not isinstance(exc, WindowsRegistryError):
+                exc = OperationError(
+                    OperationErrorKind.ON_READ,
+                    kind,
+                    f"fail to scan {path.regpath.fullpath!r}",
+                    exc,
+                )
+            self._onerror(exc)
+        return _Skipped(task.tree_key)
+
+    def _children(
+        self, result: WalkResult, tree_key: TreeKey, subkey: str
+    ) -> list[_Task]:
+        if self._max_depth is not None and result.depth >= self._max_depth:
+            return []
+        prefix = f"{subkey}{REGISTRY_SEP}" if subkey else ""
+        return [
+            _Task((*tree_key, index), f"{prefix}{name}", result.depth + 1)
+            for index, name in enumerate(result.subkeys)
+        ]
+
+    def _run(self, worker: int) -> None:
+        try:
+            while True:
+                task = self._pop(worker)
+                if task is None:
+                    return
+                output = self._scan(task)
+                if isinstance(output, _Scanned):
+                    children = self._children(
+                        output.result, output.tree_key, task.subkey
+                    )
+                    if children:
+                        self._push(worker, children)
+                self._emit(output)
+                with self._cv:
+                    self._outstanding -= 1
+                    if not self._outstanding:
+                        self._cv.notify_all()
+        except BaseException as exc:  # noqa: BLE001
+            self._emit(_Failed(exc))
+            self.stop()
+
+    def start(self) -> None:
+        self._push(0, [_Task((), "", 0)])
+        for worker in range(self._workers):
+            thread = threading.Thread(
+                target=self._run,
+                args=(worker,),
+                name=f"windowsregistry-walk-{worker}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        with self._cv:
+            self._stopped = True
+            self._cv.notify_all()
+
+    def join(self) -> None:
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join()
+
+
+class _StealingEngine(_Engine):
+    # Each worker pops from the tail of its own deque (depth-first, so the
+    # pending set stays small) and steals from the head of another worker's
+    # deque when it runs dry. Results flow through a bounded queue, so
+    # workers stall instead of buffering when the consumer falls behind.
+
+    def __init__(self, root: RegistryPath, **kwargs: object) -> None:
+        super().__init__(root, **kwargs)  # type: ignore[arg-type]
+        self._deques: list[deque[_Task]] = [deque() for _ in range(self._workers)]
+        self._results: queue.Queue[object] = queue.Queue(self._max_pending)
+
+    def _push(self, worker: int, tasks: list[_Task]) -> None:
+        with self._cv:
+            self._outstanding += len(tasks)
+            self._deques[worker].extend(reversed(tasks))
+            self._cv.notify_all()
+
+    def _steal(self, worker: int) -> Optional[_Task]:
+        own = self._deques[worker]
+        try:
+            return own.pop()
+        except IndexError:
+            pass
+        victims = list(range(len(self._deques)))
+        random.shuffle(victims)
+        for victim in victims:
+            try:
+                return self._deques[victim].popleft()
+            except IndexError:
+                continue
+        return None
+
+    def _pop(self, worker: int) -> Optional[_Task]:
+        while True:
+            task = self._steal(worker)
+            if task is not None:
+                return task
+            with self._cv:
+                if self._stopped or not self._outstanding:
+                    return None
+                self._cv.wait(0.05)
+
+    def _put(self, item: object) -> None:
+        while not self._stopped:
+            try:
+                self._results.put(item, timeout=0.05)
+                return
+            except queue.Full:
+                continue
+
+    def _emit(self, item: _Output) -> None:
+        self._put(item)
+
+    def results(self) -> Iterator[WalkResult]:
+        watcher = threading.Thread(
+            target=self._finish, name="windowsregistry-walk-finish", daemon=True
+        )
+        watcher.start()
+        while True:
+            item = self._results.get()
+            if item is _Done:
+                return
+            if isinstance(item, _Failed):
+                raise item.exc
+            if isinstance(item, _Scanned):
+                yield item.result
+
+    def _finish(self) -> None:
+        self.join()
+        # Gives up once stopped, so an abandoned walk cannot block here.
+        self._put(_Done)
+
+    def drain(self) -> None:
+        while True:
+            try:
+                self._results.get_nowait()
+            except queue.Empty:
+                return
+
+
+class _OrderedEngine(_Engine):
+    # Tasks are taken lowest preorder position first from a shared heap and
+    # results are released to the consumer strictly in preorder. When the
+    # reorder buffer is full only the task the consumer is waiting for may
+    # run, which keeps memory bounded without risking a stall.
+
+    def __init__(self, root: RegistryPath, **kwargs: object) -> None:
+        super().__init__(root, **kwargs)  # type: ignore[arg-type]
+        self._tasks: list[_Task] = []
+        self._buffer: dict[TreeKey, _Output] = {}
+        self._expected: Optional[TreeKey] = ()
+        self._failure: Optional[BaseException] = None
+
+    def _push(self, worker: int, tasks: list[_Task]) -> None:  # noqa: ARG002
+        with self._cv:
+            self._outstanding += len(tasks)
+            for task in tasks:
+                heapq.heappush(self._tasks, task)
+            self._cv.notify_all()
+
+    def _pop(self, worker: int) -> Optional[_Task]:  # noqa: ARG002
+        with self._cv:
+            while True:
+                if self._stopped or not self._outstanding:
+                    return None
+                if self._tasks and (
+                    len(self._buffer) < self._max_pending
+                    or self._tasks[0].tree_key == self._expected
+                ):
+                    return heapq.heappop(self._tasks)
+                self._cv.wait()
+
+    def _emit(self, item: _Output) -> None:
+        with self._cv:
+            if isinstance(item, _Failed):
+                self._failure = item.exc
+            elif isinstance(item, _Skipped):
+                self._buffer[item.tree_key] = item
+            else:
+                self._buffer[item.tree_key] = item
+            self._cv.notify_all()
+
+    def results(self) -> Iterator[WalkResult]:
+        # Ancestors of the last emitted key and how many children each has.
+        counts: list[int] = []
+        while True:
+            with self._cv:
+                while (
+                    self._failure is None
+                    and self._expected is not None
+                    and self._expected not in self._buffer
+                ):
+                    self._cv.wait()
+                if self._failure is not None:
+                    raise self._failure
+                tree_key = self._expected
+                if tree_key is None:
+                    return
+                item = self._buffer.pop(tree_key)
+                children = 0
+                if isinstance(item, _Scanned):
+                    result = item.result
+                    if self._max_depth is None or result.depth < self._max_depth:
+                        children = len(result.subkeys)
+                del counts[len(tree_key) :]
+                if children:
+                    counts.append(children)
+                    self._expected = (*tree_key, 0)
+                else:
+                    self._expected = None
+                    position = tree_key
+                    while position:
+                        sibling = position[-1] + 1
+                        if sibling < counts[len(position) - 1]:
+                            self._expected = (*position[:-1], sibling)
+                            break
+                        position = position[:-1]
+                        del counts[len(position) :]
+                self._cv.notify_all()
+            if isinstance(item, _Scanned):
+                yield item.result
+
+    def drain(self) -> None:
+        with self._cv:
+            self._buffer.clear()
+
+
+def parallel_walk(  # noqa: PLR0913
+    path: RegistryPath,
+    *,
+    workers: Optional[int] = None,
+    ordered: bool = False,
+    max_pending: int = 1024,
+    keys_only: bool = False,
+    max_depth: Optional[int] = None,
+    onerror: Optional[Callable[[WindowsRegistryError], None]] = None,
+) -> Generator[WalkResult, None, None]:
+    engine_cls = _OrderedEngine if ordered else _StealingEngine
+    engine = engine_cls(
+        path,
+        workers=workers if workers is not None else default_workers(),
+        max_pending=max_pending,
+        keys_only=keys_only,
+        max_depth=max_depth,
+        onerror=onerror,
+    )
+    engine.start()
+    try:
+        yield from engine.results()
+    finally:
+        engine.stop()
+        engine.drain()
+        engine.join()
@@ -0,0 +1,384 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import codecs
+import io
+import os
+import sys
+from pathlib import Path
+from typing import IO, Any, Final, Iterable, Iterator, NamedTuple, Optional, Union
+
+from ._lowlevel import lowlevel
+from .backends import RegistryBackend
+from .core import RegistryPath
+from .errors import (
+    OperationDataErrorKind,
+    OperationError,
+    OperationErrorKind,
+    WindowsRegistryError,
+)
+from .handlepool import get_handle_pool
+from .hive.format import decode_data, encode_data
+from .models import (
+    RegistryKeyPermissionType,
+    RegistryPermissionConfig,
+    RegistryValue,
+    RegistryValueType,
+)
+from .regpath import REGISTRY_SEP, RegistryPathString
+from .valuecache import invalidate_caches
+
+REGEDIT5_HEADER: Final[str] = "Windows Registry Editor Version 5.00"
+REGEDIT4_HEADER: Final[str] = "REGEDIT4"
+_LINE_WIDTH: Final[int] = 80
+# REGEDIT4 files, including the strings inside hex(2)/hex(7) data, are
+# written in the ANSI code page rather than UTF-16.
+_ANSI_ENCODING: Final[str] = "mbcs" if sys.platform == "win32" else "cp1252"
+
+
+class RegFileError(WindowsRegistryError):
+    def __init__(self, message: str, lineno: int) -> None:
+        self.message = message
+        self.lineno = lineno
+
+    def __str__(self) -> str:
+        return f"error on parsing .reg file at line {self.lineno}: {self.message}"
+
+
+class RegImportStats(NamedTuple):
+    total_keys: int
+    total_values: int
+    deleted_keys: int
+    deleted_values: int
+
+
+def _quote(text: str) -> str:
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _hex_lines(prefix: str, raw: bytes) -> Iterator[str]:
+    line = prefix
+    last = len(raw) - 1
+    for index, byte in enumerate(raw):
+        token = f"{byte:02x}," if index != last else f"{byte:02x}"
+        if len(line) + len(token) > _LINE_WIDTH - 3:
+            yield line + "\\"
+            line = "  "
+        line += token
+    yield line
+
+
+def format_value(value: RegistryValue) -> Iterator[str]:
+    name = _quote(value.value_name) if value.value_name else "@"
+    dtype = value.dtype
+    if dtype is RegistryValueType.REG_SZ:
+        yield f"{name}={_quote(value.data or '')}"
+    elif dtype is RegistryValueType.REG_DWORD:
+        yield f"{name}=dword:{value.data or 0:08x}"
+    else:
+        raw = encode_data(dtype.value, value.data)
+        kind = "hex" if dtype is RegistryValueType.REG_BINARY else f"hex({dtype.value:x})"
+        yield from _hex_lines(f"{name}={kind}:", raw)
+
+
+def iter_export(path: RegistryPath, *, header: bool = True) -> Iterator[str]:
+    if header:
+        yield REGEDIT5_HEADER + "\n\n"
+    stack: list[Iterator[RegistryPath]] = [iter((path,))]
+    while stack:
+        current = next(stack[-1], None)
+        if current is None:
+            stack.pop()
+            continue
+        lines = [f"[{current.regpath.fullpath}]"]
+        for value in current.values():
+            lines.extend(format_value(value))
+        yield "\n".join(lines) + "\n\n"
+        stack.append(current.subkeys())
+
+
+def export_reg(
+    path: RegistryPath,
+    file: Union[str, "os.PathLike[str]", IO[str]],
+    *,
+    encoding: str = "utf-16",
+) -> None:
+    if isinstance(file, (str, os.PathLike)):
+        with Path(file).open("w", encoding=encoding, newline="\r\n") as fp:
+            fp.writelines(iter_export(path))
+    else:
+        file.writelines(iter_export(path))
+
+
+def _parse_string(text: str, pos: int, lineno: int) -> tuple[str, int]:
+    # `pos` points at the opening quote; returns the text and the index after
+    # the closing quote.
+    chars: list[str] = []
+    index = pos + 1
+    while index < len(text):
+        char = text[index]
+        if char == "\\" and index + 1 < len(text):
+            chars.append(text[index + 1])
+            index += 2
+            continue
+        if char == '"':
+            return "".join(chars), index + 1
+        chars.append(char)
+        index += 1
+    raise RegFileError("unterminated string", lineno)
+
+
+def _decode_ansi(dtype: int, raw: bytes) -> Any:
+    text = raw.decode(_ANSI_ENCODING, errors="replace")
+    if dtype == RegistryValueType.REG_EXPAND_SZ.value:
+        return text.split("\0", 1)[0]
+    items: list[str] = []
+    for item in text.split("\0"):
+        if not item:
+            break
+        items.append(item)
+    return items
+
+
+def _parse_data(text: str, lineno: int, ansi: bool = False) -> tuple[int, Any]:
+    if text.startswith('"'):
+        data, end = _parse_string(text, 0, lineno)
+        if text[end:].strip():
+            raise RegFileError("unexpected data after string", lineno)
+        return RegistryValueType.REG_SZ.value, data
+    kind, sep, payload = text.partition(":")
+    if not sep:
+        raise RegFileError(f"unknown value data {text!r}", lineno)
+    kind = kind.strip().lower()
+    try:
+        if kind == "dword":
+            return RegistryValueType.REG_DWORD.value, int(payload.strip(), 16)
+        if kind == "hex":
+            dtype = RegistryValueType.REG_BINARY.value
+        elif kind.startswith("hex(") and kind.endswith(")"):
+            dtype = int(kind[4:-1], 16)
+        else:
+            raise RegFileError(f"unknown value type {kind!r}", lineno)
+        tokens = payload.replace("\\", "").replace(" ", "").split(",")
+        raw = bytes(int(token, 16) for token in tokens if token)
+    except ValueError as exc:
+        raise RegFileError(f"malformed value data ({exc})", lineno) from exc
+    if ansi and dtype in (
+        RegistryValueType.REG_EXPAND_SZ.value,
+        RegistryValueType.REG_MULTI_SZ.value,
+    ):
+        return dtype, _decode_ansi(dtype, raw)
+    return dtype, decode_data(dtype, raw)
+
+
+class _RegEntry(NamedTuple):
+    lineno: int
+    key: Optional[str]
+    delete: bool
+    name: Optional[str]
+    dtype: int
+    data: Any
+
+
+def iter_entries(lines: Iterable[str]) -> Iterator[_RegEntry]:
+    pending = ""
+    start = 0
+    header_seen = False
+    ansi = False
+    for lineno, raw in enumerate(lines, 1):
+        line = raw.rstrip("\r\n")
+        if pending:
+            line = pending + line.lstrip()
+            pending = ""
+        else:
+            start = lineno
+            line = line.strip()
+        if not line or line.startswith(";"):
+            continue
+        if line.endswith("\\") and "=hex" in line:
+            pending = line[:-1]
+            continue
+        if not header_seen:
+            if line not in (REGEDIT5_HEADER, REGEDIT4_HEADER):
+                raise RegFileError("missing REGEDIT header", start)
+            header_seen = True
+            ansi = line == REGEDIT4_HEADER
+            continue
+        if line.startswith("["):
+            if not line.endswith("]"):
+                raise RegFileError("unterminated key", start)
+            key = line[1:-1]
+            delete = key.startswith("-")
+            yield _RegEntry(start, key.lstrip("-"), delete, None, 0, None)
+            continue
+        if line.startswith("@"):
+            name, end = "", 1
+        elif line.startswith('"'):
+            name, end = _parse_string(line, 0, start)
+        else:
+            raise RegFileError(f"unexpected line {line!r}", start)
+        rest = line[end:].lstrip()
+        if not rest.startswith("="):
+            raise RegFileError("expected '=' after value name", start)
+        rest = rest[1:].strip()
+        if rest == "-":
+            yield _RegEntry(start, None, True, name, 0, None)
+            continue
+        dtype, data = _parse_data(rest, start, ansi)
+        yield _RegEntry(start, None, False, name, dtype, data)
+
+
+def _open_text(
+    file: Union[str, "os.PathLike[str]", IO[bytes]],
+) -> tuple[io.TextIOWrapper, Optional[io.BufferedReader]]:
+    # Also returns the buffer wrapped around a caller's stream, if any, so
+    # the caller can detach it again before handing the stream back.
+    sniffer: Optional[io.BufferedReader] = None
+    binary: Any
+    if isinstance(file, (str, os.PathLike)):
+        binary = Path(file).open("rb")  # noqa: SIM115
+    elif hasattr(file, "peek"):
+        binary = file
+    else:
+        # Sniff through a buffer so pipes and sockets work too.
+        binary = sniffer = io.BufferedReader(file)  # type: ignore[arg-type]
+    head = binary.peek(len(REGEDIT4_HEADER))[: len(REGEDIT4_HEADER)]
+    if head[:2] in (codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE):
+        encoding = "utf-16"
+    elif head == REGEDIT4_HEADER.encode("ascii"):
+        encoding = _ANSI_ENCODING
+    else:
+        encoding = "utf-8-sig"
+    errors = "replace" if encoding == _ANSI_ENCODING else "strict"
+    text = io.TextIOWrapper(binary, encoding=encoding, errors=errors, newline=None)
+    return text, sniffer
+
+
+class _Importer:
+    def __init__(self, ll: lowlevel) -> None:
+        self._ll = ll
+        self._handle: Any = None
+        self._regpath: Optional[RegistryPathString] = None
+        self.keys = self.values = self.deleted_keys = self.deleted_values = 0
+
+    def _close(self) -> None:
+        if self._handle is not None:
+            self._ll.close_subkey(self._handle)
+            self._handle = None
+        if self._regpath is not None:
+            invalidate_caches(self._ll.backend, self._regpath, created=True)
+            self._regpath = None
+
+    def apply(self, entry: _RegEntry) -> None:
+        if entry.key is not None:
+            self._close()
+            regpath = RegistryPathString(entry.key)
+            if entry.delete:
+                # Like regedit, deleting a key that does not exist (or whose
+                # parent does not) is not an error.
+                if regpath.parts:
+                    try:
+                        parent = self._ll.open_subkey(
+                            regpath.root_key.value,
+                            REGISTRY_SEP.join(regpath.parts[:-1]),
+                        )
+                    except FileNotFoundError:
+                        return
+                    try:
+                        self.deleted_keys += self._ll.delete_tree(
+                            parent, regpath.parts[-1]
+                        )
+                    except FileNotFoundError:
+                        pass
+                    finally:
+                        self._ll.close_subkey(parent)
+                    get_handle_pool().invalidate(self._ll.backend, regpath)
+                    invalidate_caches(self._ll.backend, regpath, tree=True)
+                return
+            try:
+                self._handle = self._ll.create_subkey(
+                    regpath.root_key.value, regpath.path
+                )
+            except OSError as exc:
+                raise OperationError(
+                    OperationErrorKind.ON_CREATE,
+                    OperationDataErrorKind.SUBKEY,
+                    f"fail to create subkey {regpath.fullpath!r}",
+                    exc,
+                ) from exc
+            self._regpath = regpath
+            self.keys += 1
+            return
+        if self._handle is None:
+            raise RegFileError("value outside of a key", entry.lineno)
+        if entry.delete:
+            try:
+                self._ll.delete_value(self._handle, entry.name or "")
+                self.deleted_values += 1
+            except FileNotFoundError:
+                pass
+            return
+        try:
+            self._ll.set_value(self._handle, entry.name or "", entry.dtype, entry.data)
+        except (OSError, ValueError) as exc:
+            raise OperationError(
+                OperationErrorKind.ON_UPDATE,
+                OperationDataErrorKind.VALUE,
+                f"fail to set value {entry.name!r} (line {entry.lineno})",
+                exc,
+            ) from exc
+        self.values += 1
+
+
+def import_reg(
+    file: Union[str, "os.PathLike[str]", IO[bytes]],
+    *,
+    backend: Optional[RegistryBackend] = None,
+    wow64_32key_access: bool = False,
+) -> RegImportStats:
+    ll = lowlevel(
+        permconf=RegistryPermissionConfig(
+            permissions=(RegistryKeyPermissionType.KEY_ALL_ACCESS,),
+            wow64_32key_access=wow64_32key_access,
+        ),
+        backend=backend,
+    )
+    importer = _Importer(ll)
+    text, sniffer = _open_text(file)
+    try:
+        for entry in iter_entries(text):
+            importer.apply(entry)
+    finally:
+        importer._close()
+        if isinstance(file, (str, os.PathLike)):
+            text.close()
+        else:
+            text.detach()
+            if sniffer is not None:
+                sniffer.detach()
+    return RegImportStats(
+        importer.keys, importer.values, importer.deleted_keys, importer.deleted_values
+    )
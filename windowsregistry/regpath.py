@@ -22,7 +22,8 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from typing import Final, Optional, Sequence
+from functools import lru_cache
+from typing import Any, Final, Optional, Sequence
 
 from .errors import RegistryPathError
 from .models import RegistryHKEYEnum
@@ -30,27 +31,44 @@ from .models import RegistryHKEYEnum
 REGISTRY_SEP: Final[str] = "\\"
 
 
+def fold_case(name: str) -> str:
+    # The registry compares names by upcasing one UTF-16 code unit at a time,
+    # so characters whose Python uppercase form expands (e.g. "\u00df" ->
+    # "SS") are left alone. Paths, hives and backends all fold with this.
+    if name.isascii():
+        return name.upper()
+    return "".join(u if len(u := c.upper()) == 1 else c for c in name)
+
+
 def _determine_root_key(rk: str) -> RegistryHKEYEnum:
     rk = rk.upper()
-    if rk.startswith("HK"):
+    if rk.startswith("HKEY_"):
+        fullname = rk
+    else:
         fullname = {
             "HKCR": "HKEY_CLASSES_ROOT",
             "HKCU": "HKEY_CURRENT_USER",
             "HKLM": "HKEY_LOCAL_MACHINE",
             "HKU": "HKEY_USERS",
-        }[rk]
-    elif rk.startswith("HKEY_"):
-        fullname = rk
-    else:
-        raise RegistryPathError("root key not found")
-    return getattr(RegistryHKEYEnum, fullname)
+            "HKCC": "HKEY_CURRENT_CONFIG",
+        }.get(rk, "")
+    try:
+        return RegistryHKEYEnum[fullname]
+    except KeyError:
+        raise RegistryPathError(f"root key {rk!r} not found") from None
+
+
+@lru_cache(maxsize=4096)
+def _split(path: str) -> tuple[str, ...]:
+    return tuple(path.split(REGISTRY_SEP))
 
 
 def _parse_parts(paths: Sequence[str]) -> tuple[str, ...]:
+    if len(paths) == 1:
+        return _split(paths[0])
     r: list[str] = []
-    ps = tuple(paths)
-    for p in ps:
-        r.extend(p.split(REGISTRY_SEP))
+    for p in paths:
+        r.extend(_split(p))
     return tuple(r)
 
 
@@ -65,13 +83,84 @@ def _parse_paths(
     return r, rk
 
 
+# Every path is a node holding only its own name and a link to its parent,
+# so paths derived from one another share their prefix nodes. Roots are
+# interned for the whole process and parsed strings are memoised.
+_roots: dict[tuple[type, RegistryHKEYEnum], "RegistryPathString"] = {}
+
+
 class RegistryPathString:
-    def __init__(
-        self, *paths: str, root_key: Optional[RegistryHKEYEnum] = None
-    ) -> None:
+    __slots__ = (
+        "_root_key",
+        "_parent",
+        "_name",
+        "_depth",
+        "_hash",
+        "_path",
+        "_fullpath",
+    )
+
+    _root_key: RegistryHKEYEnum
+    _parent: Optional["RegistryPathString"]
+    _name: str
+    _depth: int
+    _hash: Optional[int]
+    _path: Optional[str]
+    _fullpath: Optional[str]
+
+    def __new__(
+        cls, *paths: str, root_key: Optional[RegistryHKEYEnum] = None
+    ) -> "RegistryPathString":
+        if len(paths) == 1 and cls is RegistryPathString:
+            return _parse_cached(paths[0], root_key)
         parts, rk = _parse_paths(paths, root_key)
-        self._root_key = rk
-        self._parts = parts
+        return cls._from_parts(rk, parts)
+
+    @classmethod
+    def _root(cls, root_key: RegistryHKEYEnum) -> "RegistryPathString":
+        root = _roots.get((cls, root_key))
+        if root is None:
+            root = object.__new__(cls)
+            root._root_key = root_key
+            root._parent = None
+            root._name = ""
+            root._depth = 0
+            root._hash = hash(root_key)
+            root._path = ""
+            root._fullpath = root_key.name
+            root = _roots.setdefault((cls, root_key), root)
+        return root
+
+    @classmethod
+    def _from_parts(
+        cls, root_key: RegistryHKEYEnum, parts: Sequence[str]
+    ) -> "RegistryPathString":
+        node = cls._root(root_key)
+        for part in parts:
+            node = node._child(part)
+        return node
+
+    def _child(self, name: str) -> "RegistryPathString":
+        # Deliberately not interned on the parent: roots live for the whole
+        # process, so a strong child map would pin every path ever built,
+        # and a weak one costs a reference (88 bytes) plus a dict per parent,
+        # more than the node. Equal paths hash and compare equal regardless.
+        child = object.__new__(self.__class__)
+        child._root_key = self._root_key
+        child._parent = self
+        child._name = name
+        child._depth = self._depth + 1
+        child._hash = child._path = child._fullpath = None
+        return child
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return type(self)._from_parts, (self._root_key, self.parts)
+
+    def __copy__(self) -> "RegistryPathString":
+        return self
+
+    def __deepcopy__(self, memo: Any) -> "RegistryPathString":
+        return self
 
     @property
     def root_key(self) -> RegistryHKEYEnum:
@@ -79,33 +168,104 @@ class RegistryPathString:
 
     @property
     def parts(self) -> tuple[str, ...]:
-        return self._parts
+        parts = [""] * self._depth
+        node = self
+        while node._parent is not None:
+            parts[node._depth - 1] = node._name
+            node = node._parent
+        return tuple(parts)
+
+    @property
+    def depth(self) -> int:
+        return self._depth
 
     @property
     def path(self) -> str:
-        return REGISTRY_SEP.join(self.parts)
+        path = self._path
+        if path is None:
+            parent = self._parent
+            assert parent is not None
+            if parent._path is not None:
+                path = (
+                    parent._path + REGISTRY_SEP + self._name
+                    if parent._depth
+                    else self._name
+                )
+            else:
+                path = REGISTRY_SEP.join(self.parts)
+            self._path = path
+        return path
 
     @property
     def fullpath(self) -> str:
-        return REGISTRY_SEP.join([self.root_key.name, *self.parts])
+        fullpath = self._fullpath
+        if fullpath is None:
+            fullpath = self._fullpath = self._root_key.name + REGISTRY_SEP + self.path
+        return fullpath
 
     @property
     def parent(self) -> "RegistryPathString":
-        parts = self.parts[:-1]
-        return self.__class__(*parts, root_key=self.root_key)
+        return self._parent if self._parent is not None else self
 
     @property
     def name(self) -> str:
-        if not self.parts:
-            return self.root_key.name
-        return self.parts[-1]
+        if self._parent is None:
+            return self._root_key.name
+        return self._name
 
     def joinpath(self, *paths: str) -> "RegistryPathString":
-        parts = [*self.parts, *_parse_parts(paths)]
-        return self.__class__(*parts, root_key=self.root_key)
+        node = self
+        for part in _parse_parts(paths):
+            node = node._child(part)
+        return node
+
+    def is_relative_to(self, other: "RegistryPathString") -> bool:
+        if other._depth > self._depth:
+            return False
+        node: Optional[RegistryPathString] = self
+        while node is not None and node._depth > other._depth:
+            node = node._parent
+        return node == other
+
+    def __eq__(self, other: object) -> bool:
+        # Case-insensitive, like the registry itself.
+        if self is other:
+            return True
+        if not isinstance(other, RegistryPathString):
+            return NotImplemented
+        if (
+            self._depth != other._depth
+            or hash(self) != hash(other)
+            or self._root_key is not other._root_key
+        ):
+            return False
+        a: Optional[RegistryPathString] = self
+        b: Optional[RegistryPathString] = other
+        while a is not b:
+            assert a is not None and b is not None
+            if fold_case(a._name) != fold_case(b._name):
+                return False
+            a, b = a._parent, b._parent
+        return True
+
+    def __hash__(self) -> int:
+        value = self._hash
+        if value is None:
+            parent = self._parent
+            assert parent is not None
+            value = self._hash = hash((hash(parent), fold_case(self._name)))
+        return value
 
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}({self.fullpath!r})"
 
     def __str__(self) -> str:
         return self.fullpath
+
+
+@lru_cache(maxsize=4096)
+def _parse_cached(
+    path: str, root_key: Optional[RegistryHKEYEnum]
+) -> RegistryPathString:
+    parts, rk = _parse_paths((path,), root_key)
+    return RegistryPathString._from_parts(rk, parts)
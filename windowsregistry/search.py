@@ -0,0 +1,325 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import fnmatch
+import re
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Generator,
+    Iterable,
+    NamedTuple,
+    Optional,
+    Union,
+    cast,
+)
+
+from ._walk import report_open_error, walk_keys
+from .errors import WindowsRegistryError
+from .models import RegistryValue, RegistryValueType
+from .regpath import REGISTRY_SEP, RegistryPathString
+
+if TYPE_CHECKING:
+    from .core import RegistryPath
+
+# A pattern is a glob (str, matched case-insensitively like the registry),
+# a compiled regular expression (searched) or a predicate. Several patterns
+# match when any of them does.
+Pattern = Union[str, "re.Pattern[Any]", Callable[[Any], bool]]
+Patterns = Union[Pattern, Iterable[Pattern]]
+DtypeFilter = Union[
+    RegistryValueType, int, str, Iterable[Union[RegistryValueType, int, str]]
+]
+
+_SCOPED_FLAGS = {re.IGNORECASE: "i", re.MULTILINE: "m", re.DOTALL: "s", re.VERBOSE: "x"}
+
+
+class FindMatch(NamedTuple):
+    regpath: RegistryPathString
+    value: Optional[RegistryValue]
+
+
+def _as_list(patterns: Patterns) -> list[Pattern]:
+    if isinstance(patterns, (str, bytes, re.Pattern)) or callable(patterns):
+        return [patterns]  # type: ignore[list-item]
+    return list(patterns)
+
+
+def _glob(pattern: str) -> str:
+    return r"\A(?i:" + fnmatch.translate(pattern) + ")"
+
+
+def _scoped(pattern: "re.Pattern[Any]") -> Optional[str]:
+    # Only flags that can be scoped to a group survive being merged into one
+    # alternation; anything else keeps its own compiled pattern.
+    flags = pattern.flags & ~re.UNICODE
+    letters = ""
+    for flag, letter in _SCOPED_FLAGS.items():
+        if flags & flag:
+            letters += letter
+            flags &= ~flag
+    if flags or isinstance(pattern.pattern, bytes):
+        return None
+    return f"(?{letters}:{pattern.pattern})" if letters else f"(?:{pattern.pattern})"
+
+
+def compile_matcher(patterns: Patterns) -> Callable[[Any], object]:
+    # Globs and regular expressions are folded into a single regex so each
+    # candidate is scanned once however many patterns were given. The
+    # matcher's result is only meant to be tested for truth.
+    sources: list[str] = []
+    others: list[Callable[[Any], object]] = []
+    for pattern in _as_list(patterns):
+        if isinstance(pattern, str):
+            sources.append(_glob(pattern))
+        elif isinstance(pattern, re.Pattern):
+            source = _scoped(pattern)
+            if source is None:
+                others.append(pattern.search)
+            else:
+                sources.append(source)
+        elif callable(pattern):
+            others.append(pattern)
+        else:
+            raise TypeError(f"unsupported pattern {pattern!r}")
+    if sources:
+        others.insert(0, re.compile("|".join(sources)).search)
+    if len(others) == 1:
+        return others[0]
+    return lambda subject: any(match(subject) for match in others)
+
+
+_State = frozenset[tuple[int, int]]
+
+
+class _PathGlob:
+    # Key-path globs, one segment per key: "*" and "?" stay within a key
+    # name and a "**" segment spans any number of keys. Every pattern is
+    # tracked as a set of positions, so a subtree is pruned as soon as no
+    # pattern can match anything below it.
+
+    def __init__(self, patterns: list[str]) -> None:
+        self._segments: list[list[Optional[Callable[[str], Any]]]] = []
+        for pattern in patterns:
+            self._segments.append(
+                [
+                    None if part == "**" else re.compile(_glob(part)).search
+                    for part in pattern.strip(REGISTRY_SEP).split(REGISTRY_SEP)
+                ]
+            )
+        self.start = self._closure((index, 0) for index in range(len(patterns)))
+
+    def _closure(self, states: Iterable[tuple[int, int]]) -> _State:
+        result: set[tuple[int, int]] = set()
+        pending = list(states)
+        while pending:
+            state = pending.pop()
+            if state in result:
+                continue
+            result.add(state)
+            pattern, position = state
+            segments = self._segments[pattern]
+            if position < len(segments) and segments[position] is None:
+                pending.append((pattern, position + 1))
+        return frozenset(result)
+
+    def step(self, states: _State, name: str) -> _State:
+        following: list[tuple[int, int]] = []
+        for pattern, position in states:
+            segments = self._segments[pattern]
+            if position == len(segments):
+                continue
+            segment = segments[position]
+            if segment is None:
+                following.append((pattern, position))
+            elif segment(name):
+                following.append((pattern, position + 1))
+        return self._closure(following)
+
+    def accepts(self, states: _State) -> bool:
+        return any(
+            position == len(self._segments[pattern]) for pattern, position in states
+        )
+
+
+def _compile_dtype(dtype: Any) -> Callable[[int], bool]:
+    if callable(dtype) and not isinstance(dtype, (RegistryValueType, int, str)):
+        return cast("Callable[[int], bool]", dtype)
+    items = [dtype] if isinstance(dtype, (RegistryValueType, int, str)) else dtype
+    wanted: set[int] = set()
+    for item in items:
+        if isinstance(item, str):
+            name = item.upper()
+            if not name.startswith("REG_"):
+                name = "REG_" + name
+            wanted.add(RegistryValueType[name].value)
+        elif isinstance(item, RegistryValueType):
+            wanted.add(item.value)
+        else:
+            wanted.add(item)
+    return wanted.__contains__
+
+
+def _bytes_search(pattern: "re.Pattern[bytes]") -> Callable[[Any], bool]:
+    def search(data: Any) -> bool:
+        return isinstance(data, bytes) and pattern.search(data) is not None
+
+    return search
+
+
+def _compile_data(patterns: Patterns) -> Callable[[Any], bool]:
+    # Globs and str regexes see the text forms of the data (REG_MULTI_SZ
+    # items one by one, integers in decimal); bytes regexes see binary data
+    # and predicates the data as returned by the backend.
+    text: list[Pattern] = []
+    raw: list[Pattern] = []
+    for pattern in _as_list(patterns):
+        if isinstance(pattern, re.Pattern) and isinstance(pattern.pattern, bytes):
+            raw.append(_bytes_search(pattern))
+        elif isinstance(pattern, (str, re.Pattern)):
+            text.append(pattern)
+        elif callable(pattern):
+            raw.append(pattern)
+        else:
+            raise TypeError(f"unsupported pattern {pattern!r}")
+    match_text = compile_matcher(text) if text else None
+    match_raw = compile_matcher(raw) if raw else None
+
+    def match(data: Any) -> bool:
+        if match_raw is not None and match_raw(data):
+            return True
+        if match_text is None or data is None:
+            return False
+        if isinstance(data, str):
+            return bool(match_text(data))
+        if isinstance(data, int):
+            return bool(match_text(str(data)))
+        if isinstance(data, list):
+            items = cast("list[Any]", data)
+            return any(isinstance(item, str) and match_text(item) for item in items)
+        return False
+
+    return match
+
+
+def find(  # noqa: PLR0913
+    path: "RegistryPath",
+    *,
+    key: Optional[Patterns] = None,
+    keypath: Optional[Patterns] = None,
+    value: Optional[Patterns] = None,
+    data: Optional[Patterns] = None,
+    dtype: Optional[DtypeFilter] = None,
+    max_depth: Optional[int] = None,
+    limit: Optional[int] = None,
+    onerror: Optional[Callable[[WindowsRegistryError], None]] = None,
+) -> Generator[FindMatch, None, None]:
+    # `key` matches key names and `keypath` key paths relative to `path`.
+    # Without value criteria every matching key is yielded once with
+    # value=None and no values are read at all.
+    handler = path._backend
+    ll = handler._ll
+    match_key = compile_matcher(key) if key is not None else None
+    globs: Optional[_PathGlob] = None
+    match_keypath: Optional[Callable[[Any], Any]] = None
+    if keypath is not None:
+        keypaths = _as_list(keypath)
+        if all(isinstance(pattern, str) for pattern in keypaths):
+            globs = _PathGlob(keypaths)  # type: ignore[arg-type]
+        else:
+            match_keypath = compile_matcher(keypaths)
+    match_value = compile_matcher(value) if value is not None else None
+    match_data = _compile_data(data) if data is not None else None
+    match_dtype = _compile_dtype(dtype) if dtype is not None else None
+    scan_values = value is not None or data is not None or dtype is not None
+    if limit is not None and limit <= 0:
+        return
+
+    found = 0
+    # Each frame carries the key path relative to `path` (only when a keypath
+    # matcher needs it) and the glob states reached so far.
+    for frame in walk_keys(
+        ll,
+        handler.winreg_handler,
+        handler._regpath,
+        data=("", globs.start if globs is not None else None),
+        onerror=onerror,
+    ):
+        handle, regpath, depth = frame.handle, frame.regpath, frame.depth
+        relpath, states = frame.data
+        qualifies = (
+            (match_key is None or match_key(regpath.name))
+            and (states is None or globs.accepts(states))  # type: ignore[union-attr]
+            and (match_keypath is None or match_keypath(relpath))
+        )
+        descend = max_depth is None or depth < max_depth
+        # Everything this key contributes is read up front, so a key removed
+        # mid-scan is reported and skipped as a whole.
+        try:
+            total_subkeys, total_values, _ = ll.query_subkey(handle)
+            values = (
+                [ll.value_from_index(handle, index) for index in range(total_values)]
+                if qualifies and scan_values
+                else []
+            )
+            names = (
+                [ll.subkey_from_index(handle, index) for index in range(total_subkeys)]
+                if descend
+                else []
+            )
+        except OSError as exc:
+            report_open_error(regpath, exc, onerror, action="read")
+            continue
+        if qualifies and not scan_values:
+            found += 1
+            yield FindMatch(regpath, None)
+            if found == limit:
+                return
+        elif qualifies:
+            for name, value_data, kind in values:
+                if (
+                    (match_dtype is None or match_dtype(kind))
+                    and (match_value is None or match_value(name))
+                    and (match_data is None or match_data(value_data))
+                ):
+                    found += 1
+                    found_value = RegistryValue(
+                        name, value_data, RegistryValueType(kind)
+                    )
+                    yield FindMatch(regpath, found_value)
+                    if found == limit:
+                        return
+        for name in names:
+            child_states = None
+            if states is not None:
+                child_states = globs.step(states, name)  # type: ignore[union-attr]
+                if not child_states:
+                    continue
+            child_relpath = ""
+            if match_keypath is not None:
+                child_relpath = relpath + REGISTRY_SEP + name if relpath else name
+            frame.descend(name, (child_relpath, child_states))
@@ -0,0 +1,324 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, NamedTuple, Optional
+
+from ._lowlevel import lowlevel
+from ._walk import report_open_error, walk_keys
+from .errors import (
+    OperationDataErrorKind,
+    OperationError,
+    OperationErrorKind,
+    WindowsRegistryError,
+)
+from .hive.format import encode_data
+from .models import RegistrySize
+from .regpath import REGISTRY_SEP, RegistryPathString, fold_case
+from .valuecache import CacheKey, make_cache_key
+
+if TYPE_CHECKING:
+    from .core import RegistryPath
+
+
+class SizeCacheStats(NamedTuple):
+    hits: int
+    misses: int
+    size: int
+
+
+class _Counted:
+    # What QueryInfoKey cannot tell: the subkey names (needed to descend) and
+    # the total size of the value data. Either is None until first needed.
+    __slots__ = ("last_modified", "names", "data_bytes")
+
+    def __init__(
+        self,
+        last_modified: int,
+        names: Optional[tuple[str, ...]],
+        data_bytes: Optional[int],
+    ) -> None:
+        self.last_modified = last_modified
+        self.names = names
+        self.data_bytes = data_bytes
+
+
+class SizeCache:
+    # Per-key results of earlier counts, trusted only while the key's
+    # last-write time is unchanged. A subtree's own stamp does not move when
+    # something deeper changes, so every key is still queried on each count;
+    # the cache saves the subkey enumeration and the value scan.
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: dict[CacheKey, _Counted] = {}
+        self._hits = self._misses = 0
+
+    def _get(self, key: CacheKey, last_modified: int) -> Optional[_Counted]:
+        entry = self._entries.get(key)
+        if entry is None or entry.last_modified != last_modified:
+            return None
+        return entry
+
+    def _put(self, key: CacheKey, entry: _Counted) -> None:
+        with self._lock:
+            previous = self._entries.get(key)
+            self._entries[key] = entry
+            if previous is None or previous.names is None or entry.names is None:
+                return
+            # Forget whatever was counted below subkeys that are gone.
+            removed = {fold_case(name) for name in previous.names}
+            removed.difference_update(fold_case(name) for name in entry.names)
+            if not removed:
+                return
+            backend, regpath, _ = key
+            gone = [regpath._child(name) for name in removed]
+            for other in list(self._entries):
+                if other[0] is backend and any(
+                    other[1].is_relative_to(path) for path in gone
+                ):
+                    del self._entries[other]
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self._hits += 1
+            else:
+                self._misses += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> SizeCacheStats:
+        with self._lock:
+            return SizeCacheStats(self._hits, self._misses, len(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}: {len(self)} keys>"
+
+
+class _Branch(NamedTuple):
+    relpath: str
+    regpath: RegistryPathString
+    depth: int
+
+
+class _Totals:
+    __slots__ = ("subkeys", "values", "data_bytes", "max_depth")
+
+    def __init__(self) -> None:
+        self.subkeys = self.values = self.data_bytes = self.max_depth = 0
+
+    def merge(self, other: "_Totals") -> None:
+        self.subkeys += other.subkeys
+        self.values += other.values
+        self.data_bytes += other.data_bytes
+        self.max_depth = max(self.max_depth, other.max_depth)
+
+
+class _Counter:
+    def __init__(
+        self,
+        ll: lowlevel,
+        *,
+        max_depth: Optional[int],
+        data_bytes: bool,
+        cache: Optional[SizeCache],
+        onerror: Optional[Callable[[WindowsRegistryError], None]],
+    ) -> None:
+        self._ll = ll
+        self._max_depth = max_depth
+        self._data_bytes = data_bytes
+        self._cache = cache
+        self._onerror = onerror
+        self._wow64 = ll._permconf.wow64_32key_access
+
+    def _data_size(self, handle: Any, total_values: int) -> int:
+        size = 0
+        for index in range(total_values):
+            _, data, dtype = self._ll.value_from_index(handle, index)
+            size += len(encode_data(dtype, data))
+        return size
+
+    def _visit(
+        self,
+        handle: Any,
+        regpath: RegistryPathString,
+        depth: int,
+        totals: _Totals,
+    ) -> tuple[str, ...]:
+        ll = self._ll
+        total_subkeys, total_values, last_modified = ll.query_subkey(handle)
+        totals.subkeys += total_subkeys
+        totals.values += total_values
+        totals.max_depth = max(totals.max_depth, depth)
+        descend = total_subkeys and (self._max_depth is None or depth < self._max_depth)
+        if not descend and not self._data_bytes:
+            return ()
+
+        cache = self._cache
+        entry = key = None
+        if cache is not None:
+            key = make_cache_key(ll.backend, regpath, self._wow64)
+            entry = cache._get(key, last_modified)
+        names = entry.names if entry is not None else None
+        data_size = entry.data_bytes if entry is not None else None
+        hit = True
+        if descend and names is None:
+            names = tuple(ll.subkey_from_index(handle, i) for i in range(total_subkeys))
+            hit = False
+        if self._data_bytes and data_size is None:
+            data_size = self._data_size(handle, total_values)
+            hit = False
+        if cache is not None and key is not None:
+            cache._count(hit)
+            if not hit:
+                cache._put(key, _Counted(last_modified, names, data_size))
+        if data_size is not None and self._data_bytes:
+            totals.data_bytes += data_size
+        if not descend or names is None:
+            return ()
+        return names
+
+    def walk(
+        self,
+        handle: Any,
+        regpath: RegistryPathString,
+        depth: int = 0,
+        owned: bool = False,
+    ) -> _Totals:
+        totals = _Totals()
+        for frame in walk_keys(
+            self._ll,
+            handle,
+            regpath,
+            depth=depth,
+            owned=owned,
+            onerror=self._onerror,
+        ):
+            for name in self._visit(frame.handle, frame.regpath, frame.depth, totals):
+                frame.descend(name)
+        return totals
+
+    def _open(self, root: Any, branch: _Branch) -> Any:
+        try:
+            return self._ll.open_subkey(root, branch.relpath)
+        except OSError as exc:
+            report_open_error(branch.regpath, exc, self._onerror)
+            return None
+
+    def _walk_branch(self, root: Any, branch: _Branch) -> _Totals:
+        handle = self._open(root, branch)
+        if handle is None:
+            return _Totals()
+        return self.walk(handle, branch.regpath, branch.depth, owned=True)
+
+    def walk_parallel(
+        self, handle: Any, regpath: RegistryPathString, workers: int
+    ) -> _Totals:
+        # Expand breadth-first on the calling thread until there are enough
+        # independent subtrees to keep every worker busy, then count those
+        # subtrees concurrently. Pending subtrees are kept as paths relative to
+        # the root rather than open handles, so a wide key does not open all of
+        # its children up front.
+        totals = _Totals()
+        frontier = deque(
+            _Branch(name, regpath._child(name), 1)
+            for name in self._visit(handle, regpath, 0, totals)
+        )
+        while frontier and len(frontier) < workers * 4:
+            branch = frontier.popleft()
+            child = self._open(handle, branch)
+            if child is None:
+                continue
+            try:
+                names = self._visit(child, branch.regpath, branch.depth, totals)
+            finally:
+                self._ll.close_subkey(child)
+            frontier.extend(
+                _Branch(
+                    branch.relpath + REGISTRY_SEP + name,
+                    branch.regpath._child(name),
+                    branch.depth + 1,
+                )
+                for name in names
+            )
+        if frontier:
+            with ThreadPoolExecutor(
+                workers, thread_name_prefix="windowsregistry-sizeof"
+            ) as executor:
+                futures = [
+                    executor.submit(self._walk_branch, handle, branch)
+                    for branch in frontier
+                ]
+            for future in futures:
+                totals.merge(future.result())
+        return totals
+
+
+def sizeof(  # noqa: PLR0913
+    path: "RegistryPath",
+    *,
+    max_depth: Optional[int] = None,
+    workers: Optional[int] = None,
+    data_bytes: bool = False,
+    cache: Optional[SizeCache] = None,
+    onerror: Optional[Callable[[WindowsRegistryError], None]] = None,
+) -> RegistrySize:
+    handler = path._backend
+    counter = _Counter(
+        handler._ll,
+        max_depth=max_depth,
+        data_bytes=data_bytes,
+        cache=cache,
+        onerror=onerror,
+    )
+    handle, regpath = handler.winreg_handler, handler._regpath
+    try:
+        if workers is not None and workers > 1:
+            totals = counter.walk_parallel(handle, regpath, workers)
+        else:
+            totals = counter.walk(handle, regpath)
+    except OSError as exc:
+        raise OperationError(
+            OperationErrorKind.ON_READ,
+            OperationDataErrorKind.SUBKEY,
+            f"fail to query {handler._regpath.fullpath!r}",
+            exc,
+        ) from exc
+    return RegistrySize(
+        handler._regpath,
+        totals.subkeys,
+        totals.values,
+        totals.data_bytes,
+        totals.max_depth,
+    )
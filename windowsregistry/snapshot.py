@@ -0,0 +1,340 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+from enum import Enum, auto
+from typing import TYPE_CHECKING, Any, Iterator, NamedTuple, Optional
+
+from ._lowlevel import lowlevel
+from ._walk import walk_keys
+from .batch import RegistryBatch
+from .errors import (
+    OperationDataErrorKind,
+    OperationError,
+    OperationErrorKind,
+    WindowsRegistryError,
+)
+from .models import (
+    RegistryKeyPermissionType,
+    RegistryPermissionConfig,
+    RegistryValue,
+    RegistryValueType,
+)
+from .regpath import RegistryPathString, fold_case
+
+if TYPE_CHECKING:
+    from .backends import RegistryBackend
+    from .core import RegistryPath
+
+
+class KeySnapshot(NamedTuple):
+    name: str
+    last_modified: int
+    # Both sorted case-insensitively by name; values are (name, data, dtype).
+    values: tuple[tuple[str, Any, int], ...]
+    subkeys: tuple["KeySnapshot", ...]
+
+
+class DiffKind(Enum):
+    KEY_ADDED = auto()
+    KEY_REMOVED = auto()
+    VALUE_ADDED = auto()
+    VALUE_REMOVED = auto()
+    VALUE_CHANGED = auto()
+
+
+class DiffEntry(NamedTuple):
+    kind: DiffKind
+    regpath: RegistryPathString
+    name: Optional[str]
+    old: Optional[RegistryValue]
+    new: Optional[RegistryValue]
+
+
+def _folded(item: Any) -> str:
+    return fold_case(item[0])
+
+
+def _ll_for(path: "RegistryPath") -> lowlevel:
+    return lowlevel(
+        permconf=RegistryPermissionConfig(
+            permissions=(RegistryKeyPermissionType.KEY_READ,),
+            wow64_32key_access=path._backend._ll._permconf.wow64_32key_access,
+        ),
+        backend=path._backend._ll.backend,
+    )
+
+
+class _Scan:
+    __slots__ = ("old", "last_modified", "values", "subkeys")
+
+    def __init__(self, old: Optional[KeySnapshot]) -> None:
+        self.old = old
+        self.last_modified = 0
+        self.values: tuple[tuple[str, Any, int], ...] = ()
+        self.subkeys: list[KeySnapshot] = []
+
+    def finish(self, name: str) -> KeySnapshot:
+        old = self.old
+        if (
+            old is not None
+            and self.values is old.values
+            and len(self.subkeys) == len(old.subkeys)
+            and all(a is b for a, b in zip(self.subkeys, old.subkeys, strict=True))
+        ):
+            return old
+        return KeySnapshot(name, self.last_modified, self.values, tuple(self.subkeys))
+
+
+def _skip(error: WindowsRegistryError) -> None:
+    pass
+
+
+def _scan(
+    ll: lowlevel,
+    handle: Any,
+    regpath: RegistryPathString,
+    old: Optional[KeySnapshot],
+    max_depth: Optional[int],
+) -> KeySnapshot:
+    result = None
+    for frame in walk_keys(
+        ll, handle, regpath, data=_Scan(old), leave=True, onerror=_skip
+    ):
+        scan: _Scan = frame.data
+        if frame.leaving:
+            snapshot = scan.finish(frame.regpath.name)
+            if frame.parent is None:
+                result = snapshot
+            else:
+                frame.parent.data.subkeys.append(snapshot)
+            continue
+        total_subkeys, total_values, scan.last_modified = ll.query_subkey(frame.handle)
+        old = scan.old
+        if old is not None and old.last_modified == scan.last_modified:
+            # Unchanged timestamp: the key's own values and subkey names are
+            # the same, but subkeys may still have changed below it.
+            scan.values = old.values
+            names = [child.name for child in old.subkeys]
+        else:
+            scan.values = tuple(
+                sorted(
+                    (ll.value_from_index(frame.handle, i) for i in range(total_values)),
+                    key=_folded,
+                )
+            )
+            names = sorted(
+                (ll.subkey_from_index(frame.handle, i) for i in range(total_subkeys)),
+                key=str.lower,
+            )
+        previous = {} if old is None else {fold_case(c.name): c for c in old.subkeys}
+        for subkey in names:
+            if max_depth is not None and frame.depth >= max_depth:
+                # Past max_depth only the subkey names are kept.
+                stub = previous.get(fold_case(subkey))
+                scan.subkeys.append(
+                    stub if stub is not None else KeySnapshot(subkey, 0, (), ())
+                )
+            else:
+                frame.descend(subkey, _Scan(previous.get(fold_case(subkey))))
+    assert result is not None
+    return result
+
+
+def _capture(
+    path: "RegistryPath", old: Optional[KeySnapshot], max_depth: Optional[int]
+) -> KeySnapshot:
+    regpath = path.regpath
+    ll = _ll_for(path)
+    try:
+        handle = ll.open_subkey(regpath.root_key.value, regpath.path)
+    except OSError as exc:
+        raise OperationError(
+            OperationErrorKind.ON_READ,
+            OperationDataErrorKind.SUBKEY,
+            f"fail to open {regpath.fullpath!r}",
+            exc,
+        ) from exc
+    try:
+        return _scan(ll, handle, regpath, old, max_depth)
+    finally:
+        ll.close_subkey(handle)
+
+
+class RegistrySnapshot(NamedTuple):
+    regpath: RegistryPathString
+    root: KeySnapshot
+    max_depth: Optional[int] = None
+
+    @classmethod
+    def capture(
+        cls, path: "RegistryPath", *, max_depth: Optional[int] = None
+    ) -> "RegistrySnapshot":
+        return cls(path.regpath, _capture(path, None, max_depth), max_depth)
+
+    def refresh(self, path: "RegistryPath") -> "RegistrySnapshot":
+        # Re-reads only keys whose last_modified moved; unchanged subtrees
+        # are shared with this snapshot.
+        return self.__class__(
+            path.regpath, _capture(path, self.root, self.max_depth), self.max_depth
+        )
+
+    def iterkeys(self) -> Iterator[tuple[RegistryPathString, KeySnapshot]]:
+        stack = [(self.regpath, self.root)]
+        while stack:
+            regpath, key = stack.pop()
+            yield regpath, key
+            stack.extend(
+                (regpath.joinpath(child.name), child) for child in reversed(key.subkeys)
+            )
+
+
+def _value(item: tuple[str, Any, int]) -> RegistryValue:
+    name, data, dtype = item
+    return RegistryValue(name, data, RegistryValueType(dtype))
+
+
+class _Differ:
+    def __init__(self) -> None:
+        self.entries: list[DiffEntry] = []
+
+    def added(self, regpath: RegistryPathString, key: KeySnapshot) -> None:
+        self.entries.append(DiffEntry(DiffKind.KEY_ADDED, regpath, None, None, None))
+        for item in key.values:
+            self.entries.append(
+                DiffEntry(DiffKind.VALUE_ADDED, regpath, item[0], None, _value(item))
+            )
+        for child in key.subkeys:
+            self.added(regpath.joinpath(child.name), child)
+
+    def values(
+        self,
+        regpath: RegistryPathString,
+        old: tuple[tuple[str, Any, int], ...],
+        new: tuple[tuple[str, Any, int], ...],
+    ) -> None:
+        i = j = 0
+        while i < len(old) or j < len(new):
+            a = fold_case(old[i][0]) if i < len(old) else None
+            b = fold_case(new[j][0]) if j < len(new) else None
+            if b is None or (a is not None and a < b):
+                self.entries.append(
+                    DiffEntry(
+                        DiffKind.VALUE_REMOVED, regpath, old[i][0], _value(old[i]), None
+                    )
+                )
+                i += 1
+            elif a is None or b < a:
+                self.entries.append(
+                    DiffEntry(
+                        DiffKind.VALUE_ADDED, regpath, new[j][0], None, _value(new[j])
+                    )
+                )
+                j += 1
+            else:
+                if old[i][1:] != new[j][1:]:
+                    self.entries.append(
+                        DiffEntry(
+                            DiffKind.VALUE_CHANGED,
+                            regpath,
+                            new[j][0],
+                            _value(old[i]),
+                            _value(new[j]),
+                        )
+                    )
+                i += 1
+                j += 1
+
+    def key(
+        self, regpath: RegistryPathString, old: KeySnapshot, new: KeySnapshot
+    ) -> None:
+        if old is new:
+            return
+        if old.values is not new.values:
+            self.values(regpath, old.values, new.values)
+        if old.subkeys is new.subkeys:
+            return
+        previous = {fold_case(child.name): child for child in old.subkeys}
+        for child in new.subkeys:
+            match = previous.pop(fold_case(child.name), None)
+            if match is None:
+                self.added(regpath.joinpath(child.name), child)
+            else:
+                self.key(regpath.joinpath(child.name), match, child)
+        for child in previous.values():
+            self.entries.append(
+                DiffEntry(
+                    DiffKind.KEY_REMOVED, regpath.joinpath(child.name), None, None, None
+                )
+            )
+
+
+class RegistryDiff(NamedTuple):
+    old: RegistrySnapshot
+    new: RegistrySnapshot
+    entries: tuple[DiffEntry, ...]
+
+    def __bool__(self) -> bool:
+        return bool(self.entries)
+
+    def of_kind(self, kind: DiffKind) -> tuple[DiffEntry, ...]:
+        return tuple(entry for entry in self.entries if entry.kind is kind)
+
+    def to_batch(
+        self,
+        batch: Optional[RegistryBatch] = None,
+        *,
+        target: Optional[RegistryPathString] = None,
+        backend: Optional["RegistryBackend"] = None,
+    ) -> RegistryBatch:
+        # Queues the changes that turn `old` into `new`, rebased onto
+        # `target` when the patch is meant for another subtree.
+        if batch is None:
+            batch = RegistryBatch(backend=backend)
+        base = len(self.new.regpath.parts)
+        for entry in self.entries:
+            regpath = entry.regpath
+            if target is not None:
+                regpath = target.joinpath(*regpath.parts[base:])
+            if entry.kind is DiffKind.KEY_ADDED:
+                batch.create_key(regpath)
+            elif entry.kind is DiffKind.KEY_REMOVED:
+                batch.delete_key(regpath, recursive=True, missing_ok=True)
+            elif entry.kind is DiffKind.VALUE_REMOVED:
+                batch.delete_value(regpath, entry.name or "", missing_ok=True)
+            else:
+                value: RegistryValue = entry.new  # type: ignore[assignment]
+                batch.set_value(regpath, value.value_name, value.data, dtype=value.dtype)
+        return batch
+
+
+def diff(old: RegistrySnapshot, new: RegistrySnapshot) -> RegistryDiff:
+    differ = _Differ()
+    differ.key(new.regpath, old.root, new.root)
+    return RegistryDiff(old, new, tuple(differ.entries))
+
+
+def diff_live(old: RegistrySnapshot, path: "RegistryPath") -> RegistryDiff:
+    return diff(old, old.refresh(path))
@@ -0,0 +1,623 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import base64
+import gzip
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from typing import IO, Any, Iterable, Iterator, NamedTuple, Optional, Union, cast
+
+from . import _winregconsts as consts
+from .backends import RegistryBackend, get_default_backend
+from .errors import TraceError
+from .models import RegistryHKEYEnum
+from .regpath import fold_case
+
+# Trace files are gzip-compressed JSON lines: one header object followed by
+# one `[operation, handle, args, result, error, elapsed_ns]` array per call.
+# Handles are numbered in the order they were opened (predefined root keys
+# keep their HKEY value), so a trace never holds paths more than once: the
+# path of a handle is recovered from the OpenKeyEx/CreateKeyEx that made it.
+TRACE_FORMAT = "windowsregistry-trace"
+TRACE_VERSION = 1
+
+_OPENS = ("OpenKeyEx", "CreateKeyEx")
+_WRITES = ("CreateKeyEx", "SetValueEx", "DeleteKeyEx", "DeleteValue")
+_VIEWS = consts.KEY_WOW64_32KEY | consts.KEY_WOW64_64KEY
+_roots = {hkey.value: hkey.name for hkey in RegistryHKEYEnum}
+_errors: dict[str, type[OSError]] = {
+    "OSError": OSError,
+    "FileNotFoundError": FileNotFoundError,
+    "PermissionError": PermissionError,
+}
+
+TraceFile = Union[str, "os.PathLike[str]", IO[bytes]]
+
+
+class TraceRecord(NamedTuple):
+    operation: str
+    handle: int
+    args: tuple[Any, ...]
+    # Trace number of the new handle for OpenKeyEx/CreateKeyEx.
+    result: Any
+    # (exception class, errno, winerror, strerror) of a failed call.
+    error: Optional[tuple[str, int, int, str]]
+    elapsed: float
+
+
+def _encode(obj: Any) -> Any:
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return {"b": base64.b64encode(cast("bytes", obj)).decode("ascii")}
+    if isinstance(obj, (list, tuple)):
+        return [_encode(item) for item in cast("Iterable[Any]", obj)]
+    return obj
+
+
+def _decode(obj: Any) -> Any:
+    if isinstance(obj, dict):
+        return base64.b64decode(cast("dict[str, str]", obj)["b"])
+    if isinstance(obj, list):
+        return [_decode(item) for item in cast("list[Any]", obj)]
+    return obj
+
+
+def _dump_error(exc: OSError) -> tuple[str, int, int, str]:
+    name = type(exc).__name__
+    if name not in _errors:
+        name = "OSError"
+    winerror = getattr(exc, "winerror", None) or 0
+    return (name, exc.errno or 0, winerror, exc.strerror or "")
+
+
+def _load_error(error: tuple[str, int, int, str]) -> OSError:
+    name, err, winerror, message = error
+    exc = _errors.get(name, OSError)(err, message)
+    exc.winerror = winerror  # type: ignore[attr-defined]
+    return exc
+
+
+def _open(file: TraceFile, mode: str) -> IO[bytes]:
+    if isinstance(file, (str, os.PathLike)):
+        return gzip.open(file, mode)  # type: ignore[return-value]
+    return gzip.GzipFile(fileobj=file, mode=mode)  # type: ignore[return-value]
+
+
+def read_trace(file: TraceFile) -> Iterator[TraceRecord]:
+    with _open(file, "rb") as stream:
+        try:
+            header = json.loads(stream.readline() or b"null")
+        except (OSError, EOFError, ValueError):
+            header = None
+        fields = cast("dict[str, Any]", header) if isinstance(header, dict) else {}
+        if (
+            fields.get("format") != TRACE_FORMAT
+            or fields.get("version") != TRACE_VERSION
+        ):
+            raise TraceError("not a trace file or unsupported trace version")
+        for lineno, line in enumerate(stream, 2):
+            try:
+                operation, handle, args, result, error, elapsed = json.loads(line)
+            except ValueError:
+                raise TraceError(f"malformed record on line {lineno}") from None
+            yield TraceRecord(
+                operation,
+                handle,
+                tuple(_decode(args)),
+                _decode(result),
+                tuple(error) if error else None,  # type: ignore[arg-type]
+                elapsed / 1e9,
+            )
+
+
+def _records(trace: Union[TraceFile, Iterable[TraceRecord]]) -> Iterable[TraceRecord]:
+    if isinstance(trace, (str, os.PathLike)) or hasattr(trace, "read"):
+        return read_trace(trace)  # type: ignore[arg-type]
+    return trace  # type: ignore[return-value]
+
+
+class RecordingBackend:
+    def __init__(self, file: TraceFile, backend: Optional[RegistryBackend] = None) -> None:
+        self._backend = backend if backend is not None else get_default_backend()
+        self._stream = _open(file, "wb")
+        self._lock = threading.Lock()
+        self._ids: dict[int, int] = {}
+        self._next_id = 1
+        self._records = 0
+        self._write(
+            {"format": TRACE_FORMAT, "version": TRACE_VERSION, "created": time.time()}
+        )
+
+    @property
+    def backend(self) -> RegistryBackend:
+        return self._backend
+
+    @property
+    def records(self) -> int:
+        return self._records
+
+    @property
+    def closed(self) -> bool:
+        return self._stream.closed
+
+    def _write(self, obj: Any) -> None:
+        self._stream.write(json.dumps(obj, separators=(",", ":")).encode("utf-8"))
+        self._stream.write(b"\n")
+
+    def _handle_id(self, handle: Any) -> int:
+        if isinstance(handle, int) and handle in _roots:
+            return handle
+        return self._ids.get(id(handle), 0)
+
+    def _record(  # noqa: PLR0913, PLR0917
+        self,
+        operation: str,
+        handle: Any,
+        args: tuple[Any, ...],
+        result: Any,
+        error: Optional[tuple[str, int, int, str]],
+        elapsed: int,
+    ) -> None:
+        with self._lock:
+            if error is not None:
+                stored = None
+            elif operation in _OPENS:
+                stored = self._next_id
+                self._ids[id(result)] = stored
+                self._next_id += 1
+            else:
+                stored = _encode(result)
+            if not self._stream.closed:
+                handle_id = self._handle_id(handle)
+                record = [operation, handle_id, _encode(args), stored, error, elapsed]
+                self._write(record)
+                self._records += 1
+
+    def _call(self, operation: str, handle: Any, args: tuple[Any, ...], fn: Any) -> Any:
+        # Only results and OSErrors are part of the registry's behaviour; any
+        # other exception is a bug in the caller and is not recorded.
+        start = time.perf_counter_ns()
+        try:
+            result = fn(handle, *args)
+        except OSError as exc:
+            elapsed = time.perf_counter_ns() - start
+            self._record(operation, handle, args, None, _dump_error(exc), elapsed)
+            raise
+        elapsed = time.perf_counter_ns() - start
+        self._record(operation, handle, args, result, None, elapsed)
+        return result
+
+    def OpenKeyEx(
+        self, key: Any, sub_key: str, reserved: int = 0, access: int = consts.KEY_READ
+    ) -> Any:
+        return self._call(
+            "OpenKeyEx",
+            key,
+            (sub_key, reserved, access),
+            self._backend.OpenKeyEx,
+        )
+
+    def CreateKeyEx(
+        self, key: Any, sub_key: str, reserved: int = 0, access: int = consts.KEY_WRITE
+    ) -> Any:
+        return self._call(
+            "CreateKeyEx",
+            key,
+            (sub_key, reserved, access),
+            self._backend.CreateKeyEx,
+        )
+
+    def CloseKey(self, hkey: Any) -> None:
+        self._call("CloseKey", hkey, (), self._backend.CloseKey)
+        with self._lock:
+            self._ids.pop(id(hkey), None)
+
+    def EnumKey(self, key: Any, index: int) -> str:
+        return self._call("EnumKey", key, (index,), self._backend.EnumKey)
+
+    def EnumValue(self, key: Any, index: int) -> tuple[str, Any, int]:
+        return self._call("EnumValue", key, (index,), self._backend.EnumValue)
+
+    def QueryInfoKey(self, key: Any) -> tuple[int, int, int]:
+        return self._call("QueryInfoKey", key, (), self._backend.QueryInfoKey)
+
+    def QueryValueEx(self, key: Any, name: Optional[str]) -> tuple[Any, int]:
+        return self._call("QueryValueEx", key, (name,), self._backend.QueryValueEx)
+
+    def SetValueEx(
+        self, key: Any, value_name: Optional[str], reserved: int, type: int, value: Any
+    ) -> None:
+        self._call(
+            "SetValueEx",
+            key,
+            (value_name, reserved, type, value),
+            self._backend.SetValueEx,
+        )
+
+    def DeleteKeyEx(
+        self,
+        key: Any,
+        sub_key: str,
+        access: int = consts.KEY_WOW64_64KEY,
+        reserved: int = 0,
+    ) -> None:
+        self._call(
+            "DeleteKeyEx",
+            key,
+            (sub_key, access, reserved),
+            self._backend.DeleteKeyEx,
+        )
+
+    def DeleteValue(self, key: Any, value: Optional[str]) -> None:
+        self._call("DeleteValue", key, (value,), self._backend.DeleteValue)
+
+    def close(self) -> None:
+        with self._lock:
+            self._stream.close()
+
+    def __enter__(self) -> "RecordingBackend":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}: {self._records} records of {self._backend!r}>"
+
+
+# (root key name, lowercased path, WOW64 view bits)
+_Location = tuple[str, str, int]
+
+
+def _join(path: str, sub_key: Optional[str]) -> str:
+    if not sub_key:
+        return path
+    sub_key = sub_key.strip("\\")
+    return f"{path}\\{sub_key}" if path else sub_key
+
+
+def _display(location: _Location) -> str:
+    root, path, _ = location
+    return f"{root}\\{path}" if path else root
+
+
+class _Locator:
+    __slots__ = ("handles", "names")
+
+    def __init__(self) -> None:
+        self.handles: dict[int, _Location] = {}
+        # Location -> path as first spelled in the trace, for reports.
+        self.names: dict[_Location, str] = {}
+
+    def locate(self, handle: int) -> _Location:
+        root = _roots.get(handle)
+        if root is not None:
+            return root, "", 0
+        return self.handles.get(handle, ("?", "", 0))
+
+    def target(self, record: TraceRecord) -> _Location:
+        # OpenKeyEx/CreateKeyEx take (sub_key, reserved, access) and
+        # DeleteKeyEx takes (sub_key, access, reserved).
+        root, path, view = self.locate(record.handle)
+        sub_key = record.args[0]
+        access = record.args[1 if record.operation == "DeleteKeyEx" else 2]
+        location = (root, fold_case(_join(path, sub_key)), (access & _VIEWS) or view)
+        if location not in self.names:
+            self.names[location] = _join(self.name(record.handle), sub_key)
+        return location
+
+    def name(self, handle: int) -> str:
+        location = self.locate(handle)
+        return self.names.get(location) or _display(location)
+
+    def key(self, record: TraceRecord) -> tuple[Any, ...]:
+        operation = record.operation
+        if operation in _OPENS or operation == "DeleteKeyEx":
+            return (operation, *self.target(record))
+        location = self.locate(record.handle)
+        if operation in ("QueryValueEx", "SetValueEx", "DeleteValue"):
+            return (operation, *location, fold_case(record.args[0] or ""))
+        return (operation, *location, *record.args)
+
+
+class ReplayHandle:
+    __slots__ = ("location", "_closed")
+
+    def __init__(self, location: _Location) -> None:
+        self.location = location
+        self._closed = False
+
+    def Close(self) -> None:
+        self._closed = True
+
+    def __bool__(self) -> bool:
+        return not self._closed
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}: {_display(self.location)!r}>"
+
+
+class ReplayBackend:
+    def __init__(
+        self, trace: Union[TraceFile, Iterable[TraceRecord]], *, realtime: bool = False
+    ) -> None:
+        locator = _Locator()
+        outcomes: dict[tuple[Any, ...], deque[tuple[Any, Any, float]]] = {}
+        for record in _records(trace):
+            if record.operation == "CloseKey":
+                continue
+            if record.operation in _OPENS and record.error is None:
+                locator.handles[record.result] = locator.target(record)
+            outcomes.setdefault(locator.key(record), deque()).append(
+                (record.result, record.error, record.elapsed)
+            )
+        self._outcomes = outcomes
+        self._realtime = realtime
+        self._lock = threading.Lock()
+        self._served = 0
+
+    @property
+    def served(self) -> int:
+        return self._served
+
+    def _location(self, handle: Any) -> _Location:
+        if isinstance(handle, ReplayHandle):
+            return handle.location
+        if isinstance(handle, int) and handle in _roots:
+            return _roots[handle], "", 0
+        raise TraceError(f"handle {handle!r} was not opened by this replay")
+
+    def _serve(self, key: tuple[Any, ...]) -> Any:
+        # Recorded outcomes of the same call are served in order; the last one
+        # keeps being served once the queue runs dry, as an unchanged registry
+        # would answer.
+        with self._lock:
+            queue = self._outcomes.get(key)
+            if not queue:
+                args = f" with {key[4:]!r}" if key[4:] else ""
+                where = _display(key[1:4])
+                raise TraceError(f"call not in trace: {key[0]} on {where!r}{args}")
+            result, error, elapsed = queue.popleft() if len(queue) > 1 else queue[0]
+            self._served += 1
+        if self._realtime:
+            time.sleep(elapsed)
+        if error is not None:
+            raise _load_error(error)
+        return result
+
+    def _open(self, operation: str, key: Any, sub_key: str, access: int) -> ReplayHandle:
+        root, path, view = self._location(key)
+        location = (root, fold_case(_join(path, sub_key)), (access & _VIEWS) or view)
+        self._serve((operation, *location))
+        return ReplayHandle(location)
+
+    def OpenKeyEx(
+        self, key: Any, sub_key: str, reserved: int = 0, access: int = consts.KEY_READ  # noqa: ARG002
+    ) -> ReplayHandle:
+        return self._open("OpenKeyEx", key, sub_key, access)
+
+    def CreateKeyEx(
+        self, key: Any, sub_key: str, reserved: int = 0, access: int = consts.KEY_WRITE  # noqa: ARG002
+    ) -> ReplayHandle:
+        return self._open("CreateKeyEx", key, sub_key, access)
+
+    def CloseKey(self, hkey: Any) -> None:
+        if isinstance(hkey, ReplayHandle):
+            hkey.Close()
+
+    def EnumKey(self, key: Any, index: int) -> str:
+        return self._serve(("EnumKey", *self._location(key), index))
+
+    def EnumValue(self, key: Any, index: int) -> tuple[str, Any, int]:
+        name, data, dtype = self._serve(("EnumValue", *self._location(key), index))
+        return name, data, dtype
+
+    def QueryInfoKey(self, key: Any) -> tuple[int, int, int]:
+        subkeys, values, last_modified = self._serve(("QueryInfoKey", *self._location(key)))
+        return subkeys, values, last_modified
+
+    def QueryValueEx(self, key: Any, name: Optional[str]) -> tuple[Any, int]:
+        location = self._location(key)
+        data, dtype = self._serve(("QueryValueEx", *location, fold_case(name or "")))
+        return data, dtype
+
+    def SetValueEx(
+        self, key: Any, value_name: Optional[str], reserved: int, type: int, value: Any  # noqa: ARG002
+    ) -> None:
+        self._serve(("SetValueEx", *self._location(key), fold_case(value_name or "")))
+
+    def DeleteKeyEx(
+        self,
+        key: Any,
+        sub_key: str,
+        access: int = consts.KEY_WOW64_64KEY,
+        reserved: int = 0,  # noqa: ARG002
+    ) -> None:
+        root, path, view = self._location(key)
+        location = (root, fold_case(_join(path, sub_key)), (access & _VIEWS) or view)
+        self._serve(("DeleteKeyEx", *location))
+
+    def DeleteValue(self, key: Any, value: Optional[str]) -> None:
+        self._serve(("DeleteValue", *self._location(key), fold_case(value or "")))
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}: {len(self._outcomes)} distinct calls>"
+
+
+class Redundancy(NamedTuple):
+    path: str
+    # Calls that a cache or a reused handle would have saved.
+    calls: int
+    elapsed: float
+
+
+class TraceReport(NamedTuple):
+    total_calls: int
+    total_time: float
+    calls: dict[str, int]
+    time: dict[str, float]
+    # Same key opened again while the registry had not changed it.
+    repeated_opens: list[Redundancy]
+    # A handle opened, closed unused (an existence probe), then opened again.
+    exists_then_open: list[Redundancy]
+    # QueryInfoKey/QueryValueEx repeated with no write to the key in between.
+    repeated_queries: list[Redundancy]
+
+    @property
+    def redundant_calls(self) -> int:
+        return sum(
+            item.calls
+            for items in (self.repeated_opens, self.exists_then_open, self.repeated_queries)
+            for item in items
+        )
+
+    def format(self, top: int = 10) -> str:
+        lines = [
+            f"{self.total_calls} calls in {self.total_time * 1e3:.3f} ms, "
+            f"{self.redundant_calls} redundant"
+        ]
+        for operation, count in sorted(self.calls.items(), key=lambda item: -item[1]):
+            lines.append(
+                f"  {operation:<14}{count:>10}{self.time[operation] * 1e3:>12.3f} ms"
+            )
+        for title, items in (
+            ("repeated opens", self.repeated_opens),
+            ("exists-then-open", self.exists_then_open),
+            ("repeated queries", self.repeated_queries),
+        ):
+            if not items:
+                continue
+            lines.append(f"{title}:")
+            for item in items[:top]:
+                elapsed = item.elapsed * 1e3
+                lines.append(f"  {item.calls:>8}  {elapsed:>10.3f} ms  {item.path}")
+            if len(items) > top:
+                lines.append(f"  ... {len(items) - top} more")
+        return "\n".join(lines)
+
+
+class _Tally:
+    __slots__ = ("calls", "elapsed")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.elapsed = 0.0
+
+    def add(self, elapsed: float) -> None:
+        self.calls += 1
+        self.elapsed += elapsed
+
+
+def _ranked(tallies: dict[str, _Tally]) -> list[Redundancy]:
+    items = [Redundancy(path, t.calls, t.elapsed) for path, t in tallies.items()]
+    items.sort(key=lambda item: (-item.calls, -item.elapsed, item.path))
+    return items
+
+
+def analyze_trace(trace: Union[TraceFile, Iterable[TraceRecord]]) -> TraceReport:
+    locator = _Locator()
+    calls: Counter[str] = Counter()
+    times: dict[str, float] = {}
+    # Opened and probed locations are grouped by (root, path), and queries by
+    # location, so a write forgets them without scanning every entry.
+    opened: dict[tuple[str, str], set[_Location]] = {}
+    # Handle number -> [location, calls made on it] for handles still open.
+    live: dict[int, list[Any]] = {}
+    probed: dict[tuple[str, str], set[_Location]] = {}
+    queried: dict[_Location, set[tuple[Any, ...]]] = {}
+    query_names: dict[tuple[Any, ...], str] = {}
+    repeated_opens: dict[str, _Tally] = {}
+    exists_then_open: dict[str, _Tally] = {}
+    repeated_queries: dict[str, _Tally] = {}
+
+    # A write changes the key's info and values and may create or remove the
+    # key being opened, so earlier answers about it no longer count as repeats.
+    def forget_queries(location: _Location) -> None:
+        queried.pop(location, None)
+
+    def forget_opens(location: _Location) -> None:
+        opened.pop(location[:2], None)
+        probed.pop(location[:2], None)
+
+    for record in _records(trace):
+        operation = record.operation
+        calls[operation] += 1
+        times[operation] = times.get(operation, 0.0) + record.elapsed
+        if operation == "CloseKey":
+            state = live.pop(record.handle, None)
+            if state is not None and not state[1]:
+                probed.setdefault(state[0][:2], set()).add(state[0])
+            continue
+        if record.handle in live:
+            live[record.handle][1] += 1
+        if operation in _OPENS:
+            location = locator.target(record)
+            if record.error is None:
+                locator.handles[record.result] = location
+                live[record.result] = [location, 0]
+            if operation == "CreateKeyEx":
+                forget_opens(location)
+                forget_queries(location)
+                forget_queries(locator.locate(record.handle))
+                continue
+            display = locator.names[location]
+            seen = probed.get(location[:2])
+            if seen is not None and location in seen:
+                seen.discard(location)
+                exists_then_open.setdefault(display, _Tally()).add(record.elapsed)
+            elif location in opened.get(location[:2], ()):
+                repeated_opens.setdefault(display, _Tally()).add(record.elapsed)
+            opened.setdefault(location[:2], set()).add(location)
+        elif operation in _WRITES:
+            if operation == "DeleteKeyEx":
+                target = locator.target(record)
+                forget_opens(target)
+                forget_queries(target)
+            forget_queries(locator.locate(record.handle))
+        elif operation in ("QueryInfoKey", "QueryValueEx"):
+            key = locator.key(record)
+            answered = queried.setdefault(key[1:4], set())
+            if key in answered:
+                display = query_names[key]
+                repeated_queries.setdefault(display, _Tally()).add(record.elapsed)
+            answered.add(key)
+            if key not in query_names:
+                display = locator.name(record.handle)
+                if operation == "QueryValueEx":
+                    display = f"{display} [{record.args[0] or ''}]"
+                query_names[key] = display
+
+    return TraceReport(
+        sum(calls.values()),
+        sum(times.values()),
+        dict(calls),
+        times,
+        _ranked(repeated_opens),
+        _ranked(exists_then_open),
+        _ranked(repeated_queries),
+    )
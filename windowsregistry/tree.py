@@ -0,0 +1,336 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import hashlib
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Mapping,
+    MutableMapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    cast,
+)
+
+from ._lowlevel import lowlevel
+from ._walk import KeyFrame, walk_keys
+from .codec import encode
+from .errors import (
+    OperationDataErrorKind,
+    OperationError,
+    OperationErrorKind,
+    TreeSpecError,
+    ValueCodecError,
+)
+from .handlepool import get_handle_pool
+from .hive.format import encode_data
+from .models import (
+    RegistryKeyPermissionType,
+    RegistryPermissionConfig,
+    RegistryValue,
+    RegistryValueType,
+)
+from .regpath import RegistryPathString, fold_case
+from .valuecache import invalidate_caches
+
+if TYPE_CHECKING:
+    from .core import RegistryPath
+
+# A spec maps subkey names to nested specs and value names to either a
+# RegistryValue or a (data, dtype) pair, where dtype is a RegistryValueType,
+# its integer value or its name (so specs can be loaded from JSON):
+#
+#     {"Theme": ("dark", "REG_SZ"), "Plugins": {"Enabled": [1, "REG_DWORD"]}}
+TreeSpec = Mapping[str, Any]
+
+# Fullpath (case-folded) -> (last_modified, spec digest) of keys known to match
+# their spec; pass the same mapping to later calls to skip reading them.
+TreeStamps = MutableMapping[str, tuple[int, str]]
+
+
+class TreeStats(NamedTuple):
+    total_keys: int
+    unchanged_keys: int
+    created_keys: int
+    deleted_keys: int
+    set_values: int
+    deleted_values: int
+
+
+class _Value(NamedTuple):
+    name: str
+    data: Any
+    dtype: int
+    encoded: bytes
+
+
+class _Node(NamedTuple):
+    values: dict[str, _Value]
+    subkeys: dict[str, tuple[str, "_Node"]]
+    digest: str
+
+
+def _dtype(raw: Any, where: str) -> RegistryValueType:
+    try:
+        if isinstance(raw, RegistryValueType):
+            return raw
+        if isinstance(raw, str):
+            name = raw.upper()
+            return RegistryValueType[name if name.startswith("REG_") else "REG_" + name]
+        if isinstance(raw, int) and not isinstance(raw, bool):
+            return RegistryValueType(raw)
+    except (KeyError, ValueError):
+        pass
+    raise TreeSpecError(f"unknown value type {raw!r}", where)
+
+
+def _parse(spec: Mapping[Any, Any], where: str, prune: bool) -> _Node:
+    # Specs often come from JSON or other untyped sources, so every name and
+    # item is checked here rather than trusted to match TreeSpec.
+    values: dict[str, _Value] = {}
+    subkeys: dict[str, tuple[str, _Node]] = {}
+    for name, item in spec.items():
+        if not isinstance(name, str):
+            raise TreeSpecError(f"name {name!r} is not a string", where)
+        folded = fold_case(name)
+        if isinstance(item, Mapping):
+            if not name or "\\" in name:
+                raise TreeSpecError(f"invalid subkey name {name!r}", where)
+            if folded in subkeys:
+                raise TreeSpecError(f"duplicate subkey {name!r}", where)
+            nested = cast("Mapping[Any, Any]", item)
+            subkeys[folded] = (name, _parse(nested, f"{where}\\{name}", prune))
+            continue
+        if isinstance(item, RegistryValue):
+            data, dtype = item.data, item.dtype
+        elif (
+            isinstance(item, (tuple, list))
+            and len(pair := cast("Sequence[Any]", item)) == 2
+        ):
+            data, dtype = pair[0], _dtype(pair[1], f"{where}\\{name}")
+        else:
+            raise TreeSpecError(
+                f"value {name!r} must be a mapping, a RegistryValue or a (data, dtype) pair",
+                where,
+            )
+        if folded in values:
+            raise TreeSpecError(f"duplicate value {name!r}", where)
+        # Checked with the same codec the write goes through, so bad data is
+        # rejected before anything in the tree is touched.
+        try:
+            data = encode(dtype, data)
+            encoded = encode_data(dtype.value, data)
+        except (ValueCodecError, TypeError, ValueError, OverflowError) as exc:
+            raise TreeSpecError(f"bad data for value {name!r}: {exc}", where) from exc
+        values[folded] = _Value(name, data, dtype.value, encoded)
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(b"p" if prune else b"-")
+    for folded in sorted(values):
+        value = values[folded]
+        digest.update(b"v%s\0%d\0" % (folded.encode("utf-8", "surrogatepass"), value.dtype))
+        digest.update(len(value.encoded).to_bytes(4, "little") + value.encoded)
+    if prune:
+        for folded in sorted(subkeys):
+            digest.update(b"k%s\0" % folded.encode("utf-8", "surrogatepass"))
+    return _Node(values, subkeys, digest.hexdigest())
+
+
+class _State:
+    # Per-key progress while the tree is applied.
+    __slots__ = ("node", "created", "changed", "last_modified")
+
+    def __init__(self, node: _Node, created: bool) -> None:
+        self.node = node
+        self.created = created
+        self.changed = False
+        self.last_modified = 0
+
+
+class _Materializer:
+    def __init__(
+        self, ll: lowlevel, prune: bool, stamps: Optional[TreeStamps]
+    ) -> None:
+        self._ll = ll
+        self._prune = prune
+        self._stamps = stamps
+        # [keys, unchanged, created, deleted keys, set values, deleted values]
+        self.stats = [0, 0, 0, 0, 0, 0]
+
+    def _current_values(self, handle: Any, total: int) -> dict[str, tuple[Any, int]]:
+        current: dict[str, tuple[Any, int]] = {}
+        for i in range(total):
+            name, data, dtype = self._ll.value_from_index(handle, i)
+            current[fold_case(name)] = (data, dtype)
+        return current
+
+    def _sync_values(
+        self, handle: Any, node: _Node, total_values: int, created: bool
+    ) -> bool:
+        changed = False
+        current = {} if created else self._current_values(handle, total_values)
+        for folded, value in node.values.items():
+            existing = current.get(folded)
+            if existing is not None and existing[1] == value.dtype:
+                try:
+                    if encode_data(existing[1], existing[0]) == value.encoded:
+                        continue
+                except (TypeError, ValueError, OverflowError):
+                    pass
+            self._ll.set_value(
+                handle, value.name, value.dtype, value.data, encoded=True
+            )
+            self.stats[4] += 1
+            changed = True
+        if self._prune:
+            for folded in current.keys() - node.values.keys():
+                self._ll.delete_value(handle, folded)
+                self.stats[5] += 1
+                changed = True
+        return changed
+
+    def _prune_subkeys(
+        self,
+        handle: Any,
+        regpath: RegistryPathString,
+        node: _Node,
+        total_subkeys: int,
+    ) -> bool:
+        names = [self._ll.subkey_from_index(handle, i) for i in range(total_subkeys)]
+        changed = False
+        for name in names:
+            if fold_case(name) not in node.subkeys:
+                self.stats[3] += self._ll.delete_tree(handle, name)
+                pruned = regpath.joinpath(name)
+                get_handle_pool().invalidate(self._ll.backend, pruned)
+                invalidate_caches(self._ll.backend, pruned, tree=True)
+                changed = True
+        return changed
+
+    def _open(self, parent: KeyFrame, name: str, state: _State) -> tuple[Any, _State]:
+        if not state.created:
+            try:
+                return self._ll.open_subkey(parent.handle, name), state
+            except FileNotFoundError:
+                state.created = True
+        child = self._ll.create_subkey(parent.handle, name)
+        self.stats[2] += 1
+        parent.data.changed = True
+        return child, state
+
+    def _enter(self, frame: KeyFrame) -> None:
+        state: _State = frame.data
+        node = state.node
+        self.stats[0] += 1
+        total_subkeys, total_values, state.last_modified = self._ll.query_subkey(
+            frame.handle
+        )
+        fresh = (
+            not state.created
+            and self._stamps is not None
+            and self._stamps.get(fold_case(frame.regpath.fullpath))
+            == (state.last_modified, node.digest)
+        )
+        if not fresh:
+            state.changed = self._sync_values(
+                frame.handle, node, total_values, state.created
+            )
+            if self._prune and not state.created and total_subkeys:
+                state.changed |= self._prune_subkeys(
+                    frame.handle, frame.regpath, node, total_subkeys
+                )
+        for name, child_node in node.subkeys.values():
+            frame.descend(name, _State(child_node, state.created))
+
+    def _leave(self, frame: KeyFrame) -> None:
+        state: _State = frame.data
+        if state.changed or state.created:
+            invalidate_caches(self._ll.backend, frame.regpath, created=state.created)
+        else:
+            self.stats[1] += 1
+        if self._stamps is not None:
+            last_modified = state.last_modified
+            if state.changed:
+                last_modified = self._ll.query_subkey(frame.handle)[2]
+            self._stamps[fold_case(frame.regpath.fullpath)] = (
+                last_modified,
+                state.node.digest,
+            )
+
+    def apply(self, handle: Any, regpath: RegistryPathString, node: _Node) -> None:
+        for frame in walk_keys(
+            self._ll,
+            handle,
+            regpath,
+            data=_State(node, False),
+            leave=True,
+            opener=self._open,
+        ):
+            if frame.leaving:
+                self._leave(frame)
+            else:
+                self._enter(frame)
+
+
+def create_tree(
+    path: "RegistryPath",
+    spec: TreeSpec,
+    *,
+    prune: bool = False,
+    stamps: Optional[TreeStamps] = None,
+) -> TreeStats:
+    regpath: RegistryPathString = path.regpath
+    node = _parse(spec, regpath.fullpath, prune)
+    ll = lowlevel(
+        permconf=RegistryPermissionConfig(
+            permissions=(RegistryKeyPermissionType.KEY_ALL_ACCESS,),
+            wow64_32key_access=path._backend._ll._permconf.wow64_32key_access,
+        ),
+        backend=path._backend._ll.backend,
+    )
+    materializer = _Materializer(ll, prune, stamps)
+    try:
+        handle = ll.open_subkey(regpath.root_key.value, regpath.path)
+    except OSError as exc:
+        raise OperationError(
+            OperationErrorKind.ON_UPDATE,
+            OperationDataErrorKind.SUBKEY,
+            f"fail to open {regpath.fullpath!r} for writing",
+            exc,
+        ) from exc
+    try:
+        materializer.apply(handle, regpath, node)
+    except (OSError, ValueError, TypeError) as exc:
+        raise OperationError(
+            OperationErrorKind.ON_UPDATE,
+            OperationDataErrorKind.SUBKEY,
+            f"fail to materialise tree at {regpath.fullpath!r}",
+            exc,
+        ) from exc
+    finally:
+        ll.close_subkey(handle)
+    return TreeStats(*materializer.stats)
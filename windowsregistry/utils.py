@@ -22,9 +22,23 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from .models import RegistryAlternateViewType, RegistryPermissionConfig
+from functools import lru_cache
 
+from .models import (
+    RegistryAlternateViewType,
+    RegistryKeyPermissionType,
+    RegistryPermissionConfig,
+)
 
+
+@lru_cache(maxsize=None)
+def get_permission_config(
+    permissions: tuple[RegistryKeyPermissionType, ...], wow64_32key_access: bool
+) -> RegistryPermissionConfig:
+    return RegistryPermissionConfig(permissions, wow64_32key_access)
+
+
+@lru_cache(maxsize=None)
 def get_permission_int(permconf: RegistryPermissionConfig) -> int:
     if permconf.wow64_32key_access:
         alttype = RegistryAlternateViewType.KEY_WOW64_32KEY
@@ -0,0 +1,269 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterator, NamedTuple, Optional
+
+from .backends import RegistryBackend
+from .regpath import RegistryPathString
+
+# (backend, registry path, 32-bit view)
+CacheKey = tuple[RegistryBackend, RegistryPathString, bool]
+
+# Returned by ValueCache.get() when nothing usable is cached.
+UNCACHED: Any = object()
+# Cached result for a value or subkey that does not exist.
+MISSING: Any = object()
+
+
+class ValueCacheStats(NamedTuple):
+    hits: int
+    negative_hits: int
+    misses: int
+    stale: int
+    evictions: int
+    invalidations: int
+    size: int
+
+
+def make_cache_key(
+    backend: RegistryBackend, regpath: RegistryPathString, wow64_32key_access: bool
+) -> CacheKey:
+    return backend, regpath, wow64_32key_access
+
+
+class _Item:
+    __slots__ = ("value", "expires", "last_modified")
+
+    def __init__(self, value: Any, expires: float, last_modified: Optional[int]) -> None:
+        self.value = value
+        self.expires = expires
+        self.last_modified = last_modified
+
+
+def _lineage(regpath: Optional[RegistryPathString]) -> Iterator[RegistryPathString]:
+    # `regpath` and each of its ancestors up to the root key, following the
+    # parent links, so the walk is linear in the depth.
+    node = regpath
+    while node is not None:
+        yield node
+        node = node._parent
+
+
+class ValueCache:
+    # Items are keyed by (CacheKey, kind, name): "v" for a single value, "a"
+    # for the whole value list of a key and "e" for whether the key exists.
+    #
+    # Existence entries are stored under the subkey's own CacheKey but, with
+    # `revalidate`, stamped with the last-write time of the key it was looked
+    # up from. A subkey created by another process within the same timestamp
+    # tick (coarse on some backends) is then reported missing until the entry
+    # expires; pass `negative=False` where that matters.
+
+    def __init__(
+        self,
+        max_size: int = 4096,
+        *,
+        ttl: Optional[float] = None,
+        revalidate: bool = False,
+        negative: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._max_size = max(1, max_size)
+        self._ttl = ttl
+        self._revalidate = revalidate
+        self._negative = negative
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._items: OrderedDict[Hashable, _Item] = OrderedDict()
+        self._by_key: dict[CacheKey, set[Hashable]] = {}
+        # (backend, path) -> cached keys at or below it, for tree invalidation.
+        self._subtrees: dict[
+            tuple[RegistryBackend, RegistryPathString], set[CacheKey]
+        ] = {}
+        self._hits = self._negative_hits = self._misses = self._stale = 0
+        self._evictions = self._invalidations = 0
+        _caches.add(self)
+
+    @property
+    def revalidate(self) -> bool:
+        return self._revalidate
+
+    @property
+    def negative(self) -> bool:
+        return self._negative
+
+    def get(
+        self, key: CacheKey, kind: str, name: str = "", last_modified: Optional[int] = None
+    ) -> Any:
+        item_key = (key, kind, name)
+        with self._lock:
+            item = self._items.get(item_key)
+            if item is None:
+                self._misses += 1
+                return UNCACHED
+            if (self._ttl is not None and item.expires <= self._clock()) or (
+                last_modified is not None and item.last_modified != last_modified
+            ):
+                self._stale += 1
+                self._misses += 1
+                self._drop(item_key)
+                return UNCACHED
+            self._items.move_to_end(item_key)
+            if item.value is MISSING:
+                self._negative_hits += 1
+            else:
+                self._hits += 1
+            return item.value
+
+    def put(
+        self,
+        key: CacheKey,
+        kind: str,
+        name: str,
+        value: Any,
+        last_modified: Optional[int] = None,
+    ) -> None:
+        if value is MISSING and not self._negative:
+            return
+        item_key = (key, kind, name)
+        expires = self._clock() + self._ttl if self._ttl is not None else 0.0
+        with self._lock:
+            self._items[item_key] = _Item(value, expires, last_modified)
+            self._items.move_to_end(item_key)
+            members = self._by_key.get(key)
+            if members is None:
+                members = self._by_key[key] = set()
+                self._index(key)
+            members.add(item_key)
+            while len(self._items) > self._max_size:
+                oldest = next(iter(self._items))
+                self._drop(oldest)
+                self._evictions += 1
+
+    def _index(self, key: CacheKey) -> None:
+        backend = key[0]
+        for regpath in _lineage(key[1]):
+            self._subtrees.setdefault((backend, regpath), set()).add(key)
+
+    def _unindex(self, key: CacheKey) -> None:
+        backend = key[0]
+        for regpath in _lineage(key[1]):
+            below = self._subtrees.get((backend, regpath))
+            if below is not None:
+                below.discard(key)
+                if not below:
+                    del self._subtrees[backend, regpath]
+
+    def _drop(self, item_key: Any) -> None:
+        del self._items[item_key]
+        key = item_key[0]
+        members = self._by_key.get(key)
+        if members is not None:
+            members.discard(item_key)
+            if not members:
+                del self._by_key[key]
+                self._unindex(key)
+
+    def _drop_key(self, key: CacheKey) -> None:
+        members = self._by_key.pop(key, None)
+        if members is None:
+            return
+        self._unindex(key)
+        for item_key in members:
+            del self._items[item_key]
+            self._invalidations += 1
+
+    def invalidate(
+        self,
+        backend: RegistryBackend,
+        regpath: RegistryPathString,
+        *,
+        tree: bool = False,
+        created: bool = False,
+    ) -> None:
+        # Drops everything cached for `regpath` in either registry view; with
+        # `tree`, for every key below it as well. `created` also forgets the
+        # negative existence entries of its ancestors, which CreateKeyEx may
+        # have created along the way.
+        with self._lock:
+            if not self._by_key:
+                return
+            if tree:
+                for key in list(self._subtrees.get((backend, regpath), ())):
+                    self._drop_key(key)
+            else:
+                for view in (False, True):
+                    self._drop_key((backend, regpath, view))
+            if not created:
+                return
+            for ancestor in _lineage(regpath._parent):
+                for view in (False, True):
+                    item_key = ((backend, ancestor, view), "e", "")
+                    if item_key in self._items:
+                        self._drop(item_key)
+                        self._invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._by_key.clear()
+            self._subtrees.clear()
+
+    def stats(self) -> ValueCacheStats:
+        with self._lock:
+            return ValueCacheStats(
+                self._hits,
+                self._negative_hits,
+                self._misses,
+                self._stale,
+                self._evictions,
+                self._invalidations,
+                len(self._items),
+            )
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}: {len(self)}/{self._max_size} items>"
+
+
+_caches: "weakref.WeakSet[ValueCache]" = weakref.WeakSet()
+
+
+def invalidate_caches(
+    backend: RegistryBackend,
+    regpath: RegistryPathString,
+    *,
+    tree: bool = False,
+    created: bool = False,
+) -> None:
+    for cache in list(_caches):
+        cache.invalidate(backend, regpath, tree=tree, created=created)
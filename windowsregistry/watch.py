@@ -0,0 +1,446 @@
+# This file is part of windowsregistry (https://github.com/DinhHuy2010/windowsregistry.py)
+#
+# MIT License
+#
+# Copyright (c) 2024 DinhHuy2010 (https://github.com/DinhHuy2010)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import sys
+import threading
+import time
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, NamedTuple, Optional
+
+from .backends import WinregBackend
+from .core import RegistryPath
+from .errors import WindowsRegistryError
+from .regpath import RegistryPathString
+from .snapshot import DiffEntry, DiffKind, RegistrySnapshot, diff
+
+_logger = logging.getLogger(__name__)
+
+
+class ChangeEvent(NamedTuple):
+    regpath: RegistryPathString
+    # All changes found by one poll, coalesced into a single event.
+    entries: tuple[DiffEntry, ...]
+    timestamp: float
+
+
+ChangeCallback = Callable[[ChangeEvent], Any]
+
+
+class Watch:
+    def __init__(
+        self,
+        watcher: "RegistryWatcher",
+        path: RegistryPath,
+        recursive: bool,
+        interval: float,
+    ) -> None:
+        self._watcher = watcher
+        self._path = path
+        self._recursive = recursive
+        self._interval = interval
+        self._snapshot: Optional[RegistrySnapshot] = None
+        # Serialises polls: RegistryWatcher.poll() may run on another thread
+        # while the scheduler thread polls the same watch.
+        self._lock = threading.Lock()
+        self._sinks: list[ChangeCallback] = []
+        self._generation = 0
+        self._cancelled = False
+        self._native: Any = None
+
+    @property
+    def regpath(self) -> RegistryPathString:
+        return self._path.regpath
+
+    @property
+    def recursive(self) -> bool:
+        return self._recursive
+
+    @property
+    def interval(self) -> float:
+        return self._interval
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def add_callback(self, callback: ChangeCallback) -> None:
+        self._sinks.append(callback)
+
+    def remove_callback(self, callback: ChangeCallback) -> None:
+        self._sinks.remove(callback)
+
+    def cancel(self) -> None:
+        self._watcher._unregister(self)
+
+    def _capture(self) -> Optional[RegistrySnapshot]:
+        try:
+            if self._snapshot is None:
+                return RegistrySnapshot.capture(
+                    self._path, max_depth=None if self._recursive else 0
+                )
+            return self._snapshot.refresh(self._path)
+        except WindowsRegistryError:
+            return None
+
+    def _poll(self) -> Optional[ChangeEvent]:
+        old, new = self._snapshot, self._capture()
+        self._snapshot = new
+        if old is None and new is None:
+            return None
+        if new is None:
+            assert old is not None
+            entries: tuple[DiffEntry, ...] = (
+                DiffEntry(DiffKind.KEY_REMOVED, old.regpath, None, None, None),
+            )
+        elif old is None:
+            empty = new._replace(root=new.root._replace(values=(), subkeys=()))
+            entries = (
+                DiffEntry(DiffKind.KEY_ADDED, new.regpath, None, None, None),
+                *diff(empty, new).entries,
+            )
+        else:
+            entries = diff(old, new).entries
+        if not entries:
+            return None
+        return ChangeEvent(self.regpath, entries, time.time())
+
+    def __aiter__(self) -> AsyncIterator[ChangeEvent]:
+        return self.events()
+
+    async def events(self) -> AsyncGenerator[ChangeEvent, None]:
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue[ChangeEvent] = asyncio.Queue()
+
+        def sink(event: ChangeEvent) -> None:
+            loop.call_soon_threadsafe(events.put_nowait, event)
+
+        self.add_callback(sink)
+        try:
+            while True:
+                yield await events.get()
+        finally:
+            self.remove_callback(sink)
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}: {self.regpath.fullpath}>"
+
+
+class _NativeNotifier:
+    # RegNotifyChangeKeyValue on an auto-reset event per watch; the scheduler
+    # thread waits on all of them (plus a wake-up event) instead of sleeping.
+
+    MAXIMUM_WAIT_OBJECTS = 64
+    _FILTER = 0x1 | 0x4  # REG_NOTIFY_CHANGE_NAME | REG_NOTIFY_CHANGE_LAST_SET
+
+    def __init__(self) -> None:
+        import ctypes  # noqa: PLC0415
+        import winreg  # noqa: PLC0415
+        from ctypes import wintypes  # noqa: PLC0415
+
+        self._ctypes = ctypes
+        self._winreg = winreg
+        self._kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        self._advapi32 = ctypes.WinDLL("advapi32", use_last_error=True)
+        self._kernel32.CreateEventW.restype = wintypes.HANDLE
+        self._kernel32.CreateEventW.argtypes = (
+            ctypes.c_void_p,
+            wintypes.BOOL,
+            wintypes.BOOL,
+            wintypes.LPCWSTR,
+        )
+        self._kernel32.WaitForMultipleObjects.restype = wintypes.DWORD
+        self._kernel32.WaitForMultipleObjects.argtypes = (
+            wintypes.DWORD,
+            ctypes.POINTER(wintypes.HANDLE),
+            wintypes.BOOL,
+            wintypes.DWORD,
+        )
+        self._advapi32.RegNotifyChangeKeyValue.restype = wintypes.LONG
+        self._advapi32.RegNotifyChangeKeyValue.argtypes = (
+            wintypes.HANDLE,
+            wintypes.BOOL,
+            wintypes.DWORD,
+            wintypes.HANDLE,
+            wintypes.BOOL,
+        )
+        self._handle_type = wintypes.HANDLE
+        self._wake = self._kernel32.CreateEventW(None, False, False, None)
+        self._watches: dict[Watch, tuple[Any, Any]] = {}
+
+    def full(self) -> bool:
+        return len(self._watches) >= self.MAXIMUM_WAIT_OBJECTS - 1
+
+    def attach(self, watch: Watch) -> bool:
+        regpath = watch.regpath
+        wow64 = watch._path._backend._ll._permconf.wow64_32key_access
+        access = self._winreg.KEY_NOTIFY | (
+            self._winreg.KEY_WOW64_32KEY if wow64 else 0
+        )
+        try:
+            key = self._winreg.OpenKeyEx(regpath.root_key.value, regpath.path, 0, access)
+        except OSError:
+            return False
+        event = self._kernel32.CreateEventW(None, False, False, None)
+        self._watches[watch] = (key, event)
+        if not self.arm(watch):
+            self.detach(watch)
+            return False
+        return True
+
+    def arm(self, watch: Watch) -> bool:
+        key, event = self._watches[watch]
+        status = self._advapi32.RegNotifyChangeKeyValue(
+            int(key), watch.recursive, self._FILTER, event, True
+        )
+        return status == 0
+
+    def detach(self, watch: Watch) -> None:
+        entry = self._watches.pop(watch, None)
+        if entry is not None:
+            key, event = entry
+            key.Close()
+            self._kernel32.CloseHandle(event)
+
+    def wake(self) -> None:
+        self._kernel32.SetEvent(self._wake)
+
+    def wait(self, timeout: Optional[float]) -> list[Watch]:
+        watches = list(self._watches)
+        handles = [self._wake, *(self._watches[w][1] for w in watches)]
+        array = (self._handle_type * len(handles))(*handles)
+        millis = 0xFFFFFFFF if timeout is None else max(0, int(timeout * 1000))
+        index = self._kernel32.WaitForMultipleObjects(len(handles), array, False, millis)
+        if not 1 <= index < len(handles):
+            return []
+        return [watches[index - 1]]
+
+    def close(self) -> None:
+        for watch in list(self._watches):
+            self.detach(watch)
+        self._kernel32.CloseHandle(self._wake)
+
+
+class RegistryWatcher:
+    # A single scheduler thread polls every registered watch. Each poll
+    # refreshes a snapshot, which only re-reads keys whose last_modified has
+    # moved; quiet watches back off towards max_interval, and a change drops
+    # the watch back to min_interval.
+
+    def __init__(
+        self,
+        *,
+        min_interval: float = 0.5,
+        max_interval: float = 30.0,
+        backoff: float = 1.5,
+        native: bool = False,
+    ) -> None:
+        self._min_interval = min_interval
+        self._max_interval = max(min_interval, max_interval)
+        self._backoff = max(1.0, backoff)
+        self._use_native = native and sys.platform == "win32"
+        self._native: Optional[_NativeNotifier] = None
+        self._cv = threading.Condition()
+        self._queue: list[tuple[float, int, int, Watch]] = []
+        self._counter = itertools.count()
+        self._watches: set[Watch] = set()
+        self._attach: list[Watch] = []
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+    def watch(
+        self,
+        path: RegistryPath,
+        callback: Optional[ChangeCallback] = None,
+        *,
+        recursive: bool = False,
+    ) -> Watch:
+        watch = Watch(self, path, recursive, self._min_interval)
+        if callback is not None:
+            watch.add_callback(callback)
+        watch._snapshot = watch._capture()
+        with self._cv:
+            if self._stopped:
+                raise RuntimeError("watcher is closed")
+            self._watches.add(watch)
+            if self._use_native and isinstance(path._backend._ll.backend, WinregBackend):
+                self._attach.append(watch)
+            self._schedule(watch, time.monotonic() + watch._interval)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="windowsregistry-watcher", daemon=True
+                )
+                self._thread.start()
+            self._wake()
+        return watch
+
+    def _unregister(self, watch: Watch) -> None:
+        with self._cv:
+            watch._cancelled = True
+            watch._generation += 1
+            self._watches.discard(watch)
+            self._wake()
+
+    def _schedule(self, watch: Watch, due: float) -> None:
+        watch._generation += 1
+        heapq.heappush(self._queue, (due, next(self._counter), watch._generation, watch))
+
+    def _wake(self) -> None:
+        self._cv.notify_all()
+        if self._native is not None:
+            self._native.wake()
+
+    def _deliver(self, watch: Watch, event: ChangeEvent) -> None:
+        for sink in list(watch._sinks):
+            try:
+                sink(event)
+            except Exception:  # noqa: BLE001
+                _logger.exception("watch callback failed for %s", watch.regpath)
+
+    def _poll(self, watch: Watch, now: float) -> None:
+        with watch._lock:
+            event = watch._poll()
+            if event is not None:
+                watch._interval = self._min_interval
+            else:
+                watch._interval = min(
+                    watch._interval * self._backoff, self._max_interval
+                )
+        with self._cv:
+            if watch._cancelled:
+                return
+            if watch._native is not None:
+                # Notifications do the fast path; polling is only a safety net.
+                self._schedule(watch, now + self._max_interval)
+            else:
+                self._schedule(watch, now + watch._interval)
+        if event is not None:
+            self._deliver(watch, event)
+
+    def poll(self) -> int:
+        # Polls every watch immediately on the calling thread.
+        with self._cv:
+            watches = list(self._watches)
+        now = time.monotonic()
+        for watch in watches:
+            self._poll(watch, now)
+        return len(watches)
+
+    def _sync_native(self) -> None:
+        with self._cv:
+            attach, self._attach = self._attach, []
+            detach = (
+                [w for w in self._native._watches if w._cancelled]
+                if self._native is not None
+                else []
+            )
+        if attach and self._native is None:
+            try:
+                self._native = _NativeNotifier()
+            except (ImportError, OSError, AttributeError):
+                self._use_native = False
+                return
+        assert self._native is not None or not attach
+        for watch in detach:
+            self._native.detach(watch)  # type: ignore[union-attr]
+        for watch in attach:
+            if watch._cancelled or self._native.full():  # type: ignore[union-attr]
+                continue
+            if self._native.attach(watch):  # type: ignore[union-attr]
+                watch._native = self._native
+
+    def _run(self) -> None:
+        while True:
+            if self._use_native:
+                self._sync_native()
+            with self._cv:
+                if self._stopped:
+                    break
+                now = time.monotonic()
+                due: list[Watch] = []
+                while self._queue and self._queue[0][0] <= now:
+                    _, _, generation, watch = heapq.heappop(self._queue)
+                    if generation == watch._generation and not watch._cancelled:
+                        due.append(watch)
+                timeout = self._queue[0][0] - now if self._queue else None
+                if not due and self._native is None:
+                    self._cv.wait(timeout)
+                    continue
+            for watch in due:
+                self._poll(watch, now)
+            if due or self._native is None:
+                continue
+            for watch in self._native.wait(timeout):
+                if not watch._cancelled:
+                    self._poll(watch, time.monotonic())
+                    self._native.arm(watch)
+        if self._native is not None:
+            self._native.close()
+            self._native = None
+
+    def close(self) -> None:
+        with self._cv:
+            self._stopped = True
+            self._watches.clear()
+            self._queue.clear()
+            self._wake()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def __enter__(self) -> "RegistryWatcher":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._watches)
+
+
+_default_watcher: Optional[RegistryWatcher] = None
+_default_lock = threading.Lock()
+
+
+def get_default_watcher() -> RegistryWatcher:
+    global _default_watcher
+    with _default_lock:
+        if _default_watcher is None:
+            _default_watcher = RegistryWatcher()
+        return _default_watcher
+
+
+def watch(
+    path: RegistryPath,
+    callback: Optional[ChangeCallback] = None,
+    *,
+    recursive: bool = False,
+    watcher: Optional[RegistryWatcher] = None,
+) -> Watch:
+    watcher = watcher if watcher is not None else get_default_watcher()
+    return watcher.watch(path, callback, recursive=recursive)